@@ -0,0 +1,54 @@
+"""
+RAG 질의응답 답변 캐시
+- 키: (인덱스 버전, 정규화된 질문) - 인덱스가 교체/갱신되면 자동으로 다른 키가 되어 무효화
+- 프로세스 내 LRU + TTL (사용자 세션 간 공유)
+"""
+
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+def normalize_query(query):
+    """유니코드 정규화, 소문자화, 공백 정리, 끝 문장부호 제거"""
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = re.sub(r"\s+", " ", query).strip()
+    return query.rstrip("?!.。？！ ")
+
+class AnswerCache:
+    """(인덱스 버전, 정규화 질문) → {"answer", "sources"}"""
+
+    def __init__(self, capacity=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0}
+
+    def get(self, index_version, query):
+        key = (index_version, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry["stored_at"] > self.ttl:
+                self._entries.pop(key, None)
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return entry["value"]
+
+    def put(self, index_version, query, value):
+        key = (index_version, normalize_query(query))
+        with self._lock:
+            self._entries[key] = {"value": value, "stored_at": time.monotonic()}
+            self._entries.move_to_end(key)
+            # 이전 인덱스 버전의 항목은 더 이상 조회되지 않으므로 먼저 정리
+            for stale in [k for k in self._entries if k[0] != index_version]:
+                del self._entries[stale]
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
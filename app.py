@@ -1,4 +1,11 @@
 import streamlit as st
+from startup_timing import timed, render_report
+from tracing import span
+from openai_client import connection_stats
+from llm_gateway import gateway_stats
+from model_routing import routing_report
+from draft_store import restore_session_draft, persist_session_draft
+import iso_context
 
 # 페이지 설정
 st.set_page_config(
@@ -12,14 +19,46 @@ pages = [
     st.Page("survey_gen.py", title="1단계: 질문 생성", icon="📝"),
     st.Page("metric_gen.py", title="2단계: 메트릭 구성", icon="📊"),
     st.Page("iso25010_rag.py", title="RAG 데이터 구성", icon="⚙️"),
+    st.Page("trace_admin.py", title="관리자: 실행 추적", icon="🔍"),
+    st.Page("perf_dashboard.py", title="관리자: 성능 대시보드", icon="📈"),
 ]
 
+# 3단계 질문 생성용 품질 속성별 ISO 25010 문맥을 백그라운드로 미리 계산 (프로세스당 한 번)
+iso_context.preload()
+
 page = st.navigation(pages)
 
+# 작업 초안 복원 (URL 의 ?draft= 로 다른 인스턴스/재시작 전 작업을 이어서 진행)
+restore_session_draft()
+
 # ✅ 세션 상태 기반 초기 페이지 강제 지정
 if "navigated" not in st.session_state:
     st.session_state.navigated = True
     st.switch_page("survey_gen.py")   # 🎯 여기서 디폴트 페이지 지정
 
-# 페이지 실행
-page.run()
+# 페이지 실행 (페이지별 실행 시간 기록 - 기본 페이지는 url_path가 비어 있음)
+# 스크립트 실행 1회가 추적 실행(trace) 1개 - LLM/검색/임베딩/DB span이 이 아래에 기록됨
+page_name = page.url_path or "survey_gen"
+with timed(page_name, "페이지 실행"), span(f"page.{page_name}", kind="run"):
+    try:
+        page.run()
+    finally:
+        # st.rerun / st.stop 으로 중단돼도 변경된 중간 결과는 초안에 저장
+        persist_session_draft()
+render_report()
+
+with st.sidebar.expander("🔌 OpenAI 연결 재사용", expanded=False):
+    st.json(connection_stats())
+
+with st.sidebar.expander("🚦 LLM 게이트웨이", expanded=False):
+    stats = gateway_stats()
+    if stats["callers"]:
+        st.dataframe([{"caller": caller, **summary} for caller, summary in stats["callers"].items()])
+    st.json(stats["deployments"])
+
+with st.sidebar.expander("🧭 모델 라우팅", expanded=False):
+    report = routing_report()
+    if report:
+        st.dataframe(report)
+    else:
+        st.caption("아직 기록된 호출이 없습니다.")
@@ -0,0 +1,99 @@
+"""
+asyncio 실행 코어
+- 프로세스 공용 백그라운드 이벤트 루프 (스레드 1개) 에서 모든 비동기 LLM/검색 호출 실행
+- gather_limited: 세마포어로 동시 실행 수를 제한한 asyncio.gather (하나라도 실패하면 나머지 취소)
+- run_sync: Streamlit 스크립트(동기)에서 코루틴을 실행하고 결과를 기다리는 브리지
+  대기 중 주기적으로 on_tick을 호출하며, 사용자가 페이지를 떠나 Streamlit이 스크립트를 중단하면
+  (StopException / RerunException 등) 실행 중인 코루틴을 취소
+- call_in_loop: 루프 스레드에서 함수 실행 (실행 중인 코루틴이 고치는 상태를 다른 스레드에서 안전하게 복사)
+"""
+
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+
+RUN_SYNC_POLL_INTERVAL = 0.2
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop():
+    """백그라운드 이벤트 루프 (최초 호출 시 데몬 스레드로 시작)"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-core", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+async def _in_context(coro, context):
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+def run_sync(coro, on_tick=None, timeout=None, poll_interval=RUN_SYNC_POLL_INTERVAL):
+    """
+    코루틴을 백그라운드 루프에서 실행하고 결과 반환
+
+    Args:
+        coro: 실행할 코루틴
+        on_tick: 대기 중 주기적으로 호출할 함수 (진행 상황 표시 등 Streamlit 호출 → 중단 요청 감지)
+        timeout: 전체 대기 시간 제한 (초)
+    """
+    # 호출한 스레드의 contextvars(추적 span 등)를 그대로 이어받아 실행
+    future = asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), get_loop())
+    waited = 0.0
+    try:
+        while True:
+            try:
+                return future.result(timeout=poll_interval)
+            except concurrent.futures.TimeoutError:
+                waited += poll_interval
+                if timeout is not None and waited >= timeout:
+                    raise TimeoutError(f"비동기 작업 시간 초과 ({timeout}초)")
+                if on_tick:
+                    on_tick()
+    except BaseException:
+        # 스크립트 중단(페이지 이동/재실행), 시간 초과, 오류 시 남은 호출 취소
+        future.cancel()
+        raise
+
+def call_in_loop(func, timeout=None):
+    """
+    백그라운드 루프 스레드에서 func() 를 실행하고 결과 반환
+    코루틴은 루프 스레드에서만 상태를 고치므로, 그 사이(await 지점)에 복사하면 중간에 바뀌는 일이 없음
+    """
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+
+    get_loop().call_soon_threadsafe(run)
+    return future.result(timeout=timeout)
+
+async def gather_limited(coros, limit):
+    """
+    동시 실행 수를 limit으로 제한하여 실행 (결과는 입력 순서)
+    하나라도 예외가 나면 나머지 작업을 취소하고 예외 전달
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    tasks = [asyncio.ensure_future(run(coro)) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
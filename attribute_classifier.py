@@ -0,0 +1,338 @@
+"""
+4단계 품질 속성 분류 cascade (확신할 수 있는 질문은 LLM 호출 없이 분류)
+- 1단계 keyword: ISO 25010 문서의 부특성 keywords/이름(한글·영문)을 Aho-Corasick 으로 한 번에 찾아 품질 속성별 점수
+- 2단계 example: 부특성 example_questions 와의 문자 bigram TF-IDF 코사인 유사도
+- 3단계 llm: 1·2위 점수 차(margin)가 임계값보다 작으면 기존 RAG + LLM 검증으로 넘김
+- keyword 단계는 서로 다른 키워드가 CLASSIFIER_KEYWORD_DISTINCT 개 이상 일치하거나 example 단계 1위와 같은 속성일 때만 확정
+  (키워드 하나만 일치하면 2위가 없어 margin 이 항상 1.0 이므로 "인터페이스" 하나로 호환성이 되는 식의 오분류 방지)
+- 임계값은 정답이 있는 질문으로 보정 (python attribute_classifier.py --calibrate [labels.jsonl])
+  기본 정답 파일(CLASSIFIER_LABELS_PATH)은 문서와 별도로 작성한 질문이며, 없으면 문서의 example_questions 를
+  leave-one-out 으로 사용해 example 단계만 보정 (키워드가 같은 예시로 작성되어 keyword 단계 보정에는 낙관적)
+"""
+
+import os
+import re
+import json
+import math
+import argparse
+import threading
+import unicodedata
+from collections import Counter, deque
+from dotenv import load_dotenv
+
+from iso_context import ISO_DOCUMENTS_PATH, load_documents_from_file
+
+load_dotenv()
+
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+# 1단계: 1위 키워드 점수(일치 글자 수)가 CLASSIFIER_KEYWORD_MIN 이상이고 (1위 - 2위) / 1위 가 이 값 이상이며
+# 서로 다른 키워드가 CLASSIFIER_KEYWORD_DISTINCT 개 이상 일치(또는 example 단계와 일치)하면 확정
+# 기본값은 CLASSIFIER_LABELS_PATH 보정 결과 (keyword_min 2 / margin 0.05 에서 정밀도 0.96) 보다 보수적으로 잡은 값
+CLASSIFIER_KEYWORD_MARGIN = float(os.getenv("CLASSIFIER_KEYWORD_MARGIN", "0.5"))
+CLASSIFIER_KEYWORD_MIN = float(os.getenv("CLASSIFIER_KEYWORD_MIN", "3"))
+CLASSIFIER_KEYWORD_DISTINCT = int(os.getenv("CLASSIFIER_KEYWORD_DISTINCT", "2"))
+# 2단계: 1위 유사도가 CLASSIFIER_EXAMPLE_MIN 이상이고 1위 - 2위 유사도가 이 값 이상이면 확정
+CLASSIFIER_EXAMPLE_MARGIN = float(os.getenv("CLASSIFIER_EXAMPLE_MARGIN", "0.4"))
+CLASSIFIER_EXAMPLE_MIN = float(os.getenv("CLASSIFIER_EXAMPLE_MIN", "0.35"))
+# 보정 시 목표 정밀도
+CLASSIFIER_TARGET_PRECISION = float(os.getenv("CLASSIFIER_TARGET_PRECISION", "0.95"))
+# 보정용 정답 질문 (문서의 keywords/example_questions 와 별도로 작성, JSONL: {"question", "quality_attribute"})
+CLASSIFIER_LABELS_PATH = os.getenv("CLASSIFIER_LABELS_PATH", "./data/classifier_labels.jsonl")
+
+# 이전 설문에서 확정된 분류 재사용 (classification_memo)
+TIER_MEMO = "memo"
+TIER_KEYWORD = "keyword"
+TIER_EXAMPLE = "example"
+TIER_LLM = "llm"
+TIERS = (TIER_MEMO, TIER_KEYWORD, TIER_EXAMPLE, TIER_LLM)
+
+def normalize(text):
+    """비교용: 유니코드 정규화, 소문자, 공백/문장부호 제거"""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return re.sub(r"[\s\W_]+", "", text)
+
+class AhoCorasick:
+    """다중 문자열 검색 오토마톤 (패턴 수와 무관하게 텍스트 길이에 비례)"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, pattern, value):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((pattern, value))
+
+    def build(self):
+        """실패 링크 계산 (패턴을 모두 추가한 뒤 한 번 호출)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def find_all(self, text):
+        """(시작 위치, 패턴, 값) 목록"""
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern, value in self._out[node]:
+                matches.append((i - len(pattern) + 1, pattern, value))
+        return matches
+
+def _normalize_with_word_starts(text):
+    """normalize 결과 + 각 어절 첫 글자의 위치 (공백/문장부호 뒤 첫 글자)"""
+    chars, word_starts = [], set()
+    at_boundary = True
+    for ch in unicodedata.normalize("NFKC", str(text)).lower():
+        if re.match(r"[\s\W_]", ch):
+            at_boundary = True
+            continue
+        if at_boundary:
+            word_starts.add(len(chars))
+            at_boundary = False
+        chars.append(ch)
+    return "".join(chars), word_starts
+
+def _bigrams(text):
+    text = normalize(text)
+    return Counter(text[i:i + 2] for i in range(len(text) - 1)) if len(text) > 1 else Counter(text)
+
+def _split(value, sep):
+    if isinstance(value, list):
+        return [v.strip() for v in value if v and v.strip()]
+    return [v.strip() for v in str(value or "").split(sep) if v.strip()]
+
+def _ranked(scores):
+    """점수 내림차순 (1위, 1위 점수, 2위 점수)"""
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    if not ranked:
+        return None, 0.0, 0.0
+    return ranked[0][0], ranked[0][1], ranked[1][1] if len(ranked) > 1 else 0.0
+
+class AttributeClassifier:
+    """ISO 25010 문서(부특성 keywords/example_questions)로 만든 품질 속성 분류기"""
+
+    def __init__(self, documents, keyword_margin=CLASSIFIER_KEYWORD_MARGIN, keyword_min=CLASSIFIER_KEYWORD_MIN,
+                 example_margin=CLASSIFIER_EXAMPLE_MARGIN, example_min=CLASSIFIER_EXAMPLE_MIN,
+                 keyword_distinct=CLASSIFIER_KEYWORD_DISTINCT):
+        self.keyword_margin = keyword_margin
+        self.keyword_min = keyword_min
+        self.keyword_distinct = keyword_distinct
+        self.example_margin = example_margin
+        self.example_min = example_min
+
+        # 부특성/품질 속성명 → 품질 속성 (3단계가 부특성명을 붙인 경우 같은 속성으로 판단)
+        self.attribute_of = {}
+        self.examples = []  # (품질 속성, 예시 질문)
+        self._matcher = AhoCorasick()
+        patterns = {}
+        for doc in documents:
+            attr = doc.get("quality_characteristic")
+            if not attr:
+                continue
+            self.attribute_of[normalize(attr)] = attr
+            if doc.get("sub_characteristic"):
+                self.attribute_of[normalize(doc["sub_characteristic"])] = attr
+            names = [doc.get("sub_characteristic"), doc.get("sub_characteristic_en")]
+            for keyword in _split(doc.get("keywords"), "|") + [n for n in names if n]:
+                pattern = normalize(keyword)
+                if pattern:
+                    patterns.setdefault(pattern, set()).add(attr)
+            for question in _split(doc.get("example_questions"), "\n"):
+                self.examples.append((attr, question))
+
+        for pattern, attrs in patterns.items():
+            self._matcher.add(pattern, frozenset(attrs))
+        self._matcher.build()
+
+        # 예시 질문 bigram TF-IDF (여러 품질 속성 예시에 공통인 "합니까" 같은 어미는 가중치가 낮음)
+        vectors = [_bigrams(question) for _, question in self.examples]
+        document_freq = Counter(gram for vector in vectors for gram in vector)
+        self._idf = {gram: math.log((1 + len(vectors)) / (1 + freq)) + 1 for gram, freq in document_freq.items()}
+        self._example_vectors = [self._weigh(vector) for vector in vectors]
+
+    def _weigh(self, counts):
+        vector = {gram: count * self._idf.get(gram, 1.0) for gram, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {gram: v / norm for gram, v in vector.items()}
+
+    def canonical(self, attribute):
+        """품질 속성/부특성명 → 품질 속성 (모르는 이름은 None)"""
+        return self.attribute_of.get(normalize(attribute or ""))
+
+    def keyword_matches(self, question):
+        """
+        품질 속성별 일치한 키워드 집합
+        어절 중간에서 시작하는 일치는 제외 ("추가가 용이" 의 "가용" 등)
+        """
+        text, word_starts = _normalize_with_word_starts(question)
+        matched = {}
+        for start, pattern, attrs in self._matcher.find_all(text):
+            if start not in word_starts:
+                continue
+            for attr in attrs:
+                matched.setdefault(attr, set()).add(pattern)
+        return matched
+
+    def keyword_scores(self, question):
+        """품질 속성별 일치 키워드 길이 합 (같은 키워드는 한 번만)"""
+        return {attr: float(sum(len(p) for p in patterns)) for attr, patterns in self.keyword_matches(question).items()}
+
+    def keyword_candidate(self, question, example_scores):
+        """
+        keyword 단계 후보 (1위 속성, 1위 점수, margin, 확인 여부)
+        확인: 서로 다른 키워드가 keyword_distinct 개 이상 일치하거나 example 단계 1위(example_min 이상)와 같은 속성
+        """
+        matches = self.keyword_matches(question)
+        scores = {attr: float(sum(len(p) for p in patterns)) for attr, patterns in matches.items()}
+        attr, top, second = _ranked(scores)
+        if attr is None:
+            return None, 0.0, 0.0, False
+        example_attr, example_top, _ = _ranked(example_scores)
+        confirmed = (len(matches[attr]) >= self.keyword_distinct
+                     or (example_attr == attr and example_top >= self.example_min))
+        return attr, top, (top - second) / top, confirmed
+
+    def example_scores(self, question, exclude=None):
+        """품질 속성별 가장 비슷한 예시 질문의 코사인 유사도 (exclude: 제외할 예시 번호)"""
+        vector = self._weigh(_bigrams(question))
+        scores = {}
+        for idx, ((attr, _), example) in enumerate(zip(self.examples, self._example_vectors)):
+            if idx == exclude:
+                continue
+            similarity = sum(weight * example.get(gram, 0.0) for gram, weight in vector.items())
+            if similarity > scores.get(attr, 0.0):
+                scores[attr] = similarity
+        return scores
+
+    def classify(self, question, exclude_example=None):
+        """
+        질문 → {"tier", "attribute", "score", "margin"}
+        tier 가 llm 이면 attribute 는 참고용(가장 점수가 높은 후보)이며 LLM 검증이 필요함
+        """
+        example_scores = self.example_scores(question, exclude_example)
+        attr, top, margin, confirmed = self.keyword_candidate(question, example_scores)
+        if attr is not None and top >= self.keyword_min and margin >= self.keyword_margin and confirmed:
+            return {"tier": TIER_KEYWORD, "attribute": attr, "score": top, "margin": round(margin, 4)}
+
+        example_attr, top, second = _ranked(example_scores)
+        margin = top - second
+        if example_attr is not None and top >= self.example_min and margin >= self.example_margin:
+            return {"tier": TIER_EXAMPLE, "attribute": example_attr, "score": round(top, 4), "margin": round(margin, 4)}
+
+        return {"tier": TIER_LLM, "attribute": attr or example_attr, "score": round(top, 4), "margin": round(margin, 4)}
+
+_classifier = None
+_lock = threading.Lock()
+
+def get_classifier():
+    """프로세스 공용 분류기 (처음 호출 시 ISO 25010 문서 파일로 한 번 구성)"""
+    global _classifier
+    with _lock:
+        if _classifier is None:
+            _classifier = AttributeClassifier(load_documents_from_file())
+        return _classifier
+
+def tier_counts(results):
+    """4단계 결과 → 단계별로 분류한 질문 수"""
+    counts = Counter(result.get("tier", TIER_LLM) for result in results)
+    return {tier: counts.get(tier, 0) for tier in TIERS}
+
+# keyword 단계 보정 후보 (최소 일치 글자 수)
+KEYWORD_MIN_CANDIDATES = (2, 3, 4, 5, 6, 8)
+
+def calibrate(classifier, labelled, target_precision=CLASSIFIER_TARGET_PRECISION, leave_one_out=False):
+    """
+    정답 있는 질문으로 단계별 임계값 보정
+    - keyword 단계: 목표 정밀도를 만족하는 (keyword_min, margin) 중 처리 비율이 가장 높은 값 (같으면 작은 값)
+    - example 단계: 목표 정밀도를 만족하는 가장 작은 margin (= LLM 호출을 가장 많이 줄이는 값)
+
+    Args:
+        labelled: [(질문, 품질 속성)]
+        leave_one_out: labelled 가 classifier.examples 와 같은 순서일 때 자기 자신을 유사도 비교에서 제외
+            이때 키워드는 같은 예시로 작성되어 정밀도가 낙관적이므로 keyword 단계는 보정하지 않음 (None)
+
+    Returns:
+        {"keyword_min", "keyword_margin", "example_margin", "keyword": {...}, "example": {...}}
+    """
+    keyword_rows, example_rows = [], []
+    for idx, (question, label) in enumerate(labelled):
+        label = classifier.canonical(label) or label
+        example_scores = classifier.example_scores(question, idx if leave_one_out else None)
+        attr, top, margin, confirmed = classifier.keyword_candidate(question, example_scores)
+        if attr is not None and confirmed:
+            keyword_rows.append((top, margin, attr == label))
+        example_attr, top, second = _ranked(example_scores)
+        if example_attr is not None and top >= classifier.example_min:
+            example_rows.append((top - second, example_attr == label))
+
+    def accepted_stats(accepted):
+        if accepted and sum(accepted) / len(accepted) >= target_precision:
+            return {"coverage": round(len(accepted) / len(labelled), 4),
+                    "precision": round(sum(accepted) / len(accepted), 4)}
+        return None
+
+    not_calibrated = {"coverage": 0.0, "precision": None}
+
+    keyword_min, keyword_margin, keyword_stats = None, None, not_calibrated
+    if not leave_one_out:
+        for minimum in KEYWORD_MIN_CANDIDATES:
+            for threshold in [i / 20 for i in range(1, 21)]:
+                stats = accepted_stats([correct for top, margin, correct in keyword_rows
+                                        if top >= minimum and margin >= threshold])
+                if stats and stats["coverage"] > keyword_stats["coverage"]:
+                    keyword_min, keyword_margin, keyword_stats = minimum, threshold, stats
+
+    example_margin, example_stats = None, not_calibrated
+    for threshold in [i / 100 for i in range(1, 51)]:
+        stats = accepted_stats([correct for margin, correct in example_rows if margin >= threshold])
+        if stats:
+            example_margin, example_stats = threshold, stats
+            break
+
+    return {"keyword_min": keyword_min, "keyword_margin": keyword_margin, "example_margin": example_margin,
+            "keyword": keyword_stats, "example": example_stats}
+
+def load_labels(path):
+    """정답 파일 (JSONL: {"question", "quality_attribute"}) → [(질문, 품질 속성)]"""
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["question"], row["quality_attribute"]) for row in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="4단계 품질 속성 분류 cascade 임계값 보정")
+    parser.add_argument("--calibrate", nargs="?", const=CLASSIFIER_LABELS_PATH, metavar="LABELS_JSONL",
+                        help="정답 JSONL (생략 시 CLASSIFIER_LABELS_PATH, 파일이 없으면 문서의 예시 질문을 leave-one-out 으로 사용)")
+    parser.add_argument("--target-precision", type=float, default=CLASSIFIER_TARGET_PRECISION)
+    args = parser.parse_args()
+
+    classifier = AttributeClassifier(load_documents_from_file())
+    if args.calibrate and os.path.exists(args.calibrate):
+        labelled, leave_one_out = load_labels(args.calibrate), False
+    else:
+        labelled, leave_one_out = [(q, a) for a, q in classifier.examples], True
+        print("⚠️ 정답 파일이 없어 문서 예시 질문으로 example 단계만 보정합니다 (keyword 단계는 별도 정답 필요).")
+    print(f"📏 {len(labelled)}개 질문으로 보정 (문서: {ISO_DOCUMENTS_PATH}, 목표 정밀도 {args.target_precision})")
+    result = calibrate(classifier, labelled, args.target_precision, leave_one_out)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"👉 CLASSIFIER_KEYWORD_MIN={result['keyword_min']} CLASSIFIER_KEYWORD_MARGIN={result['keyword_margin']} "
+          f"CLASSIFIER_EXAMPLE_MARGIN={result['example_margin']}")
@@ -0,0 +1,222 @@
+"""
+설문 일괄 생성 CLI
+- CSV / JSONL 의 프로젝트 입력(열 이름은 survey_store.PROJECT_FIELDS)을 읽어 여러 프로젝트를 동시에 생성
+- LLM 호출은 게이트웨이 일괄 레인으로 전송 → 배포별 전역 토큰 버킷(LLM_TOKENS_PER_MINUTE / LLM_DEPLOYMENT_LIMITS)을 화면과 공유
+- 결과는 화면과 같은 방식으로 Postgres에 저장하고 처리량/실패 보고
+
+실행: python batch_generate.py projects.csv [--concurrency 4] [--scale likert_5] [--report report.json]
+"""
+
+import os
+import csv
+import json
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+from async_core import gather_limited, run_sync
+from attribute_classifier import TIERS, tier_counts
+from db.connection import get_connection
+from llm_gateway import LANE_BULK
+from metric_library import reuse_summary
+from metric_pipeline import SCALE_DESCRIPTIONS, run_metric_pipeline
+from iso_context import ISO_CONTEXT_ENABLED
+from survey_pipeline import count_corrections, parse_questions, run_survey_pipeline
+from survey_store import PROJECT_FIELDS, build_input_info, load_questions, project_exists, save_metrics, save_survey
+from tracing import span
+
+load_dotenv()
+
+# 동시에 생성할 프로젝트 수 (LLM 호출 자체는 게이트웨이가 전역으로 제한)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# 필수 입력 열
+REQUIRED_FIELDS = ["project_name", "software_description"]
+
+def load_projects(path):
+    """CSV(.csv) 또는 JSONL 파일 → 프로젝트 입력 목록"""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    projects = []
+    for line_no, row in enumerate(rows, start=1):
+        missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+        if missing:
+            raise ValueError(f"{line_no}번째 항목에 필수 값이 없습니다: {', '.join(missing)}")
+        project = {field: (str(row[field]).strip() if row.get(field) not in (None, "") else None) for field in PROJECT_FIELDS}
+        project["survey_item_count"] = int(project["survey_item_count"] or 0)
+        projects.append(project)
+
+    names = [p["project_name"] for p in projects]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"입력 파일에 중복된 프로젝트명이 있습니다: {', '.join(duplicates)}")
+    return projects
+
+def _exists(project_name):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            return project_exists(cur, project_name)
+    finally:
+        conn.close()
+
+def _save_survey(project, state, questions):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            survey_id = save_survey(cur, project, state, questions)
+            saved_questions = load_questions(cur, survey_id)
+        conn.commit()
+        return survey_id, saved_questions
+    finally:
+        conn.close()
+
+def _save_metrics(survey_id, scale_type, metrics, questions, performance):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            saved = save_metrics(cur, survey_id, scale_type, metrics, questions, performance)
+        conn.commit()
+        return saved
+    finally:
+        conn.close()
+
+async def generate_project(project, scale_type=None):
+    """
+    프로젝트 1건 생성 + 저장 (실패해도 예외 대신 결과에 기록)
+
+    Returns:
+        {"project_name", "status": success|skipped|failed, "survey_id", "questions",
+         "validated", "corrections", "tiers", "metrics", "reuse", "seconds", "error"}
+    """
+    started = time.perf_counter()
+    result = {"project_name": project["project_name"], "status": "success",
+              "survey_id": None, "questions": 0, "validated": 0, "corrections": 0, "tiers": {}, "metrics": 0, "reuse": {}, "error": None}
+    with span("batch.project", kind="run", project=project["project_name"]) as project_span:
+        try:
+            # DB 호출은 동기 드라이버이므로 스레드에서 실행 (루프 차단 방지)
+            if await asyncio.to_thread(_exists, project["project_name"]):
+                result["status"] = "skipped"
+                result["error"] = "이미 존재하는 프로젝트명"
+            else:
+                state = {}
+                await run_survey_pipeline(build_input_info(project), state, lane=LANE_BULK)
+                questions = parse_questions(state["final_questions"])
+                if not questions:
+                    raise ValueError("최종 질문을 파싱하지 못했습니다")
+                survey_id, saved_questions = await asyncio.to_thread(_save_survey, project, state, questions)
+                result["survey_id"] = survey_id
+                result["questions"] = len(saved_questions)
+                result["validated"] = len(state["rag_validation_results"])
+                result["corrections"] = count_corrections(state["rag_validation_results"])
+                result["tiers"] = tier_counts(state["rag_validation_results"])
+
+                if scale_type:
+                    metrics, failed, performance = await run_metric_pipeline(saved_questions, scale_type, exclude_survey_id=survey_id)
+                    result["reuse"] = reuse_summary(performance)
+                    result["metrics"] = await asyncio.to_thread(
+                        _save_metrics, survey_id, scale_type, metrics, saved_questions, performance
+                    )
+                    if failed:
+                        result["error"] = f"메트릭 {len(failed)}개 생성 실패"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        project_span.set(outcome=result["status"])
+
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+async def run_batch(projects, concurrency=BATCH_CONCURRENCY, scale_type=None, on_done=None):
+    """프로젝트를 concurrency 개씩 동시에 생성 (결과는 입력 순서)"""
+    async def run(project):
+        result = await generate_project(project, scale_type)
+        if on_done:
+            on_done(result)
+        return result
+
+    return await gather_limited([run(project) for project in projects], concurrency)
+
+def build_report(results, elapsed):
+    """처리량/실패 보고"""
+    succeeded = [r for r in results if r["status"] == "success"]
+    validated = sum(r.get("validated", 0) for r in succeeded)
+    corrections = sum(r.get("corrections", 0) for r in succeeded)
+    reuse = {key: sum(r.get("reuse", {}).get(key, 0) for r in succeeded) for key in ("questions", "reused", "adapted", "saved_ms")}
+    return {
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "elapsed_seconds": round(elapsed, 2),
+        "projects_per_minute": round(len(succeeded) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "questions": sum(r["questions"] for r in succeeded),
+        "metrics": sum(r["metrics"] for r in succeeded),
+        # 4단계에서 품질 속성이 바뀐 질문 비율 (ISO_CONTEXT_ENABLED 켜고/끈 실행 비교용)
+        "corrections": corrections,
+        "correction_rate": round(corrections / validated, 4) if validated else 0.0,
+        # 4단계 cascade 단계별로 분류한 질문 수 (keyword / example / llm)
+        "tiers": {tier: sum(r.get("tiers", {}).get(tier, 0) for r in succeeded) for tier in TIERS},
+        # 메트릭 라이브러리에서 재사용한 메트릭 수와 절약 시간
+        "metric_reuse": {**reuse, "reuse_rate": round(reuse["reused"] / reuse["questions"], 4) if reuse["questions"] else 0.0},
+        "failures": [
+            {"project_name": r["project_name"], "error": r["error"]}
+            for r in results if r["status"] == "failed"
+        ],
+        "results": results,
+    }
+
+def main(path, concurrency=BATCH_CONCURRENCY, scale_type=None, report_path=None):
+    projects = load_projects(path)
+    print(f"📥 {len(projects)}개 프로젝트 로드 (동시 실행 {concurrency}개"
+          + (f", 메트릭 척도 {scale_type}" if scale_type else "") + ")")
+
+    done = {"count": 0}
+
+    def on_done(result):
+        done["count"] += 1
+        icon = {"success": "✅", "skipped": "⏭️", "failed": "❌"}[result["status"]]
+        detail = f"질문 {result['questions']}개" if result["status"] == "success" else result["error"]
+        if result["status"] == "success" and scale_type:
+            detail += f", 메트릭 {result['metrics']}개"
+        print(f"{icon} [{done['count']}/{len(projects)}] {result['project_name']} - {detail} ({result['seconds']}초)")
+
+    started = time.perf_counter()
+    results = run_sync(run_batch(projects, concurrency, scale_type, on_done))
+    report = build_report(results, time.perf_counter() - started)
+
+    print("\n📊 일괄 생성 결과")
+    print(f"   성공 {report['succeeded']} / 건너뜀 {report['skipped']} / 실패 {report['failed']} (전체 {report['total']})")
+    print(f"   소요 {report['elapsed_seconds']}초, 처리량 {report['projects_per_minute']} 프로젝트/분")
+    print(f"   질문 {report['questions']}개, 메트릭 {report['metrics']}개 저장")
+    print(f"   4단계 품질 속성 수정 {report['corrections']}개 (수정 비율 {report['correction_rate']:.1%}, "
+          f"ISO 문맥 {'사용' if ISO_CONTEXT_ENABLED else '미사용'})")
+    print("   4단계 분류 방식: " + ", ".join(f"{tier} {count}개" for tier, count in report["tiers"].items()))
+    if scale_type:
+        reuse = report["metric_reuse"]
+        print(f"   메트릭 재사용 {reuse['reused']}/{reuse['questions']}개 (보정 {reuse['adapted']}개, "
+              f"재사용률 {reuse['reuse_rate']:.1%}, 약 {reuse['saved_ms'] / 1000:.1f}초 절약)")
+    for failure in report["failures"]:
+        print(f"   ❌ {failure['project_name']}: {failure['error']}")
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 보고서 저장: {report_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="설문 일괄 생성")
+    parser.add_argument("input", help="프로젝트 입력 파일 (.csv 또는 .jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="동시에 생성할 프로젝트 수")
+    parser.add_argument("--scale", choices=list(SCALE_DESCRIPTIONS), help="지정 시 메트릭까지 생성")
+    parser.add_argument("--report", help="결과 보고서 JSON 저장 경로")
+    args = parser.parse_args()
+
+    report = main(args.input, args.concurrency, args.scale, args.report)
+    raise SystemExit(1 if report["failed"] else 0)
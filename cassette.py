@@ -0,0 +1,485 @@
+"""
+외부 호출 기록/재생 (카세트)
+- CASSETTE_MODE = off(기본) | record | replay
+  record: 실제 호출의 요청/응답과 원래 지연 시간을 CASSETTE_FILE(JSONL)에 추가
+  replay: 네트워크 없이 카세트의 응답을 반환 (CASSETTE_SPEED = recorded: 기록된 지연 시간만큼 대기 | zero: 즉시)
+- 대상
+  Azure OpenAI  : httpx 전송 계층 (openai_client의 동기/비동기 클라이언트)
+  Azure Search / Blob Storage : azure-core RequestsTransport의 requests 세션 어댑터 (동기/비동기 클라이언트)
+  Postgres      : db.connection 커서 (쿼리별 결과 행 / rowcount)
+- 요청 키: 서비스 + 메서드 + URL(서명/시간 파라미터 제외) + 본문 해시, 같은 키는 기록 순서대로 재생
+  (기록보다 많이 호출되면 마지막 응답 재사용)
+- 요청 헤더(API 키, 서명)는 기록하지 않음
+- httpx 응답은 기록 중에도 스트리밍 그대로 전달 (받은 조각을 그대로 넘기며 조각별 도착 시각을 함께 기록)
+  stream_chat 처럼 stream=True 인 응답도 첫 토큰이 늦어지지 않고, 재생 시 조각을 기록된 시각에 맞춰 반환
+  (첫 바이트 지연 first_byte / 전체 latency 모두 보존)
+  카세트에는 응답을 끝까지 읽고 닫을 때 추가 - 중간에 끊은 스트림은 기록하지 않음
+  azure-core(requests) 응답은 기존처럼 본문을 모두 읽은 뒤 기록
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import hashlib
+import asyncio
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")  # off | record | replay
+CASSETTE_FILE = os.getenv("CASSETTE_FILE", "./data/cassettes/default.jsonl")
+CASSETTE_SPEED = os.getenv("CASSETTE_SPEED", "recorded")  # recorded | zero
+
+# URL 키에서 제외할 쿼리 파라미터 (SAS 서명, 만료 시각 등 실행마다 바뀌는 값)
+_VOLATILE_PARAMS = {"sig", "se", "st", "skoid", "sktid", "skt", "ske", "sks", "skv", "timestamp"}
+# 기록할 응답 헤더 (본문은 압축 해제된 상태로 기록하므로 content-encoding은 제외)
+_KEPT_HEADERS = {"content-type", "etag", "last-modified", "x-ms-blob-type", "content-range"}
+# 기록 중 전달하는 httpx 응답에서 뺄 헤더 (압축 해제한 조각을 넘기므로 길이/인코딩이 달라짐)
+_DECODED_HEADERS = {"content-encoding", "content-length"}
+
+class CassetteMiss(KeyError):
+    """재생 모드에서 카세트에 없는 요청"""
+
+def enabled():
+    return CASSETTE_MODE in ("record", "replay")
+
+def replaying():
+    return CASSETTE_MODE == "replay"
+
+def _normalize_url(url):
+    parts = urlsplit(str(url))
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _VOLATILE_PARAMS)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}" + (f"?{urlencode(query)}" if query else "")
+
+def http_key(service, method, url, body):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256(body or b"").hexdigest()
+    return hashlib.sha256(f"{service} {method.upper()} {_normalize_url(url)} {digest}".encode("utf-8")).hexdigest()
+
+def normalize_statement(statement):
+    """SQL 키 정규화 - execute_values가 펼친 VALUES 목록은 제외"""
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", errors="replace")
+    statement = " ".join(str(statement).split())
+    head, sep, _ = statement.partition(" VALUES (")
+    return head + " VALUES" if sep else statement
+
+def sql_key(statement, params):
+    payload = json.dumps([normalize_statement(statement), params], ensure_ascii=False, default=str)
+    return hashlib.sha256(f"postgres {payload}".encode("utf-8")).hexdigest()
+
+class Cassette:
+    """카세트 파일 하나 (기록 추가 / 키별 순서대로 재생)"""
+
+    def __init__(self, path=CASSETTE_FILE, speed=CASSETTE_SPEED):
+        self.path = path
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._entries = defaultdict(list)
+        self._positions = defaultdict(int)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def record(self, entry):
+        with self._lock:
+            self._entries[entry["key"]].append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def next(self, key, description=""):
+        """키에 해당하는 다음 기록 (모두 재생했으면 마지막 기록)"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"카세트에 없는 요청: {description}")
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def delay(self, entry):
+        return entry.get("latency", 0.0) if self.speed == "recorded" else 0.0
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    global _cassette
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette()
+    return _cassette
+
+def _encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+def _decode_body(entry):
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return entry.get("body", "").encode("utf-8")
+
+def _http_entry(service, key, method, url, status, headers, content, latency, chunks=None):
+    entry = {
+        "service": service,
+        "key": key,
+        "method": method,
+        "url": _normalize_url(url),
+        "status": status,
+        "headers": {k.lower(): v for k, v in headers.items() if k.lower() in _KEPT_HEADERS},
+        "latency": latency,
+        **_encode_body(content),
+    }
+    if chunks:
+        # [[요청 시작부터 도착까지 초, 바이트 수]]
+        entry["chunks"] = [[round(offset, 6), len(chunk)] for offset, chunk in chunks]
+        entry["first_byte"] = chunks[0][0]
+    return entry
+
+def _replay_chunks(entry):
+    """기록된 응답 → [(도착 시각, 조각)] (조각 기록이 없으면 latency 시각에 본문 전체)"""
+    body = _decode_body(entry)
+    if not entry.get("chunks"):
+        return [(entry.get("latency", 0.0), body)]
+    chunks, position = [], 0
+    for offset, size in entry["chunks"]:
+        chunks.append((offset, body[position:position + size]))
+        position += size
+    return chunks
+
+def _passthrough_headers(headers):
+    return [(k, v) for k, v in headers.multi_items() if k.lower() not in _DECODED_HEADERS]
+
+class _RecordingStream(httpx.SyncByteStream):
+    """받은 조각을 그대로 넘기면서 도착 시각을 모아 두고, 끝까지 읽은 뒤 닫힐 때 카세트에 기록"""
+
+    def __init__(self, response, started, record):
+        self.response = response
+        self.started = started
+        self.record = record
+        self.chunks = []
+        self.finished = False
+
+    def __iter__(self):
+        for chunk in self.response.iter_bytes():
+            self.chunks.append((time.perf_counter() - self.started, chunk))
+            yield chunk
+        self.finished = True
+
+    def close(self):
+        self.response.close()
+        if self.finished:
+            self.finished = False
+            self.record(self.chunks, time.perf_counter() - self.started)
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    """_RecordingStream 의 비동기 버전"""
+
+    def __init__(self, response, started, record):
+        self.response = response
+        self.started = started
+        self.record = record
+        self.chunks = []
+        self.finished = False
+
+    async def __aiter__(self):
+        async for chunk in self.response.aiter_bytes():
+            self.chunks.append((time.perf_counter() - self.started, chunk))
+            yield chunk
+        self.finished = True
+
+    async def aclose(self):
+        await self.response.aclose()
+        if self.finished:
+            self.finished = False
+            self.record(self.chunks, time.perf_counter() - self.started)
+
+class _ReplayStream(httpx.SyncByteStream):
+    """기록된 조각을 도착 시각에 맞춰 반환 (speed=zero 면 즉시)"""
+
+    def __init__(self, chunks, timed):
+        self.chunks = chunks
+        self.timed = timed
+
+    def __iter__(self):
+        started = time.perf_counter()
+        for offset, chunk in self.chunks:
+            if self.timed:
+                time.sleep(max(0.0, offset - (time.perf_counter() - started)))
+            yield chunk
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    """_ReplayStream 의 비동기 버전"""
+
+    def __init__(self, chunks, timed):
+        self.chunks = chunks
+        self.timed = timed
+
+    async def __aiter__(self):
+        started = time.perf_counter()
+        for offset, chunk in self.chunks:
+            if self.timed:
+                await asyncio.sleep(max(0.0, offset - (time.perf_counter() - started)))
+            yield chunk
+
+# --- Azure OpenAI (httpx) ---
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx 동기 전송 계층 래퍼"""
+
+    def __init__(self, inner, cassette=None, service="openai"):
+        self.inner = inner
+        self.cassette = cassette or get_cassette()
+        self.service = service
+
+    def handle_request(self, request):
+        key = http_key(self.service, request.method, request.url, request.read())
+        if replaying():
+            entry = self.cassette.next(key, f"{request.method} {request.url}")
+            stream = _ReplayStream(_replay_chunks(entry), timed=self.cassette.delay(entry) > 0)
+            return httpx.Response(entry["status"], headers=entry["headers"], stream=stream)
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+
+        def record(chunks, latency):
+            self.cassette.record(_http_entry(self.service, key, request.method, request.url, response.status_code,
+                                             response.headers, b"".join(c for _, c in chunks), latency, chunks))
+
+        return httpx.Response(response.status_code, headers=_passthrough_headers(response.headers),
+                              stream=_RecordingStream(response, started, record), extensions=response.extensions)
+
+    def close(self):
+        self.inner.close()
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """httpx 비동기 전송 계층 래퍼"""
+
+    def __init__(self, inner, cassette=None, service="openai"):
+        self.inner = inner
+        self.cassette = cassette or get_cassette()
+        self.service = service
+
+    async def handle_async_request(self, request):
+        key = http_key(self.service, request.method, request.url, await request.aread())
+        if replaying():
+            entry = self.cassette.next(key, f"{request.method} {request.url}")
+            stream = _AsyncReplayStream(_replay_chunks(entry), timed=self.cassette.delay(entry) > 0)
+            return httpx.Response(entry["status"], headers=entry["headers"], stream=stream)
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+
+        def record(chunks, latency):
+            self.cassette.record(_http_entry(self.service, key, request.method, request.url, response.status_code,
+                                             response.headers, b"".join(c for _, c in chunks), latency, chunks))
+
+        return httpx.Response(response.status_code, headers=_passthrough_headers(response.headers),
+                              stream=_AsyncRecordingStream(response, started, record), extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+# --- Azure Search / Blob Storage (azure-core → requests) ---
+
+def _service_of(url):
+    host = urlsplit(url).netloc
+    if ".blob." in host:
+        return "blob"
+    if ".search." in host:
+        return "search"
+    return "azure"
+
+class CassetteAdapter(BaseAdapter):
+    """requests 어댑터 - azure-core RequestsTransport 세션에 장착"""
+
+    def __init__(self, cassette=None):
+        super().__init__()
+        self.cassette = cassette or get_cassette()
+        self.inner = HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        service = _service_of(request.url)
+        key = http_key(service, request.method, request.url, request.body)
+        if replaying():
+            entry = self.cassette.next(key, f"{request.method} {request.url}")
+            time.sleep(self.cassette.delay(entry))
+            response = requests.Response()
+            response.status_code = entry["status"]
+            response.headers = CaseInsensitiveDict(entry["headers"])
+            response._content = _decode_body(entry)
+            response._content_consumed = True
+            response.raw = io.BytesIO(response._content)
+            response.url = request.url
+            response.request = request
+            response.reason = "Replayed"
+            return response
+        started = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        content = response.content
+        self.cassette.record(_http_entry(service, key, request.method, request.url, response.status_code,
+                                         response.headers, content, time.perf_counter() - started))
+        return response
+
+    def close(self):
+        self.inner.close()
+
+_session = None
+
+def _get_session():
+    global _session
+    if _session is None:
+        with _cassette_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount("https://", CassetteAdapter())
+                session.mount("http://", CassetteAdapter())
+                _session = session
+    return _session
+
+def azure_kwargs():
+    """Azure SDK 동기 클라이언트 생성 인자 (카세트가 꺼져 있으면 빈 딕셔너리)"""
+    if not enabled():
+        return {}
+    from azure.core.pipeline.transport import RequestsTransport
+    return {"transport": RequestsTransport(session=_get_session(), session_owner=False)}
+
+def azure_async_kwargs():
+    """Azure SDK 비동기(aio) 클라이언트 생성 인자 - 카세트 사용 시 requests 세션을 스레드에서 실행"""
+    if not enabled():
+        return {}
+    from azure.core.pipeline.transport import AsyncioRequestsTransport
+    return {"transport": AsyncioRequestsTransport(session=_get_session(), session_owner=False)}
+
+# --- Postgres ---
+
+class CassetteCursorMixin:
+    """
+    커서 결과를 카세트로 기록/재생
+    execute 시 결과를 모두 읽어 버퍼에 두고 fetch* 는 버퍼에서 반환
+    """
+
+    def _cassette_execute(self, statement, params, run):
+        cassette = get_cassette()
+        key = sql_key(statement, params)
+        if replaying():
+            entry = cassette.next(key, normalize_statement(statement)[:200])
+            time.sleep(cassette.delay(entry))
+            self._replay_result(entry)
+            return None
+        started = time.perf_counter()
+        result = run()
+        rows = [list(row) for row in super().fetchall()] if self.description else None
+        entry = {
+            "service": "postgres",
+            "key": key,
+            "statement": normalize_statement(statement)[:500],
+            "columns": [d[0] for d in self.description] if self.description else None,
+            "rows": rows,
+            "rowcount": self.rowcount,
+            "latency": time.perf_counter() - started,
+        }
+        cassette.record(entry)
+        self._buffer = [tuple(row) for row in rows] if rows is not None else None
+        return result
+
+    def _replay_result(self, entry):
+        self._buffer = [tuple(row) for row in entry["rows"]] if entry["rows"] is not None else None
+        self._replayed_rowcount = entry["rowcount"]
+        self._replayed_columns = entry["columns"]
+
+    def fetchone(self):
+        return self._buffer.pop(0) if self._buffer else None
+
+    def fetchall(self):
+        rows, self._buffer = self._buffer or [], []
+        return rows
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        rows, self._buffer = (self._buffer or [])[:size], (self._buffer or [])[size:]
+        return rows
+
+    def __iter__(self):
+        while self._buffer:
+            yield self._buffer.pop(0)
+
+class ReplayCursor(CassetteCursorMixin):
+    """재생 모드 커서 (DB 연결 없음)"""
+
+    arraysize = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._buffer = None
+        self._replayed_rowcount = -1
+        self._replayed_columns = None
+
+    @property
+    def rowcount(self):
+        return self._replayed_rowcount
+
+    @property
+    def description(self):
+        return [(name,) for name in self._replayed_columns] if self._replayed_columns else None
+
+    def execute(self, query, vars=None):
+        return self._cassette_execute(query, vars, None)
+
+    def executemany(self, query, vars_list):
+        return self._cassette_execute(query, list(vars_list), None)
+
+    def mogrify(self, template, args):
+        # execute_values 재생용 - 키에서 VALUES 목록은 제외되므로 형식만 맞춤
+        return b"(" + json.dumps(list(args), ensure_ascii=False, default=str)[1:-1].encode("utf-8") + b")"
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayConnection:
+    """재생 모드 연결 (커밋/롤백은 아무 일도 하지 않음)"""
+
+    encoding = "UTF8"
+    closed = 0
+
+    def __init__(self, cursor_factory=ReplayCursor):
+        self.cursor_factory = cursor_factory
+
+    def cursor(self, *args, **kwargs):
+        return self.cursor_factory(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
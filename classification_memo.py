@@ -0,0 +1,278 @@
+"""
+질문 → 품질 속성 분류 메모 (설문 저장 시 확정된 분류를 다음 설문의 4단계에서 재사용)
+- 같은 질문: sha256(정규화 질문) 키로 바로 재사용 (검색/LLM 호출 없음)
+- 거의 같은 질문: 임베딩 코사인 유사도가 CLASSIFICATION_MEMO_SIMILARITY 이상이면 재사용 (4단계 LLM 호출 직전에 한 번에 조회)
+- 기록: 설문 저장(survey_store.save_survey)의 survey_questions 저장과 같은 트랜잭션
+- 저장소: CLASSIFICATION_MEMO_BACKEND = postgres(기본, classification_memo 테이블) | local(JSON 파일, 단일 인스턴스/개발용)
+- 프로세스 내 인덱스는 버전(행 수 + 마지막 수정 시각)이 바뀐 경우에만 다시 읽고, 임베딩이 없는 행은 유사 질문 조회 때 한 번에 임베딩
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+from answer_cache import normalize_query
+from db.connection import get_connection
+from embeddings import DEPLOYMENT_EMBEDDING_NAME, EMBEDDING_DIMENSIONS
+
+load_dotenv()
+
+CLASSIFICATION_MEMO_ENABLED = os.getenv("CLASSIFICATION_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+CLASSIFICATION_MEMO_BACKEND = os.getenv("CLASSIFICATION_MEMO_BACKEND", "postgres")  # postgres | local
+CLASSIFICATION_MEMO_PATH = os.getenv("CLASSIFICATION_MEMO_PATH", "./data/classification_memo.json")
+# 거의 같은 질문으로 볼 코사인 유사도
+CLASSIFICATION_MEMO_SIMILARITY = float(os.getenv("CLASSIFICATION_MEMO_SIMILARITY", "0.95"))
+
+# 저장된 임베딩의 배포/차원 (바뀌면 다시 임베딩)
+EMBEDDING_KEY = f"{DEPLOYMENT_EMBEDDING_NAME}-{EMBEDDING_DIMENSIONS}"
+
+# 4단계 근거를 찾지 못한 질문 (5단계/화면에서 새로 쓰거나 수정한 질문)
+DEFAULT_REASON = "설문 저장 시 확정"
+
+def question_hash(question):
+    return hashlib.sha256(normalize_query(question).encode("utf-8")).hexdigest()
+
+def memo_rows(questions, state):
+    """
+    저장할 질문 + 4단계 결과 → 메모 행 [(해시, 질문, 품질 속성, 근거)] (같은 질문은 마지막 것만)
+
+    Args:
+        questions: 저장할 질문 [{"quality_attribute", "question"}]
+        state: 파이프라인 단계 결과 (refined_questions_with_rag 와 rag_validation_results 순서가 같음)
+    """
+    reasons = {}
+    refined_lines = [
+        match.group(1).strip()
+        for match in (re.match(r"\[[^\]]+\]\s*(.+)", line.strip()) for line in (state.get("refined_questions_with_rag") or "").split("\n"))
+        if match
+    ]
+    for question, validation in zip(refined_lines, state.get("rag_validation_results") or []):
+        reasons[question_hash(question)] = validation.get("reason") or DEFAULT_REASON
+
+    rows = {}
+    for q in questions:
+        digest = question_hash(q["question"])
+        rows[digest] = (digest, q["question"], q["quality_attribute"], reasons.get(digest, DEFAULT_REASON))
+    return list(rows.values())
+
+class PostgresMemoBackend:
+    """classification_memo 테이블 (임베딩은 float32 바이트)"""
+
+    def save(self, cur, rows):
+        """메모 기록 (커밋은 호출한 쪽에서 - 설문 저장과 같은 트랜잭션)"""
+        execute_values(cur, """
+            INSERT INTO classification_memo (question_hash, question_text, quality_attribute, reason)
+            VALUES %s
+            ON CONFLICT (question_hash) DO UPDATE
+            SET question_text = EXCLUDED.question_text,
+                quality_attribute = EXCLUDED.quality_attribute,
+                reason = EXCLUDED.reason,
+                updated_at = CURRENT_TIMESTAMP
+        """, rows)
+
+    def version(self):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*), MAX(updated_at) FROM classification_memo")
+                count, updated_at = cur.fetchone()
+            return count, str(updated_at)
+        finally:
+            conn.close()
+
+    def load(self):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT question_hash, question_text, quality_attribute, reason, embedding, embedding_model
+                    FROM classification_memo
+                """)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        return [
+            {"question_hash": h, "question_text": text, "quality_attribute": attr, "reason": reason,
+             "embedding": np.frombuffer(bytes(embedding), dtype=np.float32) if embedding is not None else None,
+             "embedding_model": model}
+            for h, text, attr, reason, embedding, model in rows
+        ]
+
+    def save_embeddings(self, items):
+        """[(해시, 임베딩)] 기록 (updated_at 은 그대로 - 다른 인스턴스가 다시 읽지 않도록)"""
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE classification_memo AS m
+                    SET embedding = v.embedding, embedding_model = v.embedding_model
+                    FROM (VALUES %s) AS v (question_hash, embedding, embedding_model)
+                    WHERE m.question_hash = v.question_hash
+                """, [(h, psycopg2.Binary(np.asarray(vector, dtype=np.float32).tobytes()), EMBEDDING_KEY) for h, vector in items])
+            conn.commit()
+        finally:
+            conn.close()
+
+class LocalMemoBackend:
+    """JSON 파일 1개 (해시 → 행, 원자적 교체로 저장)"""
+
+    def __init__(self, path=CLASSIFICATION_MEMO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, data):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def save(self, cur, rows):
+        with self._lock:
+            data = self._read()
+            for digest, text, attr, reason in rows:
+                data[digest] = {"question_text": text, "quality_attribute": attr, "reason": reason,
+                                "embedding": None, "embedding_model": None}
+            self._write(data)
+
+    def version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        return [
+            {"question_hash": digest, **row,
+             "embedding": np.asarray(row["embedding"], dtype=np.float32) if row.get("embedding") is not None else None}
+            for digest, row in self._read().items()
+        ]
+
+    def save_embeddings(self, items):
+        with self._lock:
+            data = self._read()
+            for digest, vector in items:
+                if digest in data:
+                    data[digest].update(embedding=[float(v) for v in vector], embedding_model=EMBEDDING_KEY)
+            self._write(data)
+
+def embed_questions(texts):
+    """임베딩 캐시를 거친 질문 임베딩"""
+    from embedding_cache import embed_texts_cached
+    from openai_client import client_for
+    return embed_texts_cached(client_for("embedding"), texts)
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class MemoIndex:
+    """저장소 앞단 프로세스 내 인덱스 (해시 → 행, 임베딩 행렬)"""
+
+    def __init__(self, backend, embed=embed_questions, similarity=CLASSIFICATION_MEMO_SIMILARITY):
+        self.backend = backend
+        self.embed = embed
+        self.similarity = similarity
+        self._version = None
+        self._rows = {}
+        self._hashes = []
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.metrics = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+    def refresh(self):
+        """저장소 버전이 바뀐 경우에만 다시 읽음 (4단계 시작 시 호출)"""
+        version = self.backend.version()
+        with self._lock:
+            if version is not None and version == self._version:
+                return
+        rows = self.backend.load() if version is not None else []
+        with self._lock:
+            self._rows = {row["question_hash"]: row for row in rows}
+            self._version = version
+            self._matrix = None
+
+    def exact(self, question):
+        """같은 질문의 메모 행 (없으면 None)"""
+        with self._lock:
+            row = self._rows.get(question_hash(question))
+            self.metrics["exact_hits" if row else "misses"] += 1
+            return row
+
+    def _ensure_matrix(self):
+        with self._lock:
+            if self._matrix is not None:
+                return
+            rows = list(self._rows.values())
+        missing = [r for r in rows if r["embedding"] is None or r.get("embedding_model") != EMBEDDING_KEY]
+        if missing:
+            vectors = self.embed([r["question_text"] for r in missing])
+            for row, vector in zip(missing, vectors):
+                row["embedding"] = np.asarray(vector, dtype=np.float32)
+                row["embedding_model"] = EMBEDDING_KEY
+            self.backend.save_embeddings([(r["question_hash"], r["embedding"]) for r in missing])
+        with self._lock:
+            self._hashes = [r["question_hash"] for r in rows]
+            self._matrix = _unit([r["embedding"] for r in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+
+    def near(self, questions):
+        """
+        질문별 가장 비슷한 메모 행 [(행, 유사도) | None] (유사도가 기준 미만이면 None)
+        메모 임베딩이 없으면 여기서 한 번에 임베딩하고 저장
+        """
+        if not questions:
+            return []
+        self._ensure_matrix()
+        with self._lock:
+            matrix, hashes = self._matrix, self._hashes
+        if not hashes:
+            return [None] * len(questions)
+
+        scores = _unit(self.embed(questions)) @ matrix.T
+        matches = []
+        with self._lock:
+            for row_scores in scores:
+                best = int(np.argmax(row_scores))
+                if row_scores[best] >= self.similarity:
+                    matches.append((self._rows[hashes[best]], float(row_scores[best])))
+                    self.metrics["near_hits"] += 1
+                else:
+                    matches.append(None)
+        return matches
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_backend():
+    return LocalMemoBackend() if CLASSIFICATION_MEMO_BACKEND == "local" else PostgresMemoBackend()
+
+def get_memo_index():
+    """프로세스 공용 메모 인덱스"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MemoIndex(get_backend())
+        return _index
+
+def remember_classifications(cur, questions, state):
+    """설문 저장 시 확정된 질문 분류를 메모에 기록 (survey_store.save_survey 에서 호출)"""
+    if not CLASSIFICATION_MEMO_ENABLED or not questions:
+        return
+    rows = memo_rows(questions, state)
+    backend = _index.backend if _index is not None else get_backend()
+    backend.save(cur, rows)
@@ -0,0 +1 @@
+# 테스트에서 프로젝트 루트 모듈(data.*, db.* 등)을 import 할 수 있도록 루트 경로를 등록
@@ -0,0 +1,165 @@
+"""
+임베딩 차원 축소 / 양자화 벤치마크
+- 코퍼스: iso25010_documents.json 문서 content
+- 질의: 세부 특성 문서의 example_questions (정답 = 해당 세부 특성 문서)
+- 기준: 1536차원 float32 정확 검색 top-k
+- 차원 × 양자화(none/int8/binary) 조합별 recall@k, 정답률, 메모리, 질의 지연 측정
+
+실행: python -m data.benchmark_embeddings [--k 5] [--dimensions 1536 1024 512 256] [--synthetic 10000]
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+from embeddings import (
+    EMBEDDING_NATIVE_DIMENSIONS,
+    QUANTIZATION_METHODS,
+    embed_texts,
+    normalize,
+    truncate_dimensions,
+    quantize,
+    quantized_scores,
+    bytes_per_vector,
+)
+from data.create_index import QUANTIZATION_OVERSAMPLING
+from openai_client import client_for
+
+load_dotenv()
+
+DOCUMENTS_FILE = "./data/iso25010_documents.json"
+EMBEDDINGS_FILE = "./data/.embedding_benchmark.npz"
+EMBED_BATCH_SIZE = 64
+
+def load_corpus():
+    """코퍼스 문서와 (질의, 정답 문서 인덱스) 목록 로드"""
+    with open(DOCUMENTS_FILE, "r", encoding="utf-8") as f:
+        documents = json.load(f)
+
+    texts = [doc["content"] for doc in documents]
+    queries, labels = [], []
+    for i, doc in enumerate(documents):
+        examples = doc.get("example_questions") or ""
+        if isinstance(examples, str):
+            examples = examples.split("\n")
+        for question in examples:
+            if question.strip():
+                queries.append(question.strip())
+                labels.append(i)
+    return texts, queries, np.array(labels)
+
+def load_embeddings(texts, queries, path=EMBEDDINGS_FILE):
+    """전체 차원 임베딩 로드 (없으면 Azure OpenAI로 생성 후 저장)"""
+    if os.path.exists(path):
+        data = np.load(path)
+        if data["docs"].shape[0] == len(texts) and data["queries"].shape[0] == len(queries):
+            print(f"📂 저장된 임베딩 사용: {path}")
+            return data["docs"], data["queries"]
+
+    print("🧮 Azure OpenAI로 전체 차원 임베딩 생성 중...")
+    client = client_for("embedding")
+
+    def embed_all(items):
+        vectors = []
+        for i in range(0, len(items), EMBED_BATCH_SIZE):
+            vectors.extend(embed_texts(client, items[i:i + EMBED_BATCH_SIZE], dimensions=EMBEDDING_NATIVE_DIMENSIONS))
+        return normalize(vectors)
+
+    docs, query_vectors = embed_all(texts), embed_all(queries)
+    np.savez(path, docs=docs, queries=query_vectors)
+    return docs, query_vectors
+
+def synthesize(docs, total, seed=0):
+    """지연시간 측정을 위해 원본 벡터에 잡음을 더해 코퍼스 확장"""
+    rng = np.random.default_rng(seed)
+    extra = total - len(docs)
+    if extra <= 0:
+        return docs
+    base = docs[rng.integers(0, len(docs), size=extra)]
+    noise = rng.normal(scale=0.05, size=base.shape).astype(np.float32)
+    return np.vstack([docs, normalize(base + noise)])
+
+def top_k(scores, k):
+    """유사도 행렬에서 질의별 상위 k개 인덱스 (내림차순)"""
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+def recall_at_k(found, truth):
+    """기준 top-k 대비 재현율"""
+    hits = [len(set(f) & set(t)) for f, t in zip(found, truth)]
+    return float(np.mean(hits)) / truth.shape[1]
+
+def run_benchmark(docs, queries, labels, dimensions_list, k=5, repeat=5):
+    """차원 × 양자화 조합 벤치마크"""
+    truth = top_k(queries @ docs.T, k)
+    baseline_bytes = len(docs) * bytes_per_vector(EMBEDDING_NATIVE_DIMENSIONS, "none")
+    rows = []
+
+    for dimensions in dimensions_list:
+        doc_vectors = truncate_dimensions(docs, dimensions)
+        query_vectors = truncate_dimensions(queries, dimensions)
+
+        for method in QUANTIZATION_METHODS:
+            quantized = quantize(doc_vectors, method)
+            # 양자화 시 후보를 늘린 뒤 원본 벡터로 재정렬 (Azure rescoring과 동일한 방식)
+            candidates = k if method == "none" else int(k * QUANTIZATION_OVERSAMPLING)
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                found = top_k(quantized_scores(query_vectors, quantized), candidates)
+                timings.append((time.perf_counter() - started) / len(queries))
+
+            raw_found = found[:, :k]
+            rescored = np.stack([
+                cand[np.argsort(-(doc_vectors[cand] @ q))][:k] for cand, q in zip(found, query_vectors)
+            ])
+
+            memory = len(docs) * bytes_per_vector(dimensions, method)
+            rows.append({
+                "dimensions": dimensions,
+                "quantization": method,
+                "recall": recall_at_k(raw_found, truth),
+                "recall_rescored": recall_at_k(rescored, truth),
+                "accuracy": float(np.mean(rescored[:, 0] == labels)) if labels is not None else None,
+                "memory_kb": memory / 1024,
+                "compression": baseline_bytes / memory,
+                "latency_us": float(np.median(timings)) * 1e6,
+            })
+    return rows
+
+def print_report(rows, k):
+    """벤치마크 결과 표 출력"""
+    print(f"\n📊 recall@{k} vs 메모리/지연 (기준: {EMBEDDING_NATIVE_DIMENSIONS}차원 float32 정확 검색)")
+    print(f"{'차원':>6} {'양자화':>7} {'recall':>8} {'재정렬':>8} {'정답률':>7} "
+          f"{'메모리(KB)':>11} {'압축비':>7} {'지연(us)':>9}")
+    for r in rows:
+        accuracy = f"{r['accuracy']:.3f}" if r["accuracy"] is not None else "-"
+        print(f"{r['dimensions']:>6} {r['quantization']:>7} {r['recall']:>8.3f} {r['recall_rescored']:>8.3f} "
+              f"{accuracy:>7} {r['memory_kb']:>11.1f} {r['compression']:>6.1f}x {r['latency_us']:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 차원 축소/양자화 벤치마크")
+    parser.add_argument("--k", type=int, default=5, help="recall@k의 k")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[1536, 1024, 512, 256])
+    parser.add_argument("--synthetic", type=int, default=0, help="지연 측정을 위한 합성 코퍼스 크기 (0=원본만)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts, queries, labels = load_corpus()
+    doc_vectors, query_vectors = load_embeddings(texts, queries)
+    print(f"📄 문서 {len(texts)}개, 질의 {len(queries)}개")
+
+    rows = run_benchmark(doc_vectors, query_vectors, labels, args.dimensions, k=args.k, repeat=args.repeat)
+    print_report(rows, args.k)
+
+    if args.synthetic:
+        synthetic_docs = synthesize(doc_vectors, args.synthetic)
+        print(f"\n🧪 합성 코퍼스 {len(synthetic_docs)}개 기준 (정답률 제외)")
+        rows = run_benchmark(synthetic_docs, query_vectors, None, args.dimensions, k=args.k, repeat=args.repeat)
+        print_report(rows, args.k)
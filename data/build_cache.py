@@ -0,0 +1,85 @@
+"""
+데이터 파이프라인 빌드 캐시
+- 각 단계 입력(원본 텍스트, 인덱스 스키마, 문서 JSON)의 콘텐츠 해시 저장
+- 입력이 바뀌지 않은 단계와 문서는 건너뛰기 위한 비교 함수 제공
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+CACHE_FILE = os.getenv("BUILD_CACHE_FILE", "./data/.build_cache.json")
+
+_cache_lock = threading.Lock()
+
+def hash_bytes(data):
+    """바이트 데이터의 sha256 해시"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    """파일 내용의 sha256 해시"""
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+def hash_json(obj):
+    """JSON 직렬화 가능한 객체의 정규화된 sha256 해시"""
+    data = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hash_bytes(data.encode("utf-8"))
+
+def load_cache(path=CACHE_FILE):
+    """캐시 파일 로드 (없거나 손상된 경우 빈 캐시)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+    cache.setdefault("stages", {})
+    cache.setdefault("documents", {})
+    return cache
+
+def save_cache(cache, path=CACHE_FILE):
+    """캐시 파일 저장 (임시 파일 작성 후 교체)"""
+    with _cache_lock:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+def is_fresh(cache, stage, input_hash, outputs=()):
+    """단계 입력 해시가 같고 산출물이 모두 존재하면 최신 상태"""
+    entry = cache["stages"].get(stage)
+    if not entry or entry.get("input_hash") != input_hash:
+        return False
+    return all(os.path.exists(path) for path in outputs)
+
+def mark_fresh(cache, stage, input_hash):
+    """단계 완료 기록"""
+    cache["stages"][stage] = {"input_hash": input_hash}
+
+def reset_documents(cache, index_name):
+    """인덱스가 새로 생성된 경우 문서 해시 초기화 (전체 재업로드)"""
+    cache["documents"][index_name] = {}
+
+def diff_documents(cache, index_name, doc_hashes, prefix=""):
+    """
+    문서 해시 비교
+
+    Args:
+        doc_hashes: {문서 키: 콘텐츠 해시}
+        prefix: 삭제 대상 판단 범위 (해당 접두사를 가진 키만 비교)
+
+    Returns:
+        (변경/신규 문서 키 리스트, 삭제된 문서 키 리스트)
+    """
+    cached = cache["documents"].get(index_name, {})
+    changed = [key for key, h in doc_hashes.items() if cached.get(key) != h]
+    removed = [key for key in cached if key.startswith(prefix) and key not in doc_hashes]
+    return changed, removed
+
+def record_documents(cache, index_name, doc_hashes, removed_keys=()):
+    """업로드된 문서 해시 기록"""
+    cached = cache["documents"].setdefault(index_name, {})
+    cached.update(doc_hashes)
+    for key in removed_keys:
+        cached.pop(key, None)
@@ -7,6 +7,8 @@ import os
 import re
 import json
 
+OUTPUT_FILE = "./data/iso25010_documents.json"
+
 def parse_iso25010_document(file_path):
     """ISO 25010 텍스트 파일을 파싱하여 구조화된 데이터 생성"""
     
@@ -607,6 +609,16 @@ def generate_documents_for_upload(quality_characteristics):
     
     return documents
 
+def convert_to_json(file_path, output_file=OUTPUT_FILE):
+    """ISO 25010 텍스트를 파싱하여 업로드용 JSON 파일로 저장"""
+    quality_data = parse_iso25010_document(file_path)
+    documents = generate_documents_for_upload(quality_data)
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(documents, f, ensure_ascii=False, indent=2)
+    
+    return quality_data, documents
+
 if __name__ == "__main__":
     print("📖 ISO 25010 문서 파싱 시작...")
     
@@ -632,25 +644,19 @@ if __name__ == "__main__":
         exit(1)
     
     print(f"📄 파일 위치: {file_path}")
-    quality_data = parse_iso25010_document(file_path)
-    
-    print(f"✅ {len(quality_data)}개 대표 품질속성 파싱 완료")
     
-    # 2. 업로드용 문서 생성
-    documents = generate_documents_for_upload(quality_data)
+    # 2. 파싱 및 업로드용 문서 생성 후 JSON 파일로 저장
+    output_file = OUTPUT_FILE
+    quality_data, documents = convert_to_json(file_path, output_file)
     
+    print(f"✅ {len(quality_data)}개 대표 품질속성 파싱 완료")
     print(f"✅ 총 {len(documents)}개 문서 생성 완료")
     print(f"   - 대표 품질속성: {len([d for d in documents if d['doc_type'] == 'main_characteristic'])}개")
     print(f"   - 세부 특성: {len([d for d in documents if d['doc_type'] == 'sub_characteristic'])}개")
     
-    # 3. JSON 파일로 저장
-    output_file = "./data/iso25010_documents.json"  # 현재 디렉토리에 저장
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(documents, f, ensure_ascii=False, indent=2)
-    
     print(f"\n💾 문서 저장 완료: {output_file}")
     
-    # 4. 샘플 출력
+    # 3. 샘플 출력
     print("\n📄 생성된 문서 샘플:")
     print(json.dumps(documents[0], ensure_ascii=False, indent=2))
     print("\n...")
@@ -4,6 +4,7 @@ ISO 25010 품질 속성 검색을 위한 최적화된 인덱스 생성
 """
 
 import os
+import json
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
@@ -12,9 +13,19 @@ from azure.search.documents.indexes.models import (
     SearchFieldDataType,
     SimpleField,
     SearchableField,
-    ComplexField
+    ComplexField,
+    VectorSearch,
+    VectorSearchProfile,
+    HnswAlgorithmConfiguration,
+    HnswParameters,
+    ScalarQuantizationCompression,
+    ScalarQuantizationParameters,
+    BinaryQuantizationCompression,
+    RescoringOptions,
 )
 from dotenv import load_dotenv
+from embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_QUANTIZATION
+from cassette import azure_kwargs
 
 load_dotenv()
 
@@ -23,15 +34,27 @@ AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
 INDEX_NAME = "iso25010-optimized"
 
-def create_index():
-    """ISO 25010 최적화 인덱스 생성"""
-    
-    # 클라이언트 생성
-    credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    index_client = SearchIndexClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        credential=credential
+# 양자화 사용 시 재정렬(rescoring)을 위한 후보 확대 배수
+QUANTIZATION_OVERSAMPLING = float(os.getenv("QUANTIZATION_OVERSAMPLING", "4"))
+
+# HNSW 튜닝 결과 파일 (python -m data.tune_hnsw --write 로 생성)
+HNSW_CONFIG_FILE = os.getenv("HNSW_CONFIG_FILE", "./data/hnsw_config.json")
+
+def load_hnsw_parameters(path=HNSW_CONFIG_FILE):
+    """튜닝된 HNSW 파라미터 로드 (파일이 없으면 None - 서비스 기본값 사용)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return HnswParameters(
+        m=config["m"],
+        ef_construction=config["efConstruction"],
+        ef_search=config["efSearch"],
+        metric=config.get("metric", "cosine")
     )
+
+def build_index(index_name=INDEX_NAME):
+    """ISO 25010 최적화 인덱스 스키마 정의"""
     
     # 필드 정의
     fields = [
@@ -129,11 +152,86 @@ def create_index():
         )
     ]
     
-    # 인덱스 생성
-    index = SearchIndex(
-        name=INDEX_NAME,
+    return SearchIndex(
+        name=index_name,
         fields=fields
     )
+
+def build_vector_search(quantization=EMBEDDING_QUANTIZATION, hnsw_parameters=None):
+    """벡터 검색 구성 (HNSW + 선택적 int8/binary 양자화 압축)"""
+    if hnsw_parameters is None:
+        hnsw_parameters = load_hnsw_parameters()
+    compressions = []
+    compression_name = None
+    rescoring_options = RescoringOptions(
+        enable_rescoring=True,
+        default_oversampling=QUANTIZATION_OVERSAMPLING,
+        rescore_storage_method="preserveOriginals"
+    )
+
+    if quantization == "int8":
+        compression_name = "int8-compression"
+        compressions.append(ScalarQuantizationCompression(
+            compression_name=compression_name,
+            parameters=ScalarQuantizationParameters(quantized_data_type="int8"),
+            rescoring_options=rescoring_options
+        ))
+    elif quantization == "binary":
+        compression_name = "binary-compression"
+        compressions.append(BinaryQuantizationCompression(
+            compression_name=compression_name,
+            rescoring_options=rescoring_options
+        ))
+    elif quantization != "none":
+        raise ValueError(f"지원하지 않는 양자화 방식입니다: {quantization}")
+
+    return VectorSearch(
+        algorithms=[HnswAlgorithmConfiguration(name="hnsw-config", parameters=hnsw_parameters)],
+        profiles=[VectorSearchProfile(
+            name="vector-profile",
+            algorithm_configuration_name="hnsw-config",
+            compression_name=compression_name
+        )],
+        compressions=compressions or None
+    )
+
+def build_rag_index(index_name, dimensions=EMBEDDING_DIMENSIONS, quantization=EMBEDDING_QUANTIZATION,
+                    hnsw_parameters=None):
+    """RAG 질의응답용 벡터 인덱스 스키마 정의"""
+    # === 최신 스펙 반영된 필드 정의 ===
+    fields = [
+        SimpleField(name="id", type=SearchFieldDataType.String, key=True),
+        SearchableField(name="content", type=SearchFieldDataType.String),
+        SimpleField(name="source", type=SearchFieldDataType.String),
+        SearchField(
+            name="embedding",
+            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+            searchable=True,
+            vector_search_dimensions=dimensions,
+            vector_search_profile_name="vector-profile"
+        ),
+    ]
+
+    return SearchIndex(
+        name=index_name,
+        fields=fields,
+        vector_search=build_vector_search(quantization, hnsw_parameters)
+    )
+
+def create_index(index=None):
+    """ISO 25010 최적화 인덱스 생성"""
+    
+    # 클라이언트 생성
+    credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
+    index_client = SearchIndexClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        credential=credential,
+        **azure_kwargs()
+    )
+    
+    # 인덱스 생성
+    if index is None:
+        index = build_index()
     
     try:
         result = index_client.create_or_update_index(index)
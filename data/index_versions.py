@@ -0,0 +1,228 @@
+"""
+Azure AI Search 인덱스 블루/그린 재구축
+- 새 버전 인덱스(<별칭>-v<타임스탬프>)에 문서를 모두 올린 뒤
+- 문서 수 검증 및 샘플 쿼리로 워밍업/검증하고
+- 별칭 설정을 원자적으로 교체한 다음 오래된 버전을 정리
+
+별칭 → 실제 인덱스명 매핑은 로컬 파일(기본) 또는 Blob Storage에 저장
+"""
+
+import os
+import json
+import time
+from datetime import datetime, timezone
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.indexes import SearchIndexClient
+from dotenv import load_dotenv
+
+from data import upload_data
+from cassette import azure_kwargs
+
+load_dotenv()
+
+# 환경 변수
+AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
+AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
+AZURE_STORAGE_ACCOUNT_NAME = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+AZURE_STORAGE_ACCOUNT_KEY = os.getenv("AZURE_STORAGE_ACCOUNT_KEY")
+
+# 별칭 저장소 설정 (file | blob)
+INDEX_ALIAS_STORE = os.getenv("INDEX_ALIAS_STORE", "file")
+INDEX_ALIAS_FILE = os.getenv("INDEX_ALIAS_FILE", "./data/index_aliases.json")
+INDEX_ALIAS_CONTAINER = os.getenv("INDEX_ALIAS_CONTAINER", "config")
+INDEX_ALIAS_BLOB = "index_aliases.json"
+INDEX_ALIAS_CACHE_TTL = float(os.getenv("INDEX_ALIAS_CACHE_TTL", "10"))
+
+# 버전 보관 및 검증 설정
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+INDEX_VERIFY_TIMEOUT = float(os.getenv("INDEX_VERIFY_TIMEOUT", "60"))
+
+_alias_cache = {"loaded_at": 0.0, "aliases": {}}
+
+def get_index_client():
+    """Azure AI Search 인덱스 클라이언트 생성"""
+    return SearchIndexClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY),
+        **azure_kwargs()
+    )
+
+def _get_alias_blob_client():
+    from azure.storage.blob import BlobServiceClient
+
+    blob_service_client = BlobServiceClient(
+        account_url=f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net",
+        credential=AZURE_STORAGE_ACCOUNT_KEY,
+        **azure_kwargs()
+    )
+    return blob_service_client.get_blob_client(container=INDEX_ALIAS_CONTAINER, blob=INDEX_ALIAS_BLOB)
+
+def _read_aliases():
+    """별칭 저장소에서 매핑 읽기"""
+    try:
+        if INDEX_ALIAS_STORE == "blob":
+            return json.loads(_get_alias_blob_client().download_blob().readall())
+        with open(INDEX_ALIAS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        if type(e).__name__ == "ResourceNotFoundError":
+            return {}
+        raise
+
+def _write_aliases(aliases):
+    """별칭 저장소에 매핑 쓰기 (단일 쓰기로 원자적 교체)"""
+    data = json.dumps(aliases, ensure_ascii=False, indent=2)
+    if INDEX_ALIAS_STORE == "blob":
+        _get_alias_blob_client().upload_blob(data.encode("utf-8"), overwrite=True)
+    else:
+        tmp_path = f"{INDEX_ALIAS_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, INDEX_ALIAS_FILE)
+    _alias_cache["aliases"] = aliases
+    _alias_cache["loaded_at"] = time.monotonic()
+
+def load_aliases(refresh=False):
+    """별칭 매핑 조회 (TTL 동안 프로세스 내 캐시)"""
+    if refresh or time.monotonic() - _alias_cache["loaded_at"] > INDEX_ALIAS_CACHE_TTL:
+        _alias_cache["aliases"] = _read_aliases()
+        _alias_cache["loaded_at"] = time.monotonic()
+    return _alias_cache["aliases"]
+
+def resolve_index_name(alias):
+    """별칭이 가리키는 실제 인덱스명 (매핑이 없으면 별칭 그대로 사용)"""
+    try:
+        return load_aliases().get(alias, {}).get("active", alias)
+    except Exception:
+        # 별칭 저장소 장애 시 마지막으로 알려진 값 또는 별칭 그대로 사용
+        return _alias_cache["aliases"].get(alias, {}).get("active", alias)
+
+def versioned_name(alias):
+    """새 버전 인덱스명 생성"""
+    return f"{alias}-v{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}"
+
+def list_versions(index_client, alias):
+    """별칭에 속한 버전 인덱스 목록 (오래된 순)"""
+    prefix = f"{alias}-v"
+    return sorted(name for name in index_client.list_index_names() if name.startswith(prefix))
+
+def warm_up_and_verify(search_client, expected_count, sample_queries=(), require_hits=True,
+                       timeout=INDEX_VERIFY_TIMEOUT):
+    """
+    새 인덱스 워밍업 및 검증
+    - 문서 수가 기대값에 도달할 때까지 대기 (색인 반영 지연 고려)
+    - 샘플 쿼리 실행 (첫 실행은 워밍업, 두 번째 실행 지연시간 측정)
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        actual_count = search_client.search(search_text="*", include_total_count=True, top=0).get_count()
+        if actual_count == expected_count or time.monotonic() > deadline:
+            break
+        time.sleep(1)
+
+    if upload_data.verify_upload(expected_count, search_client=search_client) != expected_count:
+        return False
+
+    print("\n🔥 샘플 쿼리 워밍업 및 검증:")
+    for query in sample_queries:
+        try:
+            list(search_client.search(search_text=query, top=3))
+            started = time.perf_counter()
+            hits = list(search_client.search(search_text=query, top=3))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            print(f"   ❌ '{query}': {e}")
+            return False
+
+        print(f"   - '{query}': {len(hits)}건, {elapsed_ms:.1f}ms")
+        if require_hits and not hits:
+            print(f"   ❌ '{query}' 검색 결과 없음")
+            return False
+
+    return True
+
+def swap_alias(alias, index_name):
+    """별칭이 새 인덱스를 가리키도록 교체 (이전 버전은 롤백용으로 기록)"""
+    aliases = load_aliases(refresh=True)
+    previous = aliases.get(alias, {}).get("active")
+    aliases[alias] = {
+        "active": index_name,
+        "previous": previous,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    _write_aliases(aliases)
+    print(f"🔀 별칭 교체: {alias} → {index_name} (이전: {previous})")
+    return previous
+
+def rollback(alias):
+    """직전 버전으로 별칭 되돌리기"""
+    aliases = load_aliases(refresh=True)
+    previous = aliases.get(alias, {}).get("previous")
+    if not previous:
+        print(f"⚠️ 되돌릴 이전 버전이 없습니다: {alias}")
+        return None
+    swap_alias(alias, previous)
+    return previous
+
+def collect_garbage(index_client, alias, keep=INDEX_KEEP_VERSIONS):
+    """보관 개수를 넘는 오래된 버전 삭제 (활성/직전 버전은 보존)"""
+    entry = load_aliases(refresh=True).get(alias, {})
+    protected = {entry.get("active"), entry.get("previous")}
+
+    versions = list_versions(index_client, alias)
+    deleted = []
+    for name in versions[:max(len(versions) - keep, 0)]:
+        if name in protected:
+            continue
+        index_client.delete_index(name)
+        deleted.append(name)
+
+    if deleted:
+        print(f"🗑️ 오래된 인덱스 버전 삭제: {', '.join(deleted)}")
+    return deleted
+
+def rebuild_index(alias, build_index_fn, documents, index_client=None, sample_queries=(),
+                  require_hits=True, keep=INDEX_KEEP_VERSIONS):
+    """
+    블루/그린 방식 인덱스 재구축
+
+    Args:
+        alias: 검색 측에서 사용하는 인덱스 별칭
+        build_index_fn: 인덱스명을 받아 SearchIndex 스키마를 반환하는 함수
+        documents: 새 인덱스에 올릴 전체 문서
+        index_client: SearchIndexClient 또는 로컬 대체 구현
+
+    Returns:
+        교체된 새 인덱스명 (실패 시 None, 기존 인덱스는 그대로 유지)
+    """
+    if index_client is None:
+        index_client = get_index_client()
+
+    existing = set(index_client.list_index_names())
+    index_name = versioned_name(alias)
+    while index_name in existing:
+        index_name = versioned_name(alias)
+    print(f"🏗️ 새 인덱스 버전 생성: {index_name}")
+    index_client.create_or_update_index(build_index_fn(index_name))
+
+    search_client = index_client.get_search_client(index_name)
+    try:
+        _, fail = upload_data.upload_documents(documents, search_client=search_client)
+        verified = fail == 0 and warm_up_and_verify(
+            search_client, len(documents), sample_queries, require_hits=require_hits
+        )
+    except Exception as e:
+        print(f"❌ 새 인덱스 구성 실패: {e}")
+        verified = False
+
+    if not verified:
+        # 검증 실패 시 새 버전 폐기 - 서비스 중인 인덱스는 영향 없음
+        print(f"❌ 검증 실패 - 새 버전 폐기: {index_name}")
+        index_client.delete_index(index_name)
+        return None
+
+    swap_alias(alias, index_name)
+    collect_garbage(index_client, alias, keep=keep)
+    return index_name
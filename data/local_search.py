@@ -0,0 +1,287 @@
+"""
+Azure AI Search 로컬 대체 구현 (인메모리)
+- 테스트/오프라인 환경에서 SearchIndexClient, SearchClient 대신 사용
+- 인덱스 생성/삭제, 문서 업로드/삭제, 간단한 키워드 검색과 문서 수 조회 지원
+- 벡터 질의는 인덱스 정의의 HNSW 파라미터(m, efConstruction, efSearch)로 구성한 그래프에서 검색
+"""
+
+import re
+import heapq
+import threading
+import numpy as np
+
+class LocalIndexingResult:
+    """SearchClient 업로드 결과(IndexingResult) 대체"""
+
+    def __init__(self, key, succeeded=True, status_code=200, error_message=None):
+        self.key = key
+        self.succeeded = succeeded
+        self.status_code = status_code
+        self.error_message = error_message
+
+class LocalSearchResults(list):
+    """검색 결과 목록 (get_count 지원)"""
+
+    def __init__(self, items, count):
+        super().__init__(items)
+        self._count = count
+
+    def get_count(self):
+        return self._count
+
+def _tokenize(text):
+    return set(re.findall(r"[0-9A-Za-z가-힣]+", str(text).lower()))
+
+def _match_filter(doc, filter_expr):
+    """단순 필터 (field eq 'value' 형태)만 지원"""
+    if not filter_expr:
+        return True
+    match = re.match(r"\s*(\w+)\s+eq\s+'([^']*)'\s*$", filter_expr)
+    if not match:
+        raise ValueError(f"지원하지 않는 필터 형식입니다: {filter_expr}")
+    field, value = match.groups()
+    return str(doc.get(field)) == value
+
+class HnswGraph:
+    """
+    HNSW 근사 최근접 이웃 그래프 (코사인 거리, 테스트/튜닝용 순수 Python 구현)
+    - m: 노드당 이웃 수 (0층은 2m), ef_construction: 삽입 시 후보 수, ef_search: 검색 시 후보 수
+    """
+
+    def __init__(self, m=4, ef_construction=400, ef_search=500, seed=0):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / np.log(max(m, 2))
+        self._rng = np.random.default_rng(seed)
+        self._vectors = []
+        self._neighbors = []  # 노드별 [층별 이웃 리스트]
+        self._entry = None
+        self._max_level = -1
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def _distances(self, query, ids):
+        return 1.0 - np.stack([self._vectors[i] for i in ids]) @ query
+
+    def _search_layer(self, query, entry_points, ef, level):
+        """한 층에서 ef개 후보 탐색 - [(거리, 노드)] 오름차순"""
+        visited = set(entry_points)
+        distances = self._distances(query, entry_points)
+        candidates = [(d, i) for d, i in zip(distances, entry_points)]
+        heapq.heapify(candidates)
+        found = [(-d, i) for d, i in candidates]
+        heapq.heapify(found)
+        while len(found) > ef:
+            heapq.heappop(found)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -found[0][0]:
+                break
+            fresh = [n for n in self._neighbors[node][level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for d, n in zip(self._distances(query, fresh), fresh):
+                if len(found) < ef or d < -found[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(found, (-d, n))
+                    if len(found) > ef:
+                        heapq.heappop(found)
+        return sorted((-d, i) for d, i in found)
+
+    def _prune(self, node, level):
+        """이웃 수가 한도를 넘으면 가까운 순으로 유지"""
+        limit = self.m * 2 if level == 0 else self.m
+        neighbors = self._neighbors[node][level]
+        if len(neighbors) > limit:
+            distances = self._distances(self._vectors[node], neighbors)
+            self._neighbors[node][level] = [neighbors[i] for i in np.argsort(distances)[:limit]]
+
+    def add(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        node = len(self._vectors)
+        level = int(-np.log(max(self._rng.random(), 1e-12)) * self._level_mult)
+        self._vectors.append(vector)
+        self._neighbors.append([[] for _ in range(level + 1)])
+
+        if self._entry is None:
+            self._entry, self._max_level = node, level
+            return node
+
+        entry_points = [self._entry]
+        for current in range(self._max_level, level, -1):
+            entry_points = [self._search_layer(vector, entry_points, 1, current)[0][1]]
+
+        for current in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(vector, entry_points, self.ef_construction, current)
+            neighbors = [i for _, i in found[:self.m]]
+            self._neighbors[node][current] = neighbors
+            for neighbor in neighbors:
+                self._neighbors[neighbor][current].append(node)
+                self._prune(neighbor, current)
+            entry_points = [i for _, i in found]
+
+        if level > self._max_level:
+            self._entry, self._max_level = node, level
+        return node
+
+    def search(self, vector, k, ef_search=None):
+        """근사 top-k - [(코사인 유사도, 노드)]"""
+        if self._entry is None:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        entry_points = [self._entry]
+        for current in range(self._max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, current)[0][1]]
+        found = self._search_layer(query, entry_points, max(ef_search or self.ef_search, k), 0)
+        return [(1.0 - d, i) for d, i in found[:k]]
+
+def _hnsw_parameters(definition):
+    """인덱스 정의에서 HNSW 파라미터 추출 (미지정 시 Azure 기본값)"""
+    params = {"m": 4, "ef_construction": 400, "ef_search": 500}
+    vector_search = getattr(definition, "vector_search", None)
+    if vector_search and vector_search.algorithms:
+        configured = getattr(vector_search.algorithms[0], "parameters", None)
+        if configured is not None:
+            params.update({name: getattr(configured, name) for name in params if getattr(configured, name, None)})
+    return params
+
+class LocalSearchClient:
+    """SearchClient 로컬 대체"""
+
+    def __init__(self, index_client, index_name):
+        self._index_client = index_client
+        self.index_name = index_name
+
+    @property
+    def _index(self):
+        return self._index_client._get(self.index_name)
+
+    def _apply(self, documents, action):
+        index = self._index
+        key_field = index["key"]
+        results = []
+        with self._index_client._lock:
+            for doc in documents:
+                key = doc[key_field]
+                index["version"] += 1
+                if action == "upload":
+                    index["documents"][key] = dict(doc)
+                elif action == "merge_or_upload":
+                    index["documents"].setdefault(key, {}).update(doc)
+                elif action == "delete":
+                    index["documents"].pop(key, None)
+                results.append(LocalIndexingResult(key))
+        return results
+
+    def upload_documents(self, documents, **kwargs):
+        return self._apply(documents, "upload")
+
+    def merge_or_upload_documents(self, documents, **kwargs):
+        return self._apply(documents, "merge_or_upload")
+
+    def delete_documents(self, documents, **kwargs):
+        return self._apply(documents, "delete")
+
+    def get_document_count(self, **kwargs):
+        return len(self._index["documents"])
+
+    def _graph(self):
+        """문서가 바뀌면 HNSW 그래프 재구성 (인덱스 정의의 파라미터 사용)"""
+        index = self._index
+        params = _hnsw_parameters(index["definition"])
+        cache_key = (index["version"], params["m"], params["ef_construction"])
+        if index.get("graph_key") != cache_key:
+            graph = HnswGraph(m=params["m"], ef_construction=params["ef_construction"])
+            keys = []
+            for key, doc in index["documents"].items():
+                graph.add(doc[index["vector"]])
+                keys.append(key)
+            index.update({"graph": graph, "graph_keys": keys, "graph_key": cache_key})
+        index["graph"].ef_search = params["ef_search"]
+        return index["graph"], index["graph_keys"]
+
+    def search(self, search_text=None, top=50, select=None, filter=None,
+               include_total_count=False, vector_queries=None, **kwargs):
+        """키워드 겹침 수 기반 검색 ("*" 또는 None이면 전체 문서), vector_queries는 HNSW 검색"""
+        with self._index_client._lock:
+            documents = [d for d in self._index["documents"].values() if _match_filter(d, filter)]
+
+        if vector_queries:
+            query = vector_queries[0]
+            k = query.get("k") or top
+            with self._index_client._lock:
+                graph, keys = self._graph()
+                hits = graph.search(query["vector"], k)
+                scored = [(score, self._index["documents"][keys[i]]) for score, i in hits]
+            scored = [(score, doc) for score, doc in scored if _match_filter(doc, filter)]
+        elif search_text and search_text != "*":
+            query_tokens = _tokenize(search_text)
+            scored = []
+            for doc in documents:
+                doc_tokens = set()
+                for name in self._index["searchable"]:
+                    doc_tokens |= _tokenize(doc.get(name) or "")
+                score = len(query_tokens & doc_tokens)
+                if score > 0:
+                    scored.append((score, doc))
+            scored.sort(key=lambda x: x[0], reverse=True)
+        else:
+            scored = [(1.0, doc) for doc in documents]
+
+        items = []
+        for score, doc in scored[:top]:
+            item = {k: v for k, v in doc.items() if not select or k in select}
+            item["@search.score"] = float(score)
+            items.append(item)
+        return LocalSearchResults(items, len(scored))
+
+    def close(self):
+        pass
+
+class LocalSearchIndexClient:
+    """SearchIndexClient 로컬 대체"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    def _get(self, index_name):
+        try:
+            return self._indexes[index_name]
+        except KeyError:
+            raise KeyError(f"인덱스를 찾을 수 없습니다: {index_name}")
+
+    def create_or_update_index(self, index, **kwargs):
+        key = next(f.name for f in index.fields if f.key)
+        searchable = [f.name for f in index.fields if f.searchable and not f.vector_search_dimensions]
+        vector = next((f.name for f in index.fields if f.vector_search_dimensions), None)
+        with self._lock:
+            entry = self._indexes.setdefault(index.name, {"documents": {}, "version": 0})
+            entry.update({"definition": index, "key": key, "searchable": searchable, "vector": vector})
+        return index
+
+    def create_index(self, index, **kwargs):
+        return self.create_or_update_index(index)
+
+    def get_index(self, name, **kwargs):
+        return self._get(name)["definition"]
+
+    def delete_index(self, index, **kwargs):
+        name = index if isinstance(index, str) else index.name
+        with self._lock:
+            self._indexes.pop(name, None)
+
+    def list_index_names(self, **kwargs):
+        return list(self._indexes)
+
+    def get_search_client(self, index_name, **kwargs):
+        return LocalSearchClient(self, index_name)
+
+    def close(self):
+        pass
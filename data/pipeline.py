@@ -0,0 +1,153 @@
+"""
+ISO 25010 데이터 파이프라인 (변환 → 인덱스 생성 → 업로드)
+각 단계 입력의 콘텐츠 해시를 캐시하여 변경된 단계와 문서만 처리
+
+실행: python -m data.pipeline [--force] [--index-name ALIAS] [--rollback]
+"""
+
+import json
+import time
+import argparse
+
+from data import convert_iso25010, create_index, upload_data, index_versions
+from data.build_cache import (
+    hash_file,
+    hash_json,
+    load_cache,
+    save_cache,
+    is_fresh,
+    mark_fresh,
+    reset_documents,
+    diff_documents,
+    record_documents,
+)
+
+SOURCE_FILE = "./data/ISO25010.txt"
+DOCUMENTS_FILE = convert_iso25010.OUTPUT_FILE
+
+def run_convert(cache, force=False):
+    """1단계: 원본 텍스트 → 문서 JSON 변환"""
+    # 변환 결과는 원본 텍스트와 변환 스크립트(품질속성 정의 포함)에 의해 결정됨
+    input_hash = hash_json([hash_file(SOURCE_FILE), hash_file(convert_iso25010.__file__)])
+
+    if not force and is_fresh(cache, "convert", input_hash, outputs=[DOCUMENTS_FILE]):
+        print("⏭️ [1/3] 변환: 변경 없음, 건너뜀")
+        with open(DOCUMENTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    print("📖 [1/3] 변환: ISO 25010 문서 파싱 중...")
+    _, documents = convert_iso25010.convert_to_json(SOURCE_FILE, DOCUMENTS_FILE)
+    mark_fresh(cache, "convert", input_hash)
+    print(f"   ✅ {len(documents)}개 문서 생성 → {DOCUMENTS_FILE}")
+    return documents
+
+def run_index(cache, documents, alias, force=False, index_client=None):
+    """2단계: 스키마 변경 시 새 버전 인덱스로 블루/그린 재구축"""
+    input_hash = hash_json(create_index.build_index(alias).as_dict())
+    stage = f"index:{alias}"
+
+    if not force and is_fresh(cache, stage, input_hash):
+        print(f"⏭️ [2/3] 인덱스: 스키마 변경 없음, 건너뜀 ({alias} → {index_versions.resolve_index_name(alias)})")
+        return True
+
+    print(f"🔧 [2/3] 인덱스: 새 버전으로 재구축 중... ({alias})")
+    index_name = index_versions.rebuild_index(
+        alias,
+        create_index.build_index,
+        documents,
+        index_client=index_client,
+        sample_queries=upload_data.SAMPLE_QUERIES
+    )
+    if index_name is None:
+        return False
+
+    mark_fresh(cache, stage, input_hash)
+    # 새 버전에는 전체 문서가 올라가 있으므로 문서 해시를 새 인덱스 기준으로 기록
+    reset_documents(cache, index_name)
+    record_documents(cache, index_name, {doc["id"]: hash_json(doc) for doc in documents})
+    return True
+
+def run_upload(cache, documents, alias, index_client=None):
+    """3단계: 서비스 중인 인덱스에 변경된 문서만 업로드, 사라진 문서는 삭제"""
+    index_name = index_versions.resolve_index_name(alias)
+
+    doc_hashes = {doc["id"]: hash_json(doc) for doc in documents}
+    changed_keys, removed_keys = diff_documents(cache, index_name, doc_hashes)
+
+    if not changed_keys and not removed_keys:
+        print(f"⏭️ [3/3] 업로드: 변경된 문서 없음, 건너뜀 ({len(documents)}개 최신)")
+        return True
+
+    print(f"📤 [3/3] 업로드: 변경 {len(changed_keys)}개, 삭제 {len(removed_keys)}개 "
+          f"(전체 {len(documents)}개 중, {index_name})")
+    if index_client is not None:
+        search_client = index_client.get_search_client(index_name)
+    else:
+        search_client = upload_data.get_search_client(index_name)
+
+    fail = 0
+    if changed_keys:
+        changed = set(changed_keys)
+        _, fail = upload_data.upload_documents(
+            [doc for doc in documents if doc["id"] in changed],
+            search_client=search_client
+        )
+    if removed_keys and fail == 0:
+        _, fail = upload_data.delete_documents(removed_keys, search_client=search_client)
+
+    if fail > 0:
+        # 실패가 있으면 해시를 기록하지 않아 다음 실행 시 다시 시도
+        print("   ⚠️ 일부 문서 처리 실패 - 다음 실행 시 재시도합니다.")
+        return False
+
+    record_documents(
+        cache, index_name,
+        {key: doc_hashes[key] for key in changed_keys},
+        removed_keys=removed_keys
+    )
+    return True
+
+def run_pipeline(alias=create_index.INDEX_NAME, force=False, index_client=None):
+    """
+    전체 파이프라인 실행
+
+    index_client에 로컬 대체 구현(data.local_search)을 넘기면 Azure 없이 실행 가능
+    """
+    cache = load_cache()
+    started = time.perf_counter()
+
+    try:
+        documents = run_convert(cache, force=force)
+        save_cache(cache)
+
+        if not run_index(cache, documents, alias, force=force, index_client=index_client):
+            return False
+        save_cache(cache)
+
+        ok = run_upload(cache, documents, alias, index_client=index_client)
+        save_cache(cache)
+    except Exception as e:
+        print(f"❌ 파이프라인 실패: {e}")
+        return False
+
+    print(f"\n⏱️ 총 소요 시간: {time.perf_counter() - started:.2f}초")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ISO 25010 데이터 파이프라인")
+    parser.add_argument("--force", action="store_true", help="캐시를 무시하고 모든 단계 재실행")
+    parser.add_argument("--index-name", default=create_index.INDEX_NAME, help="대상 인덱스 별칭")
+    parser.add_argument("--rollback", action="store_true", help="직전 인덱스 버전으로 별칭 되돌리기")
+    args = parser.parse_args()
+
+    if args.rollback:
+        exit(0 if index_versions.rollback(args.index_name) else 1)
+
+    print("🚀 ISO 25010 데이터 파이프라인 시작...\n")
+    success = run_pipeline(alias=args.index_name, force=args.force)
+
+    if success:
+        print("✅ 파이프라인 완료!")
+    else:
+        print("❌ 파이프라인 실패")
+        exit(1)
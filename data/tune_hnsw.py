@@ -0,0 +1,172 @@
+"""
+HNSW 파라미터 튜닝
+- 기준: 인덱싱 대상 임베딩에 대한 NumPy 정확 검색 top-k
+- m × efConstruction 조합마다 임시 인덱스를 만들고 efSearch를 바꿔가며 recall@k, p50/p95 지연 측정
+- 대상: Azure AI Search (--target azure) 또는 로컬 대체 구현 (--target local, 기본값)
+- --write 지정 시 선택된 구성을 data/hnsw_config.json에 저장 → create_index.build_vector_search에서 사용
+  (스키마 해시가 바뀌므로 다음 인덱싱 때 블루/그린 재구축으로 반영)
+
+실행: python -m data.tune_hnsw [--target local|azure] [--m 4 8 16] [--ef-construction 100 400]
+                              [--ef-search 50 100 200 500] [--k 10] [--min-recall 0.95] [--write]
+"""
+
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from azure.search.documents.indexes.models import HnswParameters
+
+from embeddings import EMBEDDING_DIMENSIONS, truncate_dimensions
+from data import upload_data
+from data.create_index import HNSW_CONFIG_FILE, build_rag_index
+from data.index_versions import get_index_client, warm_up_and_verify
+from data.local_search import LocalSearchIndexClient
+from data.benchmark_embeddings import load_corpus, load_embeddings, synthesize, top_k
+
+TUNE_INDEX_PREFIX = "hnsw-tune"
+
+def ground_truth(docs, queries, k):
+    """정확 검색 top-k (코사인 유사도 = 정규화 벡터 내적)"""
+    return top_k(queries @ docs.T, k)
+
+def build_tuning_index(index_client, docs, m, ef_construction, ef_search):
+    """임시 튜닝 인덱스 생성 및 벡터 업로드"""
+    index_name = f"{TUNE_INDEX_PREFIX}-m{m}-efc{ef_construction}"
+    index_client.create_or_update_index(_tuning_index(index_name, docs.shape[1], m, ef_construction, ef_search))
+    search_client = index_client.get_search_client(index_name)
+
+    documents = [
+        {"id": f"d{i}", "content": "", "source": "tune", "embedding": vector.tolist()}
+        for i, vector in enumerate(docs)
+    ]
+    _, fail = upload_data.upload_documents(documents, search_client=search_client)
+    if fail or not warm_up_and_verify(search_client, len(documents), require_hits=False):
+        raise RuntimeError(f"튜닝 인덱스 구성 실패: {index_name}")
+    return index_name, search_client
+
+def _tuning_index(index_name, dimensions, m, ef_construction, ef_search):
+    return build_rag_index(
+        index_name,
+        dimensions=dimensions,
+        quantization="none",
+        hnsw_parameters=HnswParameters(m=m, ef_construction=ef_construction, ef_search=ef_search, metric="cosine")
+    )
+
+def measure(search_client, queries, truth, k):
+    """질의별 검색 지연과 recall@k 측정"""
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results = list(search_client.search(
+            search_text=None,
+            vector_queries=[{"kind": "vector", "vector": query.tolist(), "fields": "embedding", "k": k}],
+            select=["id"],
+            top=k
+        ))
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append([int(r["id"][1:]) for r in results])
+
+    hits = [len(set(f) & set(t)) for f, t in zip(found, truth)]
+    return {
+        "recall": float(np.mean(hits)) / truth.shape[1],
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+def _warm_up(search_client, query, k):
+    list(search_client.search(search_text=None, vector_queries=[{
+        "kind": "vector", "vector": query.tolist(), "fields": "embedding", "k": k
+    }], top=k))
+
+def sweep(index_client, docs, queries, k, m_values, ef_construction_values, ef_search_values):
+    """m × efConstruction × efSearch 전체 조합 측정"""
+    truth = ground_truth(docs, queries, k)
+    rows = []
+    for m in m_values:
+        for ef_construction in ef_construction_values:
+            print(f"\n🏗️ m={m}, efConstruction={ef_construction} 인덱스 구성 중...")
+            started = time.perf_counter()
+            index_name, search_client = build_tuning_index(
+                index_client, docs, m, ef_construction, ef_search_values[0]
+            )
+            try:
+                # 첫 질의까지 포함해 구성 시간 측정 (로컬 대체 구현은 첫 질의 때 그래프 생성)
+                _warm_up(search_client, queries[0], k)
+                build_seconds = time.perf_counter() - started
+                for ef_search in ef_search_values:
+                    # efSearch는 질의 시점 파라미터이므로 같은 인덱스에서 정의만 갱신
+                    index_client.create_or_update_index(
+                        _tuning_index(index_name, docs.shape[1], m, ef_construction, ef_search)
+                    )
+                    _warm_up(search_client, queries[0], k)
+                    result = measure(search_client, queries, truth, k)
+                    result.update({"m": m, "efConstruction": ef_construction, "efSearch": ef_search,
+                                   "build_s": build_seconds})
+                    rows.append(result)
+                    print(f"   efSearch={ef_search:>4}: recall@{k}={result['recall']:.3f}, "
+                          f"p50={result['p50_ms']:.1f}ms, p95={result['p95_ms']:.1f}ms")
+            finally:
+                index_client.delete_index(index_name)
+    return rows
+
+def choose(rows, min_recall):
+    """목표 recall을 만족하는 구성 중 p95 지연이 가장 낮은 것 (없으면 recall 최대)"""
+    eligible = [r for r in rows if r["recall"] >= min_recall]
+    if eligible:
+        return min(eligible, key=lambda r: (r["p95_ms"], r["m"], r["efConstruction"]))
+    return max(rows, key=lambda r: (r["recall"], -r["p95_ms"]))
+
+def print_curves(rows, k):
+    """m/efConstruction별 efSearch에 따른 recall-지연 곡선 출력"""
+    print(f"\n📈 recall@{k} vs 지연 (m / efConstruction 별 efSearch 곡선)")
+    print(f"{'m':>4} {'efC':>5} {'efS':>5} {'recall':>8} {'p50(ms)':>9} {'p95(ms)':>9} {'구성(s)':>8}")
+    for r in sorted(rows, key=lambda r: (r["m"], r["efConstruction"], r["efSearch"])):
+        print(f"{r['m']:>4} {r['efConstruction']:>5} {r['efSearch']:>5} {r['recall']:>8.3f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['build_s']:>8.1f}")
+
+def write_config(row, k, path=HNSW_CONFIG_FILE):
+    """선택된 구성을 인덱스 정의에서 읽는 설정 파일로 저장"""
+    config = {
+        "m": row["m"],
+        "efConstruction": row["efConstruction"],
+        "efSearch": row["efSearch"],
+        "metric": "cosine",
+        "measured": {"k": k, "recall": round(row["recall"], 4),
+                     "p50_ms": round(row["p50_ms"], 2), "p95_ms": round(row["p95_ms"], 2)},
+        "tuned_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    print(f"💾 HNSW 구성 저장: {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW 파라미터 튜닝")
+    parser.add_argument("--target", choices=["local", "azure"], default="local")
+    parser.add_argument("--m", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100, 400])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[50, 100, 200, 500])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--synthetic", type=int, default=0, help="코퍼스 확장 크기 (0=원본만)")
+    parser.add_argument("--write", action="store_true", help="선택된 구성을 설정 파일에 저장")
+    args = parser.parse_args()
+
+    texts, query_texts, _ = load_corpus()
+    doc_vectors, query_vectors = load_embeddings(texts, query_texts)
+    if args.synthetic:
+        doc_vectors = synthesize(doc_vectors, args.synthetic)
+    doc_vectors = truncate_dimensions(doc_vectors, EMBEDDING_DIMENSIONS)
+    query_vectors = truncate_dimensions(query_vectors, EMBEDDING_DIMENSIONS)
+    print(f"📄 문서 {len(doc_vectors)}개, 질의 {len(query_vectors)}개, {EMBEDDING_DIMENSIONS}차원")
+
+    index_client = LocalSearchIndexClient() if args.target == "local" else get_index_client()
+    rows = sweep(index_client, doc_vectors, query_vectors, args.k,
+                 args.m, args.ef_construction, sorted(args.ef_search))
+    print_curves(rows, args.k)
+
+    best = choose(rows, args.min_recall)
+    print(f"\n✅ 선택: m={best['m']}, efConstruction={best['efConstruction']}, efSearch={best['efSearch']} "
+          f"(recall@{args.k}={best['recall']:.3f}, p95={best['p95_ms']:.1f}ms)")
+    if args.write:
+        write_config(best, args.k)
@@ -1,13 +1,21 @@
 """
 변환된 ISO 25010 데이터를 Azure AI Search에 업로드
+- 문서 개수/크기 제한에 맞춘 배치 분할 및 병렬 전송
+- 실패한 키만 지수 백오프로 재시도
 """
 
 import os
 import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
 from azure.search.documents import SearchClient
 from dotenv import load_dotenv
 
+from cassette import azure_kwargs
+
 load_dotenv()
 
 # 환경 변수
@@ -15,48 +23,179 @@ AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
 INDEX_NAME = "iso25010-optimized"
 
-def upload_documents(documents):
-    """문서를 Azure AI Search에 업로드"""
-    
+# 업로드 배치 설정 (Azure AI Search 제한: 요청당 최대 1000개 문서 / 16MB)
+UPLOAD_MAX_BATCH_DOCS = int(os.getenv("UPLOAD_MAX_BATCH_DOCS", "500"))
+UPLOAD_MAX_BATCH_BYTES = int(os.getenv("UPLOAD_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "4"))
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+UPLOAD_RETRY_BACKOFF = float(os.getenv("UPLOAD_RETRY_BACKOFF", "0.5"))
+
+# 검색 테스트 및 인덱스 검증용 샘플 쿼리
+SAMPLE_QUERIES = [
+    "시스템이 필요한 모든 기능을 제공합니까?",
+    "응답 속도가 빠릅니까?",
+    "보안"
+]
+
+# 재시도 대상 상태 코드 (충돌, 일시적 오류, 스로틀링)
+RETRYABLE_STATUS_CODES = {409, 422, 429, 503}
+
+def get_search_client(index_name=INDEX_NAME):
+    """Azure AI Search 클라이언트 생성"""
     credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    search_client = SearchClient(
+    return SearchClient(
         endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=credential
+        index_name=index_name,
+        credential=credential,
+        **azure_kwargs()
     )
+
+def split_batches(documents, max_docs=UPLOAD_MAX_BATCH_DOCS, max_bytes=UPLOAD_MAX_BATCH_BYTES):
+    """문서를 개수/크기 제한에 맞는 배치로 분할"""
+    batches = []
+    current, current_bytes = [], 0
     
-    try:
-        # 배치 업로드
-        result = search_client.upload_documents(documents=documents)
+    for doc in documents:
+        doc_bytes = len(json.dumps(doc, ensure_ascii=False).encode("utf-8"))
         
-        success_count = sum(1 for r in result if r.succeeded)
-        fail_count = len(result) - success_count
+        # 현재 배치에 추가하면 제한을 넘는 경우 새 배치 시작
+        if current and (len(current) >= max_docs or current_bytes + doc_bytes > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
         
-        print(f"✅ 업로드 완료:")
-        print(f"   - 성공: {success_count}개")
-        print(f"   - 실패: {fail_count}개")
+        current.append(doc)
+        current_bytes += doc_bytes
+    
+    if current:
+        batches.append(current)
+    
+    return batches
+
+def _upload_batch(search_client, batch, key_field="id", max_retries=UPLOAD_MAX_RETRIES, action="upload"):
+    """
+    단일 배치 업로드 - 실패한 키만 지수 백오프로 재시도
+    
+    action: "upload" | "merge_or_upload" | "delete"
+    
+    Returns:
+        (성공 문서 수, {실패 키: 오류 메시지}, 재시도 횟수)
+    """
+    send = getattr(search_client, f"{action}_documents")
+    pending = batch
+    succeeded = 0
+    failures = {}
+    retries = 0
+    
+    for attempt in range(max_retries + 1):
+        retry_keys = set()
         
-        # 실패한 문서 출력
-        if fail_count > 0:
-            print("\n❌ 실패한 문서:")
-            for r in result:
-                if not r.succeeded:
-                    print(f"   - {r.key}: {r.error_message}")
+        try:
+            results = send(documents=pending)
+            
+            for r in results:
+                if r.succeeded:
+                    succeeded += 1
+                    failures.pop(r.key, None)
+                elif r.status_code in RETRYABLE_STATUS_CODES:
+                    retry_keys.add(r.key)
+                    failures[r.key] = r.error_message
+                else:
+                    # 400 등 문서 자체 오류는 재시도하지 않음
+                    failures[r.key] = r.error_message
         
-        return success_count, fail_count
+        except HttpResponseError as e:
+            # 요청 전체 실패 (스로틀링, 일시적 서버 오류) - 배치 전체 재시도
+            if e.status_code not in RETRYABLE_STATUS_CODES:
+                for doc in pending:
+                    failures[doc[key_field]] = str(e)
+                break
+            for doc in pending:
+                retry_keys.add(doc[key_field])
+                failures[doc[key_field]] = str(e)
         
-    except Exception as e:
-        print(f"❌ 업로드 실패: {e}")
-        return 0, len(documents)
+        if not retry_keys or attempt == max_retries:
+            break
+        
+        # 지수 백오프 + 지터
+        retries += 1
+        time.sleep(UPLOAD_RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, UPLOAD_RETRY_BACKOFF))
+        pending = [doc for doc in pending if doc[key_field] in retry_keys]
+    
+    return succeeded, failures, retries
+
+def upload_documents(documents, search_client=None, key_field="id",
+                     max_docs=UPLOAD_MAX_BATCH_DOCS, max_bytes=UPLOAD_MAX_BATCH_BYTES,
+                     max_workers=UPLOAD_MAX_WORKERS, max_retries=UPLOAD_MAX_RETRIES,
+                     action="upload"):
+    """
+    문서를 Azure AI Search에 업로드
+    
+    문서를 개수/크기 제한 배치로 나누어 병렬 전송하고, 실패한 키만 재시도합니다.
+    
+    Returns:
+        (성공 문서 수, 실패 문서 수)
+    """
+    if search_client is None:
+        search_client = get_search_client()
+    
+    if not documents:
+        print("ℹ️ 업로드할 문서가 없습니다.")
+        return 0, 0
+    
+    batches = split_batches(documents, max_docs=max_docs, max_bytes=max_bytes)
+    total_bytes = sum(len(json.dumps(doc, ensure_ascii=False).encode("utf-8")) for doc in documents)
+    
+    print(f"📦 {len(documents)}개 문서 → {len(batches)}개 배치 (병렬 {max_workers})")
+    
+    success_count = 0
+    failures = {}
+    total_retries = 0
+    started = time.perf_counter()
+    
+    # 배치 병렬 업로드
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_upload_batch, search_client, batch, key_field, max_retries, action)
+            for batch in batches
+        ]
+        
+        for future in as_completed(futures):
+            try:
+                succeeded, batch_failures, retries = future.result()
+            except Exception as e:
+                print(f"❌ 배치 업로드 실패: {e}")
+                continue
+            success_count += succeeded
+            failures.update(batch_failures)
+            total_retries += retries
+    
+    elapsed = time.perf_counter() - started
+    fail_count = len(documents) - success_count
+    
+    print(f"✅ {'삭제' if action == 'delete' else '업로드'} 완료:")
+    print(f"   - 성공: {success_count}개")
+    print(f"   - 실패: {fail_count}개")
+    print(f"   - 재시도: {total_retries}회")
+    print(f"   - 처리량: {success_count / elapsed:.1f} docs/s, "
+          f"{total_bytes / 1024 / 1024 / elapsed:.2f} MB/s ({elapsed:.2f}초)")
+    
+    # 실패한 문서 출력
+    if failures:
+        print("\n❌ 실패한 문서:")
+        for key, message in failures.items():
+            print(f"   - {key}: {message}")
+    
+    return success_count, fail_count
+
+def delete_documents(keys, search_client=None, key_field="id"):
+    """키 목록에 해당하는 문서를 배치 삭제"""
+    documents = [{key_field: key} for key in keys]
+    return upload_documents(documents, search_client=search_client, key_field=key_field, action="delete")
 
-def verify_upload(expected_count):
+def verify_upload(expected_count, search_client=None):
     """업로드 검증"""
-    credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=credential
-    )
+    if search_client is None:
+        search_client = get_search_client()
     
     try:
         # 전체 문서 수 확인
@@ -82,25 +221,14 @@ def verify_upload(expected_count):
         print(f"❌ 검증 실패: {e}")
         return 0
 
-def test_search():
+def test_search(search_client=None):
     """검색 테스트"""
-    credential = AzureKeyCredential(AZURE_SEARCH_KEY)
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=credential
-    )
+    if search_client is None:
+        search_client = get_search_client()
     
     print("\n🔍 검색 테스트:")
     
-    # 테스트 쿼리들
-    test_queries = [
-        "시스템이 필요한 모든 기능을 제공합니까?",
-        "응답 속도가 빠릅니까?",
-        "보안"
-    ]
-    
-    for query in test_queries:
+    for query in SAMPLE_QUERIES:
         print(f"\n쿼리: '{query}'")
         try:
             results = search_client.search(
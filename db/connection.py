@@ -0,0 +1,65 @@
+"""
+PostgreSQL 연결 (화면/스크립트 공용)
+- 연결 생성과 모든 쿼리 실행을 추적 span으로 기록 (db.connect / db.query, 행 수 포함)
+- CASSETTE_MODE=record 이면 쿼리 결과를 카세트에 기록, replay 이면 DB 없이 카세트로 응답
+"""
+
+import os
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+import cassette
+from tracing import span, short_statement
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("PG_HOST"),
+    "dbname": os.getenv("PG_DATABASE"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+    "port": os.getenv("PG_PORT"),
+}
+
+class TracedCursor(psycopg2.extensions.cursor):
+    """execute / executemany 를 db.query span으로 기록하는 커서"""
+
+    def execute(self, query, vars=None):
+        with span("db.query", kind="db", statement=short_statement(query)) as s:
+            result = super().execute(query, vars)
+            s.set(rows=self.rowcount)
+            return result
+
+    def executemany(self, query, vars_list):
+        with span("db.query", kind="db", statement=short_statement(query), many=True) as s:
+            result = super().executemany(query, vars_list)
+            s.set(rows=self.rowcount)
+            return result
+
+class RecordingCursor(cassette.CassetteCursorMixin, TracedCursor):
+    """쿼리 결과를 카세트에 기록하는 커서"""
+
+    def execute(self, query, vars=None):
+        return self._cassette_execute(query, vars, lambda: TracedCursor.execute(self, query, vars))
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        return self._cassette_execute(query, vars_list, lambda: TracedCursor.executemany(self, query, vars_list))
+
+class ReplayTracedCursor(cassette.ReplayCursor):
+    """카세트 재생 커서 (span은 실제 쿼리와 같은 이름으로 기록)"""
+
+    def execute(self, query, vars=None):
+        with span("db.query", kind="db", statement=short_statement(query), replayed=True) as s:
+            result = super().execute(query, vars)
+            s.set(rows=self.rowcount)
+            return result
+
+def get_connection():
+    """PostgreSQL 연결 (쿼리 추적 커서 사용)"""
+    with span("db.connect", kind="db", host=DB_CONFIG["host"] or ""):
+        if cassette.replaying():
+            return cassette.ReplayConnection(cursor_factory=ReplayTracedCursor)
+        cursor_factory = RecordingCursor if cassette.enabled() else TracedCursor
+        return psycopg2.connect(cursor_factory=cursor_factory, **DB_CONFIG)
@@ -2,6 +2,10 @@ DROP TABLE IF EXISTS surveys CASCADE;
 DROP TABLE IF EXISTS generation_steps CASCADE;
 DROP TABLE IF EXISTS survey_questions CASCADE;
 DROP TABLE IF EXISTS metrics CASCADE;
+DROP TABLE IF EXISTS step_performance CASCADE;
+DROP TABLE IF EXISTS generation_jobs CASCADE;
+DROP TABLE IF EXISTS drafts CASCADE;
+DROP TABLE IF EXISTS classification_memo CASCADE;
 
 -- surveys 테이블 (metric_completed 컬럼 포함)
 CREATE TABLE surveys (
@@ -57,4 +61,76 @@ CREATE TABLE metrics (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (survey_id) REFERENCES surveys(id),
     FOREIGN KEY (question_id) REFERENCES survey_questions(id)
-);
\ No newline at end of file
+);
+
+-- 단계별 성능 기록 (설문 1~5단계 / 질문별 메트릭 생성)
+CREATE TABLE step_performance (
+    id INT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    survey_id INT NOT NULL,
+    stage VARCHAR(20) NOT NULL CHECK (stage IN ('survey', 'metric')),
+    step_name VARCHAR(100) NOT NULL,
+    question_order INT,
+    model VARCHAR(200),
+    llm_calls INT NOT NULL DEFAULT 0,
+    wall_ms INT NOT NULL,
+    queue_ms INT NOT NULL DEFAULT 0,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (survey_id) REFERENCES surveys(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_step_performance_survey ON step_performance (survey_id);
+
+-- 생성 작업 큐 (worker.py 가 FOR UPDATE SKIP LOCKED 로 가져가 실행)
+-- 실행 중 작업은 heartbeat 로 lease 를 연장하고, lease 가 만료되면 다른 worker 가 다시 가져감
+CREATE TABLE generation_jobs (
+    id INT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    job_type VARCHAR(20) NOT NULL CHECK (job_type IN ('survey', 'metric')),
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    payload JSONB NOT NULL,
+    progress JSONB,
+    partial_result JSONB,
+    result JSONB,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    dedupe_key VARCHAR(600),
+    attached INT NOT NULL DEFAULT 0,
+    worker_id VARCHAR(200),
+    lease_expires_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_generation_jobs_claim ON generation_jobs (created_at) WHERE status IN ('queued', 'running');
+
+-- (대상, 작업)별 진행 중 작업은 하나만 - 같은 요청은 새로 실행하지 않고 기존 작업에 합류 (attached 증가)
+CREATE UNIQUE INDEX uq_generation_jobs_active ON generation_jobs (dedupe_key) WHERE status IN ('queued', 'running');
+
+-- 작업 초안 (화면 session_state 의 생성 중간 결과, draft_store.py)
+CREATE TABLE drafts (
+    id VARCHAR(64) PRIMARY KEY,
+    data JSONB NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_drafts_updated ON drafts (updated_at);
+
+-- 질문 → 품질 속성 분류 메모 (설문 저장 시 확정된 분류, 다음 설문 4단계에서 재사용 - classification_memo.py)
+-- question_hash: sha256(정규화 질문), embedding: float32 바이트 (유사 질문 조회 시 채움)
+CREATE TABLE classification_memo (
+    question_hash CHAR(64) PRIMARY KEY,
+    question_text TEXT NOT NULL,
+    quality_attribute VARCHAR(200) NOT NULL,
+    reason TEXT,
+    embedding BYTEA,
+    embedding_model VARCHAR(200),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
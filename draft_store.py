@@ -0,0 +1,318 @@
+"""
+작업 초안 저장소 (st.session_state 의 생성 중간 결과를 서버 측에 보관)
+- 초안 ID 로 도메인 분석 ~ 최종 질문, 질문 선택 상태, 메트릭 결과 등을 저장 → 어느 인스턴스로 접속해도 이어서 작업
+- 초안 ID 는 URL 쿼리(?draft=...)로 유지, 세션 시작 시 초안을 읽어 session_state 를 복원
+- 저장소: DRAFT_BACKEND = postgres(기본, drafts 테이블) | local(DRAFT_DIR 의 JSON 파일, 단일 인스턴스/개발용)
+- 최근 초안은 프로세스 내 LRU 에 보관, 버전 번호만 조회해 다른 인스턴스가 갱신한 경우에만 다시 읽음
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from psycopg2.extras import Json
+import streamlit as st
+from dotenv import load_dotenv
+
+from db.connection import get_connection
+from survey_store import PROJECT_FIELDS
+
+load_dotenv()
+
+DRAFT_BACKEND = os.getenv("DRAFT_BACKEND", "postgres")  # postgres | local
+DRAFT_DIR = os.getenv("DRAFT_DIR", "./data/drafts")
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", "64"))
+# 마지막 수정 후 보관 기간 (새 초안을 만들 때 만료된 초안 정리)
+DRAFT_TTL_DAYS = int(os.getenv("DRAFT_TTL_DAYS", "14"))
+
+# URL 쿼리 파라미터 이름
+DRAFT_QUERY_PARAM = "draft"
+
+# 초안에 저장하는 session_state 키 (위젯 key 는 제외 - 위젯 기본값은 아래 값에서 다시 계산됨)
+DRAFT_KEYS = PROJECT_FIELDS + [
+    # 설문 생성 1~5단계
+    "domain_analysis",
+    "quality_selection",
+    "initial_questions",
+    "rag_validation_results",
+    "rag_validation_summary",
+    "refined_questions_with_rag",
+    "refinement_result",
+    "final_questions",
+    "step_metrics",
+    "step1_complete",
+    "step2_complete",
+    "step3_complete",
+    "step4_complete",
+    "step5_complete",
+    "generation_complete",
+    # 질문 선택/수정
+    "questions_data",
+    "questions_id",
+    "selected_survey_id",
+    # 메트릭 구성
+    "project_searched",
+    "last_project_name",
+    "all_metrics",
+    "metrics_generated",
+    "metric_performance",
+    # 작업 큐 (GENERATION_BACKEND=queue)
+    "survey_job_id",
+    "metric_job_id",
+    "metric_job_survey_id",
+]
+
+# JSON 저장으로 모양이 바뀌는 값 복원 (정수 키 → 문자열 키)
+_DECODERS = {
+    "metric_performance": lambda value: {int(order): perf for order, perf in value.items()},
+}
+
+class PostgresDraftBackend:
+    """drafts 테이블 (id, data JSONB, version)"""
+
+    def version(self, draft_id):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT version FROM drafts WHERE id = %s", (draft_id,))
+                row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def load(self, draft_id):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT version, data FROM drafts WHERE id = %s", (draft_id,))
+                row = cur.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+        finally:
+            conn.close()
+
+    def save(self, draft_id, data):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO drafts (id, data) VALUES (%s, %s)
+                    ON CONFLICT (id) DO UPDATE
+                    SET data = EXCLUDED.data, version = drafts.version + 1, updated_at = CURRENT_TIMESTAMP
+                    RETURNING version
+                """, (draft_id, Json(data)))
+                version = cur.fetchone()[0]
+            conn.commit()
+            return version
+        finally:
+            conn.close()
+
+    def delete(self, draft_id):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM drafts WHERE id = %s", (draft_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def purge(self, ttl_days):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM drafts WHERE updated_at < CURRENT_TIMESTAMP - make_interval(days => %s)",
+                    (ttl_days,)
+                )
+                purged = cur.rowcount
+            conn.commit()
+            return purged
+        finally:
+            conn.close()
+
+class LocalDraftBackend:
+    """초안별 JSON 파일 (버전은 파일 수정 시각 + 크기, 원자적 교체로 저장)"""
+
+    def __init__(self, directory=DRAFT_DIR):
+        self.directory = directory
+
+    def _path(self, draft_id):
+        return os.path.join(self.directory, f"{draft_id}.json")
+
+    def version(self, draft_id):
+        try:
+            stat = os.stat(self._path(draft_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, draft_id):
+        try:
+            with open(self._path(draft_id), "r", encoding="utf-8") as f:
+                stat = os.fstat(f.fileno())
+                return (stat.st_mtime_ns, stat.st_size), json.load(f)
+        except FileNotFoundError:
+            return None, None
+
+    def save(self, draft_id, data):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(draft_id)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(draft_id))
+        return self.version(draft_id)
+
+    def delete(self, draft_id):
+        try:
+            os.remove(self._path(draft_id))
+        except FileNotFoundError:
+            pass
+
+    def purge(self, ttl_days):
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = ttl_days * 86400
+        purged = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".json") and os.path.getmtime(path) < time.time() - cutoff:
+                os.remove(path)
+                purged += 1
+        return purged
+
+class DraftStore:
+    """저장소 앞단 LRU (초안 ID → (버전, 데이터))"""
+
+    def __init__(self, backend, capacity=DRAFT_CACHE_SIZE):
+        self.backend = backend
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "saves": 0}
+
+    def _remember(self, draft_id, version, data):
+        with self._lock:
+            self._entries[draft_id] = (version, data)
+            self._entries.move_to_end(draft_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def load(self, draft_id):
+        """초안 데이터 (없으면 None) - 캐시 버전이 최신이면 본문을 다시 읽지 않음"""
+        with self._lock:
+            cached = self._entries.get(draft_id)
+        if cached is not None and self.backend.version(draft_id) == cached[0]:
+            with self._lock:
+                self._entries.move_to_end(draft_id)
+                self.metrics["hits"] += 1
+            return json.loads(json.dumps(cached[1]))
+
+        with self._lock:
+            self.metrics["misses"] += 1
+        version, data = self.backend.load(draft_id)
+        if version is None:
+            with self._lock:
+                self._entries.pop(draft_id, None)
+            return None
+        self._remember(draft_id, version, data)
+        return json.loads(json.dumps(data))
+
+    def save(self, draft_id, data):
+        version = self.backend.save(draft_id, data)
+        self._remember(draft_id, version, json.loads(json.dumps(data)))
+        with self._lock:
+            self.metrics["saves"] += 1
+        return version
+
+    def delete(self, draft_id):
+        self.backend.delete(draft_id)
+        with self._lock:
+            self._entries.pop(draft_id, None)
+
+    def purge(self, ttl_days=DRAFT_TTL_DAYS):
+        return self.backend.purge(ttl_days)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = LocalDraftBackend() if DRAFT_BACKEND == "local" else PostgresDraftBackend()
+            _store = DraftStore(backend)
+        return _store
+
+def new_draft_id():
+    return uuid.uuid4().hex
+
+def valid_draft_id(draft_id):
+    """new_draft_id 형식만 허용 (URL 에서 받은 값이 파일 경로/키로 쓰이므로)"""
+    return bool(draft_id) and re.fullmatch(r"[0-9a-f]{32}", draft_id) is not None
+
+def snapshot_session(state, keys=DRAFT_KEYS):
+    """session_state → 초안 데이터 (JSON 으로 저장 가능한 값만)"""
+    return {key: state[key] for key in keys if key in state}
+
+def restore_session(state, data):
+    """초안 데이터 → session_state (없는 키만 채움)"""
+    for key, value in data.items():
+        if key in DRAFT_KEYS and key not in state:
+            state[key] = _DECODERS[key](value) if key in _DECODERS and value is not None else value
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def restore_session_draft():
+    """
+    세션 시작 시 URL 의 초안 ID 로 session_state 복원 (app.py 에서 페이지 실행 전 호출)
+    다른 인스턴스에서 만든 초안이나 재시작 전 초안도 그대로 이어서 작업
+    """
+    if "draft_id" in st.session_state:
+        return
+    draft_id = st.query_params.get(DRAFT_QUERY_PARAM)
+    if not valid_draft_id(draft_id):
+        st.session_state.draft_id = new_draft_id()
+        st.session_state.draft_digest = None
+        return
+
+    st.session_state.draft_id = draft_id
+    try:
+        data = get_store().load(draft_id)
+    except Exception as e:
+        st.sidebar.warning(f"⚠️ 작업 초안을 불러오지 못했습니다: {e}")
+        data = None
+    st.session_state.draft_digest = _digest(data) if data else None
+    if data:
+        restore_session(st.session_state, data)
+
+def persist_session_draft():
+    """
+    변경된 경우에만 session_state 를 초안으로 저장 (app.py 에서 페이지 실행 후 호출)
+    저장할 내용이 생긴 세션만 초안 ID 를 URL 에 붙임
+    """
+    if "draft_id" not in st.session_state:
+        return
+    data = snapshot_session(st.session_state)
+    if not data:
+        return
+
+    digest = _digest(data)
+    if digest != st.session_state.draft_digest:
+        try:
+            store = get_store()
+            if st.session_state.draft_digest is None:
+                # 새 초안을 만들 때 보관 기간이 지난 초안 정리
+                store.purge()
+            store.save(st.session_state.draft_id, data)
+            st.session_state.draft_digest = digest
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ 작업 초안을 저장하지 못했습니다: {e}")
+            return
+
+    # 페이지 이동 시 쿼리가 지워지므로 매번 다시 지정
+    if st.query_params.get(DRAFT_QUERY_PARAM) != st.session_state.draft_id:
+        st.query_params[DRAFT_QUERY_PARAM] = st.session_state.draft_id
@@ -0,0 +1,205 @@
+"""
+임베딩 캐시
+- 키: (배포명, 차원, sha256(텍스트))
+- 디스크: 배포명/차원별 디렉터리에 추가 전용 float32 벡터 파일 + 32바이트 키 파일 (행 순서 일치)
+  여러 프로세스(app, worker, 배치 CLI)가 같은 디렉터리를 공유하므로 추가는 파일 잠금(flock) 안에서,
+  행 번호는 잠금 안에서 읽은 키 파일 크기로 정하고 다른 프로세스가 추가한 키는 키 파일 꼬리에서 읽어 반영
+- 메모리: LRU 앞단 캐시
+- 적중률 지표 (메모리 적중 / 디스크 적중 / 미스)
+"""
+
+import os
+import fcntl
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+
+from embeddings import DEPLOYMENT_EMBEDDING_NAME, EMBEDDING_DIMENSIONS, embed_texts
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./data/.embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+# 미스 텍스트를 한 번에 임베딩할 최대 개수
+EMBED_BATCH_SIZE = 64
+
+_KEY_BYTES = 32
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+class EmbeddingCache:
+    """(배포명, 차원)별 임베딩 캐시"""
+
+    def __init__(self, model=DEPLOYMENT_EMBEDDING_NAME, dimensions=EMBEDDING_DIMENSIONS,
+                 cache_dir=EMBEDDING_CACHE_DIR, capacity=EMBEDDING_CACHE_SIZE):
+        self.model = model
+        self.dimensions = dimensions
+        self.capacity = capacity
+        self.path = os.path.join(cache_dir, f"{model}-{dimensions}")
+        self._vector_file = os.path.join(self.path, "vectors.f32")
+        self._key_file = os.path.join(self.path, "keys.bin")
+        self._lock_file = os.path.join(self.path, "lock")
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._rows = {}
+        self._keys_read = 0  # 키 파일에서 읽어 반영한 행 수
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """프로세스 간 쓰기 잠금 (같은 캐시 디렉터리를 공유하는 다른 프로세스와 직렬화)"""
+        with open(self._lock_file, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        """키 파일로 디스크 행 인덱스 구성 (비정상 종료로 남은 꼬리 데이터는 잘라냄)"""
+        os.makedirs(self.path, exist_ok=True)
+        with self._file_lock():
+            keys = b""
+            if os.path.exists(self._key_file):
+                with open(self._key_file, "rb") as f:
+                    keys = f.read()
+            row_bytes = self.dimensions * 4
+            vector_size = os.path.getsize(self._vector_file) if os.path.exists(self._vector_file) else 0
+            rows = min(len(keys) // _KEY_BYTES, vector_size // row_bytes)
+
+            if rows * _KEY_BYTES != len(keys):
+                with open(self._key_file, "r+b") as f:
+                    f.truncate(rows * _KEY_BYTES)
+            if rows * row_bytes != vector_size:
+                with open(self._vector_file, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+
+        self._rows = {}
+        for i in range(rows):
+            self._rows.setdefault(keys[i * _KEY_BYTES:(i + 1) * _KEY_BYTES], i)
+        self._keys_read = rows
+
+    def _read_new_keys(self):
+        """다른 프로세스가 추가한 키 반영 (키는 벡터 다음에 기록되므로 읽은 키의 벡터는 항상 존재)"""
+        try:
+            rows = os.path.getsize(self._key_file) // _KEY_BYTES
+        except FileNotFoundError:
+            return
+        if rows <= self._keys_read:
+            return
+        with open(self._key_file, "rb") as f:
+            f.seek(self._keys_read * _KEY_BYTES)
+            keys = f.read((rows - self._keys_read) * _KEY_BYTES)
+        for i in range(len(keys) // _KEY_BYTES):
+            # 두 프로세스가 같은 텍스트를 기록한 경우 앞 행 사용 (벡터는 같음)
+            self._rows.setdefault(keys[i * _KEY_BYTES:(i + 1) * _KEY_BYTES], self._keys_read + i)
+        self._keys_read += len(keys) // _KEY_BYTES
+
+    def _remember(self, digest, vector):
+        self._memory[digest] = vector
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, text):
+        """캐시된 임베딩 (없으면 None)"""
+        digest = text_digest(text)
+        with self._lock:
+            vector = self._memory.get(digest)
+            if vector is not None:
+                self._memory.move_to_end(digest)
+                self.metrics["memory_hits"] += 1
+                return vector
+
+            row = self._rows.get(digest)
+            if row is None:
+                self._read_new_keys()
+                row = self._rows.get(digest)
+            if row is None:
+                self.metrics["misses"] += 1
+                return None
+
+            with open(self._vector_file, "rb") as f:
+                f.seek(row * self.dimensions * 4)
+                vector = np.fromfile(f, dtype=np.float32, count=self.dimensions)
+            self.metrics["disk_hits"] += 1
+            self._remember(digest, vector)
+            return vector
+
+    def put_many(self, texts, vectors):
+        """
+        임베딩 저장 (벡터 → 키 순서로 기록하여 키가 있으면 벡터도 항상 존재)
+        행 번호는 파일 잠금 안에서 키 파일 크기로 정함 (다른 프로세스가 먼저 추가한 행과 겹치지 않도록)
+        """
+        with self._lock:
+            batch = {}
+            for text, vector in zip(texts, vectors):
+                digest = text_digest(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(digest, vector)
+                batch[digest] = vector
+
+            with self._file_lock():
+                self._read_new_keys()
+                new = [(digest, vector) for digest, vector in batch.items() if digest not in self._rows]
+                if not new:
+                    return
+                first_row = self._keys_read
+                with open(self._vector_file, "ab") as f:
+                    # 키 없이 남은 벡터 꼬리(기록 중 비정상 종료)는 잘라내고 키 행 번호에 맞춰 추가
+                    f.truncate(first_row * self.dimensions * 4)
+                    np.stack([v for _, v in new]).tofile(f)
+                with open(self._key_file, "ab") as f:
+                    f.write(b"".join(d for d, _ in new))
+                for i, (digest, _) in enumerate(new):
+                    self._rows[digest] = first_row + i
+                self._keys_read = first_row + len(new)
+
+    def stats(self):
+        """적중률 지표"""
+        total = sum(self.metrics.values())
+        hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+        return {
+            **self.metrics,
+            "requests": total,
+            "hit_rate": hits / total if total else 0.0,
+            "disk_entries": len(self._rows),
+            "memory_entries": len(self._memory),
+        }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model=DEPLOYMENT_EMBEDDING_NAME, dimensions=EMBEDDING_DIMENSIONS):
+    """(배포명, 차원)별 프로세스 공유 캐시"""
+    with _caches_lock:
+        if (model, dimensions) not in _caches:
+            _caches[(model, dimensions)] = EmbeddingCache(model, dimensions)
+        return _caches[(model, dimensions)]
+
+def embed_texts_cached(client, texts, dimensions=EMBEDDING_DIMENSIONS, model=DEPLOYMENT_EMBEDDING_NAME):
+    """캐시를 거친 텍스트 목록 임베딩 (미스만 묶어서 API 호출)"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return [np.asarray(v, dtype=np.float32) for v in embed_texts(client, texts, dimensions=dimensions, model=model)]
+
+    cache = get_embedding_cache(model, dimensions)
+    results = [cache.get(text) for text in texts]
+
+    # 같은 배치 안의 중복 텍스트는 한 번만 요청
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+    embedded = {}
+    for i in range(0, len(missing), EMBED_BATCH_SIZE):
+        batch = missing[i:i + EMBED_BATCH_SIZE]
+        vectors = embed_texts(client, batch, dimensions=dimensions, model=model)
+        cache.put_many(batch, vectors)
+        embedded.update(zip(batch, (np.asarray(v, dtype=np.float32) for v in vectors)))
+
+    return [vector if vector is not None else embedded[text] for text, vector in zip(texts, results)]
+
+def embed_text_cached(client, text, dimensions=EMBEDDING_DIMENSIONS, model=DEPLOYMENT_EMBEDDING_NAME):
+    """캐시를 거친 단일 텍스트 임베딩"""
+    return embed_texts_cached(client, [text], dimensions=dimensions, model=model)[0]
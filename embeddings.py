@@ -0,0 +1,128 @@
+"""
+임베딩 생성 및 벡터 압축 유틸리티
+- 임베딩 차원 축소 (text-embedding-3 계열의 dimensions 파라미터)
+- int8 스칼라 양자화 / 1비트 이진 양자화 및 양자화 벡터 유사도 계산
+"""
+
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+from tracing import span
+
+load_dotenv()
+
+DEPLOYMENT_EMBEDDING_NAME = os.getenv("DEPLOYMENT_EMBEDDING_NAME", "text-embedding-3-small")
+
+# text-embedding-3-small 기본 차원
+EMBEDDING_NATIVE_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(EMBEDDING_NATIVE_DIMENSIONS)))
+
+# 벡터 양자화 방식: none | int8 | binary
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none")
+QUANTIZATION_METHODS = ("none", "int8", "binary")
+
+# 이진 벡터 해밍 거리 계산 시 한 번에 처리할 질의 수 (메모리 사용량 제한)
+_HAMMING_QUERY_BLOCK = 64
+
+def embed_texts(client, texts, dimensions=EMBEDDING_DIMENSIONS, model=DEPLOYMENT_EMBEDDING_NAME):
+    """텍스트 목록 임베딩 (설정된 차원으로 축소)"""
+    kwargs = {}
+    if dimensions != EMBEDDING_NATIVE_DIMENSIONS:
+        kwargs["dimensions"] = dimensions
+    with span("embedding", kind="embedding", model=model, texts=len(texts)) as embedding_span:
+        response = client.embeddings.create(model=model, input=texts, **kwargs)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            embedding_span.set(tokens=usage.total_tokens)
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+def embed_text(client, text, dimensions=EMBEDDING_DIMENSIONS, model=DEPLOYMENT_EMBEDDING_NAME):
+    """단일 텍스트 임베딩"""
+    return embed_texts(client, [text], dimensions=dimensions, model=model)[0]
+
+def normalize(vectors):
+    """L2 정규화 (코사인 유사도 = 내적)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def truncate_dimensions(vectors, dimensions):
+    """
+    앞쪽 차원만 남기고 재정규화
+    text-embedding-3 계열의 dimensions 파라미터와 동일한 결과 (API 재호출 없이 축소 가능)
+    """
+    return normalize(np.asarray(vectors, dtype=np.float32)[..., :dimensions])
+
+def quantize(vectors, method=EMBEDDING_QUANTIZATION):
+    """
+    벡터 양자화
+
+    Returns:
+        {"method", "codes", "scale", "offset"} - int8은 차원별 min/max 기반 선형 양자화,
+        binary는 부호 비트를 8개씩 묶은 uint8 배열
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    if method == "none":
+        return {"method": method, "codes": vectors, "scale": None, "offset": None}
+
+    if method == "int8":
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        scale = np.maximum(high - low, 1e-12) / 255.0
+        codes = np.round((vectors - low) / scale - 128).clip(-128, 127).astype(np.int8)
+        return {"method": method, "codes": codes, "scale": scale.astype(np.float32),
+                "offset": (low + 128 * scale).astype(np.float32)}
+
+    if method == "binary":
+        return {"method": method, "codes": np.packbits(vectors > 0, axis=-1), "scale": None, "offset": None}
+
+    raise ValueError(f"지원하지 않는 양자화 방식입니다: {method} ({', '.join(QUANTIZATION_METHODS)})")
+
+def quantize_queries(queries, quantized):
+    """질의 벡터를 저장된 벡터와 같은 방식으로 변환 (binary만 변환 필요)"""
+    queries = np.asarray(queries, dtype=np.float32)
+    if quantized["method"] == "binary":
+        return np.packbits(queries > 0, axis=-1)
+    return queries
+
+def quantized_scores(queries, quantized):
+    """
+    질의 벡터와 양자화된 벡터 간 유사도 (높을수록 유사)
+
+    Args:
+        queries: (질의 수, 차원) float32 배열
+        quantized: quantize() 결과
+
+    Returns:
+        (질의 수, 문서 수) 유사도 배열 - binary는 음의 해밍 거리
+    """
+    method = quantized["method"]
+    codes = quantized["codes"]
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+    if method == "none":
+        return queries @ codes.T
+
+    if method == "int8":
+        # q · (codes * scale + offset) = (q * scale) · codes + q · offset
+        return (queries * quantized["scale"]) @ codes.T.astype(np.float32) + (queries @ quantized["offset"])[:, None]
+
+    if method == "binary":
+        query_codes = quantize_queries(queries, quantized)
+        distances = np.concatenate([
+            np.bitwise_count(np.bitwise_xor(block[:, None, :], codes[None, :, :])).sum(axis=-1, dtype=np.int32)
+            for block in np.array_split(query_codes, max(1, -(-len(query_codes) // _HAMMING_QUERY_BLOCK)))
+        ])
+        return -distances.astype(np.float32)
+
+    raise ValueError(f"지원하지 않는 양자화 방식입니다: {method}")
+
+def bytes_per_vector(dimensions, method=EMBEDDING_QUANTIZATION):
+    """벡터 1개 저장 크기 (바이트)"""
+    if method == "int8":
+        return dimensions
+    if method == "binary":
+        return (dimensions + 7) // 8
+    return dimensions * 4
@@ -1,31 +1,45 @@
+import time
+_page_started = time.perf_counter()
+
 import streamlit as st
-import os, uuid, time
+import os
 from dotenv import load_dotenv
 from azure.storage.blob import BlobServiceClient
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
-from azure.search.documents.indexes.models import (
-    SearchIndex,
-    SearchableField,
-    SimpleField,
-    SearchField,
-    SearchFieldDataType,
-    VectorSearch,
-    VectorSearchProfile,
-    HnswAlgorithmConfiguration,
-)
 from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
+from azure.core.exceptions import ResourceExistsError
+from data.build_cache import (
+    hash_bytes,
+    hash_json,
+    load_cache,
+    save_cache,
+    is_fresh,
+    mark_fresh,
+    reset_documents,
+    diff_documents,
+    record_documents,
+)
+from data.upload_data import upload_documents, delete_documents
+from data.index_versions import resolve_index_name, rebuild_index
+from data.create_index import build_rag_index
+from answer_cache import AnswerCache
+from embedding_cache import EMBED_BATCH_SIZE, embed_texts_cached, embed_text_cached, get_embedding_cache
+from vector_store import LOCAL_VECTOR_STORE_PATH, LocalVectorStore, LocalVectorSearchClient
+from startup_timing import record_timing, timed
+from openai_client import client_for
+from model_routing import routed_stream
+from tracing import span
+from cassette import azure_kwargs
+
+PAGE = "iso25010_rag"
+record_timing(PAGE, "import", time.perf_counter() - _page_started)
 
 # === 환경 변수 로드 ===
 load_dotenv()
 
 # === Azure 환경변수 ===
 # OpenAI
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2024-12-01-preview")
-DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME", "gpt-4.1-mini")
 DEPLOYMENT_EMBEDDING_NAME = os.getenv("DEPLOYMENT_EMBEDDING_NAME", "text-embedding-3-small")
 
 # AI Search
@@ -33,32 +47,119 @@ AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
 AZURE_SEARCH_INDEX_NAME = os.getenv("AZURE_SEARCH_INDEX_NAME", "iso25010-index")
 
+# 검색 백엔드: azure (Azure AI Search) | local (로컬 memmap 벡터 저장소)
+RAG_BACKEND = os.getenv("RAG_BACKEND", "azure")
+
 # Blob Storage
 AZURE_STORAGE_ACCOUNT_NAME = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
 AZURE_STORAGE_ACCOUNT_KEY = os.getenv("AZURE_STORAGE_ACCOUNT_KEY")
 AZURE_STORAGE_CONTAINER_NAME = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "docs")
 
-# === 클라이언트 설정 ===
-blob_service_client = BlobServiceClient(
-    account_url=f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net",
-    credential=AZURE_STORAGE_ACCOUNT_KEY
-)
+# Blob 목록 캐시 유지 시간 (초) - 업로드/삭제/새로고침 시 즉시 갱신
+BLOB_LIST_TTL = int(os.getenv("BLOB_LIST_TTL", "300"))
 
 search_endpoint = AZURE_SEARCH_ENDPOINT
 search_key = AZURE_SEARCH_API_KEY
 index_name = AZURE_SEARCH_INDEX_NAME
 
-openai_client = AzureOpenAI(
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version=OPENAI_API_VERSION
-)
-
-# === Blob 컨테이너 보장 ===
-try:
-    blob_service_client.create_container(AZURE_STORAGE_CONTAINER_NAME)
-except Exception:
-    pass
+# === 클라이언트 설정 (프로세스당 1회 생성) ===
+@st.cache_resource
+def get_blob_service_client():
+    """Blob 클라이언트 생성 및 컨테이너 보장 (최초 1회만 확인)"""
+    with timed(PAGE, "Blob 클라이언트 초기화"):
+        blob_service_client = BlobServiceClient(
+            account_url=f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net",
+            credential=AZURE_STORAGE_ACCOUNT_KEY,
+            **azure_kwargs()
+        )
+        try:
+            blob_service_client.create_container(AZURE_STORAGE_CONTAINER_NAME)
+        except ResourceExistsError:
+            pass
+    return blob_service_client
+
+def get_container_client():
+    return get_blob_service_client().get_container_client(AZURE_STORAGE_CONTAINER_NAME)
+
+@st.cache_data(ttl=BLOB_LIST_TTL, show_spinner=False)
+def list_blob_names():
+    """업로드된 문서 목록 (캐시 - list_blob_names.clear()로 갱신)"""
+    with timed(PAGE, "Blob 목록 조회"):
+        return [blob.name for blob in get_container_client().list_blobs()]
+
+@st.cache_resource
+def get_local_vector_store():
+    """로컬 벡터 저장소 (프로세스 내 세션 간 공유)"""
+    return LocalVectorStore(LOCAL_VECTOR_STORE_PATH)
+
+def get_rag_search_client(active_index_name):
+    """설정된 백엔드의 검색 클라이언트 (결과 형태는 content / source로 동일)"""
+    if RAG_BACKEND == "local":
+        return LocalVectorSearchClient(get_local_vector_store())
+    return SearchClient(endpoint=search_endpoint, index_name=active_index_name, credential=AzureKeyCredential(search_key), **azure_kwargs())
+
+@st.cache_resource
+def get_answer_cache():
+    """질문 답변 캐시 (사용자 세션 간 공유)"""
+    return AnswerCache()
+
+def get_index_version(active_index_name):
+    """답변 캐시 무효화용 인덱스 버전 (활성 인덱스명 + 반영된 문서 해시)"""
+    documents = load_cache()["documents"].get(active_index_name, {})
+    return f"{active_index_name}:{hash_json(documents)}"
+
+def stream_answer(stream):
+    """채팅 스트림에서 텍스트 조각만 추출"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def show_sources(sources):
+    with st.expander("📖 참조된 문서"):
+        for src in dict.fromkeys(sources):
+            st.markdown(f"- `{src}`")
+
+def source_key(source):
+    """파일별 고정 키 접두사 (재인덱싱 시 중복 문서 방지)"""
+    return hash_bytes(source.encode("utf-8"))[:16]
+
+def chunk_documents(source, text, chunk_size=2000):
+    """문서를 청크로 분할 - {고정 키: (청크, 콘텐츠 해시)}"""
+    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+    return {
+        f"{source_key(source)}_{i}": (chunk, hash_json({"source": source, "content": chunk}))
+        for i, chunk in enumerate(chunks)
+    }
+
+def embed_chunks(source, chunks):
+    """청크 임베딩 후 업로드용 문서 생성 ({키: 청크} → 문서 리스트)"""
+    progress = st.progress(0)
+    docs = []
+    items = list(chunks.items())
+    for start in range(0, len(items), EMBED_BATCH_SIZE):
+        batch = items[start:start + EMBED_BATCH_SIZE]
+        # 변경되지 않은 청크는 임베딩 캐시에서 가져오고 미스만 묶어서 호출
+        embeddings = embed_texts_cached(client_for("embedding"), [chunk for _, chunk in batch], model=DEPLOYMENT_EMBEDDING_NAME)
+
+        for (doc_id, chunk), embedding in zip(batch, embeddings):
+            docs.append({
+                "id": doc_id,
+                "content": chunk,
+                "source": source,
+                "embedding": embedding.tolist()
+            })
+        progress.progress(len(docs) / len(items))
+    progress.progress(1.0)
+    return docs
+
+def show_embedding_cache_stats():
+    """임베딩 캐시 적중률 표시"""
+    stats = get_embedding_cache(DEPLOYMENT_EMBEDDING_NAME).stats()
+    st.caption(
+        f"🧮 임베딩 캐시 적중률 {stats['hit_rate']:.0%} "
+        f"(메모리 {stats['memory_hits']} / 디스크 {stats['disk_hits']} / 미스 {stats['misses']}, "
+        f"저장 {stats['disk_entries']}개)"
+    )
 
 # === Streamlit 페이지 설정 ===
 st.set_page_config(page_title="RAG 데이터 구성", layout="wide")
@@ -69,19 +170,30 @@ st.markdown("#### 📤 문서 업로드")
 uploaded_file = st.file_uploader("TXT 형식의 문서를 업로드하세요", type=["txt"], label_visibility="collapsed")
 
 if uploaded_file:
-    blob_client = blob_service_client.get_blob_client(container=AZURE_STORAGE_CONTAINER_NAME, blob=uploaded_file.name)
-    blob_client.upload_blob(uploaded_file.getvalue(), overwrite=True)
+    # 업로더에 파일이 남아 있는 동안 재실행마다 다시 올리지 않도록 파일별 1회만 업로드
+    upload_id = (uploaded_file.name, uploaded_file.size)
+    if st.session_state.get("last_upload") != upload_id:
+        container_client = get_container_client()
+        container_client.upload_blob(uploaded_file.name, uploaded_file.getvalue(), overwrite=True)
+        st.session_state.last_upload = upload_id
+        list_blob_names.clear()
     st.success(f"✅ '{uploaded_file.name}' 업로드 완료!")
 
 # --- 2️⃣ 업로드된 문서 목록 ---
-st.markdown("#### 📂 업로드된 문서 목록")
-container_client = blob_service_client.get_container_client(AZURE_STORAGE_CONTAINER_NAME)
-blobs = list(container_client.list_blobs())
+title_col, refresh_col = st.columns([1, 0.2])
+with title_col:
+    st.markdown("#### 📂 업로드된 문서 목록")
+with refresh_col:
+    if st.button("🔄 목록 새로고침"):
+        list_blob_names.clear()
 
-if not blobs:
+blob_names = list_blob_names()
+container_client = get_container_client()
+
+if not blob_names:
     st.info("현재 업로드된 파일이 없습니다.")
 else:
-    filenames = [blob.name for blob in blobs]
+    filenames = blob_names
     selected_file = st.selectbox("인덱싱할 파일을 선택하세요", filenames)
     col1, col2 = st.columns([1, 0.2])
     with col1:
@@ -90,6 +202,7 @@ else:
         if st.button("🗑 파일 삭제"):
             blob_client = container_client.get_blob_client(selected_file)
             blob_client.delete_blob()
+            list_blob_names.clear()
             st.warning(f"'{selected_file}' 삭제 완료!")
             st.rerun()
 
@@ -100,62 +213,74 @@ if "indexed_files" not in st.session_state:
 if 'index_btn' in locals() and index_btn:
     st.markdown("### ⚙️ 인덱싱 진행 중...")
 
-    index_client = SearchIndexClient(endpoint=search_endpoint, credential=AzureKeyCredential(search_key))
-
-    # === 최신 스펙 반영된 필드 정의 ===
-    fields = [
-        SimpleField(name="id", type=SearchFieldDataType.String, key=True),
-        SearchableField(name="content", type=SearchFieldDataType.String),
-        SimpleField(name="source", type=SearchFieldDataType.String),
-        SearchField(
-            name="embedding",
-            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
-            searchable=True,
-            vector_search_dimensions=1536,
-            vector_search_profile_name="vector-profile"
-        ),
-    ]
-
-    # === Vector Search 구성 ===
-    vector_search = VectorSearch(
-        algorithms=[HnswAlgorithmConfiguration(name="hnsw-config")],
-        profiles=[VectorSearchProfile(name="vector-profile", algorithm_configuration_name="hnsw-config")]
-    )
-
-    # === 인덱스 생성 ===
-    index = SearchIndex(
-        name=index_name,
-        fields=fields,
-        vector_search=vector_search
-    )
-
-    index_client.create_or_update_index(index)
-
-    # === 문서 읽기 및 임베딩 처리 ===
-    blob_data = container_client.download_blob(selected_file).readall().decode("utf-8")
-    chunks = [blob_data[i:i+2000] for i in range(0, len(blob_data), 2000)]
-    search_client = SearchClient(endpoint=search_endpoint, index_name=index_name, credential=AzureKeyCredential(search_key))
-
-    progress = st.progress(0)
-    docs = []
-    for i, chunk in enumerate(chunks):
-        embedding = openai_client.embeddings.create(
-            model=DEPLOYMENT_EMBEDDING_NAME,
-            input=chunk
-        ).data[0].embedding
-
-        docs.append({
-            "id": str(uuid.uuid4()),
-            "content": chunk,
-            "source": selected_file,
-            "embedding": embedding
-        })
-        progress.progress((i + 1) / len(chunks))
-        time.sleep(0.05)
-
-    search_client.upload_documents(docs)
-    st.success(f"✅ {selected_file} 인덱싱 완료! ({len(docs)}개 섹션)")
-    st.session_state.indexed_files.add(selected_file)
+    cache = load_cache()
+    index_stage = f"index:{index_name}"
+    index_hash = hash_json(build_rag_index(index_name).as_dict())
+
+    if RAG_BACKEND != "local" and not is_fresh(cache, index_stage, index_hash):
+        # 스키마가 바뀐 경우 서비스 중인 인덱스는 그대로 두고 새 버전으로 전체 재구축
+        st.info("🏗️ 인덱스 스키마가 변경되어 새 버전 인덱스에 전체 문서를 재구축합니다...")
+        docs, doc_hashes = [], {}
+        for blob_name in blob_names:
+            blob_text = container_client.download_blob(blob_name).readall().decode("utf-8")
+            chunks = chunk_documents(blob_name, blob_text)
+            doc_hashes.update({key: h for key, (_, h) in chunks.items()})
+            docs.extend(embed_chunks(blob_name, {key: chunk for key, (chunk, _) in chunks.items()}))
+
+        # Search 클라이언트는 Azure 백엔드 재구축에서만 생성 (RAG_BACKEND=local 은 Search 키 없이 인덱싱)
+        index_client = SearchIndexClient(endpoint=search_endpoint, credential=AzureKeyCredential(search_key), **azure_kwargs())
+        new_index_name = rebuild_index(
+            index_name,
+            build_rag_index,
+            docs,
+            index_client=index_client,
+            require_hits=False
+        )
+        if new_index_name is None:
+            st.error("❌ 새 인덱스 검증에 실패하여 기존 인덱스를 유지합니다.")
+        else:
+            mark_fresh(cache, index_stage, index_hash)
+            reset_documents(cache, new_index_name)
+            record_documents(cache, new_index_name, doc_hashes)
+            st.success(f"✅ 인덱스 재구축 완료! ({new_index_name}, {len(blob_names)}개 파일 / {len(docs)}개 섹션)")
+            st.session_state.indexed_files.update(blob_names)
+    else:
+        # === 서비스 중인 인덱스에 변경된 청크만 임베딩하여 반영 ===
+        if RAG_BACKEND == "local":
+            active_index_name = f"local:{LOCAL_VECTOR_STORE_PATH}"
+        else:
+            active_index_name = resolve_index_name(index_name)
+        search_client = get_rag_search_client(active_index_name)
+
+        blob_data = container_client.download_blob(selected_file).readall().decode("utf-8")
+        chunks = chunk_documents(selected_file, blob_data)
+        chunk_hashes = {key: h for key, (_, h) in chunks.items()}
+        changed_keys, removed_keys = diff_documents(
+            cache, active_index_name, chunk_hashes, prefix=f"{source_key(selected_file)}_"
+        )
+
+        docs = embed_chunks(selected_file, {key: chunks[key][0] for key in changed_keys})
+
+        fail = 0
+        if docs:
+            _, fail = upload_documents(docs, search_client=search_client)
+        if removed_keys and fail == 0:
+            _, fail = delete_documents(removed_keys, search_client=search_client)
+
+        if fail > 0:
+            st.error(f"❌ {selected_file} 인덱싱 중 {fail}개 문서 처리 실패 - 다시 시도해주세요.")
+        else:
+            record_documents(
+                cache, active_index_name,
+                {key: chunk_hashes[key] for key in changed_keys},
+                removed_keys=removed_keys
+            )
+            st.success(f"✅ {selected_file} 인덱싱 완료! ({len(chunks)}개 섹션 중 {len(docs)}개 갱신)")
+            st.session_state.indexed_files.add(selected_file)
+            if RAG_BACKEND == "local":
+                get_local_vector_store().maybe_compact()
+    save_cache(cache)
+    show_embedding_cache_stats()
 
 # --- 4️⃣ 질의응답 (RAG) ---
 st.markdown("#### 💬 질의응답 테스트")
@@ -164,28 +289,38 @@ if st.button("🔎 답변 생성"):
     if not query:
         st.warning("질문을 입력해주세요.")
     else:
-        with st.spinner("🔎 검색 및 LLM 응답 생성 중..."):
-            search_client = SearchClient(endpoint=search_endpoint, index_name=index_name, credential=AzureKeyCredential(search_key))
-            embedding = openai_client.embeddings.create(
-                model=DEPLOYMENT_EMBEDDING_NAME,
-                input=query
-            ).data[0].embedding
-
-            results = search_client.search(
-                search_text=None,
-                vector_queries=[{
-                    "kind": "vector",
-                    "vector": embedding,
-                    "fields": "embedding",
-                    "k": 3
-                }],
-                select=["content", "source"]
-            )
-
-            sources, context_chunks = [], []
-            for doc in results:
-                context_chunks.append(doc["content"])
-                sources.append(doc["source"])
+        active_index_name = f"local:{LOCAL_VECTOR_STORE_PATH}" if RAG_BACKEND == "local" else resolve_index_name(index_name)
+        index_version = get_index_version(active_index_name)
+        answer_cache = get_answer_cache()
+        cached = answer_cache.get(index_version, query)
+
+        if cached:
+            st.subheader("🧠 답변")
+            show_sources(cached["sources"])
+            st.write(cached["answer"])
+            st.caption("⚡ 캐시된 답변입니다.")
+        else:
+            with st.spinner("🔎 관련 문서 검색 중..."):
+                search_client = get_rag_search_client(active_index_name)
+                embedding = embed_text_cached(client_for("embedding"), query, model=DEPLOYMENT_EMBEDDING_NAME).tolist()
+
+                with span("search.rag", kind="search", backend=RAG_BACKEND, top=3) as search_span:
+                    results = search_client.search(
+                        search_text=None,
+                        vector_queries=[{
+                            "kind": "vector",
+                            "vector": embedding,
+                            "fields": "embedding",
+                            "k": 3
+                        }],
+                        select=["content", "source"]
+                    )
+
+                    sources, context_chunks = [], []
+                    for doc in results:
+                        context_chunks.append(doc["content"])
+                        sources.append(doc["source"])
+                    search_span.set(rows=len(sources))
 
             context = "\n\n".join(context_chunks)
             prompt = f"""
@@ -197,15 +332,10 @@ if st.button("🔎 답변 생성"):
             ISO 25010 기준에 따라 명확하고 간결하게 한국어로 설명해주세요.
             """
 
-            response = openai_client.chat.completions.create(
-                model=DEPLOYMENT_NAME,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            answer = response.choices[0].message.content
-
-        st.subheader("🧠 답변")
-        st.write(answer)
-
-        with st.expander("📖 참조된 문서"):
-            for src in set(sources):
-                st.markdown(f"- `{src}`")
+            # 참조 문서를 먼저 보여주고 답변은 토큰 단위로 스트리밍
+            st.subheader("🧠 답변")
+            show_sources(sources)
+            stream = routed_stream("rag_answer", "iso25010_rag.answer", [{"role": "user", "content": prompt}])
+            answer = st.write_stream(stream_answer(stream))
+            answer_cache.put(index_version, query, {"answer": answer, "sources": sources})
+        show_embedding_cache_stats()
@@ -0,0 +1,171 @@
+"""
+품질 속성별 ISO/IEC 25010 참고 문맥 (프로세스 내 사전 계산)
+- 3단계 질문 생성에 2단계에서 선정한 품질 속성의 정의와 부특성을 함께 제공 → 품질 속성을 잘못 붙인 질문과 4단계 재분류 수정 감소
+- 원본: ISO_CONTEXT_SOURCE = auto(기본, 검색 환경 변수가 있으면 index) | index(Azure AI Search) | file(ISO_DOCUMENTS_PATH)
+  index 조회에 실패하면 file 로 대체
+- 프로세스당 한 번 계산해 보관 (앱은 시작 시 백그라운드로 미리 계산, worker/배치는 처음 사용할 때 계산)
+"""
+
+import os
+import json
+import threading
+from dotenv import load_dotenv
+
+from tracing import span
+
+load_dotenv()
+
+ISO_CONTEXT_ENABLED = os.getenv("ISO_CONTEXT_ENABLED", "true").lower() in ("1", "true", "yes")
+ISO_CONTEXT_SOURCE = os.getenv("ISO_CONTEXT_SOURCE", "auto")  # auto | index | file
+ISO_DOCUMENTS_PATH = os.getenv("ISO_DOCUMENTS_PATH", "./data/iso25010_documents.json")
+# 품질 속성 1개 문맥의 최대 길이 (프롬프트 크기 제한)
+ISO_CONTEXT_MAX_CHARS = int(os.getenv("ISO_CONTEXT_MAX_CHARS", "1500"))
+
+# Azure AI Search 환경 변수
+AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
+AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
+AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX")
+
+# 문맥 구성에 쓰는 문서 필드 (data/iso25010_documents.json 및 인덱스 스키마와 동일)
+DOCUMENT_FIELDS = [
+    "id", "quality_characteristic", "quality_characteristic_en",
+    "sub_characteristic", "sub_characteristic_en", "doc_type", "definition", "keywords",
+]
+
+def _keywords(value):
+    if isinstance(value, list):
+        return ", ".join(value)
+    return ", ".join(k.strip() for k in str(value or "").split("|") if k.strip())
+
+def build_attribute_contexts(documents, max_chars=ISO_CONTEXT_MAX_CHARS):
+    """
+    ISO 25010 문서 목록 → {품질 속성: 정의 + 부특성 목록 문맥}
+
+    예:
+        기능 적합성 (Functional Suitability): 명시된 조건에서 ...
+        - 기능 완전성 (Functional Completeness): 기능 세트가 ... [키워드: 완전, 충분, ...]
+    """
+    mains = {}
+    subs = {}
+    for doc in documents:
+        attr = doc.get("quality_characteristic")
+        if not attr:
+            continue
+        if doc.get("doc_type") == "main_characteristic":
+            mains[attr] = doc
+        else:
+            subs.setdefault(attr, []).append(doc)
+
+    contexts = {}
+    for attr in list(mains) + [a for a in subs if a not in mains]:
+        main = mains.get(attr, {})
+        english = main.get("quality_characteristic_en") or next(
+            (d.get("quality_characteristic_en") for d in subs.get(attr, []) if d.get("quality_characteristic_en")), ""
+        )
+        header = f"{attr} ({english})" if english else attr
+        lines = [f"{header}: {main['definition']}" if main.get("definition") else header]
+        for doc in subs.get(attr, []):
+            name = doc.get("sub_characteristic") or ""
+            if doc.get("sub_characteristic_en"):
+                name += f" ({doc['sub_characteristic_en']})"
+            line = f"- {name}: {doc.get('definition') or ''}".rstrip(": ")
+            keywords = _keywords(doc.get("keywords"))
+            if keywords:
+                line += f" [키워드: {keywords}]"
+            lines.append(line)
+
+        text = "\n".join(lines)
+        if len(text) > max_chars:
+            # 부특성 줄 단위로 자름 (첫 줄보다 짧게 제한한 경우는 글자 단위)
+            text = text[:max_chars].rsplit("\n", 1)[0] if "\n" in text[:max_chars] else text[:max_chars]
+        contexts[attr] = text
+    return contexts
+
+def load_documents_from_file(path=ISO_DOCUMENTS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_documents_from_index():
+    """현재 버전 인덱스의 ISO 25010 문서 전체 (문서 수가 적어 한 번에 조회)"""
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+    from cassette import azure_kwargs
+    from data.index_versions import resolve_index_name
+
+    search_client = SearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=resolve_index_name(AZURE_SEARCH_INDEX),
+        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY),
+        **azure_kwargs()
+    )
+    with span("search.iso_context", kind="search") as search_span:
+        documents = list(search_client.search(search_text="*", top=1000, select=DOCUMENT_FIELDS))
+        search_span.set(rows=len(documents))
+    return documents
+
+def _index_configured():
+    return all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_API_KEY, AZURE_SEARCH_INDEX])
+
+def load_attribute_contexts(source=ISO_CONTEXT_SOURCE):
+    """원본에서 문맥 계산 → (문맥, 실제 사용한 원본)"""
+    if source == "index" or (source == "auto" and _index_configured()):
+        try:
+            contexts = build_attribute_contexts(load_documents_from_index())
+            if contexts:
+                return contexts, "index"
+            print("⚠️ 인덱스에 ISO 25010 문서가 없어 파일에서 문맥을 만듭니다.")
+        except Exception as e:
+            print(f"⚠️ 인덱스에서 ISO 25010 문맥을 불러오지 못해 파일을 사용합니다: {e}")
+    try:
+        return build_attribute_contexts(load_documents_from_file()), "file"
+    except (OSError, ValueError) as e:
+        print(f"⚠️ ISO 25010 문서 파일을 불러오지 못했습니다 ({ISO_DOCUMENTS_PATH}): {e}")
+        return {}, "none"
+
+_contexts = None
+_source = None
+_lock = threading.Lock()
+
+def get_attribute_contexts():
+    """프로세스 공용 문맥 (처음 호출 시 한 번 계산)"""
+    global _contexts, _source
+    with _lock:
+        if _contexts is None:
+            _contexts, _source = load_attribute_contexts()
+        return _contexts
+
+def context_source():
+    """문맥 원본 (index | file | none, 아직 계산 전이면 None)"""
+    return _source
+
+def preload():
+    """앱 시작 시 백그라운드로 미리 계산 (첫 설문 생성이 기다리지 않도록)"""
+    if ISO_CONTEXT_ENABLED and _contexts is None:
+        threading.Thread(target=get_attribute_contexts, name="iso-context", daemon=True).start()
+
+def selected_context(attributes, contexts=None):
+    """
+    선정된 품질 속성의 문맥 결합 (띄어쓰기 차이는 무시, 일치하는 속성이 없으면 전체)
+    ISO_CONTEXT_ENABLED 가 꺼져 있으면 빈 문자열
+    """
+    if contexts is None:
+        if not ISO_CONTEXT_ENABLED:
+            return ""
+        contexts = get_attribute_contexts()
+
+    by_key = {attr.replace(" ", ""): attr for attr in contexts}
+    selected = []
+    for attr in attributes:
+        key = by_key.get(attr.replace(" ", ""))
+        if key and key not in selected:
+            selected.append(key)
+    return "\n\n".join(contexts[attr] for attr in (selected or contexts))
+
+def attribute_context(attribute, contexts=None):
+    """품질 속성 1개의 문맥 (없으면 빈 문자열)"""
+    if contexts is None:
+        if not ISO_CONTEXT_ENABLED:
+            return ""
+        contexts = get_attribute_contexts()
+    by_key = {attr.replace(" ", ""): text for attr, text in contexts.items()}
+    return by_key.get(attribute.replace(" ", ""), "")
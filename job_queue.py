@@ -0,0 +1,333 @@
+"""
+생성 작업 큐 (Postgres generation_jobs 테이블)
+- 화면은 작업을 등록하고 상태/진행 상황/중간 결과를 주기적으로 조회
+- worker.py 프로세스가 FOR UPDATE SKIP LOCKED 로 작업을 하나씩 가져가 실행 (worker 수만큼 처리량 증가)
+- 실행 중에는 heartbeat 로 lease 를 연장, lease 가 만료된 작업(죽은 worker)은 다른 worker 가 다시 가져감
+- GENERATION_BACKEND = inline(기본, 화면 스크립트에서 직접 실행) | queue(작업 큐 + worker)
+- (대상, 작업)별 진행 중 작업은 하나만 허용 (dedupe_key) - 화면 직접 실행도 작업 행과 lease 를 잡고 실행하므로
+  다른 사용자/중복 클릭 요청은 새로 실행하지 않고 진행 중 작업의 결과에 합류 (합류 횟수는 attached 로 기록)
+"""
+
+import os
+import time
+import socket
+from contextlib import contextmanager
+from psycopg2.extras import Json
+from dotenv import load_dotenv
+
+from db.connection import get_connection
+
+load_dotenv()
+
+GENERATION_BACKEND = os.getenv("GENERATION_BACKEND", "inline")  # inline | queue
+
+# lease 유지 시간 (이 시간 안에 heartbeat 가 없으면 죽은 worker 로 간주)
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# 최대 실행 시도 횟수 (lease 만료/오류 재시도 포함)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# heartbeat 간격 (lease 보다 충분히 짧게)
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+# 화면의 작업 상태 조회 간격 (초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+# 화면 스크립트가 직접 실행하는 작업의 실행자 ID (lease 가 만료되면 다음 요청이 넘겨받음)
+INLINE_WORKER_PREFIX = "inline:"
+INLINE_WORKER_ID = f"{INLINE_WORKER_PREFIX}{socket.gethostname()}-{os.getpid()}"
+
+# 작업 종류
+JOB_SURVEY = "survey"
+JOB_METRIC = "metric"
+
+# 작업 상태
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+JOB_COLUMNS = [
+    "id", "job_type", "status", "payload", "progress", "partial_result", "result", "error",
+    "attempts", "max_attempts", "attached", "worker_id", "created_at", "started_at", "finished_at",
+]
+
+class LeaseLost(Exception):
+    """heartbeat 실패 - 다른 실행자가 작업을 가져감"""
+
+class Heartbeat:
+    """
+    run_sync 의 on_tick 에서 호출 - interval 마다 snapshot() 결과로 send(progress, partial_result) 실행
+    send 가 False 를 돌려주면 LeaseLost 를 발생시켜 남은 호출을 취소
+    """
+
+    def __init__(self, send, interval=JOB_HEARTBEAT_INTERVAL, clock=time.monotonic):
+        self.send = send
+        self.interval = interval
+        self.clock = clock
+        self.last = clock()
+
+    def __call__(self, snapshot):
+        now = self.clock()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        progress, partial_result = snapshot()
+        if not self.send(progress, partial_result):
+            raise LeaseLost("lease 를 잃었습니다 (다른 실행자가 작업을 가져감)")
+
+def queue_enabled():
+    return GENERATION_BACKEND == "queue"
+
+def job_dedupe_key(operation, target):
+    """(대상, 작업) 중복 실행 방지 키 (예: metric.likert_5:12, survey:프로젝트명)"""
+    return f"{operation}:{target}"
+
+def acquire_job(cur, job_type, payload, dedupe_key, worker_id=None, lease_seconds=JOB_LEASE_SECONDS):
+    """
+    같은 dedupe_key 로 진행 중인 작업이 없으면 새로 등록, 있으면 그 작업에 합류 (attached + 1)
+    worker_id 를 주면 등록과 동시에 lease 를 잡고 running 으로 시작 (화면 직접 실행)
+
+    Returns:
+        (job_id, attached)
+    """
+    running = worker_id is not None
+    for _ in range(3):
+        cur.execute("""
+            INSERT INTO generation_jobs (
+                job_type, payload, max_attempts, dedupe_key, status, worker_id, attempts,
+                lease_expires_at, heartbeat_at, started_at
+            ) VALUES (
+                %s, %s, %s, %s, %s, %s, %s,
+                CASE WHEN %s THEN CURRENT_TIMESTAMP + make_interval(secs => %s) END,
+                CASE WHEN %s THEN CURRENT_TIMESTAMP END,
+                CASE WHEN %s THEN CURRENT_TIMESTAMP END
+            )
+            ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id
+        """, (
+            job_type, Json(payload), JOB_MAX_ATTEMPTS, dedupe_key,
+            STATUS_RUNNING if running else STATUS_QUEUED, worker_id, 1 if running else 0,
+            running, lease_seconds, running, running
+        ))
+        row = cur.fetchone()
+        if row:
+            return row[0], False
+
+        # 진행 중 작업에 합류 (화면 실행이 중단돼 lease 가 만료된 작업은 제외)
+        cur.execute("""
+            UPDATE generation_jobs
+            SET attached = attached + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE dedupe_key = %s AND status IN ('queued', 'running')
+              AND NOT (worker_id LIKE %s AND lease_expires_at < CURRENT_TIMESTAMP)
+            RETURNING id
+        """, (dedupe_key, f"{INLINE_WORKER_PREFIX}%"))
+        row = cur.fetchone()
+        if row:
+            return row[0], True
+
+        # 중단된 화면 실행 작업은 실패 처리하고 다시 등록
+        cur.execute("""
+            UPDATE generation_jobs
+            SET status = 'failed', error = '화면 실행 중단 (lease 만료)', worker_id = NULL,
+                lease_expires_at = NULL, finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE dedupe_key = %s AND status = 'running'
+              AND worker_id LIKE %s AND lease_expires_at < CURRENT_TIMESTAMP
+        """, (dedupe_key, f"{INLINE_WORKER_PREFIX}%"))
+    raise RuntimeError(f"작업을 등록하거나 합류하지 못했습니다: {dedupe_key}")
+
+def claim_job(cur, worker_id, lease_seconds=JOB_LEASE_SECONDS):
+    """
+    대기 중이거나 lease 가 만료된 작업 하나를 가져감 (다른 worker 가 잠근 행은 건너뜀)
+
+    Returns:
+        {"id", "job_type", "payload", "attempts"} 또는 None
+    """
+    cur.execute("""
+        UPDATE generation_jobs
+        SET status = 'running',
+            worker_id = %s,
+            attempts = attempts + 1,
+            lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+            heartbeat_at = CURRENT_TIMESTAMP,
+            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM generation_jobs
+            WHERE (status = 'queued' OR (status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP))
+              AND attempts < max_attempts
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, job_type, payload, attempts
+    """, (worker_id, lease_seconds))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "job_type": row[1], "payload": row[2], "attempts": row[3]}
+
+def heartbeat(cur, job_id, worker_id, progress=None, partial_result=None, lease_seconds=JOB_LEASE_SECONDS):
+    """
+    lease 연장 + 진행 상황/중간 결과 기록
+
+    Returns:
+        False 이면 lease 를 잃은 것 (만료 후 다른 worker 가 가져감) → 실행 중단
+    """
+    cur.execute("""
+        UPDATE generation_jobs
+        SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+            heartbeat_at = CURRENT_TIMESTAMP,
+            progress = COALESCE(%s, progress),
+            partial_result = COALESCE(%s, partial_result),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND worker_id = %s AND status = 'running'
+        RETURNING id
+    """, (
+        lease_seconds,
+        Json(progress) if progress is not None else None,
+        Json(partial_result) if partial_result is not None else None,
+        job_id, worker_id
+    ))
+    return cur.fetchone() is not None
+
+def complete_job(cur, job_id, worker_id, result, progress=None):
+    """작업 성공 기록 (lease 를 잃었으면 False)"""
+    cur.execute("""
+        UPDATE generation_jobs
+        SET status = 'succeeded', result = %s, progress = COALESCE(%s, progress),
+            error = NULL, lease_expires_at = NULL,
+            finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND worker_id = %s AND status = 'running'
+        RETURNING id
+    """, (Json(result), Json(progress) if progress is not None else None, job_id, worker_id))
+    return cur.fetchone() is not None
+
+def fail_job(cur, job_id, worker_id, error, retry=True):
+    """
+    작업 실패 기록 - 재시도 횟수가 남아 있으면 대기 상태로 되돌림
+
+    Returns:
+        최종 상태 (queued | failed) 또는 lease 를 잃었으면 None
+    """
+    cur.execute("""
+        UPDATE generation_jobs
+        SET status = CASE WHEN %s AND attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            error = %s, worker_id = NULL, lease_expires_at = NULL,
+            finished_at = CASE WHEN %s AND attempts < max_attempts THEN NULL ELSE CURRENT_TIMESTAMP END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND worker_id = %s AND status = 'running'
+        RETURNING status
+    """, (retry, error, retry, job_id, worker_id))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def expire_jobs(cur):
+    """lease 가 만료됐고 재시도 횟수도 소진한 작업을 실패 처리 → 처리한 작업 수"""
+    cur.execute("""
+        UPDATE generation_jobs
+        SET status = 'failed',
+            error = 'worker 응답 없음 (lease 만료, 재시도 횟수 소진)',
+            lease_expires_at = NULL, finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP AND attempts >= max_attempts
+    """)
+    return cur.rowcount
+
+def get_job(cur, job_id):
+    cur.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM generation_jobs WHERE id = %s", (job_id,))
+    row = cur.fetchone()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def duplicate_stats(cur):
+    """작업 종류별 실행 수 / 중복 요청 합류 수"""
+    cur.execute("""
+        SELECT job_type, COUNT(*) AS jobs, COALESCE(SUM(attached), 0) AS attached
+        FROM generation_jobs
+        GROUP BY job_type
+        ORDER BY job_type
+    """)
+    return [{"job_type": row[0], "jobs": row[1], "attached": row[2]} for row in cur.fetchall()]
+
+def start_job(job_type, payload, dedupe_key):
+    """
+    화면에서 작업 시작 또는 진행 중 작업에 합류 (새 연결, 커밋 포함)
+    - queue: 대기 상태로 등록 → worker 가 실행
+    - inline: 화면 실행자 lease 를 잡은 running 상태로 등록 → inline_run 으로 직접 실행
+
+    Returns:
+        (job_id, attached)
+    """
+    worker_id = None if queue_enabled() else INLINE_WORKER_ID
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            job_id, attached = acquire_job(cur, job_type, payload, dedupe_key, worker_id)
+        conn.commit()
+        return job_id, attached
+    finally:
+        conn.close()
+
+class InlineRun:
+    """화면 스크립트가 직접 실행하는 작업 (heartbeat 로 lease 유지, 결과/실패 기록)"""
+
+    def __init__(self, conn, job_id, worker_id):
+        self.conn = conn
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.beat = Heartbeat(self._send)
+
+    def _send(self, progress, partial_result):
+        with self.conn.cursor() as cur:
+            return heartbeat(cur, self.job_id, self.worker_id, progress, partial_result)
+
+    def complete(self, result, progress=None):
+        with self.conn.cursor() as cur:
+            return complete_job(cur, self.job_id, self.worker_id, result, progress)
+
+    def fail(self, error):
+        # 화면 실행은 재시도하지 않음 (대기 상태로 두면 같은 요청이 계속 합류만 하게 됨)
+        with self.conn.cursor() as cur:
+            return fail_job(cur, self.job_id, self.worker_id, error, retry=False)
+
+@contextmanager
+def inline_run(job_id, worker_id=INLINE_WORKER_ID):
+    """
+    with inline_run(job_id) as run: 실행 중 run.beat(snapshot), 끝나면 run.complete(...)
+    블록이 예외/중단(페이지 이동 등)으로 끝나면 작업을 실패로 기록해 합류한 요청도 대기를 멈춤
+    """
+    conn = get_connection()
+    conn.autocommit = True
+    run = InlineRun(conn, job_id, worker_id)
+    try:
+        yield run
+    except BaseException as e:
+        run.fail(f"{type(e).__name__}: {e}" if str(e) else "화면 실행 중단")
+        raise
+    finally:
+        conn.close()
+
+def wait_for_job(job_id, on_update=None, poll_interval=JOB_POLL_INTERVAL, timeout=None):
+    """
+    작업이 끝날 때까지 상태 조회 (화면 스크립트 스레드에서 실행)
+    - 조회할 때마다 on_update(job) 호출 → 진행 상황/중간 결과 표시
+    - 화면이 중단돼도 작업은 worker 에서 계속 실행되므로 job_id 로 다시 이어서 조회 가능
+
+    Returns:
+        마지막으로 조회한 작업 (timeout 이면 아직 실행 중일 수 있음)
+    """
+    started = time.monotonic()
+    conn = get_connection()
+    try:
+        conn.autocommit = True
+        while True:
+            with conn.cursor() as cur:
+                job = get_job(cur, job_id)
+            if job is None:
+                raise KeyError(f"작업을 찾을 수 없습니다: {job_id}")
+            if on_update:
+                on_update(job)
+            if job["status"] in FINISHED_STATUSES:
+                return job
+            if timeout is not None and time.monotonic() - started >= timeout:
+                return job
+            time.sleep(poll_interval)
+    finally:
+        conn.close()
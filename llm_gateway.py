@@ -0,0 +1,367 @@
+"""
+LLM 게이트웨이 (프로세스 내)
+- 모든 페이지의 채팅 호출이 이 모듈을 거침 (async_core 백그라운드 루프에서 실행)
+- 단일 비행(single-flight): 같은 (배포, 메시지, 온도) 요청이 진행 중이면 새로 호출하지 않고 결과 공유
+- 배포별 토큰 버킷 (분당 토큰 수) + 동시 호출 수 제한
+- 우선순위 레인: 대화형(interactive) 요청이 대기열에서 일괄(bulk) 요청보다 먼저 실행,
+  bulk는 동시 호출 슬롯을 전부 차지하지 못함 (대화형 요청용 여유 슬롯 확보)
+- 호출자(caller)별 지연 시간 / 대기 시간 / 토큰 사용량 지표
+- usage_scope: 블록(파이프라인 단계, 질문 1개) 단위 호출 수 / 대기 시간 / 토큰 / 모델 집계
+"""
+
+import os
+import json
+import time
+import heapq
+import asyncio
+import hashlib
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+from dotenv import load_dotenv
+
+from async_core import get_loop, run_sync
+from openai_client import async_client_for, client_for
+from tracing import span, record_span
+
+load_dotenv()
+
+DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
+
+# 배포별 기본 한도 (LLM_DEPLOYMENT_LIMITS로 배포별 재정의: {"gpt-4o": {"tpm": 150000, "concurrency": 10}})
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "60000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_DEPLOYMENT_LIMITS = json.loads(os.getenv("LLM_DEPLOYMENT_LIMITS", "{}"))
+
+# bulk 레인이 사용할 수 있는 동시 호출 슬롯 비율
+LLM_BULK_SHARE = float(os.getenv("LLM_BULK_SHARE", "0.75"))
+
+# 토큰 추정 (호출 전 버킷 차감용 - 응답의 실제 사용량으로 보정)
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", "2"))
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "800"))
+
+# 우선순위 레인 (숫자가 작을수록 먼저)
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANE_PRIORITY = {LANE_INTERACTIVE: 0, LANE_BULK: 1}
+
+# 호출자별 지연 시간 백분위 계산에 쓰는 최근 표본 수
+_LATENCY_SAMPLES = 200
+
+def estimate_tokens(messages, max_tokens=None):
+    """메시지 길이 기반 토큰 추정 (프롬프트 + 예상 응답, max_tokens가 있으면 그 값)"""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return int(chars / LLM_CHARS_PER_TOKEN) + (max_tokens or LLM_EXPECTED_COMPLETION_TOKENS)
+
+def completion_options(temperature=None, max_tokens=None):
+    """설정된 값만 API 인자로 전달"""
+    options = {}
+    if temperature is not None:
+        options["temperature"] = temperature
+    if max_tokens is not None:
+        options["max_tokens"] = max_tokens
+    return options
+
+def request_key(model, messages, temperature, max_tokens=None):
+    """단일 비행 키 - 같은 배포/메시지/온도/최대 토큰의 요청은 같은 키"""
+    payload = json.dumps([model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class DeploymentLimiter:
+    """
+    배포 하나의 토큰 버킷 + 동시 호출 제한 (우선순위 대기열)
+    대기열 맨 앞 요청만 토큰/슬롯을 받을 수 있으므로 대화형 요청이 bulk 요청을 앞지름
+    """
+
+    def __init__(self, tokens_per_minute, max_concurrency, bulk_share=LLM_BULK_SHARE, clock=time.monotonic):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.max_concurrency = max_concurrency
+        self.bulk_concurrency = max(1, int(max_concurrency * bulk_share))
+        self.tokens = float(tokens_per_minute)
+        self.in_flight = 0
+        self._clock = clock
+        self._updated = clock()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._condition = asyncio.Condition()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _slot_limit(self, lane):
+        return self.bulk_concurrency if lane == LANE_BULK else self.max_concurrency
+
+    async def acquire(self, cost, lane=LANE_INTERACTIVE):
+        """토큰과 동시 호출 슬롯 확보 (우선순위 순서대로)"""
+        cost = min(cost, self.capacity)
+        entry = (LANE_PRIORITY[lane], next(self._seq))
+        async with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == entry and self.in_flight < self._slot_limit(lane):
+                        if self.tokens >= cost:
+                            break
+                        wait = (cost - self.tokens) / self.rate
+                    else:
+                        wait = None
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                heapq.heappop(self._waiters)
+                self.tokens -= cost
+                self.in_flight += 1
+            except BaseException:
+                # 대기 중 취소되면 대기열에서 제거하고 다음 요청에 차례를 넘김
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._condition.notify_all()
+                raise
+            # 다음 대기 요청도 바로 확인 (슬롯/토큰이 남아 있을 수 있음)
+            self._condition.notify_all()
+        return cost
+
+    async def release(self, reserved, actual_tokens=None):
+        """슬롯 반환 + 실제 사용 토큰으로 버킷 보정 (초과 사용분은 빚으로 남음)"""
+        async with self._condition:
+            self.in_flight -= 1
+            if actual_tokens is not None:
+                self._refill()
+                self.tokens = min(self.capacity, self.tokens + reserved - actual_tokens)
+            self._condition.notify_all()
+
+    def snapshot(self):
+        tokens = min(self.capacity, self.tokens + (self._clock() - self._updated) * self.rate)
+        return {
+            "tokens": int(tokens),
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+        }
+
+class CallerMetrics:
+    """호출자 하나의 누적 지표"""
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.queue_seconds = 0.0
+        self.latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else None
+
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "p50_s": percentile(0.5),
+            "p95_s": percentile(0.95),
+            "avg_queue_s": round(self.queue_seconds / self.calls, 3) if self.calls else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+_usage_scope = contextvars.ContextVar("llm_usage_scope", default=None)
+
+@contextmanager
+def usage_scope():
+    """
+    이 블록 안의 게이트웨이 호출 사용량 집계 (단계/질문별 기록용)
+    contextvars로 전달되므로 블록 안에서 만든 비동기 작업의 호출도 포함
+    """
+    usage = {"calls": 0, "queue_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "models": set()}
+    token = _usage_scope.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_scope.reset(token)
+
+def _account(model, queue, usage):
+    scope = _usage_scope.get()
+    if scope is None:
+        return
+    scope["calls"] += 1
+    scope["queue_s"] += queue
+    scope["models"].add(model)
+    if usage is not None:
+        scope["prompt_tokens"] += usage.prompt_tokens
+        scope["completion_tokens"] += usage.completion_tokens
+
+def usage_summary(usage, wall_seconds):
+    """usage_scope 집계 → 저장용 행 값"""
+    return {
+        "model": ",".join(sorted(m for m in usage["models"] if m)),
+        "llm_calls": usage["calls"],
+        "wall_ms": int(wall_seconds * 1000),
+        "queue_ms": int(usage["queue_s"] * 1000),
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+    }
+
+_limiters = {}
+_in_flight = {}
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def get_limiter(model):
+    """배포별 제한기 (백그라운드 루프에서 생성)"""
+    if model not in _limiters:
+        limits = LLM_DEPLOYMENT_LIMITS.get(model, {})
+        _limiters[model] = DeploymentLimiter(
+            limits.get("tpm", LLM_TOKENS_PER_MINUTE),
+            limits.get("concurrency", LLM_MAX_CONCURRENCY)
+        )
+    return _limiters[model]
+
+def _record(caller, latency=None, queue=0.0, usage=None, coalesced=False, error=False):
+    with _metrics_lock:
+        m = _metrics.setdefault(caller, CallerMetrics())
+        m.calls += 1
+        m.queue_seconds += queue
+        if coalesced:
+            m.coalesced += 1
+        if error:
+            m.errors += 1
+        if latency is not None:
+            m.latencies.append(latency)
+        if usage is not None:
+            m.prompt_tokens += usage.prompt_tokens
+            m.completion_tokens += usage.completion_tokens
+
+async def _dispatch(model, messages, options, lane, timing):
+    """제한기를 거쳐 실제 API 호출 (단일 비행의 대표 요청)"""
+    limiter = get_limiter(model)
+    queued = time.perf_counter()
+    reserved = await limiter.acquire(estimate_tokens(messages, options.get("max_tokens")), lane)
+    timing["queue"] = time.perf_counter() - queued
+    usage = None
+    try:
+        response = await async_client_for("chat").chat.completions.create(
+            model=model,
+            messages=messages,
+            **options
+        )
+        usage = response.usage
+        return response
+    finally:
+        await limiter.release(reserved, usage.total_tokens if usage else None)
+
+async def chat_completion(caller, messages, temperature=None, lane=LANE_INTERACTIVE, model=None, max_tokens=None):
+    """
+    게이트웨이를 거친 채팅 호출 (코루틴 - async_core 루프에서 실행)
+
+    Args:
+        caller: 지표 집계용 호출자 이름 (예: "survey_gen.step1")
+        lane: LANE_INTERACTIVE | LANE_BULK
+
+    Returns:
+        ChatCompletion 응답 (진행 중인 같은 요청이 있으면 그 응답을 공유)
+    """
+    model = model or DEPLOYMENT_NAME
+    key = request_key(model, messages, temperature, max_tokens)
+    started = time.perf_counter()
+
+    flight = _in_flight.get(key)
+    coalesced = flight is not None
+    if not coalesced:
+        timing = {"queue": 0.0}
+        task = asyncio.ensure_future(_dispatch(model, messages, completion_options(temperature, max_tokens), lane, timing))
+        flight = _in_flight[key] = {"task": task, "waiters": 0, "timing": timing}
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    flight["waiters"] += 1
+    with span("llm.chat", kind="llm", caller=caller, model=model, lane=lane, coalesced=coalesced) as llm_span:
+        try:
+            response = await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            # 기다리는 호출자가 모두 취소되면 API 호출도 취소
+            flight["waiters"] -= 1
+            if flight["waiters"] == 0:
+                flight["task"].cancel()
+            raise
+        except Exception:
+            _record(caller, queue=flight["timing"]["queue"], coalesced=coalesced, error=True)
+            raise
+        llm_span.set(queue_s=round(flight["timing"]["queue"], 3))
+        _account(model, flight["timing"]["queue"], response.usage)
+        if response.usage and not coalesced:
+            llm_span.set(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+
+    # 공유된 응답의 토큰은 대표 요청에만 집계
+    _record(
+        caller,
+        latency=time.perf_counter() - started,
+        queue=flight["timing"]["queue"],
+        usage=None if coalesced else response.usage,
+        coalesced=coalesced
+    )
+    return response
+
+async def chat(caller, messages, temperature=None, lane=LANE_INTERACTIVE, model=None, max_tokens=None):
+    """게이트웨이를 거친 채팅 호출 - 응답 텍스트만 반환"""
+    response = await chat_completion(caller, messages, temperature=temperature, lane=lane, model=model, max_tokens=max_tokens)
+    return response.choices[0].message.content
+
+async def _create_limiter(model):
+    return get_limiter(model)
+
+def stream_chat(caller, messages, temperature=None, lane=LANE_INTERACTIVE, model=None, max_tokens=None):
+    """
+    게이트웨이를 거친 스트리밍 채팅 호출 (동기 제너레이터 - Streamlit 화면에서 직접 사용)
+    스트림은 단일 비행으로 묶지 않음 (같은 질문의 완성 답변은 answer_cache가 공유)
+    """
+    model = model or DEPLOYMENT_NAME
+    limiter = run_sync(_create_limiter(model))
+    started_at = time.time()
+    started = time.perf_counter()
+    reserved = run_sync(limiter.acquire(estimate_tokens(messages, max_tokens), lane))
+    queue = time.perf_counter() - started
+    usage = None
+    error = False
+    try:
+        stream = client_for("stream").chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **completion_options(temperature, max_tokens)
+        )
+        for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            yield chunk
+    except Exception:
+        error = True
+        raise
+    finally:
+        asyncio.run_coroutine_threadsafe(
+            limiter.release(reserved, usage.total_tokens if usage else None), get_loop()
+        )
+        latency = time.perf_counter() - started
+        _record(caller, latency=latency, queue=queue, usage=usage, error=error)
+        _account(model, queue, usage)
+        tokens = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens} if usage else {}
+        record_span("llm.stream", "llm", started_at, latency, status="error" if error else "ok",
+                    caller=caller, model=model, lane=lane, queue_s=round(queue, 3), **tokens)
+
+def gateway_stats():
+    """호출자별 지표 + 배포별 제한기 상태"""
+    with _metrics_lock:
+        callers = {caller: m.summary() for caller, m in sorted(_metrics.items())}
+    deployments = {model: limiter.snapshot() for model, limiter in list(_limiters.items())}
+    return {"callers": callers, "deployments": deployments}
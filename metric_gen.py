@@ -1,17 +1,23 @@
-import os
+import time
+_page_started = time.perf_counter()
+
+import copy
 import json
 import streamlit as st
 from dotenv import load_dotenv
-from openai import AzureOpenAI
 import psycopg2
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from startup_timing import record_timing
+from async_core import call_in_loop, run_sync
+from metric_library import reuse_summary
+from metric_pipeline import run_metric_pipeline
+from db import connection as db_connection
+from survey_store import delete_metrics, load_questions, lock_survey, save_metrics
+from job_queue import JOB_METRIC, STATUS_FAILED, STATUS_QUEUED, inline_run, job_dedupe_key, queue_enabled, start_job, wait_for_job
 
 load_dotenv()
 
-# 환경 변수 로드
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
+PAGE = "metric_gen"
+record_timing(PAGE, "import", time.perf_counter() - _page_started)
 
 # Streamlit 페이지 설정
 st.set_page_config(
@@ -40,19 +46,7 @@ st.divider()
 def get_connection():
     """PostgreSQL 연결"""
     try:
-        DB_HOST = os.getenv("PG_HOST")
-        DB_NAME = os.getenv("PG_DATABASE")
-        DB_USER = os.getenv("PG_USER")
-        DB_PASSWORD = os.getenv("PG_PASSWORD")
-        DB_PORT = os.getenv("PG_PORT")
-        
-        return psycopg2.connect(
-            host=DB_HOST,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            port=DB_PORT
-        )
+        return db_connection.get_connection()
     except psycopg2.OperationalError as e:
         st.error(f"❌ 데이터베이스 연결 실패: 네트워크 또는 DB 서버를 확인해주세요.")
         st.error(f"상세 오류: {str(e)}")
@@ -94,13 +88,7 @@ def get_questions_by_project(survey_id):
         if conn is None:
             return []
         cur = conn.cursor()
-        cur.execute("""
-            SELECT id, question_order, quality_attribute, question_text 
-            FROM survey_questions 
-            WHERE survey_id = %s 
-            ORDER BY question_order ASC
-        """, (survey_id,))
-        questions = cur.fetchall()
+        questions = load_questions(cur, survey_id)
         cur.close()
         conn.close()
         return questions
@@ -109,100 +97,66 @@ def get_questions_by_project(survey_id):
         return []
 
 
-# LLM 응답 검증 함수
-def validate_metric_response(metric_obj, question_order):
-    """LLM 응답의 필수 키 검증"""
-    required_keys = ["question_order", "quality_attribute", "question_text", "scale_interpretations"]
-    missing_keys = [key for key in required_keys if key not in metric_obj]
+# 작업 큐 메트릭 작업 조회 함수 (GENERATION_BACKEND=queue)
+def wait_for_metric_job(job_id, progress_placeholder, total_questions):
+    """
+    worker 가 실행하는 메트릭 작업을 완료까지 조회하며 진행 상황과 중간 결과를 표시
+
+    Returns:
+        (메트릭 목록, 실패 목록, 질문별 성능 {question_order: usage_summary})
+    """
+    def show(job):
+        if job["status"] == STATUS_QUEUED:
+            progress_placeholder.info("⏳ 작업 대기 중입니다 (worker 배정 전)...")
+            return
+        progress = job["progress"] or {}
+        partial = (job["partial_result"] or {}).get("metrics", [])
+        message = f"🔄 진행 중... 완료: {progress.get('done', 0)}/{total_questions}"
+        if partial:
+            latest = partial[-1]
+            message += f"\n\n최근 완료: Q{latest['question_order']}. [{latest['quality_attribute']}] {latest['question_text']}"
+        progress_placeholder.info(message)
+
+    job = wait_for_job(job_id, on_update=show)
+    st.session_state.metric_job_id = None
+    if job["status"] == STATUS_FAILED:
+        raise RuntimeError(f"메트릭 생성 작업 실패 ({job['attempts']}회 시도): {job['error']}")
+    result = job["result"]
+    # JSON 저장으로 문자열이 된 question_order 키 복원
+    performance = {int(order): perf for order, perf in result["performance"].items()}
+    return result["metrics"], result["failed"], performance
+
+def complete_metric_generation(metrics, failed_questions, performance, total_questions, progress_placeholder):
+    """생성 결과를 세션에 저장하고 완료/실패 메시지 표시"""
+    st.session_state.all_metrics = metrics
+    st.session_state.metric_performance = performance
+    for failed in failed_questions:
+        st.warning(f"⚠️ Q{failed['question_order']} 생성 실패: {failed['error']}")
     
-    if missing_keys:
-        st.warning(f"⚠️ Q{question_order}: 필수 키 누락 ({', '.join(missing_keys)})")
-        return False
-    
-    # scale_interpretations 내부 검증
-    if not isinstance(metric_obj["scale_interpretations"], list):
-        st.warning(f"⚠️ Q{question_order}: scale_interpretations가 배열이 아닙니다.")
-        return False
-    
-    for idx, scale_obj in enumerate(metric_obj["scale_interpretations"]):
-        required_scale_keys = ["scale_order", "scale", "description"]
-        missing_scale_keys = [key for key in required_scale_keys if key not in scale_obj]
-        if missing_scale_keys:
-            st.warning(f"⚠️ Q{question_order} 척도 {idx+1}: 필수 키 누락 ({', '.join(missing_scale_keys)})")
-            return False
-    
-    return True
-
-
-# 단일 질문 메트릭 생성 함수 (병렬 처리용)
-def generate_single_metric(client, question_data, scale_description, example_json, selected_scale_type):
-    """단일 질문에 대한 메트릭 생성"""
-    question_id, question_order, quality_attr, question_text = question_data
+    # 완료 메시지
+    if len(st.session_state.all_metrics) == total_questions:
+        progress_placeholder.success(f"✅ 모든 질문의 메트릭 생성 완료!")
+    else:
+        progress_placeholder.warning(
+            f"⚠️ 메트릭 생성 완료: {len(st.session_state.all_metrics)}/{total_questions}개 성공, "
+            f"{len(failed_questions)}개 실패"
+        )
     
-    try:
-        single_metric_prompt = f"""
-당신은 ISO/IEC 25010 기반의 소프트웨어 품질 평가 전문가입니다.
-다음 질문에 대해, 평가척도별로 평가자가 참고할 수 있는 '구간별 설명'을 생성하세요.
-
-**평가 척도**
-{scale_description}
-
-**질문**
-Q{question_order}. [{quality_attr}] {question_text}
-
-⚠️ 생성 규칙:
-- 항상 높은 점수(긍정적 평가)에서 낮은 점수(부정적 평가) 순으로 생성하세요.
-- 각 scale_interpretations 항목은 반드시 아래 3개의 키를 모두 포함해야 합니다.
-  1. "scale_order" (정수)
-  2. "scale" (척도명)
-  3. "description" (문장형 설명)
-- 어떤 경우에도 "description"은 생략하지 마세요.
-- JSON 객체 1개만 생성하세요 (배열 아님).
-
-{example_json}
-"""
-        
-        response = client.chat.completions.create(
-            model=DEPLOYMENT_NAME,
-            messages=[
-                {"role": "system", "content": "당신은 소프트웨어 품질 평가 전문가입니다. JSON만 반환하세요."},
-                {"role": "user", "content": single_metric_prompt}
-            ],
-            temperature=0.3
+    # 메트릭 라이브러리 재사용 결과
+    reuse = reuse_summary(performance)
+    if reuse["reused"]:
+        st.info(
+            f"♻️ 비슷한 질문의 기존 메트릭 재사용: {reuse['reused']}/{reuse['questions']}개 "
+            f"(보정 {reuse['adapted']}개, 재사용률 {reuse['reuse_rate']:.0%}, 약 {reuse['saved_ms'] / 1000:.1f}초 절약)"
         )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # JSON 파싱
-        try:
-            metric_obj = json.loads(content)
-            
-            # 응답 검증
-            if validate_metric_response(metric_obj, question_order):
-                return {
-                    "success": True,
-                    "question_order": question_order,
-                    "metric": metric_obj
-                }
-            else:
-                return {
-                    "success": False,
-                    "question_order": question_order,
-                    "error": "응답 검증 실패"
-                }
-        except json.JSONDecodeError as je:
-            return {
-                "success": False,
-                "question_order": question_order,
-                "error": f"JSON 파싱 실패: {str(je)}"
-            }
     
-    except Exception as e:
-        return {
-            "success": False,
-            "question_order": question_order,
-            "error": f"API 호출 실패: {str(e)}"
-        }
+    # 실패한 질문 상세 정보
+    if failed_questions:
+        with st.expander("❌ 실패한 질문 상세 정보", expanded=False):
+            for failed in failed_questions:
+                st.error(f"Q{failed['question_order']}: {failed['error']}")
+    
+    st.session_state.metrics_generated = True
 
 
 # ==================== 메인 UI ====================
@@ -327,7 +281,8 @@ else:
                             conn = get_connection()
                             if conn:
                                 cur = conn.cursor()
-                                cur.execute("DELETE FROM metrics WHERE survey_id = %s", (selected_survey_id,))
+                                lock_survey(cur, selected_survey_id)
+                                delete_metrics(cur, selected_survey_id)
                                 conn.commit()
                                 
                                 # surveys 테이블의 metric_completed 플래그를 N으로 업데이트
@@ -427,134 +382,75 @@ else:
 
                 # 메트릭 생성 버튼 (기존 메트릭이 없을 때만)
                 if not existing_metrics:
+                    total_questions = len(questions)
                     if st.button("🚀 메트릭 생성하기", type="primary", use_container_width=True):
                         # 메트릭 생성 시작 시 이전 데이터 클리어 (요구사항 3-3)
                         st.session_state.all_metrics = []
                         st.session_state.metrics_generated = False
                         
                         progress_placeholder = st.empty()
-                        status_container = st.container()
                         
                         try:
-                            client = AzureOpenAI(
-                                azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                                api_key=AZURE_OPENAI_API_KEY,
-                                api_version="2024-02-15-preview"
-                            )
-                            
                             progress_placeholder.info("🔄 질문별 메트릭 생성 시작...")
                             
-                            # 척도 설명
-                            if selected_scale_type == "likert_5":
-                                scale_description = """리커트 척도 (5단계):
-매우 그렇다
-그렇다
-보통이다
-그렇지 않다
-매우 그렇지 않다"""
-                            else:
-                                scale_description = """숫자 평정 척개 (1~100점):
-100~81점: 매우 긍정적
-80~61점 : 긍정적
-60~41점 : 중립
-40~21점 : 부정적
-20~1점  : 매우 부정적"""
-
-                            # 예시 JSON
-                            if selected_scale_type == "likert_5":
-                                example_json = """
-출력 형식(JSON 배열, 1개 항목):
-{
-  "question_order": 1,
-  "quality_attribute": "기능적 적합성",
-  "question_text": "시스템은 요구된 기능을 정확하게 수행하는가?",
-  "scale_interpretations": [
-    { "scale_order": 5, "scale": "매우 그렇다", "description": "모든 기능이 완벽하게 수행된다." },
-    { "scale_order": 4, "scale": "그렇다", "description": "대부분의 기능이 정확하게 수행된다." },
-    { "scale_order": 3, "scale": "보통이다", "description": "대부분 수행되지만 일부 오류가 있다." },
-    { "scale_order": 2, "scale": "그렇지 않다", "description": "일부 기능이 작동하지 않는다." },
-    { "scale_order": 1, "scale": "매우 그렇지 않다", "description": "요구된 기능을 거의 수행하지 못한다." }
-  ]
-}
-"""
-                            else:
-                                example_json = """
-출력 형식(JSON 배열, 1개 항목):
-{
-  "question_order": 1,
-  "quality_attribute": "기능적 적합성",
-  "question_text": "시스템은 요구된 기능을 정확하게 수행하는가?",
-  "scale_interpretations": [
-    { "scale_order": 5, "scale": "100~81점", "description": "모든 기능이 완벽하게 수행된다." },
-    { "scale_order": 4, "scale": "80~61점", "description": "대부분의 기능이 정확하게 수행된다." },
-    { "scale_order": 3, "scale": "60~41점", "description": "일부 오류가 있으나 대부분 수행된다." },
-    { "scale_order": 2, "scale": "40~21점", "description": "주요 기능 중 일부가 작동하지 않는다." },
-    { "scale_order": 1, "scale": "20~1점", "description": "요구된 기능을 거의 수행하지 못한다." }
-  ]
-}
-"""
-
-                            # 병렬 처리로 메트릭 생성 (요구사항 1)
-                            total_questions = len(questions)
-                            completed_count = 0
-                            failed_questions = []
-                            
-                            # ThreadPoolExecutor로 병렬 처리 (max_workers=5)
-                            with ThreadPoolExecutor(max_workers=5) as executor:
-                                # 모든 질문에 대한 Future 객체 생성
-                                future_to_question = {
-                                    executor.submit(
-                                        generate_single_metric,
-                                        client,
-                                        q,
-                                        scale_description,
-                                        example_json,
-                                        selected_scale_type
-                                    ): q for q in questions
-                                }
-                                
-                                # 완료되는 대로 처리
-                                for future in as_completed(future_to_question):
-                                    result = future.result()
-                                    completed_count += 1
-                                    
-                                    # 진행 상황 표시 (요구사항 1)
-                                    progress_placeholder.info(f"🔄 진행 중... 완료: {completed_count}/{total_questions}")
-                                    
-                                    if result["success"]:
-                                        st.session_state.all_metrics.append(result["metric"])
-                                    else:
-                                        # API 에러 발생 시 해당 질문만 스킵 (요구사항 1, 2-1)
-                                        failed_questions.append({
-                                            "question_order": result["question_order"],
-                                            "error": result["error"]
-                                        })
-                                        st.warning(f"⚠️ Q{result['question_order']} 생성 실패: {result['error']}")
-                            
-                            # 정렬 (question_order 기준)
-                            st.session_state.all_metrics.sort(key=lambda x: x["question_order"])
+                            # 같은 설문/척도의 메트릭 생성이 이미 진행 중이면 새로 실행하지 않고 그 작업에 합류
+                            # (중복 클릭/다른 사용자 - LLM 호출 비용을 두 번 쓰지 않음)
+                            job_id, attached = start_job(
+                                JOB_METRIC,
+                                {"survey_id": selected_survey_id, "scale_type": selected_scale_type},
+                                job_dedupe_key(f"{JOB_METRIC}.{selected_scale_type}", selected_survey_id)
+                            )
+                            if attached:
+                                st.info("🔗 이 설문의 메트릭 생성이 이미 진행 중입니다. 진행 중인 작업의 결과를 함께 받아옵니다.")
                             
-                            # 완료 메시지
-                            if len(st.session_state.all_metrics) == total_questions:
-                                progress_placeholder.success(f"✅ 모든 질문의 메트릭 생성 완료!")
-                            else:
-                                progress_placeholder.warning(
-                                    f"⚠️ 메트릭 생성 완료: {len(st.session_state.all_metrics)}/{total_questions}개 성공, "
-                                    f"{len(failed_questions)}개 실패"
+                            if attached or queue_enabled():
+                                # worker(또는 다른 화면)가 실행하는 작업 결과를 조회 (화면이 끊겨도 작업은 계속 실행)
+                                st.session_state.metric_job_id = job_id
+                                st.session_state.metric_job_survey_id = selected_survey_id
+                                metrics, failed_questions, performance = wait_for_metric_job(
+                                    job_id, progress_placeholder, total_questions
                                 )
-                            
-                            # 실패한 질문 상세 정보
-                            if failed_questions:
-                                with st.expander("❌ 실패한 질문 상세 정보", expanded=False):
-                                    for failed in failed_questions:
-                                        st.error(f"Q{failed['question_order']}: {failed['error']}")
-                            
-                            st.session_state.metrics_generated = True
+                            else:
+                                # 질문별 메트릭을 백그라운드 이벤트 루프에서 동시에 생성 (요구사항 1)
+                                # API 에러 발생 시 해당 질문만 스킵 (요구사항 1, 2-1)
+                                # 실행 중 작업 lease 를 유지하고 진행 상황/중간 결과를 기록 (합류한 요청이 조회)
+                                progress = {"done": 0, "total": total_questions}
+                                
+                                def on_tick():
+                                    progress_placeholder.info(f"🔄 진행 중... 완료: {progress['done']}/{total_questions}")
+                                    # 완료된 메트릭 목록은 루프 스레드에서 깊은 복사 (worker 와 같은 방식)
+                                    run.beat(lambda: call_in_loop(lambda: (
+                                        {"done": progress["done"], "total": total_questions},
+                                        {"metrics": sorted(copy.deepcopy(progress.get("metrics", [])), key=lambda m: m["question_order"])}
+                                    )))
+                                
+                                with inline_run(job_id) as run:
+                                    metrics, failed_questions, performance = run_sync(
+                                        run_metric_pipeline(questions, selected_scale_type, progress, exclude_survey_id=selected_survey_id),
+                                        on_tick=on_tick
+                                    )
+                                    run.complete(
+                                        {"metrics": metrics, "failed": failed_questions, "performance": performance},
+                                        {"done": progress["done"], "total": total_questions}
+                                    )
+                            complete_metric_generation(metrics, failed_questions, performance, total_questions, progress_placeholder)
 
                         except Exception as e:
                             progress_placeholder.error(f"❌ 전체 프로세스 오류 발생: {str(e)}")
                             with st.expander("📋 오류 상세 정보", expanded=True):
                                 st.exception(e)
+
+                    # 화면 재실행/이동 후 돌아온 경우 진행 중이던 메트릭 작업을 이어서 조회
+                    elif (st.session_state.get("metric_job_id")
+                          and st.session_state.get("metric_job_survey_id") == selected_survey_id):
+                        progress_placeholder = st.empty()
+                        try:
+                            metrics, failed_questions, performance = wait_for_metric_job(
+                                st.session_state.metric_job_id, progress_placeholder, total_questions
+                            )
+                            complete_metric_generation(metrics, failed_questions, performance, total_questions, progress_placeholder)
+                        except Exception as e:
+                            progress_placeholder.error(f"❌ 전체 프로세스 오류 발생: {str(e)}")
             
             # 메트릭이 생성되었으면 표시 (버튼 밖에서도 유지)
             if st.session_state.metrics_generated and len(st.session_state.all_metrics) > 0:
@@ -706,6 +602,15 @@ else:
                         else:
                             cur = conn.cursor()
                             
+                            # 같은 설문의 저장은 커밋까지 한 번에 하나씩 (다른 사용자의 삭제 후 저장과 섞이지 않도록)
+                            lock_survey(cur, selected_survey_id)
+                            if st.session_state.save_action_choice == "direct_save":
+                                cur.execute("SELECT COUNT(*) FROM metrics WHERE survey_id = %s", (selected_survey_id,))
+                                if cur.fetchone()[0] > 0:
+                                    conn.rollback()
+                                    conn.close()
+                                    raise RuntimeError("다른 사용자가 먼저 메트릭을 저장했습니다. 다시 저장하면 기존 메트릭 처리 방법을 선택할 수 있습니다.")
+                            
                             # 기존 메트릭 삭제 (선택한 경우)
                             if st.session_state.save_action_choice == "delete_and_save":
                                 save_status.info(f"🗑️ 기존 메트릭 삭제 중... (survey_id: {selected_survey_id})")
@@ -715,16 +620,10 @@ else:
                                 before_count = cur.fetchone()[0]
                                 st.info(f"🔍 삭제 전 메트릭 개수: {before_count}")
                                 
-                                # 삭제 실행
-                                cur.execute("""
-                                    DELETE FROM metrics 
-                                    WHERE survey_id = %s
-                                """, (selected_survey_id,))
-                                deleted_rows = cur.rowcount
+                                # 삭제 실행 (질문별 메트릭 생성 성능 기록도 함께 삭제)
+                                deleted_rows = delete_metrics(cur, selected_survey_id)
                                 st.info(f"🔍 DELETE 영향받은 행: {deleted_rows}")
                                 
-                                conn.commit()
-                                
                                 # 삭제 후 카운트 확인
                                 cur.execute("SELECT COUNT(*) FROM metrics WHERE survey_id = %s", (selected_survey_id,))
                                 after_count = cur.fetchone()[0]
@@ -732,41 +631,16 @@ else:
                                 
                                 save_status.success(f"✅ 기존 메트릭 {deleted_rows}개 삭제 완료")
                             
-                            # metrics 테이블에 저장
+                            # metrics 테이블에 저장 + 질문별 성능 기록 + metric_completed 플래그 Y
                             save_status.info("💾 메트릭 저장 시작...")
-                            for idx, metric_info in enumerate(st.session_state.all_metrics, 1):
-                                question_order = metric_info["question_order"]
-                                
-                                # 해당 question_order를 가진 question_id 찾기
-                                question_id = None
-                                for q in questions:
-                                    if q[1] == question_order:
-                                        question_id = q[0]
-                                        break
-                                
-                                if question_id:
-                                    # scale_interpretations를 JSON 문자열로 변환
-                                    element_description = json.dumps(
-                                        metric_info["scale_interpretations"],
-                                        ensure_ascii=False
-                                    )
-                                    
-                                    cur.execute("""
-                                        INSERT INTO metrics 
-                                        (survey_id, question_id, scale_type, element_description)
-                                        VALUES (%s, %s, %s, %s)
-                                    """, (selected_survey_id, question_id, selected_scale_type, element_description))
-                                    
-                                    save_status.info(f"💾 저장 중... ({idx}/{len(st.session_state.all_metrics)})")
-                            
-                            conn.commit()
-                            
-                            # surveys 테이블의 metric_completed 플래그를 Y로 업데이트
-                            cur.execute("""
-                                UPDATE surveys 
-                                SET metric_completed = 'Y', updated_at = CURRENT_TIMESTAMP
-                                WHERE id = %s
-                            """, (selected_survey_id,))
+                            save_metrics(
+                                cur,
+                                selected_survey_id,
+                                selected_scale_type,
+                                st.session_state.all_metrics,
+                                questions,
+                                st.session_state.get("metric_performance", {})
+                            )
                             conn.commit()
                             
                             cur.close()
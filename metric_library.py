@@ -0,0 +1,180 @@
+"""
+메트릭 라이브러리 (다른 설문에서 이미 생성한 메트릭을 비슷한 질문에 재사용)
+- 원본: metrics 테이블 + survey_questions (척도 유형별), 질문 임베딩은 임베딩 캐시를 거쳐 계산
+- 새 질문과 가장 가까운 저장 질문의 코사인 유사도가 METRIC_LIBRARY_SIMILARITY 이상이면 재사용
+  METRIC_LIBRARY_ADAPT_BELOW 미만이면 가벼운 보정 호출(metric_adapt 라우팅)로 질문에 맞게 설명만 고침 (METRIC_LIBRARY_ADAPT)
+- 척도 유형별 인덱스는 버전(메트릭 행 수 + 마지막 id)이 바뀐 경우에만 다시 읽음
+- 재사용률과 절약 시간(원본 생성 소요 시간 - 재사용 소요 시간)은 질문별 성능 기록에 함께 남김
+"""
+
+import os
+import json
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+from answer_cache import normalize_query
+from db.connection import get_connection
+from tracing import span
+
+load_dotenv()
+
+METRIC_LIBRARY_ENABLED = os.getenv("METRIC_LIBRARY_ENABLED", "true").lower() in ("1", "true", "yes")
+# 재사용할 최소 코사인 유사도
+METRIC_LIBRARY_SIMILARITY = float(os.getenv("METRIC_LIBRARY_SIMILARITY", "0.92"))
+# 이 값 미만이면 보정 호출 후 재사용 (이상이면 그대로 재사용)
+METRIC_LIBRARY_ADAPT_BELOW = float(os.getenv("METRIC_LIBRARY_ADAPT_BELOW", "0.98"))
+METRIC_LIBRARY_ADAPT = os.getenv("METRIC_LIBRARY_ADAPT", "true").lower() in ("1", "true", "yes")
+
+REUSE_EXACT = "exact"
+REUSE_ADAPTED = "adapted"
+
+def load_library_rows(scale_type):
+    """
+    척도 유형의 저장된 메트릭 [{"survey_id", "question_text", "quality_attribute", "scale_interpretations", "wall_ms"}]
+    같은 질문은 가장 최근 메트릭만, wall_ms 는 원본 메트릭 생성 소요 시간 (기록이 없으면 None)
+    """
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT m.survey_id, q.question_text, q.quality_attribute, m.element_description, p.wall_ms
+                FROM metrics m
+                JOIN survey_questions q ON q.id = m.question_id
+                LEFT JOIN LATERAL (
+                    SELECT wall_ms FROM step_performance
+                    WHERE survey_id = m.survey_id AND stage = 'metric' AND step_name = 'metric'
+                      AND question_order = q.question_order
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                ) p ON TRUE
+                WHERE m.scale_type = %s
+                ORDER BY m.id DESC
+            """, (scale_type,))
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    library = {}
+    for survey_id, text, attr, description, wall_ms in rows:
+        key = normalize_query(text)
+        if key in library:
+            continue
+        try:
+            interpretations = json.loads(description)
+        except (TypeError, ValueError):
+            continue
+        library[key] = {"survey_id": survey_id, "question_text": text, "quality_attribute": attr,
+                        "scale_interpretations": interpretations, "wall_ms": wall_ms}
+    return list(library.values())
+
+def library_version(scale_type):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*), MAX(id) FROM metrics WHERE scale_type = %s", (scale_type,))
+            return tuple(cur.fetchone())
+    finally:
+        conn.close()
+
+def embed_questions(texts):
+    """임베딩 캐시를 거친 질문 임베딩"""
+    from embedding_cache import embed_texts_cached
+    from openai_client import client_for
+    return embed_texts_cached(client_for("embedding"), texts)
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class MetricLibrary:
+    """척도 유형별 (저장 질문 임베딩 행렬, 메트릭)"""
+
+    def __init__(self, load_rows=load_library_rows, version=library_version, embed=embed_questions,
+                 similarity=METRIC_LIBRARY_SIMILARITY):
+        self.load_rows = load_rows
+        self.version = version
+        self.embed = embed
+        self.similarity = similarity
+        self._entries = {}  # scale_type → (버전, 행 목록, 행렬)
+        self._lock = threading.Lock()
+
+    def _entry(self, scale_type):
+        version = self.version(scale_type)
+        with self._lock:
+            cached = self._entries.get(scale_type)
+        if cached is not None and cached[0] == version:
+            return cached
+        rows = self.load_rows(scale_type)
+        matrix = _unit(self.embed([row["question_text"] for row in rows])) if rows else None
+        entry = (version, rows, matrix)
+        with self._lock:
+            self._entries[scale_type] = entry
+        return entry
+
+    def match(self, questions, scale_type, exclude_survey_id=None):
+        """
+        질문별 가장 비슷한 저장 메트릭 (한 번에 임베딩)
+
+        Args:
+            questions: [(id, question_order, quality_attribute, question_text)]
+            exclude_survey_id: 다시 생성하는 설문 자신의 기존 메트릭은 제외
+
+        Returns:
+            {question_order: {"row", "similarity"}} (기준 미만 질문은 제외)
+        """
+        _, rows, matrix = self._entry(scale_type)
+        if not rows or not questions:
+            return {}
+        scores = _unit(self.embed([q[3] for q in questions])) @ matrix.T
+        if exclude_survey_id is not None:
+            excluded = np.array([row["survey_id"] == exclude_survey_id for row in rows])
+            scores[:, excluded] = -1.0
+
+        matches = {}
+        for question, row_scores in zip(questions, scores):
+            best = int(np.argmax(row_scores))
+            if row_scores[best] >= self.similarity:
+                matches[question[1]] = {"row": rows[best], "similarity": float(row_scores[best])}
+        return matches
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_metric_library():
+    """프로세스 공용 메트릭 라이브러리"""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = MetricLibrary()
+        return _library
+
+def find_reusable_metrics(questions, scale_type, exclude_survey_id=None):
+    """재사용할 수 있는 메트릭 (사용 안 함/조회 실패 시 빈 결과 - 모두 새로 생성)"""
+    if not METRIC_LIBRARY_ENABLED:
+        return {}
+    with span("metric.library", kind="search", questions=len(questions), scale_type=scale_type) as library_span:
+        try:
+            matches = get_metric_library().match(questions, scale_type, exclude_survey_id)
+        except Exception as e:
+            library_span.set(error=f"{type(e).__name__}: {e}")
+            print(f"⚠️ 메트릭 라이브러리를 조회하지 못해 모든 질문을 새로 생성합니다: {e}")
+            return {}
+        library_span.set(matches=len(matches))
+    return matches
+
+def reuse_mode(similarity, adapt=METRIC_LIBRARY_ADAPT, adapt_below=METRIC_LIBRARY_ADAPT_BELOW):
+    """유사도 → 그대로 재사용(exact) | 보정 후 재사용(adapted)"""
+    return REUSE_ADAPTED if adapt and similarity < adapt_below else REUSE_EXACT
+
+def reuse_summary(performance):
+    """질문별 성능 기록 → 재사용률 / 절약 시간"""
+    reused = [perf for perf in performance.values() if perf.get("reuse")]
+    return {
+        "questions": len(performance),
+        "reused": len(reused),
+        "adapted": sum(1 for perf in reused if perf["reuse"] == REUSE_ADAPTED),
+        "reuse_rate": round(len(reused) / len(performance), 4) if performance else 0.0,
+        "saved_ms": sum(perf.get("saved_ms", 0) for perf in reused),
+    }
@@ -0,0 +1,273 @@
+"""
+메트릭 생성 파이프라인 (비동기)
+- metric_gen.py 화면에서 분리한 질문별 메트릭 생성 코루틴
+- 질문별 호출을 세마포어로 제한하여 동시에 실행 (METRIC_CONCURRENCY)
+- API 오류가 난 질문은 건너뛰고 실패 목록으로 반환
+- 다른 설문에서 만든 비슷한 질문의 메트릭은 metric_library 에서 찾아 재사용 (필요하면 가벼운 보정 호출)
+"""
+
+import os
+import json
+import time
+import asyncio
+from dotenv import load_dotenv
+
+from async_core import gather_limited
+from llm_gateway import LANE_BULK, usage_scope, usage_summary
+from metric_library import REUSE_ADAPTED, find_reusable_metrics, reuse_mode, reuse_summary
+from model_routing import routed_chat
+from tracing import span
+
+load_dotenv()
+
+# 질문별 메트릭 생성 동시 실행 수
+METRIC_CONCURRENCY = int(os.getenv("METRIC_CONCURRENCY", "8"))
+
+# 척도 설명
+SCALE_DESCRIPTIONS = {
+    "likert_5": """리커트 척도 (5단계):
+매우 그렇다
+그렇다
+보통이다
+그렇지 않다
+매우 그렇지 않다""",
+    "numeric_100": """숫자 평정 척개 (1~100점):
+100~81점: 매우 긍정적
+80~61점 : 긍정적
+60~41점 : 중립
+40~21점 : 부정적
+20~1점  : 매우 부정적""",
+}
+
+# 예시 JSON
+EXAMPLE_JSONS = {
+    "likert_5": """
+출력 형식(JSON 배열, 1개 항목):
+{
+  "question_order": 1,
+  "quality_attribute": "기능적 적합성",
+  "question_text": "시스템은 요구된 기능을 정확하게 수행하는가?",
+  "scale_interpretations": [
+    { "scale_order": 5, "scale": "매우 그렇다", "description": "모든 기능이 완벽하게 수행된다." },
+    { "scale_order": 4, "scale": "그렇다", "description": "대부분의 기능이 정확하게 수행된다." },
+    { "scale_order": 3, "scale": "보통이다", "description": "대부분 수행되지만 일부 오류가 있다." },
+    { "scale_order": 2, "scale": "그렇지 않다", "description": "일부 기능이 작동하지 않는다." },
+    { "scale_order": 1, "scale": "매우 그렇지 않다", "description": "요구된 기능을 거의 수행하지 못한다." }
+  ]
+}
+""",
+    "numeric_100": """
+출력 형식(JSON 배열, 1개 항목):
+{
+  "question_order": 1,
+  "quality_attribute": "기능적 적합성",
+  "question_text": "시스템은 요구된 기능을 정확하게 수행하는가?",
+  "scale_interpretations": [
+    { "scale_order": 5, "scale": "100~81점", "description": "모든 기능이 완벽하게 수행된다." },
+    { "scale_order": 4, "scale": "80~61점", "description": "대부분의 기능이 정확하게 수행된다." },
+    { "scale_order": 3, "scale": "60~41점", "description": "일부 오류가 있으나 대부분 수행된다." },
+    { "scale_order": 2, "scale": "40~21점", "description": "주요 기능 중 일부가 작동하지 않는다." },
+    { "scale_order": 1, "scale": "20~1점", "description": "요구된 기능을 거의 수행하지 못한다." }
+  ]
+}
+""",
+}
+
+def scale_prompt_parts(selected_scale_type):
+    """척도 유형별 (척도 설명, 예시 JSON) - likert_5 외에는 100점 척도"""
+    key = "likert_5" if selected_scale_type == "likert_5" else "numeric_100"
+    return SCALE_DESCRIPTIONS[key], EXAMPLE_JSONS[key]
+
+def validate_metric_response(metric_obj, question_order):
+    """LLM 응답의 필수 키 검증 (문제가 있으면 오류 메시지, 없으면 None)"""
+    required_keys = ["question_order", "quality_attribute", "question_text", "scale_interpretations"]
+    missing_keys = [key for key in required_keys if key not in metric_obj]
+    if missing_keys:
+        return f"Q{question_order}: 필수 키 누락 ({', '.join(missing_keys)})"
+
+    # scale_interpretations 내부 검증
+    if not isinstance(metric_obj["scale_interpretations"], list):
+        return f"Q{question_order}: scale_interpretations가 배열이 아닙니다."
+
+    for idx, scale_obj in enumerate(metric_obj["scale_interpretations"]):
+        required_scale_keys = ["scale_order", "scale", "description"]
+        missing_scale_keys = [key for key in required_scale_keys if key not in scale_obj]
+        if missing_scale_keys:
+            return f"Q{question_order} 척도 {idx+1}: 필수 키 누락 ({', '.join(missing_scale_keys)})"
+
+    return None
+
+async def generate_single_metric(question_data, scale_description, example_json):
+    """단일 질문에 대한 메트릭 생성"""
+    question_id, question_order, quality_attr, question_text = question_data
+
+    try:
+        single_metric_prompt = f"""
+당신은 ISO/IEC 25010 기반의 소프트웨어 품질 평가 전문가입니다.
+다음 질문에 대해, 평가척도별로 평가자가 참고할 수 있는 '구간별 설명'을 생성하세요.
+
+**평가 척도**
+{scale_description}
+
+**질문**
+Q{question_order}. [{quality_attr}] {question_text}
+
+⚠️ 생성 규칙:
+- 항상 높은 점수(긍정적 평가)에서 낮은 점수(부정적 평가) 순으로 생성하세요.
+- 각 scale_interpretations 항목은 반드시 아래 3개의 키를 모두 포함해야 합니다.
+  1. "scale_order" (정수)
+  2. "scale" (척도명)
+  3. "description" (문장형 설명)
+- 어떤 경우에도 "description"은 생략하지 마세요.
+- JSON 객체 1개만 생성하세요 (배열 아님).
+
+{example_json}
+"""
+
+        # 메트릭 일괄 생성은 bulk 레인 (대화형 요청이 먼저 실행됨)
+        content = await routed_chat(
+            "metric",
+            "metric_gen",
+            [
+                {"role": "system", "content": "당신은 소프트웨어 품질 평가 전문가입니다. JSON만 반환하세요."},
+                {"role": "user", "content": single_metric_prompt}
+            ],
+            lane=LANE_BULK
+        )
+        content = content.strip()
+
+        # JSON 파싱 및 응답 검증
+        try:
+            metric_obj = json.loads(content)
+        except json.JSONDecodeError as je:
+            return {"success": False, "question_order": question_order, "error": f"JSON 파싱 실패: {str(je)}"}
+
+        error = validate_metric_response(metric_obj, question_order)
+        if error:
+            return {"success": False, "question_order": question_order, "error": f"응답 검증 실패 - {error}"}
+        return {"success": True, "question_order": question_order, "metric": metric_obj}
+
+    except Exception as e:
+        return {"success": False, "question_order": question_order, "error": f"API 호출 실패: {str(e)}"}
+
+async def reuse_metric(question_data, match, scale_description):
+    """
+    저장된 메트릭을 질문에 맞게 재사용 (유사도가 METRIC_LIBRARY_ADAPT_BELOW 미만이면 구간별 설명만 보정)
+
+    Returns:
+        성공 결과 (reuse: exact|adapted), 보정 응답이 잘못되면 None (새로 생성)
+    """
+    question_id, question_order, quality_attr, question_text = question_data
+    source = match["row"]
+    metric_obj = {
+        "question_order": question_order,
+        "quality_attribute": quality_attr,
+        "question_text": question_text,
+        "scale_interpretations": source["scale_interpretations"],
+    }
+    mode = reuse_mode(match["similarity"])
+
+    if mode == REUSE_ADAPTED:
+        adapt_prompt = f"""
+다음은 비슷한 질문에 대해 이미 만들어진 평가척도별 '구간별 설명'입니다.
+새 질문에 맞게 description 만 고치고, scale_order 와 scale 은 그대로 두세요.
+
+**평가 척도**
+{scale_description}
+
+**기존 질문**
+[{source['quality_attribute']}] {source['question_text']}
+
+**새 질문**
+Q{question_order}. [{quality_attr}] {question_text}
+
+**기존 메트릭**
+{json.dumps(metric_obj, ensure_ascii=False)}
+
+JSON 객체 1개만 생성하세요 (기존 메트릭과 같은 형식, 배열 아님).
+"""
+        try:
+            content = await routed_chat(
+                "metric_adapt",
+                "metric_gen",
+                [
+                    {"role": "system", "content": "당신은 소프트웨어 품질 평가 전문가입니다. JSON만 반환하세요."},
+                    {"role": "user", "content": adapt_prompt}
+                ],
+                lane=LANE_BULK
+            )
+            adapted = json.loads(content.strip())
+        except Exception as e:
+            print(f"⚠️ Q{question_order} 메트릭 보정 실패, 새로 생성합니다: {e}")
+            return None
+        if not isinstance(adapted, dict) or validate_metric_response(adapted, question_order):
+            print(f"⚠️ Q{question_order} 메트릭 보정 응답이 올바르지 않아 새로 생성합니다.")
+            return None
+        metric_obj["scale_interpretations"] = adapted["scale_interpretations"]
+
+    return {"success": True, "question_order": question_order, "metric": metric_obj, "reuse": mode}
+
+def record_savings(results, matches):
+    """
+    재사용한 질문의 성능 기록에 재사용 방식/유사도/절약 시간 추가
+    절약 시간 = 원본 메트릭 생성 소요 시간(기록이 없으면 이번 실행의 새로 생성한 평균) - 재사용 소요 시간
+    """
+    generated = [r["performance"]["wall_ms"] for r in results if r["success"] and not r.get("reuse")]
+    average_ms = sum(generated) / len(generated) if generated else 0
+    for r in results:
+        if not r.get("reuse"):
+            continue
+        match = matches[r["question_order"]]
+        original_ms = match["row"]["wall_ms"] if match["row"]["wall_ms"] is not None else average_ms
+        r["performance"].update(
+            reuse=r["reuse"],
+            similarity=round(match["similarity"], 4),
+            saved_ms=max(0, int(original_ms - r["performance"]["wall_ms"])),
+        )
+
+async def run_metric_pipeline(questions, selected_scale_type, progress=None, concurrency=METRIC_CONCURRENCY,
+                              exclude_survey_id=None):
+    """
+    전체 질문 메트릭 생성
+
+    Args:
+        questions: [(id, question_order, quality_attribute, question_text)]
+        progress: {"done", "total", "metrics"} 진행 상황 딕셔너리 (선택, metrics 는 완료 순서대로 쌓이는 중간 결과)
+        exclude_survey_id: 메트릭 라이브러리에서 제외할 설문 (다시 생성하는 설문 자신)
+
+    Returns:
+        (question_order 순으로 정렬된 메트릭 목록, 실패 목록 [{"question_order", "error"}],
+         질문별 소요 시간/토큰 {question_order: usage_summary (+ 재사용 시 reuse, similarity, saved_ms)})
+    """
+    scale_description, example_json = scale_prompt_parts(selected_scale_type)
+    if progress is not None:
+        progress.update({"done": 0, "total": len(questions), "metrics": []})
+
+    # DB 조회/임베딩은 동기 호출이므로 스레드에서 실행 (루프 차단 방지)
+    matches = await asyncio.to_thread(find_reusable_metrics, questions, selected_scale_type, exclude_survey_id)
+
+    async def generate(question_data):
+        started = time.perf_counter()
+        match = matches.get(question_data[1])
+        with usage_scope() as usage:
+            result = await reuse_metric(question_data, match, scale_description) if match else None
+            if result is None:
+                result = await generate_single_metric(question_data, scale_description, example_json)
+        result["performance"] = usage_summary(usage, time.perf_counter() - started)
+        if progress is not None:
+            progress["done"] += 1
+            if result["success"]:
+                progress["metrics"].append(result["metric"])
+        return result
+
+    with span("metric.generate", kind="step", questions=len(questions)) as step:
+        results = await gather_limited([generate(q) for q in questions], concurrency)
+        record_savings(results, matches)
+        performance = {r["question_order"]: r["performance"] for r in results}
+        summary = reuse_summary(performance)
+        step.set(failed=sum(1 for r in results if not r["success"]), reused=summary["reused"],
+                 adapted=summary["adapted"], reuse_rate=summary["reuse_rate"], saved_ms=summary["saved_ms"])
+
+    metrics = sorted((r["metric"] for r in results if r["success"]), key=lambda x: x["question_order"])
+    failed = [{"question_order": r["question_order"], "error": r["error"]} for r in results if not r["success"]]
+    return metrics, failed, performance
@@ -0,0 +1,179 @@
+"""
+단계별 모델 라우팅
+- 설문 1~5단계, 메트릭 생성, RAG 답변의 배포명 / temperature / max_tokens 를 한 곳에서 설정
+- 기본값은 DEFAULT_ROUTES, MODEL_ROUTING_FILE(JSON)에서 단계별로 덮어쓰기
+- 단계별 지연 시간 SLO: 기본 배포의 최근 p95가 SLO를 넘으면 fallback(더 빠른) 배포로 전환,
+  전환 중에도 ROUTING_PROBE_INTERVAL 번에 한 번은 기본 배포로 보내 회복 여부 확인
+- 단계/배포별 지연 시간과 토큰 비용 보고 (MODEL_PRICES: 100만 토큰당 입력/출력 단가)
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+from llm_gateway import LANE_INTERACTIVE, chat_completion, stream_chat
+
+load_dotenv()
+
+DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
+# 짧고 형식이 정해진 단계(4단계 분류, 5단계 검토)와 SLO 초과 시 fallback에 쓰는 빠른 배포
+DEPLOYMENT_NAME_FAST = os.getenv("DEPLOYMENT_NAME_FAST", DEPLOYMENT_NAME)
+
+MODEL_ROUTING_FILE = os.getenv("MODEL_ROUTING_FILE", "./data/model_routing.json")
+MODEL_PRICES = json.loads(os.getenv("MODEL_PRICES", "{}"))  # {"gpt-4.1": {"input": 2.0, "output": 8.0}}
+
+# SLO 판단에 쓰는 최근 표본 수 / 최소 표본 수
+ROUTING_WINDOW = int(os.getenv("ROUTING_WINDOW", "20"))
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "5"))
+ROUTING_PROBE_INTERVAL = int(os.getenv("ROUTING_PROBE_INTERVAL", "10"))
+
+# 단계별 기본 설정 (slo_p95: 초, None이면 SLO 없음)
+DEFAULT_ROUTES = {
+    "step1_domain": {"deployment": DEPLOYMENT_NAME, "temperature": 0.5, "max_tokens": None, "slo_p95": None},
+    "step2_quality": {"deployment": DEPLOYMENT_NAME, "temperature": 0.5, "max_tokens": None, "slo_p95": None},
+    "step3_questions": {"deployment": DEPLOYMENT_NAME, "temperature": 0.7, "max_tokens": None, "slo_p95": None},
+    "step4_validation": {"deployment": DEPLOYMENT_NAME_FAST, "temperature": 0.3, "max_tokens": 600, "slo_p95": 15},
+    "step5_refinement": {"deployment": DEPLOYMENT_NAME_FAST, "temperature": 0.3, "max_tokens": None, "slo_p95": 60},
+    "step5_final": {"deployment": DEPLOYMENT_NAME, "temperature": 0.3, "max_tokens": None, "slo_p95": None},
+    "metric": {"deployment": DEPLOYMENT_NAME, "temperature": 0.3, "max_tokens": 1200, "slo_p95": 30},
+    # 메트릭 라이브러리에서 찾은 비슷한 질문의 메트릭 보정 (설명만 고치는 짧은 호출)
+    "metric_adapt": {"deployment": DEPLOYMENT_NAME_FAST, "temperature": 0.2, "max_tokens": 800, "slo_p95": 15},
+    "rag_answer": {"deployment": DEPLOYMENT_NAME, "temperature": None, "max_tokens": None, "slo_p95": None},
+}
+
+def load_routes(path=MODEL_ROUTING_FILE):
+    """기본 설정에 설정 파일의 단계별 값을 덮어쓴 라우팅 표 (fallback 기본값은 빠른 배포)"""
+    routes = {step: {"fallback": DEPLOYMENT_NAME_FAST, **route} for step, route in DEFAULT_ROUTES.items()}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for step, overrides in json.load(f).items():
+                routes.setdefault(step, {"deployment": DEPLOYMENT_NAME, "fallback": DEPLOYMENT_NAME_FAST})
+                routes[step].update(overrides)
+    return routes
+
+def token_cost(deployment, prompt_tokens, completion_tokens):
+    """토큰 비용 (단가가 설정되지 않은 배포는 0)"""
+    price = MODEL_PRICES.get(deployment, {})
+    return (prompt_tokens * price.get("input", 0) + completion_tokens * price.get("output", 0)) / 1_000_000
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else None
+
+class ModelRouter:
+    """단계별 배포 선택 + 단계/배포별 지연 시간·비용 집계"""
+
+    def __init__(self, routes=None):
+        self.routes = routes if routes is not None else load_routes()
+        self._lock = threading.Lock()
+        self._latencies = {}  # (step, deployment) → 최근 지연 시간
+        self._totals = {}     # (step, deployment) → {"calls", "prompt_tokens", "completion_tokens", "cost"}
+        self._calls = {}      # step → 호출 수 (probe 주기 계산)
+
+    def settings(self, step):
+        return self.routes.get(step) or {"deployment": DEPLOYMENT_NAME, "fallback": DEPLOYMENT_NAME_FAST}
+
+    def p95(self, step, deployment):
+        with self._lock:
+            samples = list(self._latencies.get((step, deployment), ()))
+        return _percentile(samples, 0.95) if len(samples) >= ROUTING_MIN_SAMPLES else None
+
+    def slo_exceeded(self, step):
+        route = self.settings(step)
+        p95 = self.p95(step, route["deployment"])
+        return bool(route.get("slo_p95") and p95 is not None and p95 > route["slo_p95"])
+
+    def choose(self, step):
+        """이번 호출에 사용할 배포 (SLO 초과 시 fallback, 주기적으로 기본 배포 재확인)"""
+        route = self.settings(step)
+        with self._lock:
+            self._calls[step] = self._calls.get(step, 0) + 1
+            probe = self._calls[step] % ROUTING_PROBE_INTERVAL == 0
+        fallback = route.get("fallback")
+        if fallback and fallback != route["deployment"] and self.slo_exceeded(step) and not probe:
+            return fallback
+        return route["deployment"]
+
+    def record(self, step, deployment, latency, usage=None):
+        key = (step, deployment)
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=ROUTING_WINDOW)).append(latency)
+            totals = self._totals.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0})
+            totals["calls"] += 1
+            if usage is not None:
+                totals["prompt_tokens"] += usage.prompt_tokens
+                totals["completion_tokens"] += usage.completion_tokens
+                totals["cost"] += token_cost(deployment, usage.prompt_tokens, usage.completion_tokens)
+
+    def report(self):
+        """단계/배포별 호출 수, p50/p95, SLO, 토큰, 비용"""
+        with self._lock:
+            keys = sorted(self._totals)
+            latencies = {key: list(self._latencies.get(key, ())) for key in keys}
+            totals = {key: dict(self._totals[key]) for key in keys}
+        rows = []
+        for step, deployment in keys:
+            route = self.settings(step)
+            p50, p95 = _percentile(latencies[(step, deployment)], 0.5), _percentile(latencies[(step, deployment)], 0.95)
+            rows.append({
+                "step": step,
+                "deployment": deployment,
+                "fallback": deployment != route["deployment"],
+                "calls": totals[(step, deployment)]["calls"],
+                "p50_s": round(p50, 3) if p50 is not None else None,
+                "p95_s": round(p95, 3) if p95 is not None else None,
+                "slo_p95_s": route.get("slo_p95"),
+                "prompt_tokens": totals[(step, deployment)]["prompt_tokens"],
+                "completion_tokens": totals[(step, deployment)]["completion_tokens"],
+                "cost": round(totals[(step, deployment)]["cost"], 6),
+            })
+        return rows
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """프로세스 공용 라우터 (최초 호출 시 라우팅 표 로드)"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
+
+async def routed_chat(step, caller, messages, lane=LANE_INTERACTIVE):
+    """단계 설정에 따라 배포를 골라 게이트웨이로 호출 - 응답 텍스트 반환"""
+    router = get_router()
+    route = router.settings(step)
+    deployment = router.choose(step)
+    started = time.perf_counter()
+    response = await chat_completion(
+        caller,
+        messages,
+        temperature=route.get("temperature"),
+        lane=lane,
+        model=deployment,
+        max_tokens=route.get("max_tokens")
+    )
+    router.record(step, deployment, time.perf_counter() - started, response.usage)
+    return response.choices[0].message.content
+
+def routed_stream(step, caller, messages, lane=LANE_INTERACTIVE):
+    """단계 설정에 따른 스트리밍 호출 (동기 제너레이터, 스트림 완료 시 지연 시간/토큰 기록)"""
+    router = get_router()
+    route = router.settings(step)
+    deployment = router.choose(step)
+    started = time.perf_counter()
+    usage = None
+    for chunk in stream_chat(caller, messages, temperature=route.get("temperature"), lane=lane,
+                             model=deployment, max_tokens=route.get("max_tokens")):
+        if chunk.usage:
+            usage = chunk.usage
+        yield chunk
+    router.record(step, deployment, time.perf_counter() - started, usage)
+
+def routing_report():
+    return get_router().report()
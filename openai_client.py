@@ -0,0 +1,151 @@
+"""
+프로세스 공용 Azure OpenAI 클라이언트
+- 모든 페이지/스크립트가 하나의 HTTP 연결 풀을 공유 (매 실행마다 TLS 핸드셰이크 방지)
+- 메트릭 생성 스레드 풀 크기에 맞춘 연결 수 제한, keep-alive, h2 패키지가 있으면 HTTP/2 사용
+- 호출 유형(chat / stream / embedding)별 타임아웃
+- 연결 재사용 지표 (요청 수 대비 새 연결 / TLS 핸드셰이크 수)
+- 비동기 파이프라인(async_core)용 AsyncAzureOpenAI 클라이언트도 같은 설정으로 제공
+- CASSETTE_MODE가 켜져 있으면 요청/응답을 카세트에 기록하거나 카세트로 재생
+"""
+
+import os
+import threading
+import importlib.util
+import httpx
+from dotenv import load_dotenv
+from openai import AzureOpenAI, AsyncAzureOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+import cassette
+
+load_dotenv()
+
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
+OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2024-12-01-preview")
+
+# 메트릭 생성 스레드 풀(5) × 여러 세션을 고려한 연결 수
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "auto")  # auto | true | false
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# 호출 유형별 타임아웃 (초)
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+CALL_TIMEOUTS = {
+    "chat": float(os.getenv("OPENAI_TIMEOUT_CHAT", "120")),
+    "stream": float(os.getenv("OPENAI_TIMEOUT_STREAM", "30")),  # 스트리밍은 토큰 간 대기 시간 기준
+    "embedding": float(os.getenv("OPENAI_TIMEOUT_EMBEDDING", "30")),
+}
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "new_connections": 0, "tls_handshakes": 0}
+
+def http2_enabled():
+    """HTTP/2 사용 여부 (auto면 h2 패키지 설치 시 사용)"""
+    if OPENAI_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return OPENAI_HTTP2 == "true"
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def _trace(event_name, info):
+    """httpcore 연결 이벤트 추적 - 새 TCP 연결과 TLS 핸드셰이크 집계"""
+    if event_name == "connection.connect_tcp.complete":
+        _count("new_connections")
+    elif event_name == "connection.start_tls.complete":
+        _count("tls_handshakes")
+
+def _on_request(request):
+    _count("requests")
+    request.extensions["trace"] = _trace
+
+async def _atrace(event_name, info):
+    _trace(event_name, info)
+
+async def _on_request_async(request):
+    _count("requests")
+    request.extensions["trace"] = _atrace
+
+def build_limits():
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+    )
+
+def timeout_for(call_type):
+    """호출 유형별 타임아웃"""
+    return httpx.Timeout(CALL_TIMEOUTS.get(call_type, CALL_TIMEOUTS["chat"]), connect=OPENAI_CONNECT_TIMEOUT)
+
+def _http_client_kwargs(is_async=False):
+    """연결 풀 설정 (카세트 기록/재생 중이면 같은 설정의 전송 계층을 카세트로 감쌈)"""
+    if not cassette.enabled():
+        return {"limits": build_limits(), "http2": http2_enabled()}
+    if is_async:
+        inner = httpx.AsyncHTTPTransport(limits=build_limits(), http2=http2_enabled())
+        return {"transport": cassette.AsyncCassetteTransport(inner)}
+    inner = httpx.HTTPTransport(limits=build_limits(), http2=http2_enabled())
+    return {"transport": cassette.CassetteTransport(inner)}
+
+def get_openai_client():
+    """프로세스 공용 AzureOpenAI 클라이언트 (최초 호출 시 생성)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AzureOpenAI(
+                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                    api_key=AZURE_OPENAI_API_KEY,
+                    api_version=OPENAI_API_VERSION,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    timeout=timeout_for("chat"),
+                    http_client=DefaultHttpxClient(
+                        event_hooks={"request": [_on_request]},
+                        **_http_client_kwargs()
+                    )
+                )
+    return _client
+
+def get_async_openai_client():
+    """
+    프로세스 공용 AsyncAzureOpenAI 클라이언트
+    async_core의 백그라운드 이벤트 루프 하나에서만 사용 (연결 풀이 루프에 묶임)
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncAzureOpenAI(
+                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                    api_key=AZURE_OPENAI_API_KEY,
+                    api_version=OPENAI_API_VERSION,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    timeout=timeout_for("chat"),
+                    http_client=DefaultAsyncHttpxClient(
+                        event_hooks={"request": [_on_request_async]},
+                        **_http_client_kwargs(is_async=True)
+                    )
+                )
+    return _async_client
+
+def async_client_for(call_type):
+    """호출 유형별 타임아웃을 적용한 비동기 클라이언트"""
+    return get_async_openai_client().with_options(timeout=timeout_for(call_type))
+
+def client_for(call_type):
+    """호출 유형별 타임아웃을 적용한 클라이언트 (연결 풀은 공유)"""
+    return get_openai_client().with_options(timeout=timeout_for(call_type))
+
+def connection_stats():
+    """연결 재사용 지표"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["reuse_rate"] = 1 - stats["new_connections"] / stats["requests"] if stats["requests"] else 0.0
+    stats["http2"] = http2_enabled()
+    return stats
@@ -0,0 +1,85 @@
+import time
+_page_started = time.perf_counter()
+
+import streamlit as st
+from startup_timing import record_timing
+from db.connection import get_connection
+from step_performance import load_step_performance, percentile_table, size_bucket, STAGE_SURVEY, STAGE_METRIC
+from job_queue import duplicate_stats
+
+PAGE = "perf_dashboard"
+record_timing(PAGE, "import", time.perf_counter() - _page_started)
+
+st.title("📈 성능 대시보드")
+st.caption("설문 생성 단계와 질문별 메트릭 생성의 소요 시간(ms) 백분위와 평균 토큰 사용량")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_performance():
+    conn = get_connection()
+    try:
+        return load_step_performance(conn)
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_duplicate_stats():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            return duplicate_stats(cur)
+    finally:
+        conn.close()
+
+if st.button("🔄 새로고침"):
+    load_performance.clear()
+    load_duplicate_stats.clear()
+
+try:
+    df = load_performance()
+except Exception as e:
+    st.error(f"❌ 성능 기록 조회 실패: {e}")
+    st.stop()
+
+# 같은 (대상, 작업) 요청이 진행 중 작업에 합류한 횟수 = 중복 실행을 피한 LLM 호출 묶음 수
+st.subheader("🔗 중복 생성 요청")
+try:
+    duplicates = load_duplicate_stats()
+except Exception as e:
+    st.warning(f"⚠️ 생성 작업 기록 조회 실패: {e}")
+else:
+    if duplicates:
+        st.dataframe(duplicates, use_container_width=True)
+    else:
+        st.caption("생성 작업 기록이 없습니다.")
+
+if df.empty:
+    st.info("저장된 성능 기록이 없습니다. 설문/메트릭을 저장하면 기록됩니다.")
+    st.stop()
+
+df["survey_size"] = df["survey_item_count"].map(size_bucket)
+value = st.radio("기준", ["wall_ms", "queue_ms"], horizontal=True,
+                 format_func=lambda v: "전체 소요 시간" if v == "wall_ms" else "게이트웨이 대기 시간")
+
+survey_df = df[df["stage"] == STAGE_SURVEY]
+metric_df = df[df["stage"] == STAGE_METRIC]
+
+col1, col2, col3 = st.columns(3)
+col1.metric("기록된 설문", df["survey_id"].nunique())
+col2.metric("설문 단계 기록", len(survey_df))
+col3.metric("메트릭 생성 기록", len(metric_df))
+
+st.subheader("📝 단계별")
+st.dataframe(percentile_table(df, ["stage", "step_name"], value), use_container_width=True)
+
+st.subheader("🤖 모델별")
+st.dataframe(percentile_table(df, ["stage", "model"], value), use_container_width=True)
+
+st.subheader("📏 설문 규모별")
+st.dataframe(percentile_table(df, ["survey_size", "step_name"], value), use_container_width=True)
+
+# 설문 1건당 단계 합계
+st.subheader("⏱️ 설문별 합계")
+st.caption("질문별 메트릭은 동시에 생성되므로 metric 합계는 실제 경과 시간보다 큽니다.")
+totals = df.groupby(["survey_id", "project_name", "survey_size", "stage"])[["wall_ms", "prompt_tokens", "completion_tokens"]].sum()
+st.dataframe(totals.reset_index().sort_values("survey_id", ascending=False), use_container_width=True)
+
@@ -0,0 +1,56 @@
+"""
+페이지별 시작 시간 측정
+- import 비용: 페이지 스크립트 맨 위에서 시작 시각을 잡고 import 직후 기록
+- 초기화 비용: timed() 블록으로 클라이언트 생성 등 구간별 기록
+- 프로세스 단위로 최초/최근/평균 시간을 모아 사이드바에 표시
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+_timings = {}
+_lock = threading.Lock()
+
+def record_timing(page, stage, seconds):
+    """구간 시간 기록 (ms)"""
+    ms = seconds * 1000
+    with _lock:
+        entry = _timings.setdefault((page, stage), {"first_ms": ms, "last_ms": ms, "total_ms": 0.0, "count": 0})
+        entry["last_ms"] = ms
+        entry["total_ms"] += ms
+        entry["count"] += 1
+
+@contextmanager
+def timed(page, stage):
+    """with 블록 실행 시간 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(page, stage, time.perf_counter() - started)
+
+def get_report():
+    """페이지/구간별 시간 목록"""
+    with _lock:
+        return [
+            {
+                "페이지": page,
+                "구간": stage,
+                "최초(ms)": round(entry["first_ms"], 1),
+                "최근(ms)": round(entry["last_ms"], 1),
+                "평균(ms)": round(entry["total_ms"] / entry["count"], 1),
+                "횟수": entry["count"],
+            }
+            for (page, stage), entry in sorted(_timings.items())
+        ]
+
+def render_report():
+    """사이드바에 시작 시간 보고서 표시"""
+    import streamlit as st
+
+    rows = get_report()
+    if not rows:
+        return
+    with st.sidebar.expander("⏱️ 페이지 시작 시간", expanded=False):
+        st.dataframe(rows, hide_index=True, use_container_width=True)
@@ -0,0 +1,91 @@
+"""
+단계별 성능 기록 (step_performance 테이블)
+- 설문 1~5단계와 질문별 메트릭 생성의 소요 시간 / 대기 시간 / 토큰 / 모델을 설문과 함께 저장
+- 성능 대시보드용 조회 및 백분위 집계 (단계, 모델, 설문 규모별)
+"""
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+STAGE_SURVEY = "survey"
+STAGE_METRIC = "metric"
+
+# 메트릭 라이브러리에서 재사용한 질문의 step_name (새로 생성한 질문은 "metric")
+STEP_METRIC_REUSE = "metric_reuse"
+
+# 대시보드 백분위
+PERCENTILES = (0.5, 0.9, 0.95)
+
+# 설문 규모 구간 (survey_item_count 기준)
+SIZE_BUCKETS = [(0, 10, "~10문항"), (11, 20, "11~20문항"), (21, 30, "21~30문항"), (31, None, "31문항~")]
+
+_COLUMNS = ("model", "llm_calls", "wall_ms", "queue_ms", "prompt_tokens", "completion_tokens")
+
+def survey_step_rows(survey_id, step_metrics):
+    """설문 생성 단계 기록 → 저장 행 (step_metrics: {단계: usage_summary})"""
+    return [
+        (survey_id, STAGE_SURVEY, step, None, *(metrics[c] for c in _COLUMNS))
+        for step, metrics in step_metrics.items()
+    ]
+
+def metric_step_rows(survey_id, performance):
+    """질문별 메트릭 생성 기록 → 저장 행 (performance: {question_order: usage_summary}, 재사용한 질문은 metric_reuse)"""
+    return [
+        (survey_id, STAGE_METRIC, STEP_METRIC_REUSE if metrics.get("reuse") else "metric", question_order, *(metrics[c] for c in _COLUMNS))
+        for question_order, metrics in sorted(performance.items())
+    ]
+
+def save_step_performance(cur, rows):
+    """성능 기록 일괄 저장 (커밋은 호출한 쪽에서)"""
+    if not rows:
+        return
+    execute_values(cur, """
+        INSERT INTO step_performance (
+            survey_id, stage, step_name, question_order,
+            model, llm_calls, wall_ms, queue_ms, prompt_tokens, completion_tokens
+        ) VALUES %s;
+    """, rows)
+
+def delete_metric_performance(cur, survey_id):
+    """설문의 메트릭 생성 기록 삭제 (메트릭을 지우고 다시 저장할 때 중복 집계 방지, 커밋은 호출한 쪽에서)"""
+    cur.execute("DELETE FROM step_performance WHERE survey_id = %s AND stage = %s", (survey_id, STAGE_METRIC))
+
+def load_step_performance(conn):
+    """성능 기록 + 설문 규모 조회"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT p.survey_id, s.project_name, s.survey_item_count, p.stage, p.step_name, p.question_order,
+               p.model, p.llm_calls, p.wall_ms, p.queue_ms, p.prompt_tokens, p.completion_tokens, p.created_at
+        FROM step_performance p
+        JOIN surveys s ON s.id = p.survey_id
+        ORDER BY p.created_at DESC
+    """)
+    columns = [d[0] for d in cur.description]
+    rows = cur.fetchall()
+    cur.close()
+    return pd.DataFrame(rows, columns=columns)
+
+def size_bucket(item_count):
+    """설문 문항 수 → 규모 구간 이름"""
+    if item_count is None or pd.isna(item_count):
+        return "미지정"
+    for low, high, label in SIZE_BUCKETS:
+        if item_count >= low and (high is None or item_count <= high):
+            return label
+    return "미지정"
+
+def percentile_table(df, by, value="wall_ms"):
+    """
+    그룹별 백분위 집계
+
+    Returns:
+        by 열 + count, p50/p90/p95 (value 기준), 평균 토큰
+    """
+    if df.empty:
+        return pd.DataFrame(columns=[*by, "count", *(f"p{int(p * 100)}" for p in PERCENTILES), "avg_tokens"])
+    grouped = df.assign(tokens=df["prompt_tokens"] + df["completion_tokens"]).groupby(by)
+    table = grouped[value].quantile(list(PERCENTILES)).unstack()
+    table.columns = [f"p{int(p * 100)}" for p in PERCENTILES]
+    table.insert(0, "count", grouped.size())
+    table["avg_tokens"] = grouped["tokens"].mean().round(1)
+    return table.reset_index()
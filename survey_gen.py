@@ -1,24 +1,30 @@
-import os
+import time
+_page_started = time.perf_counter()
+
+import copy
 import streamlit as st
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-import psycopg2
-from psycopg2.extras import execute_values
-import re
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
+from startup_timing import record_timing
+from async_core import call_in_loop, run_sync
+from survey_pipeline import new_progress, run_survey_pipeline, parse_questions
+from db.connection import get_connection
+from survey_store import GENERATION_STEPS, PROJECT_FIELDS, build_input_info, project_exists, save_survey
+from job_queue import (
+    JOB_SURVEY,
+    STATUS_FAILED,
+    STATUS_QUEUED,
+    STATUS_SUCCEEDED,
+    inline_run,
+    job_dedupe_key,
+    queue_enabled,
+    start_job,
+    wait_for_job,
+)
 
 load_dotenv()
 
-# 환경 변수 로드
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
-
-# Azure AI Search 환경 변수
-AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
-AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
-AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX")
+PAGE = "survey_gen"
+record_timing(PAGE, "import", time.perf_counter() - _page_started)
 
 # Streamlit 페이지 설정
 st.set_page_config(
@@ -32,160 +38,6 @@ st.title("📋 품질기반 SW 설문조사 설계 에이전트")
 st.markdown("**SW 제품의 품질모델을 정의하는 국제표준인 ISO/IEC 25010 기반으로 설문조사를 설계하여, SW 제품의 품질평가에 도움을 주기위한 목적의 에이전트 입니다.**")
 st.divider()
 
-# Azure AI Search 클라이언트 초기화 함수
-@st.cache_resource
-def get_search_client():
-    """Azure AI Search 클라이언트 생성"""
-    if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_API_KEY, AZURE_SEARCH_INDEX]):
-        st.warning("⚠️ Azure AI Search 환경 변수가 설정되지 않았습니다. RAG 기능이 비활성화됩니다.")
-        return None
-    
-    try:
-        credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-        search_client = SearchClient(
-            endpoint=AZURE_SEARCH_ENDPOINT,
-            index_name=AZURE_SEARCH_INDEX,
-            credential=credential
-        )
-        return search_client
-    except Exception as e:
-        st.error(f"❌ Azure AI Search 클라이언트 초기화 실패: {e}")
-        return None
-
-def search_iso25010_documents(quality_attribute, top_k=3):
-    """
-    Azure AI Search를 사용하여 특정 품질 속성에 대한 ISO 25010 문서 검색
-    
-    Args:
-        quality_attribute: 검색할 품질 속성명 (예: "기능 적합성", "성능 효율성")
-        top_k: 반환할 최대 문서 수
-    
-    Returns:
-        검색된 문서 내용을 결합한 문자열
-    """
-    search_client = get_search_client()
-    
-    if search_client is None:
-        return ""
-    
-    try:
-        # 한영 품질 속성 매핑 (영어 문서 검색을 위해)
-        attr_mapping = {
-            "기능 적합성": "Functional Suitability",
-            "성능 효율성": "Performance Efficiency",
-            "호환성": "Compatibility",
-            "상호작용 능력": "Interaction Capability",
-            "신뢰성": "Reliability",
-            "보안성": "Security",
-            "유지보수성": "Maintainability",
-            "유연성": "Flexibility"
-        }
-        
-        # 한국어와 영어를 모두 검색어에 포함
-        search_query = quality_attribute
-        if quality_attribute in attr_mapping:
-            search_query = f"{quality_attribute} {attr_mapping[quality_attribute]}"
-        
-        # 검색 쿼리 실행
-        results = search_client.search(
-            search_text=search_query,
-            top=top_k,
-            select=["content", "source"]  # 실제 인덱스 필드명 사용
-        )
-        
-        # 검색 결과 결합
-        context = []
-        for result in results:
-            source = result.get("source", "")
-            content = result.get("content", "")
-            
-            if source and content:
-                context.append(f"[출처: {source}]\n{content}")
-            elif content:
-                context.append(content)
-        
-        return "\n\n".join(context) if context else ""
-        
-    except Exception as e:
-        st.warning(f"⚠️ 문서 검색 중 오류 발생 ({quality_attribute}): {e}")
-        return ""
-
-def extract_main_quality_attributes(quality_selection_text):
-    """
-    2단계 품질 속성 선정 결과에서 주요 품질 속성명 추출
-    
-    Args:
-        quality_selection_text: 2단계 결과 텍스트
-    
-    Returns:
-        추출된 품질 속성명 리스트
-    """
-    # "주요 품질 속성" 섹션에서 속성명 추출
-    attributes = []
-    
-    # 패턴: "1. 기능 적합성 - 설명" 형태
-    pattern = r'\d+\.\s*([가-힣\s]+(?:적합성|효율성|호환성|능력|신뢰성|보안성|유지보수성|유연성))[\s\-]'
-    matches = re.findall(pattern, quality_selection_text)
-    
-    for match in matches:
-        attr = match.strip()
-        if attr and attr not in attributes:
-            attributes.append(attr)
-    
-    # 매칭이 없으면 ISO 25010의 9가지 품질 속성 중 텍스트에 포함된 것 추출
-    if not attributes:
-        iso_attributes = [
-            "기능 적합성", "성능 효율성", "호환성", "상호작용 능력",
-            "신뢰성", "보안성", "유지보수성", "유연성"
-        ]
-        for attr in iso_attributes:
-            if attr in quality_selection_text:
-                attributes.append(attr)
-    
-    return attributes
-
-def search_appropriate_quality_attribute(question_text, top_k=5):
-    """
-    질문 내용을 기반으로 Azure AI Search에서 관련 ISO 25010 문서 검색
-    검색된 문서에서 대표 품질속성과 세부특성을 모두 고려하여 가장 적합한 품질속성 선택
-    
-    Args:
-        question_text: 검증할 질문 텍스트
-        top_k: 반환할 최대 문서 수
-    
-    Returns:
-        검색된 문서 내용을 결합한 문자열
-    """
-    search_client = get_search_client()
-    
-    if search_client is None:
-        return ""
-    
-    try:
-        # 질문 내용으로 직접 검색
-        results = search_client.search(
-            search_text=question_text,
-            top=top_k,
-            select=["content", "source"]
-        )
-        
-        # 검색 결과 결합
-        context = []
-        for result in results:
-            source = result.get("source", "")
-            content = result.get("content", "")
-            
-            if source and content:
-                context.append(f"[출처: {source}]\n{content}")
-            elif content:
-                context.append(content)
-        
-        return "\n\n".join(context) if context else ""
-        
-    except Exception as e:
-        st.warning(f"⚠️ 품질 속성 검증 중 오류 발생: {e}")
-        return ""
-    
 # 입력 폼
 st.markdown("## 📝 1단계: 질문 생성")
 
@@ -411,23 +263,6 @@ with col2:
 
 st.divider()
 
-# DB 연결 함수
-def get_connection():
-    """PostgreSQL 연결"""
-    DB_HOST = os.getenv("PG_HOST")
-    DB_NAME = os.getenv("PG_DATABASE")
-    DB_USER = os.getenv("PG_USER")
-    DB_PASSWORD = os.getenv("PG_PASSWORD")
-    DB_PORT = os.getenv("PG_PORT")
-    
-    return psycopg2.connect(
-        host=DB_HOST,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        port=DB_PORT
-    )
-
 # 프로젝트명 중복 검증 함수
 def check_project_name_exists(project_name):
     """프로젝트명이 이미 존재하는지 확인"""
@@ -435,17 +270,64 @@ def check_project_name_exists(project_name):
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT COUNT(*) FROM surveys WHERE project_name = %s", (project_name,))
-        result = cur.fetchone()[0]
+        exists = project_exists(cur, project_name)
         
         cur.close()
         conn.close()
         
-        return result > 0
+        return exists
     except Exception as e:
         st.error(f"❌ DB 조회 중 오류 발생: {e}")
         return False
 
+# 작업 큐 설문 작업 조회 함수 (GENERATION_BACKEND=queue)
+def wait_for_survey_job(job_id, progress_placeholder):
+    """
+    worker 가 실행하는 설문 작업을 완료까지 조회하며 진행 상황과 완료된 단계를 표시
+
+    Returns:
+        (단계별 결과 state, 진행 상황)
+    """
+    def show(job):
+        partial = job["partial_result"] or {}
+        done_steps = [name for _, name, key in GENERATION_STEPS if key in partial]
+        if job["status"] == STATUS_QUEUED:
+            message = "⏳ 작업 대기 중입니다 (worker 배정 전)..."
+        else:
+            message = (job["progress"] or {}).get("message") or "🔄 작업 실행 중..."
+        if done_steps:
+            message += f"\n\n완료된 단계: {', '.join(done_steps)}"
+        progress_placeholder.info(message)
+
+    job = wait_for_job(job_id, on_update=show)
+    pipeline_state = job["result"] if job["status"] == STATUS_SUCCEEDED else (job["partial_result"] or {})
+    # 중간에 실패해도 완료된 단계 결과는 세션에 보존
+    for key, value in pipeline_state.items():
+        st.session_state[key] = value
+    st.session_state.survey_job_id = None
+    if job["status"] == STATUS_FAILED:
+        raise RuntimeError(f"설문 생성 작업 실패 ({job['attempts']}회 시도): {job['error']}")
+    return pipeline_state, job["progress"] or new_progress()
+
+def complete_generation(pipeline_state, progress, progress_placeholder):
+    """최종 질문 파싱 + 생성 완료 처리"""
+    for warning in progress["warnings"]:
+        st.warning(warning)
+    
+    final_questions = pipeline_state["final_questions"]
+    questions_data = parse_questions(final_questions)
+    
+    # 세션 상태에 질문 저장 (새로 생성된 경우에만 초기화)
+    current_questions_id = hash(final_questions)
+    
+    if 'questions_id' not in st.session_state or st.session_state.questions_id != current_questions_id:
+        st.session_state.questions_id = current_questions_id
+        st.session_state.questions_data = questions_data
+    
+    # 생성 완료 플래그 설정
+    st.session_state.generation_complete = True
+    progress_placeholder.success("✅ 모든 단계가 완료되었습니다!")
+
 # 질문 생성 버튼
 if st.button("📝 설문조사 질문 생성", type="primary", use_container_width=True):
     # 필수 항목 검증
@@ -482,467 +364,59 @@ if st.button("📝 설문조사 질문 생성", type="primary", use_container_wi
             progress_placeholder = st.empty()
             
             try:
-                # Azure OpenAI 클라이언트 초기화
-                client = AzureOpenAI(
-                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                    api_key=AZURE_OPENAI_API_KEY,
-                    api_version="2024-02-15-preview"
-                )
+                project = {field: st.session_state[field] for field in PROJECT_FIELDS}
                 
-                # 입력 정보 정리
-                input_info = {
-                    "평가할 소프트웨어": software_description,
-                    "평가 목적": evaluation_purpose if evaluation_purpose else "미입력",
-                    "응답자 정보": respondent_info if respondent_info else "미입력",
-                    "예상 응답자 수": expected_respondents if expected_respondents else "미입력",
-                    "개발 규모": development_scale if development_scale != "선택 안함" else "미입력",
-                    "사용자 규모": user_scale if user_scale else "미입력",
-                    "운영 환경": operating_environment if operating_environment else "미입력",
-                    "산업 분야": industry_field if industry_field else "미입력",
-                    "설문 문항 수": f"{survey_item_count}개" if survey_item_count > 0 else "자동 설정"
-                }
-                
-                # 입력 정보를 텍스트로 변환
-                input_text = "\n".join([f"- {key}: {value}" for key, value in input_info.items()])
-                
-                # 1단계: 분야 분석
-                progress_placeholder.info("🔍 1단계: 입력한 SW 정보를 종합적으로 분석하고 있습니다...")
-                
-                # 1단계 시스템 프롬프트 - 종합 분야 분석
-                domain_analysis_prompt = """당신은 소프트웨어 품질 평가 전문가입니다.
-제공된 소프트웨어 정보를 종합적으로 분석하여 다음 항목들을 도출하세요:
-
-**분석 항목:**
-1. 소프트웨어 도메인 및 특성 분석 (2-3문장)
-   - 산업 분야, 주요 기능, 비즈니스 특성
-   - 평가 목적과 응답자 특성 고려
-   
-2. 품질 평가 시 고려사항 (3-4개 항목)
-   - 개발/사용자 규모에 따른 고려사항
-   - 운영 환경에 따른 고려사항
-   - 산업 분야별 규제/요구사항
-   
-3. 설문 설계 방향 (2-3문장)
-   - 응답자 특성에 맞는 질문 수준
-   - 적정 문항 수 제안
-   - 중점적으로 평가할 영역
-
-**출력 형식:**
-도메인 분석:
-[분석 내용]
-
-품질 평가 고려사항:
-- [고려사항 1]
-- [고려사항 2]
-- [고려사항 3]
-
-설문 설계 방향:
-[설계 방향]"""
-
-                domain_analysis_user_prompt = f"""다음 소프트웨어 정보를 종합적으로 분석해주세요:
-
-{input_text}"""
-                
-                # 1단계 API 호출 - 분야 분석
-                domain_analysis_response = client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": domain_analysis_prompt},
-                        {"role": "user", "content": domain_analysis_user_prompt}
-                    ],
-                    temperature=0.5
+                # 같은 프로젝트의 생성이 이미 진행 중이면 새로 실행하지 않고 그 작업에 합류 (중복 클릭/다른 사용자)
+                job_id, attached = start_job(
+                    JOB_SURVEY, {"project": project}, job_dedupe_key(JOB_SURVEY, project["project_name"])
                 )
+                if attached:
+                    st.info("🔗 같은 프로젝트의 질문 생성이 이미 진행 중입니다. 진행 중인 작업의 결과를 함께 받아옵니다.")
                 
-                domain_analysis = domain_analysis_response.choices[0].message.content
-                st.session_state.domain_analysis = domain_analysis
-                st.session_state.step1_complete = True
-                
-                # 2단계: 주요 품질 속성 선정
-                progress_placeholder.info("⚖️ 2단계: 주요 품질 속성을 선정하고 있습니다...")
-                
-                # 2단계 시스템 프롬프트 - 품질 속성 선정
-                quality_selection_prompt = """당신은 소프트웨어 품질 평가 전문가입니다.
-1단계 분야 분석 결과를 바탕으로 ISO/IEC 25010의 9가지 품질 속성 중에서 주요 품질 속성을 선정하세요.
-
-ISO/IEC 25010의 9가지 품질 속성:
-1. 기능 적합성 (Functional Suitability)
-2. 성능 효율성 (Performance Efficiency)
-3. 호환성 (Compatibility)
-4. 상호작용 능력 (Interaction Capability)
-5. 신뢰성 (Reliability)
-6. 보안성 (Security)
-7. 유지보수성 (Maintainability)
-8. 유연성 (Flexibility)
-9. 보안성 (Security)
-
-**출력 형식:**
-주요 품질 속성 :
-1. [속성명] - [선정 이유 1문장]
-2. [속성명] - [선정 이유 1문장]
-3. [속성명] - [선정 이유 1문장]
-
-부차 품질 속성 :
-- [속성명들 나열]"""
-
-                quality_selection_user_prompt = f"""1단계 분야 분석 결과:
-{domain_analysis}
-
-소프트웨어 정보:
-{input_text}
-
-위 정보를 바탕으로 주요 품질 속성을 선정해주세요."""
-                
-                # 2단계 API 호출 - 품질 속성 선정
-                quality_selection_response = client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": quality_selection_prompt},
-                        {"role": "user", "content": quality_selection_user_prompt}
-                    ],
-                    temperature=0.5
-                )
-                
-                quality_selection = quality_selection_response.choices[0].message.content
-                st.session_state.quality_selection = quality_selection
-                st.session_state.step2_complete = True
-                
-                # 3단계: 질문 생성
-                progress_placeholder.info("📝 3단계: 설문조사 질문을 생성하고 있습니다...")
-                
-                # 3단계 시스템 프롬프트 - 질문 생성
-                question_generation_prompt = """당신은 소프트웨어 품질 평가 전문가입니다. 
-ISO/IEC 25010 국제 표준에 따라 소프트웨어 품질 평가를 위한 설문조사 질문을 생성해야 합니다.
-
-ISO/IEC 25010의 9가지 품질 속성:
-1. 기능 적합성 (Functional Suitability)
-2. 성능 효율성 (Performance Efficiency)
-3. 호환성 (Compatibility)
-4. 상호작용 능력 (Interaction Capability)
-5. 신뢰성 (Reliability)
-6. 보안성 (Security)
-7. 유지보수성 (Maintainability)
-8. 유연성 (Flexibility)
-
-**질문 생성 지침:**
-1. 1단계 분야 분석과 2단계 품질 속성 선정 결과를 반영하세요.
-2. 모든 품질 속성이 적절히 포함되도록 질문을 구성하세요.
-3. 2단계에서 도출된 주요 품질 속성은 질문에 필수로 포함하세요.
-4. 응답자 특성(기술 수준, 역할)을 고려하여 적절한 용어와 표현을 사용하세요.
-5. 해당 분야/산업에 특화된 맥락을 반영하세요.
-6. 설문 문항 수가 지정된 경우 해당 개수에 맞춰 조정하세요.
-7. 질문만 작성하고, 척도나 답변 옵션은 포함하지 마세요.
-8. 각 질문 앞에 [품질 속성명] 형태로 명시하세요.
-9. 그렇다~그렇지 않다 형태로 답변 가능한 질문으로 작성하세요.
-
-예시 형식:
-[기능 적합성] 시스템이 필요한 기능을 모두 제공합니까?
-[성능 효율성] 시스템의 응답 속도가 만족스럽습니까?"""
-
-                question_generation_user_prompt = f"""1단계 분야 분석 결과:
-{domain_analysis}
-
-2단계 품질 속성 선정 결과:
-{quality_selection}
-
-소프트웨어 정보:
-{input_text}
-
-위 분석 결과를 바탕으로 ISO/IEC 25010 기반 설문조사 질문을 생성해주세요."""
-
-                # 3단계 API 호출 - 질문 생성 (RAG 없이)
-                question_generation_response = client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": question_generation_prompt},
-                        {"role": "user", "content": question_generation_user_prompt}
-                    ],
-                    temperature=0.7
-                )
-                
-                initial_questions = question_generation_response.choices[0].message.content
-                st.session_state.initial_questions = initial_questions
-                st.session_state.step3_complete = True
-                
-                # 4단계: RAG 기반 품질 속성 검증 및 재분류
-                progress_placeholder.info("🔍 4단계: 품질 표준문서를 참고하여 검증하고 있습니다...")
-                
-                # 초기 질문에서 질문과 품질 속성 파싱
-                def parse_questions_for_validation(questions_text):
-                    """질문 텍스트를 파싱하여 [{quality_attr, question}] 형태로 변환"""
-                    questions_list = []
-                    pattern = r'\[([^\]]+)\]\s*(.+)'
-                    
-                    for line in questions_text.split('\n'):
-                        line = line.strip()
-                        if line and line.startswith('['):
-                            match = re.match(pattern, line)
-                            if match:
-                                quality_attr = match.group(1).strip()
-                                question = match.group(2).strip()
-                                questions_list.append({
-                                    'original_quality_attr': quality_attr,
-                                    'question': question
-                                })
-                    return questions_list
-                
-                parsed_questions = parse_questions_for_validation(initial_questions)
-                
-                # 각 질문에 대해 RAG 수행 및 품질 속성 재검증
-                rag_validation_results = []
-                
-                for idx, q_data in enumerate(parsed_questions):
-                    # RAG: 질문 내용으로 문서 검색
-                    search_result = search_appropriate_quality_attribute(q_data['question'], top_k=5)
-                    
-                    if search_result:
-                        # LLM에게 가장 적절한 품질 속성 추천 요청 (요구사항1 반영)
-                        validation_prompt = """당신은 ISO/IEC 25010 품질 표준 전문가입니다.
-
-주어진 질문과 ISO 25010 문서를 분석하여, 질문에 가장 적합한 품질 속성을 결정하세요.
-
-**ISO/IEC 25010의 9가지 대표 품질 속성과 세부 특성:**
-모든 대표 품질 속성과 그 하위의 모든 세부 특성을 고려하세요.
-
-예시:
-- 기능 적합성
-  - 기능 완전성
-  - 기능 정확성
-  - 기능 적절성
-- 성능 효율성
-  - 시간 행동
-  - 자원 활용
-  - 용량
-- 신뢰성
-  - 성숙성
-  - 가용성
-  - 결함 허용성
-  - 복구 가능성
-
-**분석 규칙:**
-1. 질문 내용을 모든 대표 품질 속성과 비교
-2. 각 대표 품질 속성의 세부 특성도 모두 비교
-3. 가장 적합한 품질 속성 선택 (대표 또는 세부 특성)
-4. 반드시 ISO 25010 문서 내용을 근거로 판단
-5. 현재 할당된 품질 속성에 구애받지 말고 객관적으로 판단
-
-**출력 형식:**
-권장 품질 속성: [가장 적합한 품질 속성명 또는 "대표 품질 속성 > 세부 특성"]
-근거: [1-2문장으로 ISO 25010 문서 기반 설명]"""
-
-                        validation_user_prompt = f"""질문: {q_data['question']}
-현재 품질 속성: {q_data['original_quality_attr']}
-
-관련 ISO/IEC 25010 문서:
-{search_result}
-
-위 ISO 25010 문서를 참고하여, 이 질문에 가장 적합한 품질 속성을 모든 대표 품질 속성과 세부 특성 중에서 선택해주세요."""
-
-                        validation_response = client.chat.completions.create(
-                            model=DEPLOYMENT_NAME,
-                            messages=[
-                                {"role": "system", "content": validation_prompt},
-                                {"role": "user", "content": validation_user_prompt}
-                            ],
-                            temperature=0.3
-                        )
-                        
-                        validation_result = validation_response.choices[0].message.content
-                        
-                        # "권장 품질 속성:" 부분 추출
-                        recommended_attr_match = re.search(r'권장 품질 속성:\s*([^\n]+)', validation_result)
-                        if recommended_attr_match:
-                            recommended_attr = recommended_attr_match.group(1).strip()
-                            # 대괄호나 따옴표 제거
-                            recommended_attr = recommended_attr.strip('[]"\'')
-                            
-                            # 변경 여부 판단
-                            changed = (recommended_attr != q_data['original_quality_attr'])
-                            
-                            rag_validation_results.append({
-                                'question_index': idx,
-                                'original_attr': q_data['original_quality_attr'],
-                                'recommended_attr': recommended_attr,
-                                'reason': validation_result,
-                                'changed': changed
-                            })
-                        else:
-                            rag_validation_results.append({
-                                'question_index': idx,
-                                'original_attr': q_data['original_quality_attr'],
-                                'recommended_attr': q_data['original_quality_attr'],
-                                'reason': validation_result,
-                                'changed': False
-                            })
-                    else:
-                        # RAG 검색 실패 시 원본 유지
-                        rag_validation_results.append({
-                            'question_index': idx,
-                            'original_attr': q_data['original_quality_attr'],
-                            'recommended_attr': q_data['original_quality_attr'],
-                            'reason': '문서 검색 실패로 원본 유지',
-                            'changed': False
-                        })
-                
-                # 변경된 질문들을 기반으로 최종 질문 재구성
-                refined_questions_lines = []
-                for idx, q_data in enumerate(parsed_questions):
-                    validation = rag_validation_results[idx]
-                    refined_questions_lines.append(f"[{validation['recommended_attr']}] {q_data['question']}")
-                
-                refined_questions_with_rag = "\n".join(refined_questions_lines)
-                
-                # 변경 사항 요약
-                changes_summary = []
-                for validation in rag_validation_results:
-                    if validation['changed']:
-                        changes_summary.append(
-                            f"질문 {validation['question_index']+1}: {validation['original_attr']} → {validation['recommended_attr']}"
-                        )
-                
-                rag_validation_summary = ""
-                if changes_summary:
-                    rag_validation_summary = "**품질 속성 변경 내역:**\n" + "\n".join(changes_summary)
+                if attached or queue_enabled():
+                    # worker(또는 다른 화면)가 실행하는 작업 결과를 조회 (화면이 끊겨도 작업은 계속 실행)
+                    st.session_state.survey_job_id = job_id
+                    pipeline_state, progress = wait_for_survey_job(job_id, progress_placeholder)
                 else:
-                    rag_validation_summary = "모든 질문의 품질 속성이 적절하여 변경 사항이 없습니다."
-                
-                # 세션에 저장
-                st.session_state.rag_validation_results = rag_validation_results
-                st.session_state.rag_validation_summary = rag_validation_summary
-                st.session_state.refined_questions_with_rag = refined_questions_with_rag
-                st.session_state.step4_complete = True
-                
-                # 5단계: 최종 검토 (4단계에서 품질 속성이 재분류된 질문 사용)
-                progress_placeholder.info("🔧 5단계: 최종 검토를 진행하고 있습니다...")
-                
-                # 5단계 시스템 프롬프트 - 최종 검토
-                refinement_prompt = """당신은 설문조사 설계 전문가입니다.
-생성된 설문조사 질문들을 검토하고 다음 문제들을 찾아 수정하세요:
-
-**검토 항목:**
-1. **이중부정**: "~하지 않지 않습니까?" 같은 이중 부정 표현
-   - 문제: 응답자 혼란 유발
-   - 해결: 긍정문으로 변경
-
-2. **모호한 척도**: "자주", "가끔", "빠른" 같은 주관적 표현
-   - 문제: 응답자마다 다른 해석
-   - 해결: 명확한 표현으로 변경 (구체적 기준을 제시하지는 말것)
-
-3. **중복질문(유사질문)**: 여러 문항이 유사한 의미를 가지는 경우  
-   - 문제: 중복 응답 유도 및 설문 피로도 증가  
-   - 해결: 의미가 유사한 질문들은 **적절히 하나의 질문으로 통합** 
-
-4. **유도질문**: 특정 답변을 유도하는 표현
-   - 문제: 편향된 응답 유도
-   - 해결: 중립적 표현으로 변경
-
-**출력 형식:**
-수정이 필요한 질문이 있는 경우:
-문제 발견 및 수정 내역:
-1. [문제 유형]: [원본 질문]
-   → 문제점: [설명]
-   → 수정: [수정된 질문]
-
-수정이 필요없는 경우:
-검토 완료: 모든 질문이 적절합니다. 수정 사항이 없습니다."""
-
-                # 4단계에서 품질 속성이 재분류된 질문 사용
-                questions_for_refinement = st.session_state.get('refined_questions_with_rag', initial_questions)
-                
-                refinement_user_prompt = f"""다음 설문조사 질문들을 검토하고 필요시 수정해주세요:
-
-{questions_for_refinement}"""
-
-                # 5단계 API 호출 - 최종 검토
-                refinement_response = client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": refinement_prompt},
-                        {"role": "user", "content": refinement_user_prompt}
-                    ],
-                    temperature=0.3
-                )
-                
-                refinement_result = refinement_response.choices[0].message.content
-                st.session_state.refinement_result = refinement_result
-                st.session_state.step5_complete = True
-                
-                # 최종 질문 생성 - 5단계에서 수정이 있었다면 반영
-                if "수정 사항이 없습니다" in refinement_result or "모든 질문이 적절합니다" in refinement_result:
-                    # 수정 사항이 없으면 4단계 질문 그대로 사용
-                    final_questions = questions_for_refinement
-                else:
-                    # 수정이 있었다면 4단계 질문에 수정 사항을 반영
-                    # LLM을 한 번 더 호출하여 최종 질문 생성
-                    final_generation_prompt = """당신은 설문조사 설계 전문가입니다.
-4단계에서 품질 속성이 재분류된 질문과 5단계의 수정 내역을 바탕으로 최종 설문조사 질문을 생성하세요.
-
-**생성 규칙:**
-1. 5단계에서 수정이 필요하다고 지적된 질문은 수정된 버전을 사용하세요.
-2. 수정이 필요없었던 질문은 원본 그대로 사용하세요.
-3. 모든 질문을 [품질 속성명] 질문 형식으로 출력하세요.
-4. 품질 속성명은 4단계에서 재분류된 것을 유지하세요.
-5. 질문만 나열하고 추가 설명은 붙이지 마세요."""
-
-                    final_generation_user_prompt = f"""4단계 품질 속성 재분류된 질문:
-{questions_for_refinement}
-
-5단계 수정 내역:
-{refinement_result}
-
-위 내용을 바탕으로 최종 설문조사 질문을 생성해주세요."""
-
-                    final_generation_response = client.chat.completions.create(
-                        model=DEPLOYMENT_NAME,
-                        messages=[
-                            {"role": "system", "content": final_generation_prompt},
-                            {"role": "user", "content": final_generation_user_prompt}
-                        ],
-                        temperature=0.3
-                    )
+                    # 입력 정보 정리
+                    input_info = build_input_info(project)
                     
-                    final_questions = final_generation_response.choices[0].message.content
-                
-                st.session_state.final_questions = final_questions
-                
-                # 최종 질문을 품질속성과 질문으로 분리하여 저장 (요구사항 3)
-                def parse_questions(questions_text):
-                    """질문 텍스트를 파싱하여 품질속성과 질문을 분리"""
-                    questions_data = []
-                    pattern = r'\[([^\]]+)\]\s*(.+)'
+                    # 1~5단계는 백그라운드 이벤트 루프에서 비동기로 실행 (4단계 질문별 검증은 동시 실행)
+                    # 대기 중 진행 상황을 갱신하며, 사용자가 페이지를 떠나면 남은 호출은 취소됨
+                    # 실행 중 작업 lease 를 유지하고 진행 상황/중간 결과를 기록 (합류한 요청이 조회)
+                    progress = new_progress()
+                    pipeline_state = {}
                     
-                    for line in questions_text.split('\n'):
-                        line = line.strip()
-                        if line and line.startswith('['):
-                            match = re.match(pattern, line)
-                            if match:
-                                quality_attribute = match.group(1).strip()
-                                question = match.group(2).strip()
-                                questions_data.append({
-                                    'quality_attribute': quality_attribute,
-                                    'question': question,
-                                    'display': f"[{quality_attribute}] {question}",
-                                    'selected': True
-                                })
+                    def on_tick():
+                        progress_placeholder.info(progress["message"])
+                        # 파이프라인이 고치는 중첩 값(step_metrics, warnings 등)은 루프 스레드에서 깊은 복사
+                        run.beat(lambda: call_in_loop(lambda: (copy.deepcopy(progress), copy.deepcopy(pipeline_state))))
                     
-                    return questions_data
-                
-                questions_data = parse_questions(final_questions)
-                
-                # 세션 상태에 질문 저장 (새로 생성된 경우에만 초기화)
-                current_questions_id = hash(final_questions)
-                
-                if 'questions_id' not in st.session_state or st.session_state.questions_id != current_questions_id:
-                    st.session_state.questions_id = current_questions_id
-                    st.session_state.questions_data = questions_data
+                    try:
+                        with inline_run(job_id) as run:
+                            run_sync(run_survey_pipeline(input_info, pipeline_state, progress), on_tick=on_tick)
+                            run.complete(pipeline_state, progress)
+                    finally:
+                        # 중간에 실패해도 완료된 단계 결과는 세션에 보존
+                        for key, value in pipeline_state.items():
+                            st.session_state[key] = value
                 
-                # 생성 완료 플래그 설정
-                st.session_state.generation_complete = True
-                progress_placeholder.success("✅ 모든 단계가 완료되었습니다!")
+                complete_generation(pipeline_state, progress, progress_placeholder)
                 
             except Exception as e:
                 progress_placeholder.error(f"❌ 오류가 발생했습니다: {str(e)}")
                 st.exception(e)
 
+# 화면 재실행/이동 후 돌아온 경우 진행 중이던 설문 작업을 이어서 조회
+elif st.session_state.get('survey_job_id'):
+    progress_placeholder = st.empty()
+    try:
+        pipeline_state, progress = wait_for_survey_job(st.session_state.survey_job_id, progress_placeholder)
+        complete_generation(pipeline_state, progress, progress_placeholder)
+    except Exception as e:
+        progress_placeholder.error(f"❌ 오류가 발생했습니다: {str(e)}")
+        st.exception(e)
+
 # 생성이 완료된 경우 결과 표시 (버튼 클릭과 무관하게) - 요구사항 2 반영
 if st.session_state.get('generation_complete', False):
     st.markdown("---")
@@ -1089,65 +563,13 @@ if st.session_state.get('generation_complete', False):
                         conn = get_connection()
                         cur = conn.cursor()
 
-                        # 1️⃣ surveys 테이블에 기본 정보 저장
-                        # 1️⃣ surveys 테이블에 기본 정보 저장 (metric_completed 기본값 N)
-                        cur.execute("""
-                            INSERT INTO surveys (
-                                project_name, software_description, evaluation_purpose,
-                                respondent_info, expected_respondents, development_scale,
-                                user_scale, operating_environment, industry_field, survey_item_count,
-                                metric_completed
-                            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                            RETURNING id;
-                        """, (
-                            st.session_state.project_name,
-                            st.session_state.software_description,
-                            st.session_state.evaluation_purpose,
-                            st.session_state.respondent_info,
-                            st.session_state.expected_respondents,
-                            st.session_state.development_scale,
-                            st.session_state.user_scale,
-                            st.session_state.operating_environment,
-                            st.session_state.industry_field,
-                            st.session_state.survey_item_count,
-                            'N'  # metric_completed 초기값
-                        ))
-
-                        survey_id = cur.fetchone()[0]
-
-                        # 2️⃣ generation_steps 테이블에 1~5단계 결과 저장
-                        steps_data = [
-                            (survey_id, 1, "도메인 분석", st.session_state.domain_analysis),
-                            (survey_id, 2, "품질 속성 선정", st.session_state.quality_selection),
-                            (survey_id, 3, "초기 질문 생성", st.session_state.initial_questions),
-                            (survey_id, 4, "RAG 기반 품질 속성 재분류", st.session_state.rag_validation_summary),
-                            (survey_id, 5, "최종 검토", st.session_state.refinement_result)
-                        ]
-
-                        execute_values(cur, """
-                            INSERT INTO generation_steps (
-                                survey_id, step_number, step_name, step_result
-                            ) VALUES %s;
-                        """, steps_data)
-
-                        # 3️⃣ survey_questions 테이블에 선택된 질문만 저장 (is_selected 제거)
-                        # 선택된 질문만 필터링하고, question_order는 화면 표시 순서대로 저장
-                        selected_questions_for_db = [
-                            (
-                                survey_id,
-                                idx + 1,  # question_order는 화면에 나온 순서대로
-                                q["quality_attribute"],
-                                q["question"]
-                            )
-                            for idx, q in enumerate(selected_questions)
-                        ]
-
-                        if selected_questions_for_db:
-                            execute_values(cur, """
-                                INSERT INTO survey_questions (
-                                    survey_id, question_order, quality_attribute, question_text
-                                ) VALUES %s;
-                            """, selected_questions_for_db)
+                        # surveys / generation_steps / survey_questions / step_performance 저장
+                        survey_id = save_survey(
+                            cur,
+                            {field: st.session_state[field] for field in PROJECT_FIELDS},
+                            st.session_state,
+                            selected_questions
+                        )
 
                         # 커밋 및 종료
                         conn.commit()
@@ -0,0 +1,868 @@
+"""
+설문 질문 생성 파이프라인 (비동기)
+- survey_gen.py 화면에서 분리한 1~5단계 및 최종 질문 생성 코루틴
+- 3단계 질문 생성에 선정된 품질 속성의 ISO/IEC 25010 정의/부특성 문맥을 함께 제공 (iso_context, 프로세스당 한 번 계산)
+- 4단계 RAG 기반 품질 속성 재분류는 질문별로 동시에 실행 (SURVEY_VALIDATION_CONCURRENCY 로 제한)
+  이전 설문에서 확정된 같은/유사 질문(classification_memo)과 키워드/예시 질문으로 확신할 수 있는 질문(attribute_classifier)은 LLM 없이 분류
+- 진행 상황은 progress 딕셔너리, 단계별 결과는 state 딕셔너리에 기록 (중간 실패 시에도 완료된 단계 보존)
+"""
+
+import os
+import re
+import asyncio
+import time
+import difflib
+import contextvars
+import unicodedata
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+from async_core import gather_limited
+from attribute_classifier import CLASSIFIER_ENABLED, TIER_EXAMPLE, TIER_KEYWORD, TIER_LLM, TIER_MEMO, get_classifier, tier_counts
+from classification_memo import CLASSIFICATION_MEMO_ENABLED, get_memo_index
+from iso_context import ISO_CONTEXT_ENABLED, attribute_context, get_attribute_contexts, selected_context
+from llm_gateway import LANE_INTERACTIVE, usage_scope, usage_summary
+from model_routing import routed_chat
+from tracing import span
+from cassette import azure_async_kwargs
+from data.index_versions import resolve_index_name
+
+load_dotenv()
+
+
+# Azure AI Search 환경 변수
+AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
+AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
+AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX")
+
+# 4단계 질문별 검증 동시 실행 수
+SURVEY_VALIDATION_CONCURRENCY = int(os.getenv("SURVEY_VALIDATION_CONCURRENCY", "8"))
+
+# 3단계 분할 생성: 설문 문항 수가 이 값 이상이면 품질 속성별로 나눠 동시에 생성 (0 이면 사용 안 함)
+SURVEY_SHARD_THRESHOLD = int(os.getenv("SURVEY_SHARD_THRESHOLD", "40"))
+SURVEY_SHARD_CONCURRENCY = int(os.getenv("SURVEY_SHARD_CONCURRENCY", "8"))
+# 2단계 주요 품질 속성의 문항 배분 가중치 (나머지 품질 속성은 1)
+SURVEY_SHARD_MAIN_WEIGHT = float(os.getenv("SURVEY_SHARD_MAIN_WEIGHT", "2"))
+# 병합 시 같은 질문으로 볼 유사도 (공백/문장부호 제거 후 difflib 비율)
+SURVEY_SHARD_DUPLICATE_RATIO = float(os.getenv("SURVEY_SHARD_DUPLICATE_RATIO", "0.9"))
+# 병합 후 요청 문항 수보다 적으면 부족한 품질 속성만 다시 요청하는 횟수 (그래도 부족하면 경고)
+SURVEY_SHARD_RETRIES = int(os.getenv("SURVEY_SHARD_RETRIES", "1"))
+
+# ISO/IEC 25010 품질 속성 (한글명 → 영문명, 영문 문서 검색용)
+ISO_QUALITY_ATTRIBUTES = {
+    "기능 적합성": "Functional Suitability",
+    "성능 효율성": "Performance Efficiency",
+    "호환성": "Compatibility",
+    "상호작용 능력": "Interaction Capability",
+    "신뢰성": "Reliability",
+    "보안성": "Security",
+    "유지보수성": "Maintainability",
+    "유연성": "Flexibility",
+}
+
+# 현재 파이프라인의 게이트웨이 레인 (화면: 대화형, 배치 CLI: 일괄)
+_lane = contextvars.ContextVar("survey_pipeline_lane", default=LANE_INTERACTIVE)
+
+# 1단계 시스템 프롬프트 - 종합 분야 분석
+DOMAIN_ANALYSIS_PROMPT = """당신은 소프트웨어 품질 평가 전문가입니다.
+제공된 소프트웨어 정보를 종합적으로 분석하여 다음 항목들을 도출하세요:
+
+**분석 항목:**
+1. 소프트웨어 도메인 및 특성 분석 (2-3문장)
+   - 산업 분야, 주요 기능, 비즈니스 특성
+   - 평가 목적과 응답자 특성 고려
+   
+2. 품질 평가 시 고려사항 (3-4개 항목)
+   - 개발/사용자 규모에 따른 고려사항
+   - 운영 환경에 따른 고려사항
+   - 산업 분야별 규제/요구사항
+   
+3. 설문 설계 방향 (2-3문장)
+   - 응답자 특성에 맞는 질문 수준
+   - 적정 문항 수 제안
+   - 중점적으로 평가할 영역
+
+**출력 형식:**
+도메인 분석:
+[분석 내용]
+
+품질 평가 고려사항:
+- [고려사항 1]
+- [고려사항 2]
+- [고려사항 3]
+
+설문 설계 방향:
+[설계 방향]"""
+
+# 2단계 시스템 프롬프트 - 품질 속성 선정
+QUALITY_SELECTION_PROMPT = """당신은 소프트웨어 품질 평가 전문가입니다.
+1단계 분야 분석 결과를 바탕으로 ISO/IEC 25010의 9가지 품질 속성 중에서 주요 품질 속성을 선정하세요.
+
+ISO/IEC 25010의 9가지 품질 속성:
+1. 기능 적합성 (Functional Suitability)
+2. 성능 효율성 (Performance Efficiency)
+3. 호환성 (Compatibility)
+4. 상호작용 능력 (Interaction Capability)
+5. 신뢰성 (Reliability)
+6. 보안성 (Security)
+7. 유지보수성 (Maintainability)
+8. 유연성 (Flexibility)
+9. 보안성 (Security)
+
+**출력 형식:**
+주요 품질 속성 :
+1. [속성명] - [선정 이유 1문장]
+2. [속성명] - [선정 이유 1문장]
+3. [속성명] - [선정 이유 1문장]
+
+부차 품질 속성 :
+- [속성명들 나열]"""
+
+# 3단계 시스템 프롬프트 - 질문 생성
+QUESTION_GENERATION_PROMPT = """당신은 소프트웨어 품질 평가 전문가입니다.
+ISO/IEC 25010 국제 표준에 따라 소프트웨어 품질 평가를 위한 설문조사 질문을 생성해야 합니다.
+
+ISO/IEC 25010의 9가지 품질 속성:
+1. 기능 적합성 (Functional Suitability)
+2. 성능 효율성 (Performance Efficiency)
+3. 호환성 (Compatibility)
+4. 상호작용 능력 (Interaction Capability)
+5. 신뢰성 (Reliability)
+6. 보안성 (Security)
+7. 유지보수성 (Maintainability)
+8. 유연성 (Flexibility)
+
+**질문 생성 지침:**
+1. 1단계 분야 분석과 2단계 품질 속성 선정 결과를 반영하세요.
+2. 모든 품질 속성이 적절히 포함되도록 질문을 구성하세요.
+3. 2단계에서 도출된 주요 품질 속성은 질문에 필수로 포함하세요.
+4. 응답자 특성(기술 수준, 역할)을 고려하여 적절한 용어와 표현을 사용하세요.
+5. 해당 분야/산업에 특화된 맥락을 반영하세요.
+6. 설문 문항 수가 지정된 경우 해당 개수에 맞춰 조정하세요.
+7. 질문만 작성하고, 척도나 답변 옵션은 포함하지 마세요.
+8. 각 질문 앞에 [품질 속성명] 형태로 명시하세요.
+9. 그렇다~그렇지 않다 형태로 답변 가능한 질문으로 작성하세요.
+
+예시 형식:
+[기능 적합성] 시스템이 필요한 기능을 모두 제공합니까?
+[성능 효율성] 시스템의 응답 속도가 만족스럽습니까?"""
+
+# 3단계 분할 생성 시스템 프롬프트 - 품질 속성 1개의 질문만 생성
+QUESTION_SHARD_PROMPT = """당신은 소프트웨어 품질 평가 전문가입니다.
+ISO/IEC 25010 국제 표준에 따라 지정된 품질 속성 하나에 대한 설문조사 질문을 생성해야 합니다.
+같은 설문의 다른 품질 속성 질문은 별도로 생성되므로, 지정된 품질 속성의 질문만 작성하세요.
+
+**질문 생성 지침:**
+1. 1단계 분야 분석과 2단계 품질 속성 선정 결과를 반영하세요.
+2. 제공된 ISO/IEC 25010 문서의 세부 특성을 고르게 다루고, 같은 내용을 반복하지 마세요.
+3. 응답자 특성(기술 수준, 역할)을 고려하여 적절한 용어와 표현을 사용하세요.
+4. 해당 분야/산업에 특화된 맥락을 반영하세요.
+5. 요청한 개수만큼 정확히 작성하세요.
+6. 질문만 작성하고, 척도나 답변 옵션은 포함하지 마세요.
+7. 각 질문은 한 줄에 하나씩, 앞에 [품질 속성명] 형태로 명시하세요.
+8. 그렇다~그렇지 않다 형태로 답변 가능한 질문으로 작성하세요.
+
+예시 형식:
+[성능 효율성] 시스템의 응답 속도가 만족스럽습니까?"""
+
+# 4단계 시스템 프롬프트 - RAG 기반 품질 속성 검증
+VALIDATION_PROMPT = """당신은 ISO/IEC 25010 품질 표준 전문가입니다.
+
+주어진 질문과 ISO 25010 문서를 분석하여, 질문에 가장 적합한 품질 속성을 결정하세요.
+
+**ISO/IEC 25010의 9가지 대표 품질 속성과 세부 특성:**
+모든 대표 품질 속성과 그 하위의 모든 세부 특성을 고려하세요.
+
+예시:
+- 기능 적합성
+  - 기능 완전성
+  - 기능 정확성
+  - 기능 적절성
+- 성능 효율성
+  - 시간 행동
+  - 자원 활용
+  - 용량
+- 신뢰성
+  - 성숙성
+  - 가용성
+  - 결함 허용성
+  - 복구 가능성
+
+**분석 규칙:**
+1. 질문 내용을 모든 대표 품질 속성과 비교
+2. 각 대표 품질 속성의 세부 특성도 모두 비교
+3. 가장 적합한 품질 속성 선택 (대표 또는 세부 특성)
+4. 반드시 ISO 25010 문서 내용을 근거로 판단
+5. 현재 할당된 품질 속성에 구애받지 말고 객관적으로 판단
+
+**출력 형식:**
+권장 품질 속성: [가장 적합한 품질 속성명 또는 "대표 품질 속성 > 세부 특성"]
+근거: [1-2문장으로 ISO 25010 문서 기반 설명]"""
+
+# 5단계 시스템 프롬프트 - 최종 검토
+REFINEMENT_PROMPT = """당신은 설문조사 설계 전문가입니다.
+생성된 설문조사 질문들을 검토하고 다음 문제들을 찾아 수정하세요:
+
+**검토 항목:**
+1. **이중부정**: "~하지 않지 않습니까?" 같은 이중 부정 표현
+   - 문제: 응답자 혼란 유발
+   - 해결: 긍정문으로 변경
+
+2. **모호한 척도**: "자주", "가끔", "빠른" 같은 주관적 표현
+   - 문제: 응답자마다 다른 해석
+   - 해결: 명확한 표현으로 변경 (구체적 기준을 제시하지는 말것)
+
+3. **중복질문(유사질문)**: 여러 문항이 유사한 의미를 가지는 경우  
+   - 문제: 중복 응답 유도 및 설문 피로도 증가  
+   - 해결: 의미가 유사한 질문들은 **적절히 하나의 질문으로 통합** 
+
+4. **유도질문**: 특정 답변을 유도하는 표현
+   - 문제: 편향된 응답 유도
+   - 해결: 중립적 표현으로 변경
+
+**출력 형식:**
+수정이 필요한 질문이 있는 경우:
+문제 발견 및 수정 내역:
+1. [문제 유형]: [원본 질문]
+   → 문제점: [설명]
+   → 수정: [수정된 질문]
+
+수정이 필요없는 경우:
+검토 완료: 모든 질문이 적절합니다. 수정 사항이 없습니다."""
+
+# 최종 질문 생성 프롬프트 (5단계 수정 내역 반영)
+FINAL_GENERATION_PROMPT = """당신은 설문조사 설계 전문가입니다.
+4단계에서 품질 속성이 재분류된 질문과 5단계의 수정 내역을 바탕으로 최종 설문조사 질문을 생성하세요.
+
+**생성 규칙:**
+1. 5단계에서 수정이 필요하다고 지적된 질문은 수정된 버전을 사용하세요.
+2. 수정이 필요없었던 질문은 원본 그대로 사용하세요.
+3. 모든 질문을 [품질 속성명] 질문 형식으로 출력하세요.
+4. 품질 속성명은 4단계에서 재분류된 것을 유지하세요.
+5. 질문만 나열하고 추가 설명은 붙이지 마세요."""
+
+_search_clients = {}
+
+def get_async_search_client():
+    """별칭이 가리키는 현재 버전 인덱스의 비동기 검색 클라이언트 (이벤트 루프 내에서 호출)"""
+    if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_API_KEY, AZURE_SEARCH_INDEX]):
+        return None
+    index_name = resolve_index_name(AZURE_SEARCH_INDEX)
+    if index_name not in _search_clients:
+        _search_clients[index_name] = AsyncSearchClient(
+            endpoint=AZURE_SEARCH_ENDPOINT,
+            index_name=index_name,
+            credential=AzureKeyCredential(AZURE_SEARCH_API_KEY),
+            **azure_async_kwargs()
+        )
+    return _search_clients[index_name]
+
+@contextmanager
+def measured_step(state, step):
+    """단계 span + 소요 시간/대기 시간/토큰/모델 기록 (state["step_metrics"][step])"""
+    started = time.perf_counter()
+    with span(f"survey.{step}", kind="step") as step_span, usage_scope() as usage:
+        yield step_span
+    state.setdefault("step_metrics", {})[step] = usage_summary(usage, time.perf_counter() - started)
+
+def new_progress():
+    """진행 상황 (백그라운드 루프에서 갱신, 화면 스레드에서 표시)"""
+    return {"message": "", "done": 0, "total": 0, "warnings": []}
+
+async def chat(step, system_prompt, user_prompt):
+    """단일 채팅 호출 (단계별 모델 라우팅 → LLM 게이트웨이, 레인은 run_survey_pipeline 에서 지정)"""
+    return await routed_chat(
+        step,
+        f"survey_gen.{step}",
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        lane=_lane.get()
+    )
+
+def build_input_text(input_info):
+    """입력 정보를 텍스트로 변환"""
+    return "\n".join([f"- {key}: {value}" for key, value in input_info.items()])
+
+async def analyze_domain(input_text):
+    """1단계: 분야 분석"""
+    user_prompt = f"""다음 소프트웨어 정보를 종합적으로 분석해주세요:
+
+{input_text}"""
+    return await chat("step1_domain", DOMAIN_ANALYSIS_PROMPT, user_prompt)
+
+async def select_quality_attributes(domain_analysis, input_text):
+    """2단계: 주요 품질 속성 선정"""
+    user_prompt = f"""1단계 분야 분석 결과:
+{domain_analysis}
+
+소프트웨어 정보:
+{input_text}
+
+위 정보를 바탕으로 주요 품질 속성을 선정해주세요."""
+    return await chat("step2_quality", QUALITY_SELECTION_PROMPT, user_prompt)
+
+def iso_context_section(iso_context):
+    """3단계 프롬프트에 붙일 ISO/IEC 25010 문맥 (없으면 빈 문자열)"""
+    if not iso_context:
+        return ""
+    return f"""
+선정된 품질 속성의 ISO/IEC 25010 정의와 부특성 (질문에는 해당 부특성이 속한 품질 속성명을 표기):
+{iso_context}
+"""
+
+async def generate_questions(domain_analysis, quality_selection, input_text, iso_context=""):
+    """3단계: 질문 생성 (사전 계산한 ISO 25010 문맥 사용, 질문별 검색 없음)"""
+    user_prompt = f"""1단계 분야 분석 결과:
+{domain_analysis}
+
+2단계 품질 속성 선정 결과:
+{quality_selection}
+
+소프트웨어 정보:
+{input_text}
+{iso_context_section(iso_context)}
+위 분석 결과를 바탕으로 ISO/IEC 25010 기반 설문조사 질문을 생성해주세요."""
+    return await chat("step3_questions", QUESTION_GENERATION_PROMPT, user_prompt)
+
+def extract_main_quality_attributes(quality_selection_text):
+    """
+    2단계 품질 속성 선정 결과에서 주요 품질 속성명 추출
+
+    Args:
+        quality_selection_text: 2단계 결과 텍스트
+
+    Returns:
+        추출된 품질 속성명 리스트
+    """
+    # "주요 품질 속성" 섹션에서 속성명 추출
+    attributes = []
+
+    # 패턴: "1. 기능 적합성 - 설명" 형태
+    pattern = r'\d+\.\s*([가-힣\s]+(?:적합성|효율성|호환성|능력|신뢰성|보안성|유지보수성|유연성))[\s\-]'
+    matches = re.findall(pattern, quality_selection_text)
+
+    for match in matches:
+        attr = match.strip()
+        if attr and attr not in attributes:
+            attributes.append(attr)
+
+    # 매칭이 없으면 ISO 25010의 품질 속성 중 텍스트에 포함된 것 추출
+    if not attributes:
+        for attr in ISO_QUALITY_ATTRIBUTES:
+            if attr in quality_selection_text:
+                attributes.append(attr)
+
+    return attributes
+
+def requested_question_count(input_info):
+    """input_info 의 '설문 문항 수' ('N개' | '자동 설정') → N (자동이면 0)"""
+    match = re.match(r"\s*(\d+)", str(input_info.get("설문 문항 수", "")))
+    return int(match.group(1)) if match else 0
+
+def use_sharding(question_count, threshold=SURVEY_SHARD_THRESHOLD):
+    return threshold > 0 and question_count >= threshold
+
+def split_question_counts(total, main_attributes, main_weight=SURVEY_SHARD_MAIN_WEIGHT):
+    """
+    요청 문항 수를 ISO 품질 속성별로 배분 (주요 품질 속성은 main_weight 배)
+    - 모든 품질 속성에 최소 1문항 (문항 수가 속성 수보다 적으면 가중치 순)
+    - 나머지는 가중치 비례, 소수점 이하는 큰 순서대로 1문항씩 (최대 잉여 방식)
+
+    Returns:
+        {품질 속성: 문항 수} (0 문항 속성 제외, ISO 순서)
+    """
+    main = {attr.replace(" ", "") for attr in main_attributes}
+    weights = {
+        attr: main_weight if attr.replace(" ", "") in main else 1.0
+        for attr in ISO_QUALITY_ATTRIBUTES
+    }
+    order = sorted(weights, key=lambda attr: -weights[attr])
+
+    counts = {attr: 0 for attr in weights}
+    for attr in order[:min(total, len(order))]:
+        counts[attr] = 1
+
+    remaining = total - sum(counts.values())
+    if remaining > 0:
+        weight_sum = sum(weights.values())
+        quotas = {attr: remaining * weight / weight_sum for attr, weight in weights.items()}
+        for attr, quota in quotas.items():
+            counts[attr] += int(quota)
+        leftover = remaining - sum(int(quota) for quota in quotas.values())
+        for attr in sorted(quotas, key=lambda a: (-(quotas[a] - int(quotas[a])), order.index(a)))[:leftover]:
+            counts[attr] += 1
+
+    return {attr: count for attr, count in counts.items() if count > 0}
+
+def _normalize_question(text):
+    """중복 비교용: 유니코드 정규화, 공백/문장부호 제거"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"[\s\W_]+", "", text)
+
+def dedupe_questions(questions, ratio=SURVEY_SHARD_DUPLICATE_RATIO):
+    """
+    (품질 속성, 질문) 목록에서 중복 질문 제거 (순서 유지, 먼저 나온 질문을 남김)
+    같은 문장이거나 difflib 유사도가 ratio 이상이면 중복으로 판단
+    """
+    kept = []
+    seen = []
+    for attr, question in questions:
+        normalized = _normalize_question(question)
+        if not normalized:
+            continue
+        if any(
+            normalized == other or difflib.SequenceMatcher(None, normalized, other).ratio() >= ratio
+            for other in seen
+        ):
+            continue
+        seen.append(normalized)
+        kept.append((attr, question))
+    return kept
+
+async def generate_question_shard(attribute, count, domain_analysis, quality_selection, input_text,
+                                  progress=None, contexts=None, exclude=None):
+    """
+    3단계 분할: 품질 속성 1개의 질문 count 개 생성 → [(품질 속성, 질문)]
+    exclude: 이미 생성된 질문 (부족분 재요청 시 중복 금지 목록으로 프롬프트에 추가)
+    """
+    # 사전 계산한 문맥이 없을 때만 검색
+    iso_context = attribute_context(attribute, contexts) if contexts else ""
+    if not iso_context:
+        iso_context = await search_appropriate_quality_attribute(
+            f"{attribute} {ISO_QUALITY_ATTRIBUTES.get(attribute, '')}".strip(), top_k=3, progress=progress
+        )
+    exclude_block = ""
+    if exclude:
+        exclude_block = "\n이미 생성된 질문 (중복 금지):\n" + "\n".join(f"- {q}" for q in exclude) + "\n"
+    user_prompt = f"""1단계 분야 분석 결과:
+{domain_analysis}
+
+2단계 품질 속성 선정 결과:
+{quality_selection}
+
+소프트웨어 정보:
+{input_text}
+
+'{attribute}' 관련 ISO/IEC 25010 문서:
+{iso_context or "(검색 결과 없음)"}
+{exclude_block}
+위 내용을 바탕으로 [{attribute}] 품질 속성에 대한 설문조사 질문을 정확히 {count}개 생성해주세요."""
+    result = await chat("step3_questions", QUESTION_SHARD_PROMPT, user_prompt)
+
+    # 다른 속성명이 붙어 나와도 분할 기준 속성으로 통일 (재분류는 4단계에서)
+    questions = [
+        (attribute, q["question"]) for q in parse_questions_for_validation(result)
+    ][:count]
+    if progress is not None:
+        progress["done"] += 1
+        progress["message"] = f"📝 3단계: 품질 속성별로 질문을 생성하고 있습니다... ({progress['done']}/{progress['total']})"
+    return questions
+
+def _missing_counts(merged, shard_counts):
+    """품질 속성별 부족 문항 수 {품질 속성: 부족 수} (부족하지 않은 속성 제외)"""
+    produced = {}
+    for attr, _ in merged:
+        produced[attr] = produced.get(attr, 0) + 1
+    return {
+        attr: count - produced.get(attr, 0)
+        for attr, count in shard_counts.items()
+        if produced.get(attr, 0) < count
+    }
+
+def _cap_per_attribute(merged, shard_counts):
+    """품질 속성별 요청 문항 수까지만 남김 (순서 유지)"""
+    kept = []
+    produced = {}
+    for attr, question in merged:
+        if produced.get(attr, 0) < shard_counts.get(attr, 0):
+            produced[attr] = produced.get(attr, 0) + 1
+            kept.append((attr, question))
+    return kept
+
+async def generate_questions_sharded(domain_analysis, quality_selection, input_text, question_count,
+                                     progress=None, concurrency=SURVEY_SHARD_CONCURRENCY, contexts=None):
+    """
+    3단계 분할 생성: 품질 속성별로 나눠 동시에 생성 후 병합/중복 제거
+    요청 문항 수보다 적으면 부족한 품질 속성만 다시 요청 (SURVEY_SHARD_RETRIES), 그래도 부족하면 progress 경고
+    단일 호출과 같은 "[품질 속성] 질문" 줄 형식으로 반환 (4단계 파싱 그대로 사용)
+
+    Returns:
+        (질문 텍스트, {품질 속성: 요청 문항 수})
+    """
+    shard_counts = split_question_counts(question_count, extract_main_quality_attributes(quality_selection))
+    if progress is not None:
+        progress.update({"done": 0, "total": len(shard_counts)})
+
+    shards = await gather_limited(
+        [
+            generate_question_shard(attr, count, domain_analysis, quality_selection, input_text, progress, contexts)
+            for attr, count in shard_counts.items()
+        ],
+        concurrency
+    )
+    merged = dedupe_questions([question for shard in shards for question in shard])
+
+    # 중복 제거/부족 응답으로 모자란 문항은 해당 품질 속성만 다시 요청 (기존 질문은 중복 금지 목록으로 전달)
+    for _ in range(SURVEY_SHARD_RETRIES):
+        missing = _missing_counts(merged, shard_counts)
+        if not missing:
+            break
+        if progress is not None:
+            progress["total"] += len(missing)
+        refills = await gather_limited(
+            [
+                generate_question_shard(
+                    attr, count, domain_analysis, quality_selection, input_text, progress, contexts,
+                    exclude=[q for a, q in merged if a == attr]
+                )
+                for attr, count in missing.items()
+            ],
+            concurrency
+        )
+        merged = _cap_per_attribute(
+            dedupe_questions(merged + [question for refill in refills for question in refill]), shard_counts
+        )
+
+    if len(merged) < question_count and progress is not None:
+        progress["warnings"].append(
+            f"⚠️ 3단계 분할 생성: 요청 {question_count}개 중 {len(merged)}개만 생성되었습니다 (중복 제거/부족 응답)"
+        )
+    return "\n".join(f"[{attr}] {question}" for attr, question in merged), shard_counts
+
+def parse_questions_for_validation(questions_text):
+    """질문 텍스트를 파싱하여 [{quality_attr, question}] 형태로 변환"""
+    questions_list = []
+    pattern = r'\[([^\]]+)\]\s*(.+)'
+
+    for line in questions_text.split('\n'):
+        line = line.strip()
+        if line and line.startswith('['):
+            match = re.match(pattern, line)
+            if match:
+                questions_list.append({
+                    'original_quality_attr': match.group(1).strip(),
+                    'question': match.group(2).strip()
+                })
+    return questions_list
+
+async def search_appropriate_quality_attribute(question_text, top_k=5, progress=None):
+    """
+    질문 내용을 기반으로 Azure AI Search에서 관련 ISO 25010 문서 검색
+
+    Returns:
+        검색된 문서 내용을 결합한 문자열 (검색 불가/실패 시 빈 문자열)
+    """
+    search_client = get_async_search_client()
+    if search_client is None:
+        return ""
+
+    try:
+        with span("search.quality_attribute", kind="search", top=top_k) as search_span:
+            results = await search_client.search(
+                search_text=question_text,
+                top=top_k,
+                select=["content", "source"]
+            )
+
+            context = []
+            async for result in results:
+                source = result.get("source", "")
+                content = result.get("content", "")
+
+                if source and content:
+                    context.append(f"[출처: {source}]\n{content}")
+                elif content:
+                    context.append(content)
+            search_span.set(rows=len(context))
+
+        return "\n\n".join(context) if context else ""
+
+    except Exception as e:
+        if progress is not None:
+            progress["warnings"].append(f"⚠️ 품질 속성 검증 중 오류 발생: {e}")
+        return ""
+
+# cascade 로 분류한 질문의 재분류 근거
+TIER_REASONS = {
+    TIER_KEYWORD: "ISO 25010 부특성 키워드 일치로 분류",
+    TIER_EXAMPLE: "ISO 25010 예시 질문과의 유사도로 분류",
+}
+
+def _same_attribute(classifier, original_attr, recommended_attr):
+    """부특성명/띄어쓰기 차이를 무시하고 같은 품질 속성인지"""
+    if classifier is None:
+        return original_attr == recommended_attr
+    return (classifier.canonical(original_attr) or original_attr) == (classifier.canonical(recommended_attr) or recommended_attr)
+
+def resolved_result(idx, q_data, tier, recommended_attr, reason, classifier):
+    """LLM 없이 분류한 결과 → 4단계 결과 (3단계 속성명과 같은 품질 속성이면 원본 유지)"""
+    original_attr = q_data['original_quality_attr']
+    if _same_attribute(classifier, original_attr, recommended_attr):
+        recommended_attr = original_attr
+    return {
+        'question_index': idx,
+        'original_attr': original_attr,
+        'recommended_attr': recommended_attr,
+        'reason': reason,
+        'changed': recommended_attr != original_attr,
+        'tier': tier
+    }
+
+def classified_result(idx, q_data, decision, classifier):
+    """cascade 분류 결과 → 4단계 결과"""
+    reason = f"{TIER_REASONS[decision['tier']]} (점수 {decision['score']}, 1·2위 차이 {decision['margin']})"
+    return resolved_result(idx, q_data, decision['tier'], decision['attribute'], reason, classifier)
+
+def memo_result(idx, q_data, row, similarity, classifier):
+    """분류 메모 재사용 → 4단계 결과"""
+    match = "같은 질문" if similarity is None else f"유사 질문 (유사도 {similarity:.3f}: {row['question_text']})"
+    reason = f"이전 설문에서 확정된 분류 재사용 - {match}\n{row['reason'] or ''}".rstrip()
+    return resolved_result(idx, q_data, TIER_MEMO, row['quality_attribute'], reason, classifier)
+
+def _advance(progress, count=1):
+    if progress is not None and count:
+        progress["done"] += count
+        progress["message"] = f"🔍 4단계: 품질 표준문서를 참고하여 검증하고 있습니다... ({progress['done']}/{progress['total']})"
+
+async def validate_question(idx, q_data, progress=None):
+    """4단계: 질문 1개의 품질 속성을 RAG + LLM 으로 검증"""
+    search_result = await search_appropriate_quality_attribute(q_data['question'], top_k=5, progress=progress)
+
+    if not search_result:
+        # RAG 검색 실패 시 원본 유지
+        result = {
+            'question_index': idx,
+            'original_attr': q_data['original_quality_attr'],
+            'recommended_attr': q_data['original_quality_attr'],
+            'reason': '문서 검색 실패로 원본 유지',
+            'changed': False,
+            'tier': TIER_LLM
+        }
+    else:
+        user_prompt = f"""질문: {q_data['question']}
+현재 품질 속성: {q_data['original_quality_attr']}
+
+관련 ISO/IEC 25010 문서:
+{search_result}
+
+위 ISO 25010 문서를 참고하여, 이 질문에 가장 적합한 품질 속성을 모든 대표 품질 속성과 세부 특성 중에서 선택해주세요."""
+        validation_result = await chat("step4_validation", VALIDATION_PROMPT, user_prompt)
+
+        # "권장 품질 속성:" 부분 추출 (대괄호나 따옴표 제거)
+        recommended_attr_match = re.search(r'권장 품질 속성:\s*([^\n]+)', validation_result)
+        recommended_attr = q_data['original_quality_attr']
+        if recommended_attr_match:
+            recommended_attr = recommended_attr_match.group(1).strip().strip('[]"\'')
+
+        result = {
+            'question_index': idx,
+            'original_attr': q_data['original_quality_attr'],
+            'recommended_attr': recommended_attr,
+            'reason': validation_result,
+            'changed': recommended_attr != q_data['original_quality_attr'],
+            'tier': TIER_LLM
+        }
+
+    _advance(progress)
+    return result
+
+def open_memo(progress=None):
+    """최신 분류 메모 인덱스 (사용 안 함/조회 실패 시 None - 메모 없이 계속 진행)"""
+    if not CLASSIFICATION_MEMO_ENABLED:
+        return None
+    try:
+        memo = get_memo_index()
+        memo.refresh()
+        return memo
+    except Exception as e:
+        if progress is not None:
+            progress["warnings"].append(f"⚠️ 분류 메모를 불러오지 못했습니다: {e}")
+        return None
+
+async def validate_questions(parsed_questions, progress=None, concurrency=SURVEY_VALIDATION_CONCURRENCY):
+    """
+    4단계: 모든 질문 검증 (결과는 질문 순서)
+    같은 질문 메모 → 키워드/예시 질문 cascade → 유사 질문 메모(한 번에 임베딩) → 나머지만 RAG + LLM 동시 실행
+    """
+    if progress is not None:
+        progress.update({"done": 0, "total": len(parsed_questions)})
+    # 프로세스당 한 번 구성 (ISO 25010 문서 파일/메모 저장소 읽기는 스레드에서)
+    classifier = await asyncio.to_thread(get_classifier) if CLASSIFIER_ENABLED else None
+    memo = await asyncio.to_thread(open_memo, progress)
+
+    results = [None] * len(parsed_questions)
+    pending = []
+    for idx, q_data in enumerate(parsed_questions):
+        row = memo.exact(q_data['question']) if memo is not None else None
+        if row is not None:
+            results[idx] = memo_result(idx, q_data, row, None, classifier)
+            continue
+        decision = classifier.classify(q_data['question']) if classifier is not None else None
+        if decision is not None and decision['tier'] != TIER_LLM:
+            results[idx] = classified_result(idx, q_data, decision, classifier)
+            continue
+        pending.append(idx)
+
+    if memo is not None and pending:
+        try:
+            matches = await asyncio.to_thread(memo.near, [parsed_questions[idx]['question'] for idx in pending])
+        except Exception as e:
+            matches = [None] * len(pending)
+            if progress is not None:
+                progress["warnings"].append(f"⚠️ 유사 질문 메모 조회 중 오류 발생: {e}")
+        for idx, match in zip(pending, matches):
+            if match is not None:
+                results[idx] = memo_result(idx, parsed_questions[idx], match[0], match[1], classifier)
+        pending = [idx for idx in pending if results[idx] is None]
+
+    _advance(progress, len(parsed_questions) - len(pending))
+    for result in await gather_limited(
+        [validate_question(idx, parsed_questions[idx], progress) for idx in pending],
+        concurrency
+    ):
+        results[result['question_index']] = result
+    return results
+
+def summarize_validation(parsed_questions, rag_validation_results):
+    """재분류 결과로 질문 재구성 및 변경 내역 요약"""
+    refined_questions_with_rag = "\n".join(
+        f"[{validation['recommended_attr']}] {q_data['question']}"
+        for q_data, validation in zip(parsed_questions, rag_validation_results)
+    )
+
+    changes_summary = [
+        f"질문 {validation['question_index']+1}: {validation['original_attr']} → {validation['recommended_attr']}"
+        for validation in rag_validation_results if validation['changed']
+    ]
+    if changes_summary:
+        rag_validation_summary = "**품질 속성 변경 내역:**\n" + "\n".join(changes_summary)
+    else:
+        rag_validation_summary = "모든 질문의 품질 속성이 적절하여 변경 사항이 없습니다."
+
+    tiers = tier_counts(rag_validation_results)
+    rag_validation_summary += (
+        f"\n\n**분류 방식:** 분류 메모 재사용 {tiers[TIER_MEMO]}개 / 키워드 {tiers[TIER_KEYWORD]}개 / "
+        f"예시 질문 유사도 {tiers[TIER_EXAMPLE]}개 / LLM 검증 {tiers[TIER_LLM]}개"
+    )
+    return refined_questions_with_rag, rag_validation_summary
+
+def count_corrections(rag_validation_results):
+    """4단계에서 품질 속성이 바뀐 질문 수"""
+    return sum(1 for validation in rag_validation_results if validation["changed"])
+
+async def refine_questions(questions_for_refinement):
+    """5단계: 최종 검토"""
+    user_prompt = f"""다음 설문조사 질문들을 검토하고 필요시 수정해주세요:
+
+{questions_for_refinement}"""
+    return await chat("step5_refinement", REFINEMENT_PROMPT, user_prompt)
+
+async def finalize_questions(questions_for_refinement, refinement_result):
+    """5단계 수정 내역을 반영한 최종 질문 (수정 사항이 없으면 4단계 질문 그대로)"""
+    if "수정 사항이 없습니다" in refinement_result or "모든 질문이 적절합니다" in refinement_result:
+        return questions_for_refinement
+    user_prompt = f"""4단계 품질 속성 재분류된 질문:
+{questions_for_refinement}
+
+5단계 수정 내역:
+{refinement_result}
+
+위 내용을 바탕으로 최종 설문조사 질문을 생성해주세요."""
+    return await chat("step5_final", FINAL_GENERATION_PROMPT, user_prompt)
+
+def parse_questions(questions_text):
+    """최종 질문 텍스트를 파싱하여 품질속성과 질문을 분리"""
+    questions_data = []
+    pattern = r'\[([^\]]+)\]\s*(.+)'
+
+    for line in questions_text.split('\n'):
+        line = line.strip()
+        if line and line.startswith('['):
+            match = re.match(pattern, line)
+            if match:
+                quality_attribute = match.group(1).strip()
+                question = match.group(2).strip()
+                questions_data.append({
+                    'quality_attribute': quality_attribute,
+                    'question': question,
+                    'display': f"[{quality_attribute}] {question}",
+                    'selected': True
+                })
+
+    return questions_data
+
+async def run_survey_pipeline(input_info, state, progress=None, lane=LANE_INTERACTIVE):
+    """
+    설문 질문 생성 전체 파이프라인
+
+    Args:
+        input_info: 입력 정보 딕셔너리
+        state: 단계별 결과를 기록할 딕셔너리 (session_state 키와 동일한 이름)
+        progress: new_progress() 결과 (선택)
+        lane: LLM 게이트웨이 레인 (배치 실행은 LANE_BULK)
+    """
+    progress = progress if progress is not None else new_progress()
+    _lane.set(lane)
+    input_text = build_input_text(input_info)
+
+    progress["message"] = "🔍 1단계: 입력한 SW 정보를 종합적으로 분석하고 있습니다..."
+    with measured_step(state, "step1_domain"):
+        state["domain_analysis"] = await analyze_domain(input_text)
+    state["step1_complete"] = True
+
+    progress["message"] = "⚖️ 2단계: 주요 품질 속성을 선정하고 있습니다..."
+    with measured_step(state, "step2_quality"):
+        state["quality_selection"] = await select_quality_attributes(state["domain_analysis"], input_text)
+    state["step2_complete"] = True
+
+    question_count = requested_question_count(input_info)
+    with measured_step(state, "step3_questions") as step3:
+        # 프로세스당 한 번 계산 (앱은 시작 시 미리 계산, 아직이면 스레드에서 기다림)
+        contexts = await asyncio.to_thread(get_attribute_contexts) if ISO_CONTEXT_ENABLED else {}
+        step3.set(iso_context=bool(contexts))
+        if use_sharding(question_count):
+            # 문항 수가 많으면 품질 속성별로 나눠 동시에 생성 (소요 시간 ≈ 가장 큰 분할 1개)
+            progress["message"] = "📝 3단계: 품질 속성별로 질문을 생성하고 있습니다..."
+            state["initial_questions"], shard_counts = await generate_questions_sharded(
+                state["domain_analysis"], state["quality_selection"], input_text, question_count, progress,
+                contexts=contexts
+            )
+            step3.set(shards=len(shard_counts), requested=question_count,
+                      generated=len(parse_questions_for_validation(state["initial_questions"])))
+        else:
+            progress["message"] = "📝 3단계: 설문조사 질문을 생성하고 있습니다..."
+            iso_context = selected_context(extract_main_quality_attributes(state["quality_selection"]), contexts)
+            state["initial_questions"] = await generate_questions(
+                state["domain_analysis"], state["quality_selection"], input_text, iso_context
+            )
+    state["step3_complete"] = True
+
+    progress["message"] = "🔍 4단계: 품질 표준문서를 참고하여 검증하고 있습니다..."
+    with measured_step(state, "step4_validation") as step4:
+        parsed_questions = parse_questions_for_validation(state["initial_questions"])
+        rag_validation_results = await validate_questions(parsed_questions, progress)
+        refined_questions_with_rag, rag_validation_summary = summarize_validation(parsed_questions, rag_validation_results)
+        # 3단계에서 품질 속성을 잘못 붙여 4단계가 고친 질문 수 (ISO 문맥 효과 측정용)
+        corrections = count_corrections(rag_validation_results)
+        tiers = tier_counts(rag_validation_results)
+        step4.set(questions=len(parsed_questions), corrections=corrections,
+                  **{f"tier_{tier}": count for tier, count in tiers.items()})
+    state["step_metrics"]["step4_validation"].update(items=len(parsed_questions), corrections=corrections, tiers=tiers)
+    state["rag_validation_results"] = rag_validation_results
+    state["rag_validation_summary"] = rag_validation_summary
+    state["refined_questions_with_rag"] = refined_questions_with_rag
+    state["step4_complete"] = True
+
+    progress["message"] = "🔧 5단계: 최종 검토를 진행하고 있습니다..."
+    questions_for_refinement = refined_questions_with_rag or state["initial_questions"]
+    with measured_step(state, "step5_refinement"):
+        state["refinement_result"] = await refine_questions(questions_for_refinement)
+    state["step5_complete"] = True
+
+    with measured_step(state, "step5_final"):
+        state["final_questions"] = await finalize_questions(questions_for_refinement, state["refinement_result"])
+    return state
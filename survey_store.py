@@ -0,0 +1,165 @@
+"""
+설문/메트릭 저장 (화면과 배치 CLI 공용)
+- 프로젝트 입력 필드 → 파이프라인 input_info 변환
+- surveys / generation_steps / survey_questions / classification_memo / step_performance / metrics 저장
+- 모든 함수는 커서를 받아 실행만 하고 커밋은 호출한 쪽에서 처리
+"""
+
+import json
+from psycopg2.extras import execute_values
+
+from classification_memo import remember_classifications
+from step_performance import delete_metric_performance, save_step_performance, survey_step_rows, metric_step_rows
+
+# surveys 테이블의 프로젝트 입력 컬럼 (화면 입력 / CSV·JSONL 열 이름과 동일)
+PROJECT_FIELDS = [
+    "project_name",
+    "software_description",
+    "evaluation_purpose",
+    "respondent_info",
+    "expected_respondents",
+    "development_scale",
+    "user_scale",
+    "operating_environment",
+    "industry_field",
+    "survey_item_count",
+]
+
+# 설문별 저장 잠금(pg_advisory_xact_lock) 네임스페이스
+SURVEY_LOCK_NAMESPACE = 25010
+
+# generation_steps 에 저장하는 단계 (단계 번호, 이름, 파이프라인 state 키)
+GENERATION_STEPS = [
+    (1, "도메인 분석", "domain_analysis"),
+    (2, "품질 속성 선정", "quality_selection"),
+    (3, "초기 질문 생성", "initial_questions"),
+    (4, "RAG 기반 품질 속성 재분류", "rag_validation_summary"),
+    (5, "최종 검토", "refinement_result"),
+]
+
+def build_input_info(project):
+    """프로젝트 입력 → 파이프라인 input_info (빈 값은 '미입력')"""
+    survey_item_count = int(project.get("survey_item_count") or 0)
+    development_scale = project.get("development_scale")
+    return {
+        "평가할 소프트웨어": project["software_description"],
+        "평가 목적": project.get("evaluation_purpose") or "미입력",
+        "응답자 정보": project.get("respondent_info") or "미입력",
+        "예상 응답자 수": project.get("expected_respondents") or "미입력",
+        "개발 규모": development_scale if development_scale and development_scale != "선택 안함" else "미입력",
+        "사용자 규모": project.get("user_scale") or "미입력",
+        "운영 환경": project.get("operating_environment") or "미입력",
+        "산업 분야": project.get("industry_field") or "미입력",
+        "설문 문항 수": f"{survey_item_count}개" if survey_item_count > 0 else "자동 설정"
+    }
+
+def project_exists(cur, project_name):
+    cur.execute("SELECT COUNT(*) FROM surveys WHERE project_name = %s", (project_name,))
+    return cur.fetchone()[0] > 0
+
+def lock_survey(cur, survey_id):
+    """트랜잭션이 끝날 때까지 같은 설문의 저장을 직렬화 (다른 프로세스의 삭제 후 저장과 섞이지 않도록)"""
+    cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (SURVEY_LOCK_NAMESPACE, survey_id))
+
+def save_survey(cur, project, state, questions):
+    """
+    설문 1건 저장
+
+    Args:
+        project: PROJECT_FIELDS 키를 가진 입력 정보
+        state: 파이프라인 단계 결과 (run_survey_pipeline의 state / session_state)
+        questions: 저장할 질문 [{"quality_attribute", "question"}] (순서대로 question_order 부여)
+
+    Returns:
+        survey_id
+    """
+    # 1️⃣ surveys 테이블에 기본 정보 저장 (metric_completed 기본값 N)
+    cur.execute("""
+        INSERT INTO surveys (
+            project_name, software_description, evaluation_purpose,
+            respondent_info, expected_respondents, development_scale,
+            user_scale, operating_environment, industry_field, survey_item_count,
+            metric_completed
+        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        RETURNING id;
+    """, (*(project.get(field) for field in PROJECT_FIELDS), 'N'))
+    survey_id = cur.fetchone()[0]
+
+    # 2️⃣ generation_steps 테이블에 1~5단계 결과 저장
+    execute_values(cur, """
+        INSERT INTO generation_steps (
+            survey_id, step_number, step_name, step_result
+        ) VALUES %s;
+    """, [(survey_id, number, name, state[key]) for number, name, key in GENERATION_STEPS])
+
+    # 3️⃣ survey_questions 테이블에 질문 저장 (question_order는 표시 순서)
+    if questions:
+        execute_values(cur, """
+            INSERT INTO survey_questions (
+                survey_id, question_order, quality_attribute, question_text
+            ) VALUES %s;
+        """, [(survey_id, idx + 1, q["quality_attribute"], q["question"]) for idx, q in enumerate(questions)])
+
+    # 4️⃣ classification_memo 에 확정된 질문 → 품질 속성 기록 (다음 설문 4단계에서 재사용)
+    remember_classifications(cur, questions, state)
+
+    # 5️⃣ step_performance 테이블에 단계별 소요 시간/토큰 저장
+    save_step_performance(cur, survey_step_rows(survey_id, state.get("step_metrics", {})))
+    return survey_id
+
+def load_questions(cur, survey_id):
+    """메트릭 생성 대상 질문 [(id, question_order, quality_attribute, question_text)]"""
+    cur.execute("""
+        SELECT id, question_order, quality_attribute, question_text
+        FROM survey_questions
+        WHERE survey_id = %s
+        ORDER BY question_order ASC
+    """, (survey_id,))
+    return cur.fetchall()
+
+def save_metrics(cur, survey_id, scale_type, metrics, questions, performance=None):
+    """
+    메트릭 저장 + 질문별 성능 기록 + metric_completed = 'Y'
+
+    Returns:
+        저장된 메트릭 수
+    """
+    question_ids = {q[1]: q[0] for q in questions}
+    saved_orders = set()
+    for metric_info in metrics:
+        question_id = question_ids.get(metric_info["question_order"])
+        if question_id is None:
+            continue
+        # scale_interpretations를 JSON 문자열로 변환
+        element_description = json.dumps(metric_info["scale_interpretations"], ensure_ascii=False)
+        cur.execute("""
+            INSERT INTO metrics
+            (survey_id, question_id, scale_type, element_description)
+            VALUES (%s, %s, %s, %s)
+        """, (survey_id, question_id, scale_type, element_description))
+        saved_orders.add(metric_info["question_order"])
+
+    # 질문별 메트릭 생성 소요 시간/토큰 저장 (저장된 메트릭만)
+    save_step_performance(cur, metric_step_rows(survey_id, {
+        order: perf for order, perf in (performance or {}).items() if order in saved_orders
+    }))
+
+    # surveys 테이블의 metric_completed 플래그를 Y로 업데이트
+    cur.execute("""
+        UPDATE surveys
+        SET metric_completed = 'Y', updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    """, (survey_id,))
+    return len(saved_orders)
+
+def delete_metrics(cur, survey_id):
+    """
+    메트릭 + 질문별 메트릭 생성 성능 기록 삭제 (같은 트랜잭션)
+
+    Returns:
+        삭제된 메트릭 수
+    """
+    cur.execute("DELETE FROM metrics WHERE survey_id = %s", (survey_id,))
+    deleted = cur.rowcount
+    delete_metric_performance(cur, survey_id)
+    return deleted
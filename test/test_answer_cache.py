@@ -0,0 +1,17 @@
+"""
+RAG 답변 캐시 테스트
+"""
+from answer_cache import AnswerCache, normalize_query
+
+def test_normalized_hit_and_version_invalidation():
+    cache = AnswerCache(capacity=8, ttl=60)
+    cache.put("idx-v1:abc", "기능적 적합성이란 무엇인가요?", {"answer": "A", "sources": ["iso.txt"]})
+
+    assert normalize_query("  기능적   적합성이란 무엇인가요 ? ") == "기능적 적합성이란 무엇인가요"
+    assert cache.get("idx-v1:abc", "기능적 적합성이란  무엇인가요")["answer"] == "A"
+    assert cache.get("idx-v2:def", "기능적 적합성이란 무엇인가요?") is None
+
+def test_expired_entries_are_missed():
+    cache = AnswerCache(capacity=8, ttl=0)
+    cache.put("v", "질문", {"answer": "A", "sources": []})
+    assert cache.get("v", "질문") is None
@@ -0,0 +1,43 @@
+"""
+비동기 실행 코어 테스트 (동시 실행 제한, 스크립트 중단 시 취소)
+"""
+import asyncio
+
+import pytest
+
+from async_core import gather_limited, run_sync
+
+def test_gather_limited_keeps_order_and_limit():
+    running = {"now": 0, "max": 0}
+
+    async def work(i):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01 * (5 - i % 5))
+        running["now"] -= 1
+        return i
+
+    assert run_sync(gather_limited([work(i) for i in range(20)], 4)) == list(range(20))
+    assert running["max"] == 4
+
+class ScriptStopped(BaseException):
+    """Streamlit StopException 대용"""
+
+def test_run_sync_cancels_when_script_stops():
+    state = {"cancelled": False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    def on_tick():
+        raise ScriptStopped()
+
+    with pytest.raises(ScriptStopped):
+        run_sync(slow(), on_tick=on_tick, poll_interval=0.05)
+
+    run_sync(asyncio.sleep(0.05))
+    assert state["cancelled"]
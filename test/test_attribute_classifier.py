@@ -0,0 +1,127 @@
+"""
+4단계 품질 속성 분류 cascade 테스트 (Aho-Corasick, 단계별 확정/LLM 위임, 보정, 파이프라인 연동)
+"""
+import asyncio
+
+import survey_pipeline
+from attribute_classifier import (
+    TIER_EXAMPLE,
+    TIER_KEYWORD,
+    TIER_LLM,
+    TIER_MEMO,
+    AhoCorasick,
+    AttributeClassifier,
+    calibrate,
+    get_classifier,
+    tier_counts,
+)
+
+DOCUMENTS = [
+    {"quality_characteristic": "성능 효율성", "sub_characteristic": "시간 행동", "sub_characteristic_en": "Time Behaviour",
+     "keywords": "응답시간 | 속도 | 지연", "example_questions": "시스템의 응답 속도가 만족스럽습니까?\n처리 시간이 적절합니까?"},
+    {"quality_characteristic": "보안성", "sub_characteristic": "기밀성", "sub_characteristic_en": "Confidentiality",
+     "keywords": "암호화 | 접근 권한 | 기밀", "example_questions": "권한 없는 사용자의 접근이 차단됩니까?\n데이터가 암호화되어 저장됩니까?"},
+    {"quality_characteristic": "신뢰성", "sub_characteristic": "가용성", "sub_characteristic_en": "Availability",
+     "keywords": "가용 | 가동", "example_questions": "필요할 때 시스템을 사용할 수 있습니까?"},
+]
+
+def test_aho_corasick_finds_overlapping_patterns():
+    matcher = AhoCorasick()
+    for pattern in ["he", "she", "his", "hers"]:
+        matcher.add(pattern, pattern)
+    matcher.build()
+
+    assert sorted((start, pattern) for start, pattern, _ in matcher.find_all("ushers")) == [
+        (1, "she"), (2, "he"), (2, "hers")
+    ]
+
+def test_keyword_tier_resolves_clear_questions():
+    classifier = AttributeClassifier(DOCUMENTS, keyword_min=2)
+
+    decision = classifier.classify("응답 시간이 지연되지 않습니까?")
+    assert (decision["tier"], decision["attribute"]) == (TIER_KEYWORD, "성능 효율성")
+
+def test_keyword_must_start_a_word():
+    classifier = AttributeClassifier(DOCUMENTS, keyword_min=2)
+
+    # "추가가 용이" 의 "가용" 은 어절 중간에서 시작하므로 무시
+    assert classifier.keyword_scores("기능 추가가 용이합니까?") == {}
+    assert classifier.keyword_scores("가용 시간이 충분합니까?") == {"신뢰성": 2.0}
+
+def test_ambiguous_questions_fall_through_to_llm():
+    classifier = AttributeClassifier(DOCUMENTS, keyword_min=2, example_margin=0.4)
+
+    # 두 품질 속성 키워드가 비슷하게 일치하고 예시 질문과도 거리가 멀면 LLM 검증
+    decision = classifier.classify("암호화 때문에 속도가 느려집니까?")
+    assert decision["tier"] == TIER_LLM
+
+def test_example_tier_uses_similarity_when_no_keyword_matches():
+    classifier = AttributeClassifier(DOCUMENTS, example_min=0.3, example_margin=0.1)
+
+    decision = classifier.classify("필요할 때 시스템을 언제든 사용할 수 있습니까?")
+    assert (decision["tier"], decision["attribute"]) == (TIER_EXAMPLE, "신뢰성")
+
+def test_single_keyword_needs_a_second_signal():
+    classifier = AttributeClassifier(DOCUMENTS, keyword_min=2)
+
+    # 키워드 하나만 일치하면 margin 이 1.0 이어도 확정하지 않음 (example 단계와 일치하거나 서로 다른 키워드 2개 이상 필요)
+    attr, top, margin, confirmed = classifier.keyword_candidate("암호화가 적용됩니까?", {})
+    assert (attr, margin, confirmed) == ("보안성", 1.0, False)
+    assert classifier.keyword_candidate("암호화와 접근 권한이 적용됩니까?", {})[3]
+    assert classifier.keyword_candidate("암호화가 적용됩니까?", {"보안성": 0.5})[3]
+
+def test_interface_alone_is_not_compatibility():
+    decision = get_classifier().classify("사용자 인터페이스가 직관적입니까?")
+    assert decision["tier"] == TIER_LLM
+
+def test_calibration_returns_keyword_min_and_smallest_margin_meeting_precision():
+    classifier = AttributeClassifier(DOCUMENTS, keyword_distinct=1)
+    labelled = [
+        ("응답 시간이 빠릅니까?", "시간 행동"),
+        ("접근 권한이 관리됩니까?", "보안성"),
+        ("암호화 속도가 빠릅니까?", "성능 효율성"),
+    ]
+
+    result = calibrate(classifier, labelled, target_precision=1.0)
+    # 세 번째 질문은 암호화(3) vs 속도(2) → margin 1/3 로 잘못 분류되므로 그보다 큰 값
+    assert (result["keyword_min"], result["keyword_margin"]) == (2, 0.35)
+    assert result["keyword"] == {"coverage": 0.6667, "precision": 1.0}
+
+def test_leave_one_out_does_not_calibrate_keyword_tier():
+    classifier = AttributeClassifier(DOCUMENTS)
+    labelled = [(question, attr) for attr, question in classifier.examples]
+
+    result = calibrate(classifier, labelled, target_precision=1.0, leave_one_out=True)
+    assert result["keyword_min"] is None and result["keyword_margin"] is None
+    assert result["keyword"]["precision"] is None
+
+def test_tier_counts_default_to_llm_for_older_results():
+    assert tier_counts([{"tier": TIER_KEYWORD}, {"tier": TIER_LLM}, {}]) == {
+        TIER_MEMO: 0, TIER_KEYWORD: 1, TIER_EXAMPLE: 0, TIER_LLM: 2
+    }
+
+def test_pipeline_skips_llm_for_resolved_questions(monkeypatch):
+    calls = []
+
+    async def fake_search(query, top_k=5, progress=None):
+        return "문서"
+
+    async def fake_chat(step, system_prompt, user_prompt):
+        calls.append(user_prompt)
+        return "권장 품질 속성: 사용성"
+
+    monkeypatch.setattr(survey_pipeline, "search_appropriate_quality_attribute", fake_search)
+    monkeypatch.setattr(survey_pipeline, "chat", fake_chat)
+    monkeypatch.setattr(survey_pipeline, "CLASSIFICATION_MEMO_ENABLED", False)
+
+    questions = [
+        {"original_quality_attr": "시간 행동", "question": "시스템의 응답 속도가 만족스럽습니까?"},
+        {"original_quality_attr": "기능 적합성", "question": "전반적으로 만족하십니까?"},
+    ]
+    results = asyncio.run(survey_pipeline.validate_questions(questions, survey_pipeline.new_progress()))
+
+    assert get_classifier().classify(questions[0]["question"])["tier"] != TIER_LLM
+    # 부특성명(시간 행동)이 같은 품질 속성이면 원본 유지
+    assert results[0]["recommended_attr"] == "시간 행동" and not results[0]["changed"]
+    assert results[1]["tier"] == TIER_LLM
+    assert len(calls) == 1
@@ -0,0 +1,65 @@
+"""
+설문 일괄 생성 CLI 테스트 (입력 파일 로드, input_info 변환, 보고서)
+"""
+import json
+
+import pytest
+
+from batch_generate import build_report, load_projects
+from survey_store import build_input_info
+
+def test_load_csv_and_jsonl_use_project_fields(tmp_path):
+    csv_path = tmp_path / "projects.csv"
+    csv_path.write_text(
+        "project_name,software_description,industry_field,survey_item_count\n"
+        "A,쇼핑몰,유통,10\n"
+        "B,병원 예약,,\n",
+        encoding="utf-8-sig"
+    )
+    jsonl_path = tmp_path / "projects.jsonl"
+    jsonl_path.write_text(
+        "\n".join(json.dumps(row, ensure_ascii=False) for row in [
+            {"project_name": "A", "software_description": "쇼핑몰", "industry_field": "유통", "survey_item_count": 10},
+            {"project_name": "B", "software_description": "병원 예약"},
+        ]) + "\n",
+        encoding="utf-8"
+    )
+
+    assert load_projects(str(csv_path)) == load_projects(str(jsonl_path))
+    a, b = load_projects(str(csv_path))
+    assert a["survey_item_count"] == 10 and a["industry_field"] == "유통"
+    assert b["survey_item_count"] == 0 and b["industry_field"] is None
+
+def test_load_rejects_missing_and_duplicate_projects(tmp_path):
+    path = tmp_path / "projects.jsonl"
+    path.write_text(json.dumps({"project_name": "A"}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="software_description"):
+        load_projects(str(path))
+
+    path.write_text("\n".join([json.dumps({"project_name": "A", "software_description": "x"})] * 2), encoding="utf-8")
+    with pytest.raises(ValueError, match="중복"):
+        load_projects(str(path))
+
+def test_build_input_info_fills_missing_values():
+    info = build_input_info({"software_description": "쇼핑몰", "development_scale": "선택 안함", "survey_item_count": 0})
+
+    assert info["평가할 소프트웨어"] == "쇼핑몰"
+    assert info["개발 규모"] == "미입력"
+    assert info["설문 문항 수"] == "자동 설정"
+    assert build_input_info({"software_description": "x", "survey_item_count": 15})["설문 문항 수"] == "15개"
+
+def test_report_counts_throughput_and_failures():
+    results = [
+        {"project_name": "A", "status": "success", "questions": 10, "validated": 10, "corrections": 1, "tiers": {"keyword": 4, "llm": 6}, "metrics": 10, "error": None},
+        {"project_name": "B", "status": "success", "questions": 12, "validated": 10, "corrections": 0, "tiers": {"keyword": 2, "example": 1, "llm": 7}, "metrics": 0, "error": None},
+        {"project_name": "C", "status": "skipped", "questions": 0, "metrics": 0, "error": "이미 존재하는 프로젝트명"},
+        {"project_name": "D", "status": "failed", "questions": 0, "metrics": 0, "error": "TimeoutError: "},
+    ]
+
+    report = build_report(results, 30)
+    assert (report["succeeded"], report["skipped"], report["failed"]) == (2, 1, 1)
+    assert report["projects_per_minute"] == 4.0
+    assert report["questions"] == 22
+    assert (report["corrections"], report["correction_rate"]) == (1, 0.05)
+    assert report["tiers"] == {"memo": 0, "keyword": 6, "example": 1, "llm": 13}
+    assert report["failures"] == [{"project_name": "D", "error": "TimeoutError: "}]
@@ -0,0 +1,162 @@
+"""
+카세트 기록/재생 테스트 (httpx, 스트리밍 응답, azure-core, Postgres 커서)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from psycopg2.extras import execute_values
+
+import cassette
+from cassette import Cassette, CassetteMiss, CassetteTransport, ReplayConnection, sql_key
+
+class Handler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def _reply(self, body, content_type="application/json"):
+        Handler.calls += 1
+        time.sleep(0.05)
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        self._reply(json.dumps({"echo": body["prompt"], "calls": Handler.calls + 1}, ensure_ascii=False))
+
+    def do_GET(self):
+        if self.path == "/stream":
+            # 조각 사이에 지연이 있는 스트리밍 응답 (Content-Length 없이 연결 종료로 끝)
+            Handler.calls += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i, delay in enumerate([0.02, 0.3]):
+                time.sleep(delay)
+                self.wfile.write(f"data: {i}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            return
+        self._reply("42", "text/plain")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+@pytest.fixture
+def use_cassette(tmp_path, monkeypatch):
+    def switch(mode, speed="zero"):
+        monkeypatch.setattr(cassette, "CASSETTE_MODE", mode)
+        monkeypatch.setattr(cassette, "_cassette", Cassette(str(tmp_path / "cassette.jsonl"), speed=speed))
+        monkeypatch.setattr(cassette, "_session", None)
+    return switch
+
+def test_httpx_replay_matches_recorded_order(server, use_cassette):
+    use_cassette("record")
+    with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+        recorded = [client.post(f"{server}/chat", json={"prompt": p}).json() for p in ["가", "나", "가"]]
+    calls_after_record = Handler.calls
+
+    use_cassette("replay")
+    with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+        replayed = [client.post(f"{server}/chat", json={"prompt": p}).json() for p in ["가", "나", "가"]]
+        with pytest.raises(CassetteMiss):
+            client.post(f"{server}/chat", json={"prompt": "없는 요청"})
+
+    assert replayed == recorded
+    assert Handler.calls == calls_after_record
+
+def test_replay_speed_recorded_vs_zero(server, use_cassette):
+    use_cassette("record")
+    with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+        client.post(f"{server}/chat", json={"prompt": "지연"})
+
+    def replay_seconds(speed):
+        use_cassette("replay", speed=speed)
+        with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+            started = time.perf_counter()
+            client.post(f"{server}/chat", json={"prompt": "지연"})
+            return time.perf_counter() - started
+
+    assert replay_seconds("recorded") >= 0.05
+    assert replay_seconds("zero") < 0.05
+
+def _stream_timings(client, url):
+    """(첫 조각까지 초, 전체 초, 본문)"""
+    started = time.perf_counter()
+    first = None
+    body = b""
+    with client.stream("GET", url) as response:
+        for chunk in response.iter_bytes():
+            first = first if first is not None else time.perf_counter() - started
+            body += chunk
+    return first, time.perf_counter() - started, body
+
+def test_streaming_passes_through_while_recording_and_replays_first_byte(server, use_cassette):
+    use_cassette("record")
+    with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+        first, total, recorded = _stream_timings(client, f"{server}/stream")
+    # 기록 중에도 첫 조각은 전체 응답을 기다리지 않고 도착
+    assert first < total - 0.2
+
+    [entry] = [json.loads(line) for line in open(cassette.get_cassette().path, encoding="utf-8")]
+    assert len(entry["chunks"]) == 2
+    assert entry["first_byte"] < entry["latency"] - 0.2
+    calls_after_record = Handler.calls
+
+    use_cassette("replay", speed="recorded")
+    with httpx.Client(transport=CassetteTransport(httpx.HTTPTransport())) as client:
+        first, total, replayed = _stream_timings(client, f"{server}/stream")
+    assert replayed == recorded == b"data: 0\n\ndata: 1\n\n"
+    assert first < entry["latency"] - 0.2
+    assert total >= 0.3
+    assert Handler.calls == calls_after_record
+
+def test_azure_sdk_client_replays(server, use_cassette):
+    def count():
+        client = SearchClient(server, "iso25010", AzureKeyCredential("key"), **cassette.azure_kwargs())
+        return client.get_document_count()
+
+    use_cassette("record")
+    assert count() == 42
+    calls_after_record = Handler.calls
+
+    use_cassette("replay")
+    assert count() == 42
+    assert Handler.calls == calls_after_record
+
+def test_postgres_replay_including_execute_values(use_cassette):
+    use_cassette("replay")
+    select = "SELECT id, project_name FROM surveys WHERE project_name = %s"
+    insert = "INSERT INTO survey_questions (survey_id, question_text) VALUES %s"
+    cassette.get_cassette().record({
+        "service": "postgres", "key": sql_key(select, ["A"]), "columns": ["id", "project_name"],
+        "rows": [[1, "A"]], "rowcount": 1, "latency": 0.0,
+    })
+    cassette.get_cassette().record({
+        "service": "postgres", "key": sql_key(b"INSERT INTO survey_questions (survey_id, question_text) VALUES (1,'q')", None),
+        "columns": None, "rows": None, "rowcount": 2, "latency": 0.0,
+    })
+
+    cur = ReplayConnection().cursor()
+    cur.execute(select, ["A"])
+    assert cur.fetchone() == (1, "A")
+    assert cur.fetchone() is None
+
+    execute_values(cur, insert, [(1, "질문 1"), (1, "질문 2")])
+    assert cur.rowcount == 2
@@ -0,0 +1,114 @@
+"""
+질문 분류 메모 테스트 (저장 행 구성, 같은/유사 질문 조회, 인스턴스 간 갱신, 4단계 LLM 호출 전 재사용)
+"""
+import asyncio
+
+import numpy as np
+
+import survey_pipeline
+from attribute_classifier import TIER_LLM, TIER_MEMO
+from classification_memo import LocalMemoBackend, MemoIndex, memo_rows, question_hash
+
+VOCABULARY = ["기능", "모두", "제공", "응답", "속도", "보안", "암호화", "시스템"]
+
+class FakeEmbedder:
+    """어휘 포함 여부로 만든 결정적 임베딩 (호출 횟수 기록)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [np.array([1.0 if word in text else 0.0 for word in VOCABULARY] + [0.1], dtype=np.float32) for text in texts]
+
+def saved_memo(tmp_path, questions, state=None):
+    backend = LocalMemoBackend(str(tmp_path / "memo.json"))
+    backend.save(None, memo_rows(questions, state or {}))
+    return backend
+
+def test_memo_rows_take_step4_reason_and_dedupe():
+    state = {
+        "refined_questions_with_rag": "[기능 적합성] 시스템이 필요한 기능을 모두 제공합니까?\n[성능 효율성] 응답이 빠릅니까?",
+        "rag_validation_results": [{"reason": "기능 완전성 관련"}, {"reason": "시간 행동 관련"}],
+    }
+    questions = [
+        {"quality_attribute": "기능 적합성", "question": "시스템이 필요한 기능을 모두 제공합니까?"},
+        {"quality_attribute": "기능 적합성", "question": "시스템이 필요한 기능을 모두  제공합니까"},
+        {"quality_attribute": "보안성", "question": "화면에서 새로 추가한 질문입니까?"},
+    ]
+
+    rows = memo_rows(questions, state)
+
+    assert len(rows) == 2
+    assert rows[0][0] == question_hash("시스템이 필요한 기능을 모두 제공합니까?")
+    assert rows[0][3] == "기능 완전성 관련"
+    assert rows[1][3] == "설문 저장 시 확정"
+
+def test_exact_and_near_lookup(tmp_path):
+    backend = saved_memo(tmp_path, [
+        {"quality_attribute": "기능 적합성", "question": "시스템이 필요한 기능을 모두 제공합니까?"},
+        {"quality_attribute": "보안성", "question": "데이터가 암호화되어 보안이 유지됩니까?"},
+    ])
+    embed = FakeEmbedder()
+    memo = MemoIndex(backend, embed=embed, similarity=0.95)
+    memo.refresh()
+
+    assert memo.exact("시스템이 필요한 기능을 모두 제공합니까").get("quality_attribute") == "기능 적합성"
+    assert memo.exact("응답 속도가 빠릅니까?") is None
+
+    near, miss = memo.near(["시스템은 필요한 기능을 모두 제공하고 있습니까?", "응답 속도가 빠릅니까?"])
+    assert near[0]["quality_attribute"] == "기능 적합성" and near[1] > 0.95
+    assert miss is None
+
+    # 메모 임베딩은 한 번만 계산해 저장 (다른 인스턴스는 다시 임베딩하지 않음)
+    assert len(embed.calls[0]) == 2
+    other = MemoIndex(LocalMemoBackend(backend.path), embed=FakeEmbedder())
+    other.refresh()
+    other.near(["시스템이 기능을 모두 제공합니까?"])
+    assert len(other.embed.calls) == 1
+
+def test_refresh_reloads_only_after_another_instance_saves(tmp_path):
+    backend = saved_memo(tmp_path, [{"quality_attribute": "보안성", "question": "접근 권한이 관리됩니까?"}])
+    memo = MemoIndex(backend, embed=FakeEmbedder())
+    memo.refresh()
+    assert memo.exact("응답 속도가 빠릅니까?") is None
+
+    LocalMemoBackend(backend.path).save(None, memo_rows(
+        [{"quality_attribute": "성능 효율성", "question": "응답 속도가 빠릅니까?"}], {}
+    ))
+    memo.refresh()
+    assert memo.exact("응답 속도가 빠릅니까?")["quality_attribute"] == "성능 효율성"
+
+def test_step4_reuses_memo_before_llm(tmp_path, monkeypatch):
+    backend = saved_memo(tmp_path, [
+        {"quality_attribute": "기능 적합성", "question": "시스템이 필요한 기능을 모두 제공합니까?"},
+    ])
+    memo = MemoIndex(backend, embed=FakeEmbedder())
+    calls = []
+
+    async def fake_search(query, top_k=5, progress=None):
+        return "문서"
+
+    async def fake_chat(step, system_prompt, user_prompt):
+        calls.append(user_prompt)
+        return "권장 품질 속성: 신뢰성"
+
+    monkeypatch.setattr(survey_pipeline, "get_memo_index", lambda: memo)
+    monkeypatch.setattr(survey_pipeline, "CLASSIFICATION_MEMO_ENABLED", True)
+    monkeypatch.setattr(survey_pipeline, "CLASSIFIER_ENABLED", False)
+    monkeypatch.setattr(survey_pipeline, "search_appropriate_quality_attribute", fake_search)
+    monkeypatch.setattr(survey_pipeline, "chat", fake_chat)
+
+    questions = [
+        {"original_quality_attr": "기능 적합성", "question": "시스템이 필요한 기능을 모두 제공합니까?"},
+        {"original_quality_attr": "성능 효율성", "question": "시스템은 필요한 기능을 모두 제공하고 있습니까?"},
+        {"original_quality_attr": "신뢰성", "question": "장애가 자주 발생하지 않습니까?"},
+    ]
+    progress = survey_pipeline.new_progress()
+    results = asyncio.run(survey_pipeline.validate_questions(questions, progress))
+
+    assert [r["tier"] for r in results] == [TIER_MEMO, TIER_MEMO, TIER_LLM]
+    assert not results[0]["changed"]
+    assert results[1]["recommended_attr"] == "기능 적합성" and results[1]["changed"]
+    assert len(calls) == 1
+    assert progress["done"] == progress["total"] == 3
@@ -0,0 +1,65 @@
+"""
+작업 초안 저장소 테스트 (로컬 저장소, 인스턴스 간 LRU 일관성, session_state 복원)
+"""
+import json
+
+from draft_store import DraftStore, LocalDraftBackend, new_draft_id, restore_session, snapshot_session, valid_draft_id
+
+class CountingBackend(LocalDraftBackend):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.loads = 0
+
+    def load(self, draft_id):
+        self.loads += 1
+        return super().load(draft_id)
+
+def test_lru_skips_reload_until_another_instance_saves(tmp_path):
+    backend = CountingBackend(str(tmp_path))
+    replica_a = DraftStore(backend)
+    replica_b = DraftStore(LocalDraftBackend(str(tmp_path)))
+    draft_id = new_draft_id()
+
+    replica_a.save(draft_id, {"domain_analysis": "v1"})
+    assert replica_a.load(draft_id) == {"domain_analysis": "v1"}
+    assert backend.loads == 0
+
+    replica_b.save(draft_id, {"domain_analysis": "v2 - 다른 인스턴스에서 수정"})
+    assert replica_a.load(draft_id) == {"domain_analysis": "v2 - 다른 인스턴스에서 수정"}
+    assert backend.loads == 1
+
+def test_loaded_draft_is_a_copy(tmp_path):
+    store = DraftStore(LocalDraftBackend(str(tmp_path)))
+    draft_id = new_draft_id()
+    store.save(draft_id, {"questions_data": [{"question": "q", "selected": True}]})
+
+    store.load(draft_id)["questions_data"][0]["selected"] = False
+    assert store.load(draft_id)["questions_data"][0]["selected"] is True
+
+def test_missing_and_deleted_drafts(tmp_path):
+    store = DraftStore(LocalDraftBackend(str(tmp_path)))
+    draft_id = new_draft_id()
+    assert store.load(draft_id) is None
+
+    store.save(draft_id, {"all_metrics": []})
+    store.delete(draft_id)
+    assert store.load(draft_id) is None
+
+def test_session_roundtrip_restores_only_missing_keys():
+    session = {
+        "domain_analysis": "분석",
+        "metric_performance": {1: {"wall_ms": 10}},
+        "show_template_dialog": True,
+    }
+    data = snapshot_session(session)
+    assert "show_template_dialog" not in data
+
+    restored = {"domain_analysis": "이미 있는 값"}
+    restore_session(restored, json.loads(json.dumps(data)))
+    assert restored["domain_analysis"] == "이미 있는 값"
+    assert restored["metric_performance"] == {1: {"wall_ms": 10}}
+
+def test_draft_id_format():
+    assert valid_draft_id(new_draft_id())
+    assert not valid_draft_id("../../etc/passwd")
+    assert not valid_draft_id(None)
@@ -0,0 +1,57 @@
+"""
+임베딩 캐시 테스트 (가짜 임베딩 클라이언트 사용)
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input, **kwargs):
+        self.calls.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text)), float(i), 1.0, 0.0])
+            for i, text in enumerate(input)
+        ])
+
+def test_cache_hits_memory_then_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_caches", {})
+    monkeypatch.setattr(embedding_cache, "get_embedding_cache",
+                        lambda model, dimensions: embedding_cache._caches.setdefault(
+                            (model, dimensions), EmbeddingCache(model, dimensions, cache_dir=str(tmp_path), capacity=1)))
+    client = SimpleNamespace(embeddings=FakeEmbeddings())
+
+    first = embedding_cache.embed_texts_cached(client, ["가", "나나", "가"], dimensions=4, model="m")
+    assert client.embeddings.calls == [["가", "나나"]]
+    np.testing.assert_array_equal(first[0], first[2])
+
+    again = embedding_cache.embed_texts_cached(client, ["가", "나나"], dimensions=4, model="m")
+    assert len(client.embeddings.calls) == 1
+    np.testing.assert_array_equal(again[1], first[1])
+
+    stats = embedding_cache._caches[("m", 4)].stats()
+    assert stats["misses"] == 3 and stats["disk_hits"] >= 1 and stats["disk_entries"] == 2
+
+    # 다른 프로세스/재시작 시 디스크에서 복원
+    reopened = EmbeddingCache("m", 4, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(reopened.get("나나"), first[1])
+
+def test_instances_sharing_a_directory_do_not_overwrite_rows(tmp_path):
+    a = EmbeddingCache("m", 2, cache_dir=str(tmp_path))
+    b = EmbeddingCache("m", 2, cache_dir=str(tmp_path))
+
+    b.put_many(["b"], [[9.0, 9.0]])
+    a.put_many(["a"], [[1.0, 1.0]])
+
+    # 메모리 캐시를 거치지 않는 새 인스턴스로 디스크 행 확인
+    reopened = EmbeddingCache("m", 2, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(reopened.get("a"), [1.0, 1.0])
+    np.testing.assert_array_equal(reopened.get("b"), [9.0, 9.0])
+    # 다른 인스턴스가 추가한 키도 디스크에서 읽음
+    np.testing.assert_array_equal(a.get("b"), [9.0, 9.0])
+    assert a.stats()["disk_entries"] == 2
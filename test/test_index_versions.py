@@ -0,0 +1,37 @@
+"""
+블루/그린 인덱스 재구축 테스트 (로컬 검색 대체 구현 사용)
+"""
+from data import index_versions
+from data.create_index import build_index
+from data.local_search import LocalSearchIndexClient
+
+DOCUMENTS = [
+    {"id": "doc1", "content": "응답 속도 성능 효율성", "doc_type": "sub_characteristic", "level": 2},
+    {"id": "doc2", "content": "보안 기밀성", "doc_type": "sub_characteristic", "level": 2},
+]
+
+def test_rebuild_swaps_alias_and_collects_old_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "INDEX_ALIAS_FILE", str(tmp_path / "aliases.json"))
+    index_client = LocalSearchIndexClient()
+
+    names = [
+        index_versions.rebuild_index("iso-test", build_index, DOCUMENTS, index_client=index_client,
+                                     sample_queries=["보안"], keep=2)
+        for _ in range(3)
+    ]
+
+    assert index_versions.resolve_index_name("iso-test") == names[-1]
+    assert index_versions.list_versions(index_client, "iso-test") == names[1:]
+    assert index_versions.rollback("iso-test") == names[1]
+
+def test_failed_verification_keeps_active_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "INDEX_ALIAS_FILE", str(tmp_path / "aliases.json"))
+    index_client = LocalSearchIndexClient()
+
+    active = index_versions.rebuild_index("iso-test", build_index, DOCUMENTS, index_client=index_client)
+    failed = index_versions.rebuild_index("iso-test", build_index, DOCUMENTS, index_client=index_client,
+                                          sample_queries=["존재하지않는검색어"])
+
+    assert failed is None
+    assert index_versions.resolve_index_name("iso-test") == active
+    assert index_client.list_index_names() == [active]
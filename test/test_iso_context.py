@@ -0,0 +1,54 @@
+"""
+품질 속성별 ISO 25010 문맥 테스트 (문서 → 속성별 문맥, 선정 속성 결합, 길이 제한)
+"""
+import iso_context
+from iso_context import attribute_context, build_attribute_contexts, load_documents_from_file, selected_context
+
+DOCUMENTS = [
+    {"id": "main_보안성", "doc_type": "main_characteristic", "quality_characteristic": "보안성",
+     "quality_characteristic_en": "Security", "definition": "정보와 데이터를 보호하는 정도"},
+    {"id": "sub_보안성_기밀성", "doc_type": "sub_characteristic", "quality_characteristic": "보안성",
+     "sub_characteristic": "기밀성", "sub_characteristic_en": "Confidentiality",
+     "definition": "권한이 있는 사람만 데이터에 접근할 수 있는 정도", "keywords": "접근 | 권한 | 암호화"},
+    {"id": "main_성능_효율성", "doc_type": "main_characteristic", "quality_characteristic": "성능 효율성",
+     "quality_characteristic_en": "Performance Efficiency", "definition": "자원 대비 성능의 정도"},
+]
+
+def test_sub_characteristics_are_grouped_under_their_attribute():
+    contexts = build_attribute_contexts(DOCUMENTS)
+
+    assert list(contexts) == ["보안성", "성능 효율성"]
+    assert contexts["보안성"] == (
+        "보안성 (Security): 정보와 데이터를 보호하는 정도\n"
+        "- 기밀성 (Confidentiality): 권한이 있는 사람만 데이터에 접근할 수 있는 정도 [키워드: 접근, 권한, 암호화]"
+    )
+
+def test_context_is_cut_at_line_boundary():
+    contexts = build_attribute_contexts(DOCUMENTS, max_chars=40)
+
+    assert contexts["보안성"] == "보안성 (Security): 정보와 데이터를 보호하는 정도"
+
+def test_selected_context_ignores_spacing_and_falls_back_to_all():
+    contexts = build_attribute_contexts(DOCUMENTS)
+
+    assert selected_context(["성능효율성"], contexts) == contexts["성능 효율성"]
+    assert selected_context(["알 수 없는 속성"], contexts) == f"{contexts['보안성']}\n\n{contexts['성능 효율성']}"
+    assert attribute_context("보안 성", contexts) == contexts["보안성"]
+    assert attribute_context("호환성", contexts) == ""
+
+def test_bundled_documents_cover_every_pipeline_attribute():
+    from survey_pipeline import ISO_QUALITY_ATTRIBUTES
+
+    contexts = build_attribute_contexts(load_documents_from_file())
+    assert set(ISO_QUALITY_ATTRIBUTES) <= set(contexts)
+    assert all(len(text) <= iso_context.ISO_CONTEXT_MAX_CHARS for text in contexts.values())
+
+def test_index_failure_falls_back_to_file(monkeypatch):
+    def unavailable():
+        raise ConnectionError("검색 서비스 연결 실패")
+
+    monkeypatch.setattr(iso_context, "load_documents_from_index", unavailable)
+    contexts, source = iso_context.load_attribute_contexts("index")
+
+    assert source == "file"
+    assert "보안성" in contexts
@@ -0,0 +1,54 @@
+"""
+생성 작업 큐 테스트 (중복 방지 키, 화면 직접 실행 lease 의 완료/중단 기록)
+"""
+import pytest
+
+import job_queue
+from job_queue import inline_run, job_dedupe_key
+
+class FakeConnection:
+    autocommit = False
+    closed = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def recorded(monkeypatch):
+    calls = []
+    conn = FakeConnection()
+    monkeypatch.setattr(job_queue, "get_connection", lambda: conn)
+    monkeypatch.setattr(job_queue, "complete_job", lambda cur, job_id, worker_id, result, progress=None: calls.append(("complete", job_id, result)) or True)
+    monkeypatch.setattr(job_queue, "fail_job", lambda cur, job_id, worker_id, error, retry=True: calls.append(("fail", job_id, error, retry)) or "failed")
+    return calls, conn
+
+def test_dedupe_key_per_target_and_operation():
+    assert job_dedupe_key("metric.likert_5", 12) == "metric.likert_5:12"
+    assert job_dedupe_key("metric.likert_5", 12) != job_dedupe_key("metric.numeric_100", 12)
+
+def test_inline_run_completes(recorded):
+    calls, conn = recorded
+    with inline_run(7, "inline:test") as run:
+        run.complete({"metrics": []})
+
+    assert calls == [("complete", 7, {"metrics": []})]
+    assert conn.autocommit and conn.closed
+
+def test_interrupted_inline_run_fails_without_retry(recorded):
+    calls, conn = recorded
+    # 페이지 이동/재실행으로 스크립트가 중단돼도 합류한 요청이 계속 기다리지 않도록 실패 기록
+    with pytest.raises(KeyboardInterrupt):
+        with inline_run(8, "inline:test"):
+            raise KeyboardInterrupt()
+
+    assert calls == [("fail", 8, "화면 실행 중단", False)]
+    assert conn.closed
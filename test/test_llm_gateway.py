@@ -0,0 +1,88 @@
+"""
+LLM 게이트웨이 테스트 (단일 비행, 우선순위 레인, 토큰 버킷)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import llm_gateway
+from async_core import run_sync
+from llm_gateway import DeploymentLimiter, LANE_BULK, LANE_INTERACTIVE
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"답변 {self.calls}"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        )
+
+def test_identical_requests_are_coalesced(monkeypatch):
+    completions = FakeCompletions()
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm_gateway, "async_client_for", lambda call_type: fake_client)
+    messages = [{"role": "user", "content": "같은 질문"}]
+
+    async def scenario():
+        return await asyncio.gather(*[
+            llm_gateway.chat("test.coalesce", messages, temperature=0.3, model="test-deployment")
+            for _ in range(5)
+        ])
+
+    assert run_sync(scenario()) == ["답변 1"] * 5
+    assert completions.calls == 1
+
+    summary = llm_gateway.gateway_stats()["callers"]["test.coalesce"]
+    assert summary["calls"] == 5
+    assert summary["coalesced"] == 4
+    assert summary["prompt_tokens"] == 10
+
+def test_interactive_lane_preempts_bulk():
+    async def scenario():
+        limiter = DeploymentLimiter(tokens_per_minute=60000, max_concurrency=1, bulk_share=1.0)
+        order = []
+        held = await limiter.acquire(100, LANE_BULK)
+
+        async def request(name, lane):
+            reserved = await limiter.acquire(100, lane)
+            order.append(name)
+            await limiter.release(reserved)
+
+        tasks = [asyncio.ensure_future(request(f"bulk{i}", LANE_BULK)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request("interactive", LANE_INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        await limiter.release(held)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert run_sync(scenario()) == ["interactive", "bulk0", "bulk1", "bulk2"]
+
+def test_bulk_lane_leaves_slots_for_interactive():
+    async def scenario():
+        limiter = DeploymentLimiter(tokens_per_minute=60000, max_concurrency=4, bulk_share=0.5)
+        await limiter.acquire(1, LANE_BULK)
+        await limiter.acquire(1, LANE_BULK)
+        blocked = asyncio.ensure_future(limiter.acquire(1, LANE_BULK))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        await asyncio.wait_for(limiter.acquire(1, LANE_INTERACTIVE), timeout=1)
+        blocked.cancel()
+        return limiter.snapshot()
+
+    assert run_sync(scenario())["in_flight"] == 3
+
+def test_token_bucket_waits_for_refill():
+    async def scenario():
+        # 분당 600토큰 = 초당 10토큰
+        limiter = DeploymentLimiter(tokens_per_minute=600, max_concurrency=4)
+        await limiter.acquire(600)
+        started = time.monotonic()
+        await limiter.acquire(3)
+        return time.monotonic() - started
+
+    assert 0.2 <= run_sync(scenario()) < 1.0
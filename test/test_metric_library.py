@@ -0,0 +1,109 @@
+"""
+메트릭 라이브러리 테스트 (척도 유형별 유사 질문 조회, 재사용/보정/새로 생성, 절약 시간, 저장 행)
+"""
+import json
+import re
+
+import numpy as np
+
+import metric_library
+import metric_pipeline
+from async_core import run_sync
+from metric_library import REUSE_ADAPTED, REUSE_EXACT, MetricLibrary, reuse_mode, reuse_summary
+from step_performance import STEP_METRIC_REUSE, metric_step_rows
+
+VOCABULARY = ["기능", "모두", "제공", "응답", "속도", "보안", "암호화", "시스템"]
+
+SCALES = [
+    {"scale_order": 5, "scale": "매우 그렇다", "description": "모든 기능이 제공된다."},
+    {"scale_order": 1, "scale": "매우 그렇지 않다", "description": "기능이 거의 없다."},
+]
+
+def fake_embed(texts):
+    return [np.array([1.0 if word in text else 0.0 for word in VOCABULARY] + [0.1], dtype=np.float32) for text in texts]
+
+def library_row(survey_id, text, wall_ms=4000):
+    return {"survey_id": survey_id, "question_text": text, "quality_attribute": "기능 적합성",
+            "scale_interpretations": SCALES, "wall_ms": wall_ms}
+
+def test_match_by_scale_type_and_exclude_own_survey():
+    rows = {"likert_5": [library_row(1, "시스템이 필요한 기능을 모두 제공합니까?")]}
+    loads = []
+
+    def load_rows(scale_type):
+        loads.append(scale_type)
+        return rows.get(scale_type, [])
+
+    library = MetricLibrary(load_rows=load_rows, version=lambda scale_type: 1, embed=fake_embed, similarity=0.95)
+    questions = [(10, 1, "기능 적합성", "시스템은 필요한 기능을 모두 제공합니까?"), (11, 2, "보안성", "데이터가 암호화됩니까?")]
+
+    matches = library.match(questions, "likert_5")
+    assert list(matches) == [1] and matches[1]["similarity"] > 0.95
+    assert library.match(questions, "numeric_100") == {}
+    assert library.match(questions, "likert_5", exclude_survey_id=1) == {}
+    # 버전이 그대로면 다시 읽지 않음
+    assert loads == ["likert_5", "numeric_100"]
+
+def test_reuse_mode_adapts_below_threshold():
+    assert reuse_mode(0.99, adapt=True, adapt_below=0.98) == REUSE_EXACT
+    assert reuse_mode(0.95, adapt=True, adapt_below=0.98) == REUSE_ADAPTED
+    assert reuse_mode(0.95, adapt=False, adapt_below=0.98) == REUSE_EXACT
+
+def test_pipeline_reuses_adapts_and_generates(monkeypatch):
+    matches = {
+        1: {"row": library_row(1, "시스템이 필요한 기능을 모두 제공합니까?"), "similarity": 0.99},
+        2: {"row": library_row(1, "응답 속도가 빠릅니까?", wall_ms=None), "similarity": 0.95},
+        3: {"row": library_row(1, "데이터가 암호화됩니까?"), "similarity": 0.93},
+    }
+    calls = []
+
+    async def fake_routed_chat(step, caller, messages, lane=None):
+        calls.append(step)
+        if step == "metric_adapt":
+            # Q2 보정은 성공, Q3 보정은 잘못된 응답 → 새로 생성
+            if "Q2." in messages[1]["content"]:
+                return json.dumps({"question_order": 2, "quality_attribute": "성능 효율성", "question_text": "응답이 빠릅니까?",
+                                   "scale_interpretations": [{"scale_order": 5, "scale": "매우 그렇다", "description": "매우 빠르다."}]})
+            return "보정할 수 없습니다"
+        order = int(re.search(r"Q(\d+)\.", messages[1]["content"]).group(1))
+        return json.dumps({"question_order": order, "quality_attribute": "신뢰성", "question_text": "질문",
+                           "scale_interpretations": SCALES})
+
+    monkeypatch.setattr(metric_pipeline, "find_reusable_metrics", lambda questions, scale_type, exclude: matches)
+    monkeypatch.setattr(metric_pipeline, "routed_chat", fake_routed_chat)
+    monkeypatch.setattr(metric_pipeline, "reuse_mode", lambda similarity: reuse_mode(similarity, True, 0.98))
+
+    questions = [
+        (10, 1, "기능 적합성", "시스템이 필요한 기능을 모두 제공합니까?"),
+        (11, 2, "성능 효율성", "응답이 빠릅니까?"),
+        (12, 3, "보안성", "데이터가 암호화되어 저장됩니까?"),
+        (13, 4, "신뢰성", "장애가 드뭅니까?"),
+    ]
+    metrics, failed, performance = run_sync(metric_pipeline.run_metric_pipeline(questions, "likert_5"))
+
+    assert not failed and [m["question_order"] for m in metrics] == [1, 2, 3, 4]
+    # 재사용한 메트릭은 새 질문의 순서/품질 속성/문장을 사용
+    assert metrics[0]["question_text"] == "시스템이 필요한 기능을 모두 제공합니까?"
+    assert metrics[0]["scale_interpretations"] == SCALES
+    assert metrics[1]["scale_interpretations"][0]["description"] == "매우 빠르다."
+    assert sorted(calls) == ["metric", "metric", "metric_adapt", "metric_adapt"]
+
+    assert performance[1]["reuse"] == REUSE_EXACT and performance[1]["saved_ms"] > 0
+    assert performance[2]["reuse"] == REUSE_ADAPTED
+    assert "reuse" not in performance[3] and "reuse" not in performance[4]
+    assert reuse_summary(performance) == {
+        "questions": 4, "reused": 2, "adapted": 1, "reuse_rate": 0.5,
+        "saved_ms": performance[1]["saved_ms"] + performance[2]["saved_ms"],
+    }
+
+    rows = metric_step_rows(7, performance)
+    assert [row[2] for row in rows] == [STEP_METRIC_REUSE, STEP_METRIC_REUSE, "metric", "metric"]
+
+def test_library_failure_generates_everything(monkeypatch):
+    def broken_library():
+        raise RuntimeError("DB 연결 실패")
+
+    monkeypatch.setattr(metric_library, "get_metric_library", broken_library)
+    monkeypatch.setattr(metric_library, "METRIC_LIBRARY_ENABLED", True)
+
+    assert metric_library.find_reusable_metrics([(1, 1, "보안성", "질문")], "likert_5") == {}
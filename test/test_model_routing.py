@@ -0,0 +1,50 @@
+"""
+단계별 모델 라우팅 테스트 (설정 파일 덮어쓰기, SLO 초과 시 fallback, 비용 보고)
+"""
+import json
+from types import SimpleNamespace
+
+import model_routing
+from model_routing import ModelRouter, load_routes
+
+def test_routing_file_overrides_step_settings(tmp_path):
+    path = tmp_path / "model_routing.json"
+    path.write_text(json.dumps({"step4_validation": {"deployment": "small", "max_tokens": 300}}), encoding="utf-8")
+
+    routes = load_routes(str(path))
+
+    assert routes["step4_validation"]["deployment"] == "small"
+    assert routes["step4_validation"]["max_tokens"] == 300
+    assert routes["step4_validation"]["temperature"] == 0.3
+    assert routes["step3_questions"]["temperature"] == 0.7
+
+def test_falls_back_when_p95_exceeds_slo(monkeypatch):
+    monkeypatch.setattr(model_routing, "ROUTING_PROBE_INTERVAL", 4)
+    router = ModelRouter({"step4": {"deployment": "large", "fallback": "small", "slo_p95": 1.0}})
+
+    for _ in range(5):
+        router.record("step4", "large", 0.5)
+    assert router.choose("step4") == "large"
+
+    for _ in range(5):
+        router.record("step4", "large", 3.0)
+    chosen = [router.choose("step4") for _ in range(8)]
+
+    # 4번에 한 번은 기본 배포로 회복 여부 확인
+    assert chosen.count("large") == 2
+    assert chosen.count("small") == 6
+
+def test_report_includes_latency_and_cost(monkeypatch):
+    monkeypatch.setattr(model_routing, "MODEL_PRICES", {"small": {"input": 1.0, "output": 4.0}})
+    router = ModelRouter({"metric": {"deployment": "large", "fallback": "small", "slo_p95": 1.0}})
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+
+    router.record("metric", "small", 0.4, usage)
+    router.record("metric", "small", 0.6, usage)
+
+    [row] = router.report()
+    assert row["deployment"] == "small"
+    assert row["fallback"] is True
+    assert row["calls"] == 2
+    assert row["p95_s"] == 0.6
+    assert row["cost"] == round(2 * (1000 * 1.0 + 500 * 4.0) / 1_000_000, 6)
@@ -0,0 +1,61 @@
+"""
+RAG 데이터 구성 화면 테스트 (Streamlit AppTest, Search 자격 증명 없이 로컬 벡터 저장소로 인덱싱)
+"""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import azure.storage.blob
+import data.build_cache
+import embedding_cache
+import openai_client
+import vector_store
+
+PAGE_PATH = os.path.join(os.path.dirname(__file__), "..", "iso25010_rag.py")
+
+DOCUMENT = "ISO 25010 기능 적합성은 요구된 기능을 제공하는 정도입니다. " * 10
+
+class FakeContainer:
+    def list_blobs(self):
+        return [SimpleNamespace(name="iso25010.txt")]
+
+    def download_blob(self, name):
+        return SimpleNamespace(readall=lambda: DOCUMENT.encode("utf-8"))
+
+class FakeBlobService:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def create_container(self, name):
+        pass
+
+    def get_container_client(self, name):
+        return FakeContainer()
+
+class FakeStats:
+    def stats(self):
+        return {"hit_rate": 0.0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_entries": 0}
+
+def test_local_backend_indexes_without_search_credentials(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_BACKEND", "local")
+    monkeypatch.delenv("AZURE_SEARCH_API_KEY", raising=False)
+    monkeypatch.delenv("AZURE_SEARCH_ENDPOINT", raising=False)
+    monkeypatch.setattr(azure.storage.blob, "BlobServiceClient", FakeBlobService)
+    monkeypatch.setattr(vector_store, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    cache_file = str(tmp_path / "build_cache.json")
+    load_cache, save_cache = data.build_cache.load_cache, data.build_cache.save_cache
+    monkeypatch.setattr(data.build_cache, "load_cache", lambda path=cache_file: load_cache(path))
+    monkeypatch.setattr(data.build_cache, "save_cache", lambda cache, path=cache_file: save_cache(cache, path))
+    monkeypatch.setattr(openai_client, "client_for", lambda call_type: None)
+    monkeypatch.setattr(embedding_cache, "embed_texts_cached",
+                        lambda client, texts, **kwargs: [np.ones(vector_store.EMBEDDING_DIMENSIONS, dtype=np.float32) for _ in texts])
+    monkeypatch.setattr(embedding_cache, "get_embedding_cache", lambda *args, **kwargs: FakeStats())
+
+    app = AppTest.from_file(PAGE_PATH, default_timeout=30).run()
+    next(button for button in app.button if "인덱싱 시작" in button.label).click().run()
+
+    assert not app.exception
+    assert any("인덱싱 완료" in message.value for message in app.success)
+    assert vector_store.LocalVectorStore(str(tmp_path / "vectors")).count() == 1
@@ -0,0 +1,83 @@
+"""
+단계별 성능 기록 테스트 (게이트웨이 사용량 집계, 저장 행, 백분위 집계)
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+
+import llm_gateway
+from async_core import run_sync
+from llm_gateway import usage_scope, usage_summary
+from step_performance import metric_step_rows, percentile_table, size_bucket, survey_step_rows
+from survey_store import delete_metrics
+
+class FakeCompletions:
+    async def create(self, model, messages, **kwargs):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=7, completion_tokens=3, total_tokens=10)
+        )
+
+def test_usage_scope_collects_calls_from_child_tasks(monkeypatch):
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(llm_gateway, "async_client_for", lambda call_type: fake_client)
+
+    async def step():
+        with usage_scope() as usage:
+            await asyncio.gather(*[
+                llm_gateway.chat("test.scope", [{"role": "user", "content": f"질문 {i}"}], model="small")
+                for i in range(3)
+            ])
+        return usage
+
+    summary = usage_summary(run_sync(step()), 1.5)
+    assert summary["llm_calls"] == 3
+    assert summary["prompt_tokens"] == 21
+    assert summary["completion_tokens"] == 9
+    assert summary["model"] == "small"
+    assert summary["wall_ms"] == 1500
+
+def test_rows_follow_insert_column_order():
+    perf = {"model": "m", "llm_calls": 1, "wall_ms": 100, "queue_ms": 5, "prompt_tokens": 10, "completion_tokens": 4}
+
+    assert survey_step_rows(7, {"step1_domain": perf}) == [(7, "survey", "step1_domain", None, "m", 1, 100, 5, 10, 4)]
+    assert metric_step_rows(7, {2: perf, 1: perf})[0][:4] == (7, "metric", "metric", 1)
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+        self.rowcount = 3
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+
+def test_delete_metrics_also_deletes_metric_performance():
+    cur = RecordingCursor()
+
+    assert delete_metrics(cur, 7) == 3
+    # 다시 저장할 때 이전 메트릭 생성 기록이 중복 집계되지 않도록 같은 트랜잭션에서 삭제
+    assert cur.statements == [
+        ("DELETE FROM metrics WHERE survey_id = %s", (7,)),
+        ("DELETE FROM step_performance WHERE survey_id = %s AND stage = %s", (7, "metric")),
+    ]
+
+def test_percentile_table_by_step():
+    df = pd.DataFrame({
+        "step_name": ["a"] * 10 + ["b"] * 2,
+        "wall_ms": list(range(1, 11)) + [100, 200],
+        "prompt_tokens": [10] * 12,
+        "completion_tokens": [0] * 12,
+    })
+
+    table = percentile_table(df, ["step_name"]).set_index("step_name")
+    assert table.loc["a", "count"] == 10
+    assert table.loc["a", "p50"] == 5.5
+    assert table.loc["b", "p95"] == 195
+    assert table.loc["b", "avg_tokens"] == 10
+
+def test_size_bucket():
+    assert size_bucket(10) == "~10문항"
+    assert size_bucket(25) == "21~30문항"
+    assert size_bucket(None) == "미지정"
@@ -0,0 +1,139 @@
+"""
+3단계 분할 생성 테스트 (품질 속성별 문항 배분, 병합 중복 제거, 분할 동시 실행)
+"""
+import asyncio
+import re
+
+import survey_pipeline
+from survey_pipeline import (
+    ISO_QUALITY_ATTRIBUTES,
+    dedupe_questions,
+    extract_main_quality_attributes,
+    generate_questions_sharded,
+    requested_question_count,
+    split_question_counts,
+    use_sharding,
+)
+
+QUALITY_SELECTION = """**주요 품질 속성 (우선순위 순):**
+1. 보안성 - 결제 정보 보호
+2. 성능 효율성 - 대량 트래픽 처리
+"""
+
+def test_split_weights_main_attributes_and_keeps_total():
+    counts = split_question_counts(50, ["보안성", "성능효율성"])
+
+    assert sum(counts.values()) == 50
+    assert set(counts) == set(ISO_QUALITY_ATTRIBUTES)
+    assert counts["보안성"] > counts["호환성"]
+    assert counts["성능 효율성"] > counts["유연성"]
+
+def test_split_prefers_main_attributes_when_fewer_questions_than_attributes():
+    counts = split_question_counts(3, ["유연성"])
+
+    assert sum(counts.values()) == 3
+    assert "유연성" in counts
+
+def test_requested_question_count():
+    assert requested_question_count({"설문 문항 수": "60개"}) == 60
+    assert requested_question_count({"설문 문항 수": "자동 설정"}) == 0
+    assert use_sharding(60, threshold=40) and not use_sharding(0, threshold=40)
+    assert not use_sharding(60, threshold=0)
+
+def test_extract_main_quality_attributes():
+    assert extract_main_quality_attributes(QUALITY_SELECTION) == ["보안성", "성능 효율성"]
+
+def test_dedupe_removes_exact_and_near_duplicates():
+    merged = dedupe_questions([
+        ("보안성", "개인정보가 안전하게 보호된다고 느끼십니까?"),
+        ("신뢰성", "개인정보가 안전하게 보호된다고 느끼십니까 ?"),
+        ("보안성", "개인 정보가 안전하게 보호되고 있다고 느끼십니까?"),
+        ("신뢰성", "장애 후 서비스가 빠르게 복구됩니까?"),
+    ])
+
+    assert merged == [
+        ("보안성", "개인정보가 안전하게 보호된다고 느끼십니까?"),
+        ("신뢰성", "장애 후 서비스가 빠르게 복구됩니까?"),
+    ]
+
+def test_shards_run_concurrently_and_merge(monkeypatch):
+    running = []
+    peak = []
+
+    async def fake_search(query, top_k=5, progress=None):
+        return ""
+
+    async def fake_chat(step, system_prompt, user_prompt):
+        attribute, count = re.search(r"\[(.+?)\] 품질 속성에 대한 설문조사 질문을 정확히 (\d+)개", user_prompt).groups()
+        running.append(attribute)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(attribute)
+        # 속성명을 잘못 붙인 줄과 요청보다 많은 줄도 섞어서 반환
+        lines = [f"[기타] {attribute} {str(i) * 12}" for i in range(int(count) + 2)]
+        return "\n".join(lines)
+
+    monkeypatch.setattr(survey_pipeline, "search_appropriate_quality_attribute", fake_search)
+    monkeypatch.setattr(survey_pipeline, "chat", fake_chat)
+
+    progress = survey_pipeline.new_progress()
+    text, shard_counts = asyncio.run(
+        generate_questions_sharded("분석", QUALITY_SELECTION, "정보", 40, progress, concurrency=8)
+    )
+
+    questions = survey_pipeline.parse_questions_for_validation(text)
+    assert len(shard_counts) == len(ISO_QUALITY_ATTRIBUTES)
+    assert max(peak) == len(ISO_QUALITY_ATTRIBUTES)
+    assert progress["done"] == progress["total"] == len(shard_counts)
+    assert len(questions) <= 40
+    assert {q["original_quality_attr"] for q in questions} == set(shard_counts)
+
+def _fake_search(monkeypatch):
+    async def fake_search(query, top_k=5, progress=None):
+        return ""
+
+    monkeypatch.setattr(survey_pipeline, "search_appropriate_quality_attribute", fake_search)
+
+def test_shortfall_is_refilled_for_affected_attributes(monkeypatch):
+    _fake_search(monkeypatch)
+    prompts = []
+
+    async def fake_chat(step, system_prompt, user_prompt):
+        attribute, count = re.search(r"\[(.+?)\] 품질 속성에 대한 설문조사 질문을 정확히 (\d+)개", user_prompt).groups()
+        prompts.append((attribute, user_prompt))
+        if attribute == "보안성" and "이미 생성된 질문" not in user_prompt:
+            # 첫 응답은 같은 질문만 반복 → 중복 제거 후 1개
+            return "\n".join(f"[보안성] 데이터가 암호화되어 저장됩니까?" for _ in range(int(count)))
+        return "\n".join(f"[{attribute}] {attribute} 질문 {str(i) * 12}" for i in range(int(count)))
+
+    monkeypatch.setattr(survey_pipeline, "chat", fake_chat)
+
+    progress = survey_pipeline.new_progress()
+    text, shard_counts = asyncio.run(generate_questions_sharded("분석", QUALITY_SELECTION, "정보", 40, progress))
+
+    questions = survey_pipeline.parse_questions_for_validation(text)
+    assert len(questions) == 40
+    assert sum(q["original_quality_attr"] == "보안성" for q in questions) == shard_counts["보안성"]
+    # 부족한 품질 속성만 다시 요청, 기존 질문은 중복 금지 목록으로 전달
+    retries = [prompt for attribute, prompt in prompts if "이미 생성된 질문" in prompt]
+    assert len(retries) == 1 and "데이터가 암호화되어 저장됩니까?" in retries[0]
+    assert progress["done"] == progress["total"] == len(shard_counts) + 1
+    assert progress["warnings"] == []
+
+def test_shortfall_after_retries_adds_warning(monkeypatch):
+    _fake_search(monkeypatch)
+
+    async def fake_chat(step, system_prompt, user_prompt):
+        attribute, count = re.search(r"\[(.+?)\] 품질 속성에 대한 설문조사 질문을 정확히 (\d+)개", user_prompt).groups()
+        # 항상 요청보다 1개 적게 반환 (재요청해도 같은 질문)
+        return "\n".join(f"[{attribute}] {attribute} 질문 {str(i) * 12}" for i in range(int(count) - 1))
+
+    monkeypatch.setattr(survey_pipeline, "chat", fake_chat)
+
+    progress = survey_pipeline.new_progress()
+    text, shard_counts = asyncio.run(generate_questions_sharded("분석", QUALITY_SELECTION, "정보", 40, progress))
+
+    questions = survey_pipeline.parse_questions_for_validation(text)
+    assert len(questions) < 40
+    assert len(progress["warnings"]) == 1
+    assert f"요청 40개 중 {len(questions)}개" in progress["warnings"][0]
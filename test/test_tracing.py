@@ -0,0 +1,108 @@
+"""
+실행 추적 테스트 (부모-자식 연결, 비동기 루프로 전달, OTLP 변환, 실행별 묶기)
+"""
+import asyncio
+
+import pytest
+
+import tracing
+from async_core import gather_limited, run_sync
+from tracing import group_runs, recent_spans, span, to_otlp
+
+@pytest.fixture(autouse=True)
+def no_export(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_EXPORTER", "none")
+
+def spans_of(trace_id):
+    return {r["name"]: r for r in recent_spans() if r["trace_id"] == trace_id}
+
+def test_nested_spans_share_trace_and_parent():
+    with span("page.test", kind="run") as root:
+        with span("db.query", kind="db") as query:
+            query.set(rows=3)
+
+    records = spans_of(root.trace_id)
+    assert records["db.query"]["parent_id"] == root.span_id
+    assert records["db.query"]["attrs"]["rows"] == 3
+    assert records["page.test"]["parent_id"] is None
+
+def test_spans_follow_run_sync_into_async_tasks():
+    async def call(i):
+        with span("llm.chat", kind="llm", index=i):
+            await asyncio.sleep(0.01)
+
+    async def pipeline():
+        with span("survey.step4", kind="step"):
+            await gather_limited([call(i) for i in range(3)], 2)
+
+    with span("page.survey", kind="run") as root:
+        run_sync(pipeline())
+
+    records = [r for r in recent_spans() if r["trace_id"] == root.trace_id]
+    step = next(r for r in records if r["name"] == "survey.step4")
+    calls = [r for r in records if r["name"] == "llm.chat"]
+    assert step["parent_id"] == root.span_id
+    assert len(calls) == 3
+    assert all(r["parent_id"] == step["span_id"] for r in calls)
+
+def test_error_status_and_otlp_export():
+    with pytest.raises(ValueError):
+        with span("search.rag", kind="search", top=3) as failed:
+            raise ValueError("boom")
+
+    [record] = [r for r in recent_spans() if r["span_id"] == failed.span_id]
+    assert record["status"] == "error"
+
+    payload = to_otlp([record])
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == record["trace_id"]
+    assert otlp_span["status"]["code"] == 2
+    assert {"key": "top", "value": {"intValue": "3"}} in otlp_span["attributes"]
+
+def test_group_runs_orders_latest_first():
+    with span("page.first", kind="run"):
+        pass
+    with span("page.second", kind="run") as second:
+        with span("db.query", kind="db"):
+            pass
+
+    runs = group_runs(recent_spans())
+    assert runs[0]["trace_id"] == second.trace_id
+    assert runs[0]["name"] == "page.second"
+    assert len(runs[0]["spans"]) == 2
+
+def test_idle_root_queries_are_not_exported(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "TRACE_EXPORTER", "jsonl")
+    monkeypatch.setattr(tracing, "_ensure_exporter", lambda: None)
+    monkeypatch.setattr(tracing._export_queue, "put", exported.append)
+
+    with span("db.query", kind="db"):
+        pass
+    with pytest.raises(RuntimeError):
+        with span("db.query", kind="db"):
+            raise RuntimeError("연결 끊김")
+    with span("page.test", kind="run"):
+        with span("db.query", kind="db"):
+            pass
+
+    assert [(r["name"], r["status"]) for r in exported] == [("db.query", "error"), ("db.query", "ok"), ("page.test", "ok")]
+
+def test_jsonl_rotates_and_loads_only_the_tail(monkeypatch, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(path))
+    monkeypatch.setattr(tracing, "TRACE_FILE_MAX_MB", 1 / 1024)  # 1KB
+
+    records = [{"trace_id": f"t{i}", "span_id": f"s{i}", "padding": "x" * 200} for i in range(12)]
+    for record in records:
+        tracing.export([record], exporter="jsonl")
+
+    assert (tmp_path / "traces.jsonl.1").exists()
+    assert path.stat().st_size < 1024 + 300
+    current = tracing.load_spans(str(path), max_mb=0)
+    assert current[-1]["span_id"] == "s11"
+
+    # 끝부분만 읽을 때 잘린 첫 줄은 버리고 온전한 줄만 반환
+    tail = tracing.load_spans(str(path), max_mb=500 / (1024 * 1024))
+    assert 0 < len(tail) < len(current)
+    assert [r["span_id"] for r in tail] == [r["span_id"] for r in current[-len(tail):]]
@@ -0,0 +1,24 @@
+"""
+HNSW 튜닝 테스트 (로컬 대체 구현 사용)
+"""
+import numpy as np
+
+from embeddings import normalize
+from data import tune_hnsw
+from data.create_index import load_hnsw_parameters
+from data.local_search import LocalSearchIndexClient
+
+def test_sweep_recall_and_written_config(tmp_path):
+    rng = np.random.default_rng(0)
+    docs = normalize(rng.normal(size=(300, 16)))
+    queries = normalize(rng.normal(size=(10, 16)))
+
+    rows = tune_hnsw.sweep(LocalSearchIndexClient(), docs, queries, 5, [8], [100], [10, 200])
+    assert rows[1]["recall"] >= rows[0]["recall"]
+    assert rows[1]["recall"] >= 0.95
+
+    path = tmp_path / "hnsw_config.json"
+    assert tune_hnsw.choose(rows, 0.95)["recall"] >= 0.95
+    tune_hnsw.write_config(rows[1], 5, path=str(path))
+    params = load_hnsw_parameters(str(path))
+    assert (params.m, params.ef_construction, params.ef_search) == (8, 100, 200)
@@ -0,0 +1,57 @@
+"""
+로컬 memmap 벡터 저장소 테스트 (추가 / 검색 / 툼스톤 삭제 / 압축)
+"""
+import numpy as np
+
+from vector_store import LocalVectorStore, LocalVectorSearchClient
+
+def make_docs(vectors, prefix="doc"):
+    return [
+        {"id": f"{prefix}{i}", "content": f"내용 {i}", "source": f"{prefix}.txt", "embedding": v.tolist()}
+        for i, v in enumerate(vectors)
+    ]
+
+def test_exact_search_delete_and_compact(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    store = LocalVectorStore(str(tmp_path), dimensions=8, quantization="none")
+    store.add(make_docs(vectors[:10]))
+    store.add(make_docs(vectors[10:], prefix="more"))
+
+    hits = store.search(vectors[3], k=3)
+    assert hits[0]["id"] == "doc3"
+    assert set(hits[0]) >= {"content", "source"}
+
+    store.delete(["doc3"])
+    assert "doc3" not in [h["id"] for h in store.search(vectors[3], k=3)]
+
+    # 같은 id를 다시 추가하면 최신 행만 유효
+    store.add(make_docs(vectors[5:6] * -1)[:1])
+    assert store.count() == 19
+
+    assert store.compact() == 19
+    reopened = LocalVectorStore(str(tmp_path), dimensions=8, quantization="none")
+    assert reopened.stats() == {"segments": 1, "rows": 19, "alive": 19, "tombstoned": 0}
+    assert reopened.search(vectors[12], k=1)[0]["id"] == "more2"
+
+def test_delete_removes_superseded_rows_too(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimensions=2, quantization="none")
+    store.add([{"id": "a", "content": "old", "source": "a.txt", "embedding": [1.0, 0.0]}])
+    store.add([{"id": "a", "content": "new", "source": "a.txt", "embedding": [0.0, 1.0]}])
+
+    assert store.delete(["a"]) == 1
+    # 삭제된 최신 행 대신 이전 행이 다시 살아나지 않음
+    assert store.count() == 0
+    assert store.search(np.array([1.0, 0.0], dtype=np.float32), k=1) == []
+    assert LocalVectorStore(str(tmp_path), dimensions=2, quantization="none").count() == 0
+
+def test_search_client_with_quantization(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    client = LocalVectorSearchClient(LocalVectorStore(str(tmp_path), dimensions=16, quantization="int8"))
+    client.upload_documents(make_docs(vectors))
+
+    results = client.search(search_text=None, select=["content", "source"],
+                            vector_queries=[{"kind": "vector", "vector": vectors[7].tolist(), "fields": "embedding", "k": 3}])
+    assert results[0]["content"] == "내용 7"
+    assert client.get_document_count() == 50
@@ -0,0 +1,135 @@
+"""
+생성 작업 worker 테스트 (heartbeat 주기, lease 상실 시 실행 취소, 결과/실패 기록, DB 재연결, 진행 상황 복사)
+"""
+import asyncio
+import threading
+
+import psycopg2
+import pytest
+
+import worker
+from worker import Heartbeat, LeaseLost
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_heartbeat_sends_once_per_interval():
+    clock = FakeClock()
+    sent = []
+    beat = Heartbeat(lambda progress, partial: sent.append((progress, partial)) or True, interval=5, clock=clock)
+
+    beat(lambda: ({"done": 1}, None))
+    clock.now = 5
+    beat(lambda: ({"done": 2}, None))
+    clock.now = 7
+    beat(lambda: ({"done": 3}, None))
+
+    assert sent == [({"done": 2}, None)]
+
+def test_lost_lease_cancels_running_pipeline(monkeypatch):
+    cancelled = threading.Event()
+
+    async def slow_pipeline(input_info, state, progress):
+        state["domain_analysis"] = "1단계 결과"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(worker, "run_survey_pipeline", slow_pipeline)
+    sent = []
+
+    def send(progress, partial):
+        sent.append(partial)
+        return False
+
+    with pytest.raises(LeaseLost):
+        worker.run_survey_job({"project": {"software_description": "쇼핑몰"}}, Heartbeat(send, interval=0))
+
+    assert sent[0] == {"domain_analysis": "1단계 결과"}
+    # 취소는 백그라운드 루프에서 비동기로 전달됨
+    assert cancelled.wait(timeout=2)
+
+class FakeConnection:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        self.closed = True
+
+def test_process_job_records_result_or_failure(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(worker, "complete_job", lambda cur, job_id, worker_id, result, progress: recorded.append(("ok", job_id, result)) or True)
+    monkeypatch.setattr(worker, "fail_job", lambda cur, job_id, worker_id, error: recorded.append(("fail", job_id, error)) or "queued")
+
+    def failing(payload, on_tick):
+        raise ValueError("파싱 실패")
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "survey", lambda payload, on_tick: ({"final_questions": "q"}, {"message": ""}))
+    monkeypatch.setitem(worker.JOB_HANDLERS, "metric", failing)
+
+    worker.process_job(FakeConnection(), {"id": 1, "job_type": "survey", "payload": {}, "attempts": 1}, "w1")
+    worker.process_job(FakeConnection(), {"id": 2, "job_type": "metric", "payload": {}, "attempts": 1}, "w1")
+
+    assert recorded == [("ok", 1, {"final_questions": "q"}), ("fail", 2, "ValueError: 파싱 실패")]
+
+class DroppedConnection(FakeConnection):
+    """모든 쿼리에서 연결 끊김 오류"""
+
+    def __init__(self):
+        self.closed = False
+
+    def execute(self, *args):
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+def test_failure_on_dropped_connection_propagates_without_recording(monkeypatch):
+    def failing(payload, on_tick):
+        raise psycopg2.OperationalError("heartbeat 실패")
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "metric", failing)
+    monkeypatch.setattr(worker, "fail_job", lambda cur, job_id, worker_id, error: cur.execute("UPDATE"))
+
+    with pytest.raises(psycopg2.OperationalError):
+        worker.process_job(DroppedConnection(), {"id": 3, "job_type": "metric", "payload": {}, "attempts": 1}, "w1")
+
+def test_worker_reconnects_after_dropped_connection(monkeypatch):
+    dropped = DroppedConnection()
+    connections = [dropped, FakeConnection()]
+    monkeypatch.setattr(worker, "get_connection", lambda: connections.pop(0))
+    monkeypatch.setattr(worker, "WORKER_RECONNECT_DELAY", 0)
+    monkeypatch.setattr(worker, "expire_jobs", lambda cur: cur.execute("UPDATE") if cur is dropped else 0)
+    monkeypatch.setattr(worker, "claim_job", lambda cur, worker_id: None)
+
+    worker.run_worker("w1", once=True)
+
+    assert dropped.closed and connections == []
+
+def test_survey_snapshot_is_a_deep_copy(monkeypatch):
+    snapshots = []
+
+    async def pipeline(input_info, state, progress):
+        state["warnings"] = ["첫 경고"]
+        await asyncio.sleep(0.3)
+        state["warnings"].append("두 번째 경고")
+
+    monkeypatch.setattr(worker, "run_survey_pipeline", pipeline)
+
+    def on_tick(snapshot):
+        if not snapshots:
+            snapshots.append(snapshot())
+
+    state, _ = worker.run_survey_job({"project": {"software_description": "쇼핑몰"}}, on_tick)
+
+    assert snapshots[0][1] == {"warnings": ["첫 경고"]}
+    assert state["warnings"] == ["첫 경고", "두 번째 경고"]
@@ -0,0 +1,92 @@
+import time
+_page_started = time.perf_counter()
+
+from datetime import datetime
+import altair as alt
+import pandas as pd
+import streamlit as st
+from startup_timing import record_timing
+from tracing import TRACE_EXPORTER, TRACE_FILE, TRACE_LOAD_MAX_MB, recent_spans, load_spans, group_runs
+
+PAGE = "trace_admin"
+record_timing(PAGE, "import", time.perf_counter() - _page_started)
+
+# 실행 목록에 표시할 최대 실행 수
+MAX_RUNS = 50
+
+# span 종류별 색상
+KIND_COLORS = {
+    "run": "#9e9e9e",
+    "step": "#4c78a8",
+    "llm": "#f58518",
+    "search": "#54a24b",
+    "embedding": "#b279a2",
+    "db": "#e45756",
+    "internal": "#bab0ac",
+}
+
+st.title("🔍 실행 추적")
+st.caption(f"내보내기: `{TRACE_EXPORTER}`" + (f" → `{TRACE_FILE}`" if TRACE_EXPORTER == "jsonl" else ""))
+
+source = st.radio("span 출처", ["메모리 (현재 프로세스)", "JSONL 파일"], horizontal=True)
+spans = recent_spans() if source.startswith("메모리") else load_spans()
+if not source.startswith("메모리") and TRACE_LOAD_MAX_MB > 0:
+    st.caption(f"파일 끝부분 {TRACE_LOAD_MAX_MB:g}MB 만 읽습니다 (TRACE_LOAD_MAX_MB).")
+show_trivial = st.checkbox("span이 1개뿐인 실행도 표시 (화면 재실행 등)", value=False)
+
+runs = [run for run in group_runs(spans) if show_trivial or len(run["spans"]) > 1][:MAX_RUNS]
+if not runs:
+    st.info("기록된 실행이 없습니다.")
+    st.stop()
+
+def run_label(run):
+    started = datetime.fromtimestamp(run["start"]).strftime("%m-%d %H:%M:%S")
+    return f"{started} · {run['name']} · {run['duration']:.2f}초 · span {len(run['spans'])}개"
+
+run = st.selectbox("실행 선택", runs, format_func=run_label)
+
+# --- 종류별 소요 시간 요약 ---
+rows = []
+for record in run["spans"]:
+    rows.append({
+        "name": record["name"],
+        "kind": record["kind"],
+        "status": record["status"],
+        "offset_s": record["start"] - run["start"],
+        "end_s": record["start"] - run["start"] + (record["duration"] or 0),
+        "duration_s": record["duration"] or 0,
+        "span_id": record["span_id"],
+        "parent_id": record["parent_id"],
+        "tokens": record["attrs"].get("prompt_tokens", 0) + record["attrs"].get("completion_tokens", 0),
+        "rows": record["attrs"].get("rows"),
+        "attrs": record["attrs"],
+    })
+df = pd.DataFrame(rows)
+
+summary = df[df["kind"] != "run"].groupby("kind").agg(
+    spans=("span_id", "count"), total_s=("duration_s", "sum"), tokens=("tokens", "sum")
+).reset_index()
+cols = st.columns(len(summary) or 1)
+for col, item in zip(cols, summary.itertuples()):
+    col.metric(item.kind, f"{item.total_s:.2f}초", f"{item.spans}개", delta_color="off")
+
+# --- waterfall (시작 순서대로 한 줄씩) ---
+df["label"] = [f"{i:03d} {name}" for i, name in enumerate(df["name"])]
+chart = alt.Chart(df).mark_bar().encode(
+    x=alt.X("offset_s:Q", title="실행 시작 후 경과 (초)"),
+    x2="end_s:Q",
+    y=alt.Y("label:N", sort=None, title=None),
+    color=alt.Color(
+        "kind:N",
+        scale=alt.Scale(domain=list(KIND_COLORS), range=list(KIND_COLORS.values())),
+        title="종류"
+    ),
+    tooltip=["name", "kind", "status", alt.Tooltip("duration_s:Q", format=".3f"), "tokens", "rows"]
+).properties(height=max(200, 22 * len(df)))
+st.altair_chart(chart, use_container_width=True)
+
+with st.expander("📋 span 상세"):
+    st.dataframe(
+        df[["name", "kind", "status", "offset_s", "duration_s", "tokens", "rows", "attrs"]].assign(attrs=df["attrs"].astype(str)),
+        use_container_width=True
+    )
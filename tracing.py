@@ -0,0 +1,253 @@
+"""
+실행 추적 (span 기반 경량 트레이싱)
+- span(name, kind, **attrs): 컨텍스트 매니저 - 부모 span이 없으면 새 실행(trace)을 시작
+  contextvars로 부모를 전달하므로 async_core 루프의 코루틴에서도 같은 실행으로 이어짐
+- LLM / 검색 / 임베딩 / DB 쿼리 호출을 감싸 토큰 수, 행 수 등을 속성으로 기록
+- 내보내기: TRACE_EXPORTER = jsonl(기본, TRACE_FILE) | otlp(TRACE_OTLP_ENDPOINT, OTLP/HTTP JSON) | none
+  jsonl 파일은 TRACE_FILE_MAX_MB 를 넘으면 TRACE_FILE.1 로 교체하고, 읽을 때는 끝부분 TRACE_LOAD_MAX_MB 만 읽음
+  부모 없이 DB 쿼리 1개로 끝난 실행(워커/작업 대기 폴링 등)은 내보내지 않음 (오류는 내보냄, 메모리에는 보관)
+  완료된 span은 큐에 넣고 백그라운드 스레드가 묶어서 기록 (호출 경로에서 파일/네트워크 I/O 없음)
+- 최근 span은 메모리에도 보관 (관리자 페이지 실행별 waterfall)
+"""
+
+import os
+import json
+import time
+import queue
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "jsonl")  # jsonl | otlp | none
+TRACE_FILE = os.getenv("TRACE_FILE", "./data/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "survey-agent")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))
+# jsonl 파일 교체 크기 (MB, 0 이면 제한 없음) / 관리자 페이지에서 읽을 파일 끝부분 크기 (MB, 0 이면 전체)
+TRACE_FILE_MAX_MB = float(os.getenv("TRACE_FILE_MAX_MB", "20"))
+TRACE_LOAD_MAX_MB = float(os.getenv("TRACE_LOAD_MAX_MB", "5"))
+
+# DB 쿼리 속성에 남길 SQL 최대 길이
+_STATEMENT_CHARS = 200
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_recent = deque(maxlen=TRACE_BUFFER_SIZE)
+_recent_lock = threading.Lock()
+_export_queue = queue.Queue()
+_exporter_thread = None
+_exporter_lock = threading.Lock()
+
+class Span:
+    """진행 중인 span (set으로 속성 추가)"""
+
+    def __init__(self, name, kind, parent, attrs):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs)
+        self.status = "ok"
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+@contextmanager
+def span(name, kind="internal", **attrs):
+    """
+    span 기록
+
+    Args:
+        name: 단계/호출 이름 (예: "survey.step3", "llm.chat", "db.query")
+        kind: run | step | llm | search | embedding | db | internal
+    """
+    current = Span(name, kind, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.status = "error"
+        current.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    except BaseException:
+        # 취소 / Streamlit 스크립트 중단(재실행, 페이지 이동)
+        current.status = "cancelled"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current._started
+        _finish(current.to_dict())
+
+def record_span(name, kind, start, duration, status="ok", **attrs):
+    """
+    이미 끝난 구간을 현재 span의 자식으로 기록
+    (스트리밍 제너레이터처럼 with 블록으로 감쌀 수 없는 호출용)
+    """
+    finished = Span(name, kind, _current_span.get(), attrs)
+    finished.start = start
+    finished.duration = duration
+    finished.status = status
+    _finish(finished.to_dict())
+
+def current_trace_id():
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+def _is_idle_query(record):
+    """부모 없이 끝난 단독 DB 쿼리 (폴링 등, 오류가 아니면 내보내지 않음)"""
+    return record["kind"] == "db" and not record["parent_id"] and record["status"] == "ok"
+
+def _finish(record):
+    with _recent_lock:
+        _recent.append(record)
+    if TRACE_EXPORTER != "none" and not _is_idle_query(record):
+        _ensure_exporter()
+        _export_queue.put(record)
+
+def _ensure_exporter():
+    global _exporter_thread
+    if _exporter_thread is None:
+        with _exporter_lock:
+            if _exporter_thread is None:
+                _exporter_thread = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+                _exporter_thread.start()
+
+def _export_loop():
+    while True:
+        batch = [_export_queue.get()]
+        deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+        while time.monotonic() < deadline:
+            try:
+                batch.append(_export_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        try:
+            export(batch)
+        except Exception as e:
+            print(f"⚠️ 추적 내보내기 실패: {e}")
+
+def export(records, exporter=None):
+    """span 묶음 내보내기 (jsonl 파일 추가 또는 OTLP/HTTP 전송)"""
+    exporter = exporter or TRACE_EXPORTER
+    if exporter == "jsonl":
+        os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+        _rotate(TRACE_FILE)
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    elif exporter == "otlp":
+        httpx.post(TRACE_OTLP_ENDPOINT, json=to_otlp(records), timeout=10).raise_for_status()
+
+def _rotate(path, max_mb=None):
+    """파일이 max_mb 를 넘으면 path.1 로 교체 (이전 .1 은 삭제)"""
+    max_mb = TRACE_FILE_MAX_MB if max_mb is None else max_mb
+    if max_mb > 0 and os.path.exists(path) and os.path.getsize(path) >= max_mb * 1024 * 1024:
+        os.replace(path, f"{path}.1")
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(records):
+    """OTLP/HTTP JSON 형식 (resourceSpans) 변환"""
+    spans = []
+    for record in records:
+        start_ns = int(record["start"] * 1e9)
+        attributes = [{"key": "span.kind", "value": {"stringValue": record["kind"]}}]
+        attributes += [{"key": key, "value": _otlp_value(value)} for key, value in record["attrs"].items()]
+        otlp_span = {
+            "traceId": record["trace_id"],
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((record["duration"] or 0) * 1e9)),
+            "attributes": attributes,
+            "status": {"code": 2 if record["status"] == "error" else 1},
+        }
+        if record["parent_id"]:
+            otlp_span["parentSpanId"] = record["parent_id"]
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]
+    }
+
+def recent_spans():
+    """메모리에 보관된 최근 span"""
+    with _recent_lock:
+        return list(_recent)
+
+def load_spans(path=TRACE_FILE, max_mb=None):
+    """JSONL 파일 끝부분 max_mb 의 span (파일이 없으면 빈 목록, 잘린 첫 줄은 버림)"""
+    if not os.path.exists(path):
+        return []
+    max_mb = TRACE_LOAD_MAX_MB if max_mb is None else max_mb
+    max_bytes = int(max_mb * 1024 * 1024)
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        offset = max(0, size - max_bytes) if max_bytes > 0 else 0
+        # 한 바이트 앞에서 읽고 첫 줄바꿈까지 버림 (offset 이 줄 경계면 빈 줄만 버려짐)
+        f.seek(offset - 1 if offset else 0)
+        data = f.read()
+    if offset:
+        data = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+def group_runs(spans):
+    """
+    span을 실행(trace)별로 묶기
+
+    Returns:
+        최신 실행부터 [{"trace_id", "name", "start", "duration", "spans"}]
+        (name/duration은 부모가 없는 루트 span 기준)
+    """
+    traces = {}
+    for record in spans:
+        traces.setdefault(record["trace_id"], {})[record["span_id"]] = record
+
+    runs = []
+    for trace_id, by_id in traces.items():
+        records = sorted(by_id.values(), key=lambda r: r["start"])
+        root = next((r for r in records if not r["parent_id"]), records[0])
+        start = records[0]["start"]
+        end = max(r["start"] + (r["duration"] or 0) for r in records)
+        runs.append({"trace_id": trace_id, "name": root["name"], "start": start, "duration": end - start, "spans": records})
+    return sorted(runs, key=lambda run: run["start"], reverse=True)
+
+def short_statement(sql):
+    """DB span 속성용 SQL 요약 (공백 정리 + 길이 제한)"""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", errors="replace")
+    return " ".join(str(sql).split())[:_STATEMENT_CHARS]
@@ -0,0 +1,322 @@
+"""
+로컬 벡터 저장소 (오프라인 RAG 질의응답용)
+- 임베딩은 추가 전용 float32 세그먼트 파일에 저장하고 np.memmap으로 로드
+- 메타데이터(id, source, content)는 세그먼트별 JSONL 사이드 파일에 저장
+- 전체 행렬에 대한 NumPy 내적으로 정확한 top-k 검색 (양자화 설정 시 후보 확대 후 원본 재정렬)
+- 삭제는 툼스톤으로 표시하고, 압축(compact) 시 살아있는 행만 새 세그먼트로 병합
+
+Azure AI Search SearchClient와 같은 형태(content / source)로 결과를 반환하여 대체 백엔드로 사용
+"""
+
+import os
+import json
+import threading
+import numpy as np
+
+from embeddings import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_QUANTIZATION,
+    normalize,
+    quantize,
+    quantized_scores,
+)
+from data.create_index import QUANTIZATION_OVERSAMPLING
+from data.local_search import LocalIndexingResult, LocalSearchResults
+
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "./data/vector_store")
+
+# 자동 압축 기준 (세그먼트 수 또는 삭제된 행 비율 초과 시)
+LOCAL_VECTOR_MAX_SEGMENTS = int(os.getenv("LOCAL_VECTOR_MAX_SEGMENTS", "8"))
+LOCAL_VECTOR_COMPACT_RATIO = float(os.getenv("LOCAL_VECTOR_COMPACT_RATIO", "0.3"))
+
+MANIFEST_FILE = "manifest.json"
+TOMBSTONES_FILE = "tombstones.jsonl"
+
+class LocalVectorStore:
+    """memmap 기반 추가 전용 세그먼트 벡터 저장소"""
+
+    def __init__(self, path=LOCAL_VECTOR_STORE_PATH, dimensions=EMBEDDING_DIMENSIONS,
+                 quantization=EMBEDDING_QUANTIZATION):
+        self.path = path
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self._lock = threading.RLock()
+        self._manifest_mtime = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ---------- 파일 경로 ----------
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _vector_file(self, segment):
+        return self._file(f"{segment}.f32")
+
+    def _meta_file(self, segment):
+        return self._file(f"{segment}.meta.jsonl")
+
+    # ---------- 로드 ----------
+    def _read_manifest(self):
+        try:
+            with open(self._file(MANIFEST_FILE), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {"dimensions": self.dimensions, "segments": [], "next_segment": 1}
+
+        if manifest["dimensions"] != self.dimensions:
+            raise ValueError(
+                f"저장소 차원({manifest['dimensions']})과 설정 차원({self.dimensions})이 다릅니다. "
+                f"새 경로를 사용하거나 재인덱싱하세요."
+            )
+        return manifest
+
+    def _write_manifest(self):
+        tmp_path = self._file(f"{MANIFEST_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self._file(MANIFEST_FILE))
+        self._manifest_mtime = os.path.getmtime(self._file(MANIFEST_FILE))
+
+    def _load(self):
+        """매니페스트, 세그먼트(memmap), 메타데이터, 툼스톤 로드"""
+        with self._lock:
+            self._manifest = self._read_manifest()
+            manifest_path = self._file(MANIFEST_FILE)
+            self._manifest_mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+
+            tombstones = set()
+            if os.path.exists(self._file(TOMBSTONES_FILE)):
+                with open(self._file(TOMBSTONES_FILE), "r", encoding="utf-8") as f:
+                    for line in f:
+                        segment, row = json.loads(line)
+                        tombstones.add((segment, row))
+
+            matrices, metadata, locations = [], [], []
+            for segment in self._manifest["segments"]:
+                name, rows = segment["name"], segment["rows"]
+                if rows == 0:
+                    continue
+                matrices.append(np.memmap(self._vector_file(name), dtype=np.float32, mode="r",
+                                          shape=(rows, self.dimensions)))
+                with open(self._meta_file(name), "r", encoding="utf-8") as f:
+                    for row, line in enumerate(f):
+                        if row >= rows:
+                            break
+                        metadata.append(json.loads(line))
+                        locations.append((name, row))
+
+            self._matrices = matrices
+            self._metadata = metadata
+            self._locations = locations
+            self._tombstones = tombstones
+            self._rebuild_views()
+
+    def _rebuild_views(self):
+        """id → 행 위치 매핑, 살아있는 행 마스크, 양자화 코드 갱신"""
+        # 같은 id가 다시 추가된 경우 최신 행만 유효 (툼스톤 적용 전에 결정 - 삭제된 최신 행 대신 이전 행이 살아나지 않도록)
+        latest = {}
+        for i, meta in enumerate(self._metadata):
+            latest[meta[0]] = i
+        alive = np.zeros(len(self._metadata), dtype=bool)
+        self._id_to_row = {}
+        for doc_id, i in latest.items():
+            if self._locations[i] not in self._tombstones:
+                alive[i] = True
+                self._id_to_row[doc_id] = i
+        self._alive = alive
+        self._full_matrix = None
+
+        if self.quantization != "none" and self._matrices:
+            self._quantized = quantize(self._matrix(), self.quantization)
+        else:
+            self._quantized = None
+
+    def _matrix(self):
+        """전체 벡터 행렬 (세그먼트가 하나면 memmap 그대로 사용)"""
+        if not self._matrices:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        if len(self._matrices) == 1:
+            return self._matrices[0]
+        if self._full_matrix is None:
+            # 세그먼트가 여러 개면 한 번만 이어붙여 재사용 (compact 후에는 다시 memmap 하나)
+            self._full_matrix = np.concatenate(self._matrices)
+        return self._full_matrix
+
+    def refresh(self):
+        """다른 프로세스가 저장소를 변경한 경우 다시 로드"""
+        manifest_path = self._file(MANIFEST_FILE)
+        mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+        if mtime != self._manifest_mtime:
+            self._load()
+
+    # ---------- 쓰기 ----------
+    def add(self, documents):
+        """문서 추가 (같은 id가 있으면 새 행으로 교체) - 호출마다 새 세그먼트 생성"""
+        if not documents:
+            return 0
+
+        vectors = normalize([doc["embedding"] for doc in documents])
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"임베딩 차원({vectors.shape[1]})이 저장소 차원({self.dimensions})과 다릅니다.")
+
+        with self._lock:
+            self.refresh()
+            name = f"seg-{self._manifest['next_segment']:06d}"
+
+            vectors.tofile(self._vector_file(name))
+            with open(self._meta_file(name), "w", encoding="utf-8") as f:
+                for doc in documents:
+                    f.write(json.dumps([doc["id"], doc.get("source"), doc.get("content")], ensure_ascii=False) + "\n")
+
+            self._manifest["segments"].append({"name": name, "rows": len(documents)})
+            self._manifest["next_segment"] += 1
+            self._write_manifest()
+            self._load()
+        return len(documents)
+
+    def delete(self, ids):
+        """id 목록 삭제 (툼스톤 기록)"""
+        with self._lock:
+            self.refresh()
+            rows = [self._id_to_row[i] for i in ids if i in self._id_to_row]
+            with open(self._file(TOMBSTONES_FILE), "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(list(self._locations[row])) + "\n")
+            # 툼스톤 추가를 다른 프로세스에 알리기 위해 매니페스트 갱신
+            self._write_manifest()
+            self._load()
+        return len(rows)
+
+    def compact(self):
+        """살아있는 행만 하나의 세그먼트로 병합하고 기존 세그먼트/툼스톤 정리"""
+        with self._lock:
+            self.refresh()
+            old_segments = [segment["name"] for segment in self._manifest["segments"]]
+            live_rows = np.flatnonzero(self._alive)
+            matrix = self._matrix()
+
+            name = f"seg-{self._manifest['next_segment']:06d}"
+            np.ascontiguousarray(matrix[live_rows], dtype=np.float32).tofile(self._vector_file(name))
+            with open(self._meta_file(name), "w", encoding="utf-8") as f:
+                for row in live_rows:
+                    f.write(json.dumps(self._metadata[row], ensure_ascii=False) + "\n")
+
+            self._manifest["segments"] = [{"name": name, "rows": int(len(live_rows))}]
+            self._manifest["next_segment"] += 1
+            self._write_manifest()
+
+            # memmap 참조 해제 후 이전 파일 삭제
+            self._matrices = []
+            self._full_matrix = None
+            self._quantized = None
+            for old in old_segments:
+                for path in (self._vector_file(old), self._meta_file(old)):
+                    if os.path.exists(path):
+                        os.remove(path)
+            if os.path.exists(self._file(TOMBSTONES_FILE)):
+                os.remove(self._file(TOMBSTONES_FILE))
+            self._load()
+        return len(live_rows)
+
+    def maybe_compact(self, max_segments=LOCAL_VECTOR_MAX_SEGMENTS, ratio=LOCAL_VECTOR_COMPACT_RATIO):
+        """세그먼트가 많거나 삭제된 행 비율이 높으면 압축"""
+        stats = self.stats()
+        if stats["segments"] > max_segments or (stats["rows"] and stats["tombstoned"] / stats["rows"] > ratio):
+            print(f"🧹 로컬 벡터 저장소 압축: {stats['segments']}개 세그먼트, 삭제 {stats['tombstoned']}행")
+            self.compact()
+            return True
+        return False
+
+    # ---------- 조회 ----------
+    def count(self):
+        return int(self._alive.sum())
+
+    def stats(self):
+        """세그먼트 수, 살아있는/삭제된 행 수"""
+        return {
+            "segments": len(self._manifest["segments"]),
+            "rows": len(self._metadata),
+            "alive": self.count(),
+            "tombstoned": len(self._metadata) - self.count(),
+        }
+
+    def search(self, vector, k=3):
+        """
+        정확한 top-k 검색
+
+        Returns:
+            [{"id", "content", "source", "@search.score"}] (유사도 내림차순)
+        """
+        with self._lock:
+            self.refresh()
+            if not self._metadata:
+                return []
+
+            query = normalize(vector).reshape(1, -1)
+            matrix = self._matrix()
+
+            if self._quantized is not None:
+                # 양자화 코드로 후보를 넓게 뽑은 뒤 float32 원본으로 재정렬
+                scores = quantized_scores(query, self._quantized)[0]
+                scores[~self._alive] = -np.inf
+                candidates = _top_k(scores, int(k * QUANTIZATION_OVERSAMPLING))
+                exact = np.asarray(matrix[candidates]) @ query[0]
+                order = candidates[np.argsort(-exact)][:k]
+                final_scores = dict(zip(candidates, exact))
+            else:
+                scores = np.asarray(matrix @ query[0])
+                scores[~self._alive] = -np.inf
+                order = _top_k(scores, k)
+                final_scores = dict(zip(order, scores[order]))
+
+            results = []
+            for row in order:
+                if not self._alive[row]:
+                    continue
+                doc_id, source, content = self._metadata[row]
+                results.append({"id": doc_id, "content": content, "source": source,
+                                "@search.score": float(final_scores[row])})
+            return results
+
+def _top_k(scores, k):
+    """점수 배열에서 상위 k개 인덱스 (내림차순)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=int)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+class LocalVectorSearchClient:
+    """LocalVectorStore를 SearchClient 인터페이스로 감싼 대체 백엔드"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def upload_documents(self, documents, **kwargs):
+        self.store.add(documents)
+        return [LocalIndexingResult(doc["id"]) for doc in documents]
+
+    def merge_or_upload_documents(self, documents, **kwargs):
+        return self.upload_documents(documents)
+
+    def delete_documents(self, documents, **kwargs):
+        self.store.delete([doc["id"] for doc in documents])
+        return [LocalIndexingResult(doc["id"]) for doc in documents]
+
+    def get_document_count(self, **kwargs):
+        return self.store.count()
+
+    def search(self, search_text=None, vector_queries=None, select=None, top=None, **kwargs):
+        """벡터 질의만 지원 (search_text="*"는 문서 수 조회용)"""
+        if not vector_queries:
+            return LocalSearchResults([], self.store.count())
+
+        query = vector_queries[0]
+        k = query.get("k") or top or 3
+        results = self.store.search(query["vector"], k=k)
+        if select:
+            results = [{key: r[key] for key in list(select) + ["@search.score"] if key in r} for r in results]
+        return LocalSearchResults(results, len(results))
+
+    def close(self):
+        pass
@@ -0,0 +1,183 @@
+"""
+생성 작업 worker (job_queue 의 generation_jobs 를 가져가 실행)
+- 설문 작업: 1~5단계 파이프라인 실행 → 단계별 결과(state)를 결과로 기록 (질문 선택/저장은 화면에서)
+- 메트릭 작업: 저장된 질문으로 메트릭 생성 → 메트릭/실패/질문별 성능을 결과로 기록
+- 실행 중 JOB_HEARTBEAT_INTERVAL 마다 lease 연장 + 진행 상황/중간 결과 기록, lease 를 잃으면 실행 취소
+- 여러 프로세스를 띄우면 SKIP LOCKED 로 작업을 나눠 가져감
+- DB 연결이 끊기면 다시 연결해 계속 실행 (기록하지 못한 작업은 lease 만료 후 다른 worker 가 다시 실행)
+
+실행: python worker.py [--worker-id ID] [--once]
+"""
+
+import os
+import copy
+import time
+import socket
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+
+from async_core import call_in_loop, run_sync
+from db.connection import get_connection
+from job_queue import (
+    JOB_HEARTBEAT_INTERVAL,
+    JOB_LEASE_SECONDS,
+    JOB_METRIC,
+    JOB_SURVEY,
+    Heartbeat,
+    LeaseLost,
+    claim_job,
+    complete_job,
+    expire_jobs,
+    fail_job,
+    heartbeat,
+)
+from metric_pipeline import run_metric_pipeline
+from survey_pipeline import new_progress, run_survey_pipeline
+from survey_store import build_input_info, load_questions
+from tracing import span
+
+load_dotenv()
+
+# 대기 작업이 없을 때 다시 조회하기까지 대기 시간
+WORKER_IDLE_SLEEP = float(os.getenv("WORKER_IDLE_SLEEP", "2"))
+# DB 연결이 끊겼을 때 다시 연결하기까지 대기 시간
+WORKER_RECONNECT_DELAY = float(os.getenv("WORKER_RECONNECT_DELAY", "5"))
+
+# 연결이 끊긴 경우의 DB 오류 (같은 연결로는 실패 기록도 할 수 없음)
+DB_CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+def run_survey_job(payload, on_tick):
+    """설문 작업 → (결과, 진행 상황)"""
+    progress = new_progress()
+    state = {}
+
+    def snapshot():
+        # 파이프라인이 고치는 중첩 목록/딕셔너리(warnings, step_metrics 등)는 루프 스레드에서 깊은 복사
+        return call_in_loop(lambda: (copy.deepcopy(progress), copy.deepcopy(state)))
+
+    run_sync(
+        run_survey_pipeline(build_input_info(payload["project"]), state, progress),
+        on_tick=lambda: on_tick(snapshot)
+    )
+    return state, progress
+
+def run_metric_job(payload, on_tick):
+    """메트릭 작업 → (결과, 진행 상황)"""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            questions = load_questions(cur, payload["survey_id"])
+    finally:
+        conn.close()
+
+    progress = {"done": 0, "total": len(questions)}
+
+    def snapshot():
+        return call_in_loop(lambda: (
+            {"done": progress["done"], "total": progress["total"]},
+            {"metrics": sorted(copy.deepcopy(progress.get("metrics", [])), key=lambda m: m["question_order"])}
+        ))
+
+    metrics, failed, performance = run_sync(
+        run_metric_pipeline(questions, payload["scale_type"], progress, exclude_survey_id=payload["survey_id"]),
+        on_tick=lambda: on_tick(snapshot)
+    )
+    result = {"metrics": metrics, "failed": failed, "performance": performance}
+    return result, {"done": progress["done"], "total": progress["total"]}
+
+JOB_HANDLERS = {
+    JOB_SURVEY: run_survey_job,
+    JOB_METRIC: run_metric_job,
+}
+
+def process_job(conn, job, worker_id):
+    """
+    가져온 작업 1건 실행 + 결과/실패 기록
+    DB 연결이 끊겨 기록하지 못하면 DB_CONNECTION_ERRORS 를 그대로 올림 (run_worker 가 다시 연결)
+    """
+    def send(progress, partial_result):
+        with conn.cursor() as cur:
+            return heartbeat(cur, job["id"], worker_id, progress, partial_result)
+
+    beat = Heartbeat(send)
+
+    with span(f"job.{job['job_type']}", kind="run", job_id=job["id"], attempt=job["attempts"]) as job_span:
+        try:
+            result, progress = JOB_HANDLERS[job["job_type"]](job["payload"], beat)
+        except LeaseLost as e:
+            job_span.set(outcome="lease_lost")
+            print(f"⚠️ 작업 {job['id']}: {e}")
+            return
+        except Exception as e:
+            try:
+                with conn.cursor() as cur:
+                    status = fail_job(cur, job["id"], worker_id, f"{type(e).__name__}: {e}")
+            except DB_CONNECTION_ERRORS:
+                job_span.set(outcome="connection_lost")
+                print(f"⚠️ 작업 {job['id']}: DB 연결이 끊겨 실패를 기록하지 못했습니다 (lease 만료 후 다시 실행): {e}")
+                raise
+            job_span.set(outcome=status or "lease_lost")
+            print(f"❌ 작업 {job['id']} 실패 ({job['attempts']}회차, 상태: {status}): {e}")
+            return
+
+        with conn.cursor() as cur:
+            completed = complete_job(cur, job["id"], worker_id, result, progress)
+        job_span.set(outcome="succeeded" if completed else "lease_lost")
+        print(f"✅ 작업 {job['id']} ({job['job_type']}) 완료" if completed
+              else f"⚠️ 작업 {job['id']}: 완료 전에 lease 를 잃어 결과를 버립니다")
+
+def _close_quietly(conn):
+    if conn is None:
+        return
+    try:
+        conn.close()
+    except DB_CONNECTION_ERRORS:
+        pass
+
+def run_worker(worker_id, once=False):
+    """
+    작업을 하나씩 가져가 실행 (once 이면 대기 작업이 없을 때 종료)
+    작업 조회/heartbeat/결과 기록 중 DB 연결이 끊기면 WORKER_RECONNECT_DELAY 후 새 연결로 계속 실행
+    """
+    conn = None
+    print(f"👷 worker 시작: {worker_id} (lease {JOB_LEASE_SECONDS}초, heartbeat {JOB_HEARTBEAT_INTERVAL}초)")
+    try:
+        while True:
+            try:
+                if conn is None:
+                    conn = get_connection()
+                    conn.autocommit = True
+
+                with conn.cursor() as cur:
+                    expired = expire_jobs(cur)
+                    if expired:
+                        print(f"🪦 lease 만료 작업 {expired}개 실패 처리")
+                    job = claim_job(cur, worker_id)
+
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(WORKER_IDLE_SLEEP)
+                    continue
+
+                print(f"▶️ 작업 {job['id']} ({job['job_type']}) 시작 - {job['attempts']}회차")
+                process_job(conn, job, worker_id)
+            except DB_CONNECTION_ERRORS as e:
+                print(f"🔌 DB 연결 오류, {WORKER_RECONNECT_DELAY}초 후 다시 연결합니다: {e}")
+                _close_quietly(conn)
+                conn = None
+                time.sleep(WORKER_RECONNECT_DELAY)
+    finally:
+        _close_quietly(conn)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="생성 작업 worker")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}", help="worker 식별자")
+    parser.add_argument("--once", action="store_true", help="대기 작업을 모두 처리하면 종료")
+    args = parser.parse_args()
+
+    try:
+        run_worker(args.worker_id, once=args.once)
+    except KeyboardInterrupt:
+        print("\n👋 worker 종료 (실행 중이던 작업은 lease 만료 후 다른 worker 가 이어서 실행)")